@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Benchmark for polling several grippers: BKS_HTTP one after the other vs. AsyncBKS_HTTP concurrently.|n
+By default local fake webservers (see fake_webserver) are started, so no real grippers are needed.|n
+|n
+Example usage:|n
+-  %(prog)s --nb_grippers 8 --latency 0.005|n
+-  %(prog)s --hosts 192.168.1.253 192.168.1.254|n
+'''
+
+import os.path
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.bks_lib.bks_http_async import ConnectGrippers, GetValuesOfGrippers, CloseGrippers
+from bkstools.bench.fake_webserver import StartFakeWebservers
+from pyschunk.tools.util import MultilineFormatter
+
+
+def BenchSync( hosts, names, nb_cycles ):
+    """Return the number of polling cycles per s when reading names from all hosts with BKS_HTTP one after the other
+    """
+    grippers = [ BKS_HTTP( host ) for host in hosts ]
+    t0 = time.perf_counter()
+    for c in range( nb_cycles ):  # @UnusedVariable
+        for gripper in grippers:
+            gripper.get_values( names )
+    return nb_cycles / (time.perf_counter() - t0)
+
+
+async def BenchAsync( hosts, names, nb_cycles ):
+    """Return the number of polling cycles per s when reading names from all hosts with AsyncBKS_HTTP concurrently
+    """
+    grippers = await ConnectGrippers( hosts )
+    try:
+        t0 = time.perf_counter()
+        for c in range( nb_cycles ):  # @UnusedVariable
+            for result in await GetValuesOfGrippers( grippers, names ):
+                if ( isinstance( result, BaseException ) ):
+                    raise result
+        return nb_cycles / (time.perf_counter() - t0)
+    finally:
+        CloseGrippers( grippers )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bench_async.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-n", "--nb_grippers",
+                         dest="nb_grippers",
+                         default=8,
+                         type=int,
+                         help="""Number of fake grippers to start. Default is %(default)d.""" )
+
+    parser.add_argument( "-l", "--latency",
+                         dest="latency",
+                         default=0.005,
+                         type=float,
+                         help="""Artificial delay in s per request of the fake grippers. Default is %(default)s.""" )
+
+    parser.add_argument( "-c", "--nb_cycles",
+                         dest="nb_cycles",
+                         default=50,
+                         type=int,
+                         help="""Number of polling cycles to measure. Default is %(default)d.""" )
+
+    parser.add_argument( "-p", "--parameters",
+                         dest="names",
+                         nargs="+",
+                         default=[ "actual_pos", "actual_vel", "actual_cur", "plc_sync_input" ],
+                         help="""Names of the parameters to read per gripper and cycle. Default is %(default)s.""" )
+
+    parser.add_argument( "-H", "--hosts",
+                         dest="hosts",
+                         nargs="+",
+                         default=None,
+                         help="""Real grippers to use instead of fake ones.""" )
+
+    args = parser.parse_args()
+
+    servers = []
+    hosts = args.hosts
+    if ( hosts is None ):
+        servers = StartFakeWebservers( args.nb_grippers, args.latency )
+        hosts = [ server.host for server in servers ]
+        # keep the metadata of the fake grippers out of the users metadata store:
+        BKS_HTTP.metadata_store_path = os.path.join( tempfile.mkdtemp(), "bench_metadata.sqlite" )
+
+    try:
+        rate_sync = BenchSync( hosts, args.names, args.nb_cycles )
+        rate_async = asyncio.run( BenchAsync( hosts, args.names, args.nb_cycles ) )
+    finally:
+        for server in servers:
+            server.Stop()
+
+    print( f"Polling {len(args.names)} parameters from {len(hosts)} grippers:" )
+    print( f"  BKS_HTTP      (one after the other): {rate_sync:8.1f} cycles/s" )
+    print( f"  AsyncBKS_HTTP (concurrently):        {rate_async:8.1f} cycles/s" )
+    print( f"  speedup: {rate_async/rate_sync:.1f}x" )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
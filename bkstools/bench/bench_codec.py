@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Microbenchmark for the conversion of parameter values from the hex strings of the HTTP/JSON webinterface.|n
+Compares the precompiled codecs of bks_codec with the former per call datatype dispatch for every HMS datatype.|n
+|n
+Example usage:|n
+-  %(prog)s|n
+-  %(prog)s --numelements 32 --number 20000|n
+'''
+
+import os.path
+import sys
+import argparse
+import struct
+import timeit
+
+from bkstools.bks_lib import hms
+from bkstools.bks_lib.bks_codec import cCodec, g_format_chars
+from pyschunk.tools.util import MultilineFormatter
+
+
+def LegacyReverse( hex_string ):
+    r = ""
+    for i in range( 0, len( hex_string ), 2 ):
+        r = hex_string[i:i+2] + r
+    return r
+
+
+def LegacyGetSingleValue( datatype, data, reverse_data ):
+    """The datatype dispatch formerly done by BKSBaseCommon.GetSingleValue() for every single value
+    """
+    if ( datatype == hms.HMS_Datatypes.ABP_FLOAT ):
+        if ( reverse_data ):
+            v32 = int( LegacyReverse(data), 16 )
+        else:
+            v32 = int( data, 16 )
+        packed = bytes( (v32 & 0x000000ff,
+                         (v32>>8) & 0x000000ff,
+                         (v32>>16) & 0x000000ff,
+                         (v32>>24) & 0x000000ff) )
+        return struct.unpack("<f", packed)[0]
+
+    if ( datatype in (hms.HMS_Datatypes.ABP_ENUM,
+                      hms.HMS_Datatypes.ABP_UINT8,
+                      hms.HMS_Datatypes.ABP_UINT16,
+                      hms.HMS_Datatypes.ABP_UINT32,
+                      hms.HMS_Datatypes.ABP_UINT64,
+                      hms.HMS_Datatypes.ABP_BITS8,
+                      hms.HMS_Datatypes.ABP_BITS16,
+                      hms.HMS_Datatypes.ABP_BITS32,
+                      hms.HMS_Datatypes.ABP_OCTET) ):
+        if ( reverse_data ):
+            return int( LegacyReverse(data), 16 )
+        return int( data, 16 )
+
+    if ( datatype in (hms.HMS_Datatypes.ABP_SINT8,
+                      hms.HMS_Datatypes.ABP_SINT16,
+                      hms.HMS_Datatypes.ABP_SINT32,
+                      hms.HMS_Datatypes.ABP_SINT64) ):
+        if ( reverse_data ):
+            v = int( LegacyReverse(data), 16 )
+        else:
+            v = int( data, 16 )
+        if ( datatype == hms.HMS_Datatypes.ABP_SINT8 and v >= 0x80 ):
+            v = -((v-1) ^ 0xff)
+        if ( datatype == hms.HMS_Datatypes.ABP_SINT16 and v >= 0x8000 ):
+            v = -((v-1) ^ 0xffff)
+        if ( datatype == hms.HMS_Datatypes.ABP_SINT32 and v >= 0x80000000 ):
+            v = -((v-1) ^ 0xffffffff)
+        if ( datatype == hms.HMS_Datatypes.ABP_SINT64 and v >= 0x8000000000000000 ):
+            v = -((v-1) ^ 0xffffffffffffffff)
+        return v
+
+    if ( datatype == hms.HMS_Datatypes.ABP_BOOL ):
+        return bool( int( data, 16 ) )
+
+    if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
+        s = ""
+        for i in range( 0, len( data ), 2 ):
+            c = chr( int( data[i:i+2], 16 ) )
+            if ( c == "\x00" ):
+                break
+            s += c
+        return s
+    raise ValueError( "Unknown datatype %d" % datatype )
+
+
+def LegacyDecode( datatype, numelements, data, reverse_data ):
+    """The per element loop formerly done by BKS_HTTP.UpdateValue() for arrays
+    """
+    if ( numelements > 1 ):
+        l = []
+        nb_chars = hms.HMS_Datatypes_size_in_bytes[ datatype ] << 1
+        for si in range( numelements ):  # @UnusedVariable
+            l.append( LegacyGetSingleValue( datatype, data[:nb_chars], reverse_data ) )
+            data = data[nb_chars:]
+        if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
+            return "".join(l)
+        return l
+    return LegacyGetSingleValue( datatype, data, reverse_data )
+
+
+def MakeSampleData( datatype, numelements ):
+    """Return a hex string with numelements sample values of datatype in little endian byte order
+    """
+    if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
+        return ( b"bkstools" * numelements )[:numelements].hex()
+    format_char = g_format_chars[ datatype ]
+    samples = { "?": True, "b": -5, "h": -1234, "i": -123456, "q": -1234567890123,
+                "B": 0xa5, "H": 0xbeef, "I": 0xdeadbeef, "Q": 0x0123456789abcdef, "f": 3.25 }
+    return struct.pack( f"<{numelements}{format_char}", *( [samples[ format_char ]] * numelements ) ).hex()
+
+
+def BenchDatatype( datatype, numelements, number, reverse_data ):
+    """Return (t_legacy, t_codec) in s per decoded value for datatype with numelements elements
+    """
+    data = MakeSampleData( datatype, numelements )
+    codec = cCodec( datatype, numelements )
+
+    legacy = LegacyDecode( datatype, numelements, data, reverse_data )
+    current = codec.Decode( data, reverse_data )
+    if ( legacy != current ):
+        raise ValueError( f"Mismatch for {hms.HMS_Datatypes.GetName( datatype )}: legacy={legacy!r} codec={current!r}" )
+
+    t_legacy = timeit.timeit( lambda: LegacyDecode( datatype, numelements, data, reverse_data ), number=number ) / number
+    t_codec  = timeit.timeit( lambda: codec.Decode( data, reverse_data ), number=number ) / number
+    return (t_legacy, t_codec)
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bench_codec.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-n", "--number",
+                         dest="number",
+                         default=100000,
+                         type=int,
+                         help="""Number of decodes per datatype and measurement. Default is %(default)d.""" )
+
+    parser.add_argument( "-e", "--numelements",
+                         dest="numelements",
+                         default=16,
+                         type=int,
+                         help="""Number of elements for the array measurements. Default is %(default)d.""" )
+
+    parser.add_argument( "--big_endian",
+                         dest="reverse_data",
+                         action="store_false",
+                         default=True,
+                         help="""Benchmark big endian hex strings (dataformat 1) instead of the default little endian ones (dataformat 0).""" )
+
+    args = parser.parse_args()
+
+    datatypes = [ hms.HMS_Datatypes.ABP_CHAR ] + sorted( g_format_chars.keys() )
+    print( f"{'datatype':<12} {'elems':>5} {'legacy [us]':>12} {'codec [us]':>12} {'speedup':>8}" )
+    for numelements in (1, args.numelements):
+        for datatype in datatypes:
+            (t_legacy, t_codec) = BenchDatatype( datatype, numelements, args.number, args.reverse_data )
+            print( f"{hms.HMS_Datatypes.GetName( datatype ):<12} {numelements:>5} {t_legacy*1e6:>12.3f} {t_codec*1e6:>12.3f} {t_legacy/t_codec:>7.1f}x" )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
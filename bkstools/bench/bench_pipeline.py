@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Benchmark for the cycle time of a pick-and-place loop (move, grip, move, release) with BKSModule:|n
+calling the commands one after the other vs. submitting them to a cCommandQueue (with and without cStatusWatcher).|n
+By default a local fake webserver with a simulated motion (see fake_webserver.cFakeMotion) is used, so no real gripper is needed.|n
+|n
+Example usage:|n
+-  %(prog)s --latency 0.005|n
+-  %(prog)s -H 192.168.1.253 --pick 10000 --place 40000 --vel 50000|n
+'''
+
+import os.path
+import sys
+import time
+import argparse
+import tempfile
+
+from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.bks_lib.bks_module import BKSModule
+from bkstools.bks_lib.bks_command_queue import cCommandQueue
+from bkstools.bench.fake_webserver import cFakeWebserver, cFakeMotion
+from pyschunk.tools.util import MultilineFormatter
+
+
+def PickAndPlace( target, args ):
+    """Perform one pick-and-place cycle with target (a BKSModule or cCommandQueue).
+    Return the result of the last command (a Future for a cCommandQueue).
+    """
+    target.move_to_absolute_position( args.pick, args.vel )
+    target.grip_workpiece( BKSModule.grip_from_outside, args.vel, args.force, wait_command_successfully_processed_timeout=1.0 )
+    target.move_to_absolute_position( args.place, args.vel )
+    return target.release_workpiece( wait_command_successfully_processed_timeout=1.0 )
+
+
+def Bench( host, args, use_queue, use_status_watcher, count_requests ):
+    """Return (cycle time in s, number of requests per cycle or None) of the pick-and-place loop
+    """
+    gripper = BKSModule( host, use_status_watcher=use_status_watcher )
+    gripper.print_command_timing = False
+    target = gripper
+    if ( use_queue ):
+        target = cCommandQueue( gripper )
+    try:
+        PickAndPlace( target, args )  # warm up, e.g. read the cached values once
+        n0 = count_requests()
+        t0 = time.perf_counter()
+        for c in range( args.nb_cycles ):  # @UnusedVariable
+            result = PickAndPlace( target, args )
+        if ( use_queue ):
+            result.result()
+        t1 = time.perf_counter()
+        n1 = count_requests()
+    finally:
+        if ( use_queue ):
+            target.Close()
+        gripper.StopStatusWatcher()
+    nb_requests = None if n0 is None else (n1 - n0) / args.nb_cycles
+    return ( (t1 - t0) / args.nb_cycles, nb_requests )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bench_pipeline.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-l", "--latency",
+                         dest="latency",
+                         default=0.005,
+                         type=float,
+                         help="""Artificial delay in s per request of the fake gripper. Default is %(default)s.""" )
+
+    parser.add_argument( "-c", "--nb_cycles",
+                         dest="nb_cycles",
+                         default=10,
+                         type=int,
+                         help="""Number of pick-and-place cycles to measure. Default is %(default)d.""" )
+
+    parser.add_argument( "--pick", dest="pick", default=10000, type=int, help="""Pick position in µm. Default is %(default)d.""" )
+    parser.add_argument( "--place", dest="place", default=20000, type=int, help="""Place position in µm. Default is %(default)d.""" )
+    parser.add_argument( "--vel", dest="vel", default=100000, type=int, help="""Velocity in µm/s. Default is %(default)d.""" )
+    parser.add_argument( "--force", dest="force", default=50, type=int, help="""Grip force in %%. Default is %(default)d.""" )
+
+    parser.add_argument( "-H", "--host",
+                         dest="host",
+                         default=None,
+                         help="""Real gripper to use instead of the fake one. !!! The gripper will move !!!""" )
+
+    args = parser.parse_args()
+
+    server = None
+    motion = None
+    host = args.host
+    count_requests = lambda: None
+    if ( host is None ):
+        server = cFakeWebserver( latency=args.latency )
+        motion = cFakeMotion( server.gripper )
+        host = server.host
+        count_requests = lambda: server.gripper.nb_requests
+        # keep the metadata of the fake gripper out of the users metadata store:
+        BKS_HTTP.metadata_store_path = os.path.join( tempfile.mkdtemp(), "bench_metadata.sqlite" )
+
+    results = []
+    try:
+        for (description, use_queue, use_status_watcher) in [ ("BKSModule calls one after the other", False, False),
+                                                              ("cCommandQueue",                       True,  False),
+                                                              ("cCommandQueue with cStatusWatcher",   True,  True) ]:
+            results.append( (description,) + Bench( host, args, use_queue, use_status_watcher, count_requests ) )
+    finally:
+        if ( motion is not None ):
+            motion.Stop()
+        if ( server is not None ):
+            server.Stop()
+
+    print( f"Pick-and-place cycle (move, grip, move, release) with {args.nb_cycles} cycles:" )
+    t_reference = results[0][1]
+    for (description, cycle_time, nb_requests) in results:
+        requests_str = "" if nb_requests is None else f" {nb_requests:6.1f} requests/cycle"
+        print( f"  {description:<36} {cycle_time*1000.0:8.1f} ms/cycle{requests_str}  gain {100.0*(t_reference-cycle_time)/t_reference:5.1f} %" )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Benchmark for saving bks.py recordings as GPD or CSV: rendering record by record as formerly done by
+cRecording.GetRecordString() vs. rendering column by column with cRecording.GetRecordStrings().|n
+A synthetic recording (positions, status dword bits, changing error codes and states, unreadable values) is used,
+a local fake webserver provides the metadata only.|n
+|n
+Example usage:|n
+-  %(prog)s|n
+-  %(prog)s --nb_records 1000000 --comma|n
+'''
+
+import os.path
+import sys
+import math
+import time
+import argparse
+import tempfile
+
+from bkstools.scripts import bks
+from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.bks_lib.bks_base import BKSBase
+from bkstools.bench.fake_webserver import cFakeWebserver
+from pyschunk.tools.util import MultilineFormatter
+
+
+## Parameters of the synthetic recording and their output formats
+g_parameters = [ ("actual_pos", ""), ("actual_vel", ""), ("actual_cur", ""), ("plc_sync_input[0]", ":08x"), ("plc_sync_input", ""),
+                 ("system_state", ""), ("err_code", ""), ("wrn_code", ""), ("internal_params.comm_state", "") ]
+
+
+def LegacyGetRecordString( recording, record, tstart ):
+    """Rendering of a single record as formerly done by cRecording.GetRecordString()
+    """
+    def GetValue( value, nbdigits=6, valueformat="" ):
+        if ( value is None ):
+            return "NaN"
+        if ( valueformat != "" ):
+            s = "{0" + valueformat + "}"
+            return s.format( value )
+        if ( type( value ) is float ):
+            s = "%.*f" % (nbdigits,value)
+            if ( recording.use_comma ):
+                s = s.replace(".",",")
+            return s
+        return value
+
+    def GetValueString( name, value, valueformat="" ):
+        if ( recording.cyclically ):
+            return "%s%s" % (GetValue(value, valueformat=valueformat), recording.sep)
+        else:
+            return "%s=%s%s" % (name, GetValue(value, valueformat=valueformat), recording.sep)
+
+    s = ""
+    sl = ""
+    t = record[0] - tstart
+    if ( recording.cyclically ):
+        s += "%s%s%s%s%s%s" % (GetValue(t,3), recording.sep, GetValue(record[0],3), recording.sep, bks.GetHHMMSSms( record[0], recording.use_comma ), recording.sep )
+    for (parametername,value,parameterformat) in zip( recording.parameternames_to_record, record[1:], recording.parameterformats ):
+        s += GetValueString( parametername, value, parameterformat )
+
+    for parametername in recording.parameternames_to_print:
+        for o in recording.special_names_prefix_bits:
+            if ( parametername == o.parametername ):
+                rv = record[ o.value_index ]
+                try:
+                    v = int( rv )
+                    for (name,mask) in o.bits:
+                        s += GetValueString( name, 1 if ( v & mask ) else 0 )
+                except TypeError:
+                    for (name,mask) in o.bits:
+                        s += GetValueString( name, None )
+
+        for o in recording.special_names_codes:
+            if ( recording.do_gpd and parametername in o.parameternames ):
+                rv = record[ o.value_index ]
+                try:
+                    code_int = int( rv )
+                    (new_value,label_str) = o.GetStr( recording.bks, code_int)
+                except TypeError:
+                    new_value = "NaN"
+                    label_str = "???"
+                if ( new_value != o.last_value ):
+                    sl += '\n## set label "\\n%s" at %.3f,character %.1f point pointtype 9 pointsize 1.5 left %s' % (label_str, t, o.char_offset, o.color)
+                    o.last_value = new_value
+    return s + sl
+
+
+def FillRecording( recording, nb_records, t0 ):
+    """Append nb_records synthetic records with 1ms period to the record buffer of recording
+    """
+    error_codes = [ 0x00, 0x00, 0xd9, 0x00, 0xde ]
+    for k in range( nb_records ):
+        if ( k % 5000 == 4999 ):
+            recording.record_buffer.Append( t0 + k * 0.001, [ None ] * len( g_parameters ) )  # e.g. connection lost
+            continue
+        pos = 50.0 + 40.0 * math.sin( k * 0.002 )
+        status_dword = ( k // 100 ) & 0x3ffff
+        err_code = error_codes[ ( k // 1000 ) % len( error_codes ) ]
+        values = [ pos, 40.0 * 0.002 * math.cos( k * 0.002 ), 0.1 * ( k % 17 ), status_dword, [ status_dword, int( pos * 1000 ), err_code, 0 ],
+                   ( ( k // 2000 ) % 4 ) << 8, err_code, 0, 0x0a + ( k // 30000 ) % 2 ]
+        recording.record_buffer.Append( t0 + k * 0.001, values )
+
+
+def Bench( recording, tstart, do_gpd, use_comma ):
+    """Return (time for legacy rendering, time for column wise rendering) in s and check that both give the same output
+    """
+    recording.do_gpd = do_gpd
+    recording.use_comma = use_comma
+    header = recording.GetHeader( tstart, "bench" )
+
+    for o in recording.special_names_codes:
+        o.last_value = None
+    t0 = time.perf_counter()
+    legacy = [ header ]
+    for record in recording.record_buffer.GetRecords( tstart ):
+        legacy.append( LegacyGetRecordString( recording, record, tstart ) + "\n" )
+    t1 = time.perf_counter()
+
+    for o in recording.special_names_codes:
+        o.last_value = None
+    t2 = time.perf_counter()
+    lines = [ header ]
+    for slices in recording.record_buffer.GetSlices( tstart ):
+        (times, value_lists) = recording.record_buffer.GetValueLists( slices )
+        lines.extend( line + "\n" for line in recording.GetRecordStrings( times, value_lists, tstart ) )
+    t3 = time.perf_counter()
+
+    if ( lines != legacy ):
+        for (a,b) in zip( legacy, lines ):
+            if ( a != b ):
+                raise AssertionError( f"Different output:\n  legacy:      {a!r}\n  column wise: {b!r}" )
+        raise AssertionError( f"Different number of lines: {len(legacy)} vs. {len(lines)}" )
+    return ( t1 - t0, t3 - t2 )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bench_render.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-n", "--nb_records",
+                         dest="nb_records",
+                         default=100000,
+                         type=int,
+                         help="""Number of records of the synthetic recording. Default is %(default)d.""" )
+    parser.add_argument( "--comma",
+                         dest="use_comma",
+                         action="store_true",
+                         help="""Flag, if given then render CSV with decimal comma, see bks.py --use_comma.""" )
+
+    args = parser.parse_args()
+
+    # keep the metadata of the fake gripper out of the users metadata store:
+    BKS_HTTP.metadata_store_path = os.path.join( tempfile.mkdtemp(), "bench_metadata.sqlite" )
+    server = cFakeWebserver()
+    try:
+        gripper = BKSBase( server.host )
+        names = [ name for (name,parameterformat) in g_parameters ]  # @UnusedVariable
+        formats = [ parameterformat for (name,parameterformat) in g_parameters ]  # @UnusedVariable
+        recording = bks.cRecording( gripper, names, formats, False, False, "bench_render", "bench", False, True, -3600.0, " ", False )
+        t0 = math.floor( time.time() )
+        FillRecording( recording, args.nb_records, t0 )
+
+        print( f"Rendering a recording of {args.nb_records} records with {len(names)} parameters:" )
+        for (description, do_gpd) in [ ("GPD", True), ("CSV", False) ]:
+            (t_legacy, t_columns) = Bench( recording, t0, do_gpd, args.use_comma and not do_gpd )
+            print( f"  {description}: record by record {t_legacy:7.3f} s   column wise {t_columns:7.3f} s   speedup {t_legacy/t_columns:5.2f}" )
+        recording.Close()
+    finally:
+        server.Stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
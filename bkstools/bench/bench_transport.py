@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Benchmark suite for the transports BKS_HTTP and BKS_Modbus with a report of latency percentiles as JSON.|n
+Measured per transport: latency of single parameter get and set, poll rate of plc_sync_input, time of a dump of
+all parameters, startup time (cold and warm metadata cache) and the latency from sending a command via plc_sync_output
+to seeing the command_received_toggle in plc_sync_input.|n
+By default the local gripper simulator (see bkstools.simulator) is used as stand-in, via HTTP and via Modbus-RTU on a
+pseudo terminal, so the results only depend on the host and the software and can be compared between releases
+with --baseline.|n
+|n
+Example usage:|n
+-  %(prog)s --output bench_0.0.2.32.json|n
+-  %(prog)s --transports http --latency 0.002 --nb_samples 1000|n
+-  %(prog)s --baseline bench_0.0.2.31.json|n
+'''
+
+import os.path
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+import bkstools.release
+from bkstools.bks_lib.bks_base import BKSBase
+from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.simulator.sim_gripper import cSimGripper
+from bkstools.simulator.sim_model import cKinematicModel
+from bkstools.simulator.sim_faults import cFaultInjector
+from bkstools.simulator.sim_http import cSimWebserver
+from pyschunk.tools.util import MultilineFormatter
+
+
+def GetPercentiles( samples, percentiles=(50, 90, 99) ):
+    """Return a dict with the number, minimum, mean, maximum and the percentiles (nearest rank) of the durations samples (in s) in ms
+    """
+    ordered = sorted( samples )
+    n = len( ordered )
+    result = dict( n=n, min_ms=ordered[0] * 1000.0, mean_ms=sum( ordered ) / n * 1000.0 )
+    for p in percentiles:
+        result[ f"p{p}_ms" ] = ordered[ min( n - 1, max( 0, -( -p * n // 100 ) - 1 ) ) ] * 1000.0
+    result[ "max_ms" ] = ordered[-1] * 1000.0
+    return { k: round( v, 4 ) if k != "n" else v for (k,v) in result.items() }
+
+
+def TimeCalls( function, nb_samples, nb_warmup ):
+    """Return the list of durations in s of nb_samples calls of function, after nb_warmup calls that are not measured
+    """
+    for i in range( nb_warmup ):  # @UnusedVariable
+        function()
+    samples = []
+    for i in range( nb_samples ):  # @UnusedVariable
+        t0 = time.perf_counter()
+        function()
+        samples.append( time.perf_counter() - t0 )
+    return samples
+
+
+def BenchCommandReceived( bks, nb_samples, nb_warmup, timeout=1.0 ):
+    """Return the list of durations in s from writing a command to plc_sync_output until the toggled command_received_toggle is read.
+    The command is a move to the actual position (i.e. no motion), repeated with the repeat_command_toggle.
+    """
+    bks.plc_sync_output = [ bks.cw_fast_stop, 0, 0, 0 ]
+    bks.plc_sync_output = [ bks.cw_fast_stop | bks.cw_acknowledge, 0, 0, 0 ]
+    time.sleep( 0.1 )
+    pos = bks.plc_sync_input[1]
+    samples = []
+    for i in range( nb_warmup + nb_samples ):
+        toggle = bks.plc_sync_input[0] & bks.sw_command_received_toggle
+        controlword = bks.cw_fast_stop | bks.cw_move_to_absolute_position | ( bks.cw_repeat_command_toggle if i & 1 else 0 )
+        t0 = time.perf_counter()
+        bks.plc_sync_output = [ controlword, pos, 10000, 0 ]
+        while ( bks.plc_sync_input[0] & bks.sw_command_received_toggle == toggle ):
+            if ( time.perf_counter() - t0 > timeout ):
+                raise TimeoutError( f"command_received_toggle not toggled within {timeout} s" )
+        if ( i >= nb_warmup ):
+            samples.append( time.perf_counter() - t0 )
+    return samples
+
+
+def BenchTransport( host, args, is_http ):
+    """Return a dict with the results of all benchmarks for the gripper at host
+    """
+    results = dict()
+    bks = BKSBase( host )
+    if ( is_http ):
+        # cold: empty metadata store, i.e. all metadata is read from the gripper,
+        # warm: metadata store filled by the connection above, only the firmware token is validated.
+        warm_store_path = BKS_HTTP.metadata_store_path
+        cold_samples = []
+        for i in range( args.nb_startups ):
+            BKS_HTTP.metadata_store_path = os.path.join( tempfile.mkdtemp(), "bench_metadata.sqlite" )
+            t0 = time.perf_counter()
+            BKSBase( host )
+            cold_samples.append( time.perf_counter() - t0 )
+        BKS_HTTP.metadata_store_path = warm_store_path
+        results[ "startup_cold" ] = GetPercentiles( cold_samples )
+        results[ "startup_warm" ] = GetPercentiles( TimeCalls( lambda: BKSBase( host ), args.nb_startups, 1 ) )
+    else:
+        # BKS_Modbus takes the metadata from the default_settings, so there is no cold or warm cache:
+        results[ "startup" ] = GetPercentiles( TimeCalls( lambda: BKSBase( host ), args.nb_startups, 1 ) )
+
+    results[ "get_single" ] = GetPercentiles( TimeCalls( lambda: bks.get_value( "actual_pos" ), args.nb_samples, args.nb_warmup ) )
+    results[ "set_single" ] = GetPercentiles( TimeCalls( lambda: bks.set_value( "set_force", value=50.0 ), args.nb_samples, args.nb_warmup ) )
+
+    samples = TimeCalls( lambda: bks.get_value( "plc_sync_input" ), args.nb_samples, args.nb_warmup )
+    results[ "poll_plc_sync_input" ] = GetPercentiles( samples )
+    results[ "poll_plc_sync_input" ][ "rate_hz" ] = round( len( samples ) / sum( samples ), 1 )
+
+    names = [ name for name in bks.name_to_index if name in args.parameter_names ]
+    def DumpAll():
+        bks.cached_index_to_value.clear()   # really read constant parameters as well
+        bks.get_values( names, ignore_insufficient_read_rights=True )
+    results[ "dump_all" ] = GetPercentiles( TimeCalls( DumpAll, args.nb_dumps, 1 ) )
+    results[ "dump_all" ][ "nb_parameters" ] = len( names )
+
+    results[ "command_received" ] = GetPercentiles( BenchCommandReceived( bks, args.nb_commands, 2 ) )
+    return results
+
+
+def PrintComparison( report, baseline ):
+    """Print the change of the median and 99th percentile of all results in report relative to baseline
+    """
+    print( f"Comparison with baseline bkstools {baseline.get( 'bkstools' )} (positive = slower):" )
+    for (transport, results) in report[ "results" ].items():
+        for (name, result) in results.items():
+            base = baseline.get( "results", {} ).get( transport, {} ).get( name )
+            if ( base is None ):
+                continue
+            changes = []
+            for key in ( "p50_ms", "p99_ms" ):
+                if ( base.get( key ) ):
+                    changes.append( f"{key[:-3]} {result[ key ]:9.3f} ms {100.0 * ( result[ key ] - base[ key ] ) / base[ key ]:+7.1f} %" )
+            print( f"  {transport:<7} {name:<20} " + "  ".join( changes ) )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bench_transport.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-t", "--transports",
+                         dest="transports",
+                         nargs="+",
+                         default=[ "http", "modbus" ],
+                         choices=[ "http", "modbus" ],
+                         help="""The transports to benchmark. Modbus-RTU needs pseudo terminals, i.e. Linux or macOS. Default is %(default)s.""" )
+
+    parser.add_argument( "-n", "--nb_samples",
+                         dest="nb_samples",
+                         default=200,
+                         type=int,
+                         help="""Number of measured single get, set and poll transactions. Default is %(default)d.""" )
+
+    parser.add_argument( "-w", "--nb_warmup",
+                         dest="nb_warmup",
+                         default=10,
+                         type=int,
+                         help="""Number of unmeasured transactions before each measurement. Default is %(default)d.""" )
+
+    parser.add_argument( "--nb_commands",
+                         dest="nb_commands",
+                         default=50,
+                         type=int,
+                         help="""Number of measured commands. Default is %(default)d.""" )
+
+    parser.add_argument( "--nb_dumps",
+                         dest="nb_dumps",
+                         default=5,
+                         type=int,
+                         help="""Number of measured dumps of all parameters. Default is %(default)d.""" )
+
+    parser.add_argument( "--nb_startups",
+                         dest="nb_startups",
+                         default=5,
+                         type=int,
+                         help="""Number of measured startups (connections). Default is %(default)d.""" )
+
+    parser.add_argument( "-l", "--latency",
+                         dest="latency",
+                         default=0.0,
+                         type=float,
+                         help="""Artificial delay in s per request of the simulated gripper. Default is %(default)s.""" )
+
+    parser.add_argument( "-o", "--output",
+                         dest="output",
+                         default=None,
+                         help="""File to write the JSON report to. Default is to print it.""" )
+
+    parser.add_argument( "-b", "--baseline",
+                         dest="baseline",
+                         default=None,
+                         help="""JSON report of an earlier run to compare the results with.""" )
+
+    args = parser.parse_args()
+
+    gripper = cSimGripper()
+    args.parameter_names = [ d["name"] for d in gripper.data ]
+    model = cKinematicModel( gripper )
+    faults = cFaultInjector( latency=args.latency )
+    server = cSimWebserver( gripper, faults=faults )
+    slave = None
+    # keep the metadata of the simulated gripper out of the users metadata store:
+    BKS_HTTP.metadata_store_path = os.path.join( tempfile.mkdtemp(), "bench_metadata.sqlite" )
+
+    report = dict( bkstools=bkstools.release.PROJECT_RELEASE,
+                   python=platform.python_version(),
+                   platform=platform.platform(),
+                   settings=dict( nb_samples=args.nb_samples, nb_warmup=args.nb_warmup, nb_commands=args.nb_commands,
+                                  nb_dumps=args.nb_dumps, nb_startups=args.nb_startups, latency=args.latency ),
+                   results=dict() )
+    try:
+        for transport in args.transports:
+            if ( transport == "http" ):
+                host = server.host
+            else:
+                from bkstools.simulator.sim_modbus import cModbusRTUSlave
+                slave = cModbusRTUSlave( { 12: gripper }, faults )
+                host = f"{slave.port},12,115200,8N1"
+            report[ "results" ][ transport ] = BenchTransport( host, args, transport == "http" )
+    finally:
+        if ( slave is not None ):
+            slave.Stop()
+        server.Stop()
+        model.Stop()
+
+    text = json.dumps( report, indent=2 )
+    if ( args.output ):
+        with open( args.output, "w" ) as f:
+            f.write( text + "\n" )
+    else:
+        print( text )
+    if ( args.baseline ):
+        with open( args.baseline ) as f:
+            PrintComparison( report, json.load( f ) )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Local fake of the HTTP/JSON webinterface of a BKS gripper for offline measurements.|n
+Serves /adi/info.json, /adi/metadata2.json, /adi/enum.json, /adi/data.json, /adi/update.json and /module/info.json
+with the parameter metadata and enums from the default_settings in bkstools_data.
+Parameter values are plain memory: initially all 0, written by /adi/update.json.|n
+|n
+Example usage:|n
+-  %(prog)s --port 8080|n
+-  %(prog)s --port 8080 --nb_servers 8 --latency 0.005|n
+-  %(prog)s --port 8080 --nb_servers 8 --consecutive_addresses  # on 127.0.0.1 ... 127.0.0.8|n
+'''
+
+import os.path
+import sys
+import json
+import time
+import struct
+import argparse
+import ipaddress
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import bkstools
+from bkstools.bks_lib import hms
+from pyschunk.tools.util import GetPersistantDict, MultilineFormatter
+
+
+def LoadDefaultSettings():
+    """Return (data,enums) from the default_settings in bkstools_data.
+    data is the list of parameter metadata dicts, enums a dict mapping parameter names to dicts of enum names to values.
+    """
+    settings = GetPersistantDict( name="default_settings", path=os.path.join( os.path.dirname( bkstools.__file__ ), "bkstools_data" ) )
+    try:
+        data = list( settings[ "data" ] )
+        enums = dict()
+        for (key,value) in settings.items():
+            if ( key.endswith( ".enum" ) ):
+                enums[ key[:-len(".enum")] ] = { k: v for (k,v) in value.items() if k != "_last" }
+    finally:
+        settings.close()
+    return (data, enums)
+
+
+def GetSizeInBytes( d ):
+    """Return the size in bytes of the value of the parameter described by metadata dict d
+    """
+    if ( len( d["datatype"] ) > 1 ):
+        return sum( [ hms.HMS_Datatypes_size_in_bytes[ dt ] * nb for (dt,nb) in zip( d["datatype"], d["numsubelements"] ) ] )
+    return hms.HMS_Datatypes_size_in_bytes[ d["datatype"][0] ] * d["numelements"]
+
+
+class cFakeGripper(object):
+    """The state of a single fake gripper: metadata, enums and parameter values (as bytearrays in little endian byte order).
+    """
+    def __init__( self, data, enums, sw_version_txt="0.0.0.0-fake", networktype=137, serial_no_num=0 ):
+        self.data = data
+        self.enums = enums
+        self.networktype = networktype
+        self.lock = threading.Lock()
+        self.index_of_inst = { d["instance"]: i for (i,d) in enumerate( data ) }
+        self.values = [ bytearray( GetSizeInBytes( d ) ) for d in data ]
+        self.nb_requests = 0
+        self.SetValueBytes( "sw_version_txt", sw_version_txt.encode( "latin-1" ) )
+        self.SetValueBytes( "serial_no_num", struct.pack( "<I", serial_no_num ) )
+        self.SetValueBytes( "serial_no_txt", f"{serial_no_num:08d}".encode( "latin-1" ) )
+
+    def GetIndexOfName( self, name ):
+        for (i,d) in enumerate( self.data ):
+            if ( d["name"] == name ):
+                return i
+        return None
+
+    def SetValueBytes( self, name, value, offset=0 ):
+        """Set the raw bytes of the value of parameter name (if available)
+        """
+        i = self.GetIndexOfName( name )
+        if ( i is not None ):
+            with self.lock:
+                self.values[ i ][offset:offset+len(value)] = value[:len( self.values[ i ] ) - offset]
+
+    def GetElementOffset( self, i, e ):
+        """Return the offset in bytes of element e of the array or structured parameter with index i
+        """
+        d = self.data[ i ]
+        if ( len( d["datatype"] ) > 1 ):
+            return sum( [ hms.HMS_Datatypes_size_in_bytes[ dt ] * nb for (dt,nb) in list( zip( d["datatype"], d["numsubelements"] ) )[:e] ] )
+        return e * hms.HMS_Datatypes_size_in_bytes[ d["datatype"][0] ]
+
+    def WriteValue( self, i, value, offset=0 ):
+        """Write the raw bytes value to the parameter with index i at offset, as done by /adi/update.json
+        """
+        with self.lock:
+            self.values[ i ][offset:offset+len(value)] = value
+
+
+class cFakeMotion(object):
+    """Minimal reaction of a cFakeGripper to commands sent via plc_sync_output, for benchmarks of command sequences.
+
+    On every change of plc_sync_output the command_received_toggle bit of the statusword in plc_sync_input
+    is toggled after received_delay s. After the motion time (position change / velocity, but at least min_duration s)
+    actual_pos is set to the commanded position and the success and position_reached bits are set.
+    The commanded position is always taken as absolute position. The fake does neither know errors nor grip physics.
+    """
+    # statusword bits, see BKSBaseCommon.SetupStatusword():
+    SW_READY_FOR_OPERATION = 1 << 0
+    SW_SUCCESS = 1 << 4
+    SW_COMMAND_RECEIVED_TOGGLE = 1 << 5
+    SW_POSITION_REACHED = 1 << 13
+
+    def __init__( self, gripper, received_delay=0.005, min_duration=0.02, cycle_time=0.001 ):
+        self.gripper = gripper
+        self.received_delay = received_delay
+        self.min_duration = min_duration
+        self.cycle_time = cycle_time
+        self.index_output = gripper.GetIndexOfName( "plc_sync_output" )
+        self.statusword = self.SW_READY_FOR_OPERATION
+        self.actual_pos = 0
+        self.SetInput()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread( target=self.Run, daemon=True )
+        self.thread.start()
+
+    def SetInput( self ):
+        self.gripper.SetValueBytes( "plc_sync_input", struct.pack( "<IiII", self.statusword, self.actual_pos, 0, 0 ) )
+
+    def GetOutput( self ):
+        with self.gripper.lock:
+            return struct.unpack( "<IiiI", bytes( self.gripper.values[ self.index_output ] ) )
+
+    def Run( self ):
+        last_output = self.GetOutput()
+        while ( not self.stop_event.wait( self.cycle_time ) ):
+            output = self.GetOutput()
+            if ( output == last_output ):
+                continue
+            last_output = output
+            (controlword, pos, vel, force) = output  # @UnusedVariable
+            time.sleep( self.received_delay )
+            self.statusword = ( self.statusword ^ self.SW_COMMAND_RECEIVED_TOGGLE ) & ~(self.SW_SUCCESS | self.SW_POSITION_REACHED)
+            self.SetInput()
+            if ( vel > 0 ):
+                duration = max( self.min_duration, abs( pos - self.actual_pos ) / vel )
+                self.actual_pos = pos
+            else:
+                duration = self.min_duration
+            time.sleep( duration - self.received_delay )
+            self.statusword |= self.SW_SUCCESS | self.SW_POSITION_REACHED
+            self.SetInput()
+
+    def Stop( self ):
+        self.stop_event.set()
+        self.thread.join()
+
+
+class cFakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"    # keep-alive
+    disable_nagle_algorithm = True  # headers and body are written separately, so avoid delayed ACKs
+
+    def log_message( self, *args ):
+        pass
+
+    def Reply( self, obj, code=200 ):
+        body = json.dumps( obj ).encode( "utf-8" )
+        self.send_response( code )
+        self.send_header( "Content-Type", "application/json" )
+        self.send_header( "Content-Length", str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def do_POST( self ):
+        self.do_GET()
+
+    def do_GET( self ):
+        gripper = self.server.gripper
+        gripper.nb_requests += 1
+        if ( self.server.latency > 0.0 ):
+            time.sleep( self.server.latency )
+
+        url = urllib.parse.urlparse( self.path )
+        query = { k: v[0] for (k,v) in urllib.parse.parse_qs( url.query ).items() }
+        try:
+            if ( url.path == "/adi/info.json" ):
+                return self.Reply( { "dataformat": 0, "numadis": len( gripper.data ), "webversion": 1 } )
+            if ( url.path == "/module/info.json" ):
+                return self.Reply( { "networktype": gripper.networktype } )
+            if ( url.path == "/adi/metadata2.json" ):
+                offset = int( query["offset"] )
+                return self.Reply( gripper.data[ offset : offset + int( query["count"] ) ] )
+            if ( url.path == "/adi/enum.json" ):
+                name = gripper.data[ gripper.index_of_inst[ int( query["inst"] ) ] ]["name"]
+                return self.Reply( [ { "string": k, "value": v } for (k,v) in gripper.enums.get( name, {} ).items() ] )
+            if ( url.path == "/adi/data.json" ):
+                offset = int( query["offset"] )
+                with gripper.lock:
+                    return self.Reply( [ v.hex() for v in gripper.values[ offset : offset + int( query["count"] ) ] ] )
+            if ( url.path == "/adi/update.json" ):
+                i = gripper.index_of_inst[ int( query["inst"] ) ]
+                value = bytes.fromhex( query["value"] )
+                offset = 0
+                if ( "elem" in query ):
+                    offset = gripper.GetElementOffset( i, int( query["elem"] ) )
+                gripper.WriteValue( i, value, offset )
+                return self.Reply( { "result": 0 } )
+        except (KeyError, ValueError, IndexError):
+            return self.Reply( [], 400 )
+        self.send_error( 404 )
+
+
+class cFakeWebserver(ThreadingHTTPServer):
+    """HTTP server faking the webinterface of a single BKS gripper, serving in a background thread.
+    latency is an artificial delay in s per request to mimic the response time of a real gripper.
+    port 0 means any free port, see self.host for the actual "ip:port".
+    """
+    daemon_threads = True
+    request_handler_class = cFakeRequestHandler
+
+    def __init__( self, port=0, address="127.0.0.1", latency=0.0, gripper=None ):
+        if ( gripper is None ):
+            (data, enums) = LoadDefaultSettings()
+            gripper = cFakeGripper( data, enums )
+        self.gripper = gripper
+        self.latency = latency
+        ThreadingHTTPServer.__init__( self, (address, port), self.request_handler_class )
+        self.host = "%s:%d" % self.server_address
+        self.thread = threading.Thread( target=self.serve_forever, daemon=True )
+        self.thread.start()
+
+    def Stop( self ):
+        self.shutdown()
+        self.server_close()
+
+
+def StartFakeWebservers( nb_servers, latency=0.0, address="127.0.0.1", port=0, consecutive_addresses=False ):
+    """Return a list of nb_servers started cFakeWebservers sharing the same metadata, with serial numbers 1, 2, ...
+    With consecutive_addresses the servers listen on the consecutive IP addresses starting at address (e.g. 127.0.0.1,
+    127.0.0.2, ... which all are loopback addresses on Linux) on the same port. Else with a port other than 0
+    the servers use the consecutive ports starting at port.
+    """
+    (data, enums) = LoadDefaultSettings()
+    servers = []
+    for i in range( nb_servers ):
+        if ( consecutive_addresses ):
+            (server_address, server_port) = (str( ipaddress.ip_address( address ) + i ), port)
+        else:
+            (server_address, server_port) = (address, port + i if port else 0)
+        servers.append( cFakeWebserver( server_port, server_address, latency, cFakeGripper( data, enums, serial_no_num=i + 1 ) ) )
+    return servers
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "fake_webserver.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-p", "--port",
+                         dest="port",
+                         default=8080,
+                         type=int,
+                         help="""The (first) TCP port to listen on. Default is %(default)d.""" )
+
+    parser.add_argument( "-a", "--address",
+                         dest="address",
+                         default="127.0.0.1",
+                         help="""The address to listen on. Default is %(default)s.""" )
+
+    parser.add_argument( "-n", "--nb_servers",
+                         dest="nb_servers",
+                         default=1,
+                         type=int,
+                         help="""Number of fake grippers to serve on consecutive ports. Default is %(default)d.""" )
+
+    parser.add_argument( "-c", "--consecutive_addresses",
+                         dest="consecutive_addresses",
+                         action="store_true",
+                         help="""Serve the fake grippers on consecutive IP addresses (starting at --address) on the same port instead of on consecutive ports.""" )
+
+    parser.add_argument( "-l", "--latency",
+                         dest="latency",
+                         default=0.0,
+                         type=float,
+                         help="""Artificial delay in s per request. Default is %(default)s.""" )
+
+    args = parser.parse_args()
+
+    servers = StartFakeWebservers( args.nb_servers, args.latency, args.address, args.port, args.consecutive_addresses )
+    for server in servers:
+        print( f"Serving fake gripper on http://{server.host}" )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    for server in servers:
+        server.Stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -13,6 +13,7 @@ import re
 
 from bkstools.bks_lib.bks_modbus import BKS_Modbus
 from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.bks_lib.bks_telemetry import BKS_Telemetry, g_host_prefix as telemetry_host_prefix
 import time
 
 
@@ -58,6 +59,10 @@ def GetModbusSettings( host ):
 def BKSBase( host, max_age_in_s=5*60, debug=False, repeater_timeout=3.0, repeater_nb_tries=5 ):
     """Factory function to return an object to allow access to SCHUNK BKS grippers
     """
+    if ( host.startswith( telemetry_host_prefix ) ):
+        # access via a local telemetry server that shares its connection to the gripper, see bks_telemetry.py
+        return BKS_Telemetry( host, max_age_in_s, debug )
+
     modbus_settings = GetModbusSettings( host )
 
     if ( modbus_settings ):
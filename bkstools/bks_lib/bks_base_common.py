@@ -8,16 +8,18 @@ Created on 2022-03-07
 '''
 
 
-import struct
 
 from pyschunk.generated.generated_enums import eCmdCode, eErrorCode, eMotorType, eBksUserLevel, eFirmwareStorage, eGripperType, eBksReferencingType, eFieldbusType, eBrakeChopperMode   # @UnusedImport
 from pyschunk.tools.util import GetPersistantDict, enum
-from bkstools.bks_lib import hms
+from bkstools.bks_lib import hms, bks_instrumentation
+from bkstools.bks_lib.bks_codec import MakeCodec, GetDatatypeCodec
 from bkstools.bks_lib.debug import Print, Error, Debug, Var, ApplicationError, InsufficientAccessRights, InsufficientReadRights, InsufficientWriteRights, ControlledFromOtherChannel, ServiceNotAvailable, UnsupportedCommand  # @UnusedImport
 
 # The following Python module must be imported explicitly to be able to generate
 # standalone exes with py2exe on Python 3
 import dbm.dumb  # @UnusedImport
+import threading
+import time
 
 import re
 
@@ -68,6 +70,21 @@ class Struct(object):
         return 'Struct(%s)' % ', '.join(args)
 
 
+class LazyDict(dict):
+    """dict that determines the values of missing keys on first access by calling loader( key ).
+    The loader must raise KeyError for keys it cannot provide.
+    (Note: like for defaultdict only self[key] calls the loader, not get() or the in operator)
+    """
+    def __init__(self, loader, *args, **kwargs ):
+        dict.__init__( self, *args, **kwargs )
+        self.loader = loader
+
+    def __missing__(self, key):
+        value = self.loader( key )
+        self[ key ] = value
+        return value
+
+
 def make_property_name( name ):
     """Return a name suitable as a property name:
     - Converts spaces to _
@@ -117,13 +134,23 @@ def int32_to_uint32( int32 ):
         return int32 + 0x100000000
     return int32
 
+def GetIndexRanges( indices, max_gap=0 ):
+    """Return a list of (offset,count) tuples that cover all indices in indices.
+    Indices that are at most max_gap apart are merged into the same range, so
+    with the default max_gap=0 only directly adjacent indices are merged.
+    """
+    ranges = []
+    for index in sorted( set( indices ) ):
+        if ( ranges and index <= ranges[-1][0] + ranges[-1][1] + max_gap ):
+            ranges[-1] = (ranges[-1][0], index - ranges[-1][0] + 1)
+        else:
+            ranges.append( (index, 1) )
+    return ranges
+
 def Reverse( hex_string ):
-    """reverse a hex string "01234" -> "3401"
+    """reverse the byte order of a hex string "012345" -> "452301"
     """
-    r = ""
-    for i in range( 0, len( hex_string ), 2 ):
-        r = hex_string[i:i+2] + r
-    return r
+    return "".join( reversed( [ hex_string[i:i+2] for i in range( 0, len( hex_string ), 2 ) ] ) )
 
 class BKSBaseCommon(object):
 
@@ -141,10 +168,13 @@ class BKSBaseCommon(object):
 
         #t0=time.time()
 
-        self.enums = dict()
+        self.enums = LazyDict( self.LoadEnum )   # enums are loaded on first access only
         self.name_to_index = dict()
         self.inst_to_index = dict()
         self.failed_requests = dict()
+        self.codecs = dict()                 # index -> precompiled codec, see SetAttributes
+        self.io_lock = threading.RLock()     # serializes the transactions of concurrent threads, e.g. of a cStatusWatcher
+        self.instruments = bks_instrumentation.g_global_instruments   # see AddInstrument()
 
         # for now this is not available via webinterface or via hsm_enums, so enter explicitly:
         anybus_state_enum = enum( SETUP=0, NW_INIT=1, WAIT_PROCESS=2, IDLE=3, PROCESS_ACTIVE=4, ERROR=5, EXCEPTION=7 )
@@ -183,10 +213,16 @@ class BKSBaseCommon(object):
                                      "mac_addr" ]
         self.index_is_cachable = []          # cannot be initialized yet, must be done in SetAttributes
         self.cached_index_to_value = dict()
+        self.index_to_read_time = dict()     # index -> time.time() when the value was read last, see UpdateValues() and GetReadTimes()
 
     def UpdateEnum( self, d ):
         raise NotImplementedError() # derived classes must implement this
 
+    def LoadEnum( self, name ):
+        """Return the enum for the parameter named name. Called on first access to self.enums[ name ].
+        """
+        raise KeyError( name )      # derived classes that can read enums from the gripper must overwrite this
+
     def SetAttributes(self, extra_parameter_dicts=[] ):
         #t1=time.time()
         #Print("init read took %fs" % (t1-t0))
@@ -225,9 +261,7 @@ class BKSBaseCommon(object):
                 datatype = None
             #Print( "%d name=%s datatype=%r(%s) = %r" % (i,d["name"], datatype, hms.HMS_Datatypes.GetName(datatype), self.get_value(i,datatype)) )
             self._add_property( d["name"], i, datatype, d["instance"] )
-
-            if ( datatype == hms.HMS_Datatypes.ABP_ENUM ):
-                self.UpdateEnum( d )
+            self.codecs[ i ] = MakeCodec( d )
 
             if ( d["name"] == "fieldbus_input" or d["name"] == "fieldbus_input_frame" or d["name"] == "plc_sync_input" ):
                 # its an EGL-C or an Ethernet/IP brick where the synchronous data is named differently.
@@ -325,65 +359,21 @@ class BKSBaseCommon(object):
     def GetIndexOfInstance(self, inst):
         return self.inst_to_index[inst]
 
+    def AddInstrument( self, instrument ):
+        """Add instrument (a bks_instrumentation.cInstrument) to be called before and after each transaction with the gripper
+        """
+        self.instruments = self.instruments + [ instrument ]   # (copy, as the list is shared with all objects initially)
+
+    def RemoveInstrument( self, instrument ):
+        self.instruments = [ i for i in self.instruments if i is not instrument ]
+
+    def GetNamesOfIndices( self, indices ):
+        """Return the list of parameter names for indices, whose elements can be given in any form understood by get_value(), for instrumentation
+        """
+        return [ self.data[ index if type( index ) is int else self.ParseIndexOrName( index )[0] ]["name"] for index in indices ]
+
     def GetSingleValue( self, datatype, data ):
-        if ( datatype == hms.HMS_Datatypes.ABP_FLOAT ):
-            if ( self.reverse_data ):
-                v32 = int( Reverse(data), 16 )
-            else:
-                v32 = int( data, 16 )
-            #packed = chr( v32 & 0x000000ff ) + chr( (v32>>8) & 0x000000ff ) + chr( (v32>>16) & 0x000000ff ) + chr( (v32>>24) & 0x000000ff )
-            packed = bytes( (v32 & 0x000000ff,
-                             (v32>>8) & 0x000000ff,
-                             (v32>>16) & 0x000000ff,
-                             (v32>>24) & 0x000000ff) )
-
-            return struct.unpack("f", packed)[0]
-
-        if ( datatype in (hms.HMS_Datatypes.ABP_ENUM,
-                          hms.HMS_Datatypes.ABP_UINT8,
-                          hms.HMS_Datatypes.ABP_UINT16,
-                          hms.HMS_Datatypes.ABP_UINT32,
-                          hms.HMS_Datatypes.ABP_UINT64) ):
-            try:
-                if ( self.reverse_data ):
-                    return int( Reverse(data), 16 )
-                else:
-                    return int( data, 16 )
-            except TypeError as e:  # @UnusedVariable
-                #raise ApplicationError( "get_value failed for data = %r with %r" % (data,e))
-                # fails for 80
-                # debug.ApplicationError: get_value failed for data = {u'error': 9} with TypeError("int() can't convert non-string with explicit base",
-                return data
-        if ( datatype in (hms.HMS_Datatypes.ABP_SINT8,
-                          hms.HMS_Datatypes.ABP_SINT16,
-                          hms.HMS_Datatypes.ABP_SINT32,
-                          hms.HMS_Datatypes.ABP_SINT64) ):
-            if ( self.reverse_data ):
-                v = int( Reverse(data), 16 )
-            else:
-                v = int( data, 16 )
-            if ( datatype == hms.HMS_Datatypes.ABP_SINT8 and v >= 0x80 ):
-                v = -((v-1) ^ 0xff)
-            if ( datatype == hms.HMS_Datatypes.ABP_SINT16 and v >= 0x8000 ):
-                v = -((v-1) ^ 0xffff)
-            if ( datatype == hms.HMS_Datatypes.ABP_SINT32 and v >= 0x80000000 ):
-                v = -((v-1) ^ 0xffffffff)
-            if ( datatype == hms.HMS_Datatypes.ABP_SINT64 and v >= 0x8000000000000000 ):
-                v = -((v-1) ^ 0xffffffffffffffff)
-            return v
-
-        if ( datatype == hms.HMS_Datatypes.ABP_BOOL ):
-            return bool( int( data, 16 ) )
-
-        if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
-            s = ""
-            for cc in chunkstring( data, 2 ):
-                c = chr( int( cc, 16 ) )
-                if ( c == "\x00" ):
-                    break
-                s += c
-            return s
-        raise ApplicationError( "Unknown datatype %d (%s)" % (datatype,hms.HMS_Datatypes.GetName( datatype ) ) )
+        return GetDatatypeCodec( datatype ).DecodeSingle( data, self.reverse_data )
 
     def MakeIndex( self, index_or_name ):
         if ( type( index_or_name ) is str ):
@@ -391,6 +381,102 @@ class BKSBaseCommon(object):
         else:
             return index_or_name
 
+    def ParseIndexOrName( self, index_or_name ):
+        """Return a tuple (index, subname, elementindex) for index_or_name as understood by get_value():
+        - for "NAME.SUBNAME" subname is the name of the element of the structured parameter NAME
+        - for "NAME[ELEMENTINDEX]" elementindex is the index of the element of the array parameter NAME
+        - else subname and elementindex are None
+        """
+        subname = None
+        elementindex = None
+        if ( type( index_or_name ) is str  and  "." in index_or_name ):
+            (index_or_name,subname) = index_or_name.split(".")
+        elif ( type( index_or_name ) is str  and  "[" in index_or_name ):
+            mob = re.match( "(\w+)\[(.+)\]", index_or_name )
+            elementindex  = Str2Value( mob.group(2) )
+            index_or_name = Str2Value( mob.group(1) )
+        return (self.MakeIndex( index_or_name ), subname, elementindex)
+
+    def get_values( self, index_or_names, ignore_insufficient_read_rights=False ):
+        """Return a list with the values of the parameters given in index_or_names.
+
+        The elements of index_or_names can be given in any form understood by get_value().
+        The parameters are read with as few requests as the communication interface
+        allows, see UpdateValues().
+
+        If ignore_insufficient_read_rights is True then None is returned for parameters
+        that cannot be read due to insufficient read rights, else InsufficientReadRights is raised.
+        """
+        (accesses, index_to_value, indices_to_read) = self.PrepareGetValues( index_or_names )
+        if ( indices_to_read ):
+            index_to_value.update( self.UpdateValues( indices_to_read ) )
+        return self.FinishGetValues( accesses, index_to_value, ignore_insufficient_read_rights )
+
+    def PrepareGetValues( self, index_or_names ):
+        """Return a tuple (accesses, index_to_value, indices_to_read) for get_values():
+        the parsed index_or_names, a dict with the cached values and the list of indices that must be read.
+        """
+        accesses = [ self.ParseIndexOrName( index_or_name ) for index_or_name in index_or_names ]
+
+        index_to_value = dict()
+        indices_to_read = []
+        for (index,subname,elementindex) in accesses:  # @UnusedVariable
+            if ( index in self.cached_index_to_value ):
+                index_to_value[ index ] = self.cached_index_to_value[ index ]
+            elif ( not index in indices_to_read ):
+                indices_to_read.append( index )
+        return (accesses, index_to_value, indices_to_read)
+
+    def FinishGetValues( self, accesses, index_to_value, ignore_insufficient_read_rights ):
+        """Return the list of values for get_values() from accesses and index_to_value as returned by PrepareGetValues()
+        (with index_to_value updated by UpdateValues()).
+        """
+        values = []
+        for (index,subname,elementindex) in accesses:
+            value = index_to_value[ index ]
+            if ( isinstance( value, InsufficientReadRights ) ):
+                if ( ignore_insufficient_read_rights ):
+                    values.append( None )
+                    continue
+                raise value
+            if ( index in self.index_is_cachable ):
+                self.cached_index_to_value[ index ] = value
+
+            if ( not subname is None ):
+                value = value.__dict__[ subname ]
+            elif ( not elementindex is None ):
+                value = value[ elementindex ]
+            values.append( value )
+        return values
+
+    def UpdateValues( self, indices ):
+        """Read the values of the parameters with the indices given in list indices from the gripper.
+
+        Returns a dict that maps each index to its value. For parameters that cannot be read due to
+        insufficient read rights the InsufficientReadRights exception is stored as value.
+
+        The time of each read (middle between request and response) is stored in self.index_to_read_time.
+
+        This generic implementation reads the parameters one by one. Derived classes
+        should overload this to read several parameters with a single request.
+        """
+        index_to_value = dict()
+        for index in indices:
+            t_request = time.time()
+            try:
+                index_to_value[ index ] = self.get_value( index )
+            except InsufficientReadRights as e:
+                index_to_value[ index ] = e
+            self.index_to_read_time[ index ] = ( t_request + time.time() ) / 2.0
+        return index_to_value
+
+    def GetReadTimes( self, index_or_names ):
+        """Return a list with the times (like time.time()) when the values of the parameters given in index_or_names
+        were read from the gripper last, e.g. by get_values(). Parameters read with the same request have the same time.
+        None is returned for parameters never read (like cached constant parameters).
+        """
+        return [ self.index_to_read_time.get( self.ParseIndexOrName( index_or_name )[0] ) for index_or_name in index_or_names ]
+
     def get_value( self, index_or_name, datatype=None ):
         #print "get-value %r %r" % (index_or_name, datatype)
         if ( type( index_or_name ) is str  and  "." in index_or_name ):
@@ -0,0 +1,170 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides precompiled codecs to convert parameter values from/to the hex strings used by the HTTP/JSON webinterface
+'''
+
+import struct
+
+from bkstools.bks_lib import hms
+from bkstools.bks_lib.debug import ApplicationError
+
+## struct format characters of the HMS datatypes. Signed values are encoded via their unsigned counterparts,
+#  see cCodec.Encode()
+g_format_chars = { hms.HMS_Datatypes.ABP_BOOL  : "?",
+                   hms.HMS_Datatypes.ABP_SINT8 : "b",
+                   hms.HMS_Datatypes.ABP_SINT16: "h",
+                   hms.HMS_Datatypes.ABP_SINT32: "i",
+                   hms.HMS_Datatypes.ABP_SINT64: "q",
+                   hms.HMS_Datatypes.ABP_UINT8 : "B",
+                   hms.HMS_Datatypes.ABP_UINT16: "H",
+                   hms.HMS_Datatypes.ABP_UINT32: "I",
+                   hms.HMS_Datatypes.ABP_UINT64: "Q",
+                   hms.HMS_Datatypes.ABP_ENUM  : "B",
+                   hms.HMS_Datatypes.ABP_BITS8 : "B",
+                   hms.HMS_Datatypes.ABP_BITS16: "H",
+                   hms.HMS_Datatypes.ABP_BITS32: "I",
+                   hms.HMS_Datatypes.ABP_OCTET : "B",
+                   hms.HMS_Datatypes.ABP_FLOAT : "f" }
+
+
+class cCodec(object):
+    """Precompiled en-/decoder for the hex string values of a parameter with numelements elements of a single HMS datatype.
+
+    The conversion is done with a struct.Struct per byte order, so decoding a value
+    needs a single bytes.fromhex() and a single unpack, regardless of the number of elements.
+    The reverse_data flag given to Decode() / Encode() selects the byte order:
+    True means the hex strings transmit the bytes of a value in little endian order.
+    """
+    def __init__( self, datatype, numelements=1 ):
+        self.datatype = datatype
+        self.numelements = numelements
+        self.is_char = (datatype == hms.HMS_Datatypes.ABP_CHAR)
+        self.is_bool = (datatype == hms.HMS_Datatypes.ABP_BOOL)
+        self.is_array = numelements > 1
+
+        if ( self.is_char or not datatype in g_format_chars ):
+            self.struct_le = None
+            self.struct_be = None
+            self.struct_le_single = None
+            self.struct_be_single = None
+            return
+
+        format_char = g_format_chars[ datatype ]
+        self.struct_le = struct.Struct( f"<{numelements}{format_char}" )
+        self.struct_be = struct.Struct( f">{numelements}{format_char}" )
+        self.struct_le_single = struct.Struct( f"<{format_char}" )
+        self.struct_be_single = struct.Struct( f">{format_char}" )
+        self.size = self.struct_le_single.size
+
+        if ( format_char in "bhiq" ):
+            # signed values are encoded as two's complement via their unsigned counterpart
+            format_char = format_char.upper()
+        if ( format_char in "BHIQ" ):
+            self.mask = (1 << (8*self.size)) - 1
+            self.encode_le = struct.Struct( f"<{format_char}" )
+            self.encode_be = struct.Struct( f">{format_char}" )
+        else:
+            self.mask = None
+            self.encode_le = self.struct_le_single
+            self.encode_be = self.struct_be_single
+
+    def Decode( self, data, reverse_data ):
+        """Return the value decoded from hex string data.
+        For arrays a list of values is returned, for CHAR arrays a string with all \\0 characters removed.
+        """
+        if ( type( data ) is not str ):
+            # e.g. an error dict like {'error': 9} reported instead of a value
+            return data
+        if ( self.is_char ):
+            return bytes.fromhex( data ).replace( b"\x00", b"" ).decode( "latin-1" )
+        if ( self.struct_le is None ):
+            raise ApplicationError( "Unknown datatype %d (%s)" % (self.datatype,hms.HMS_Datatypes.GetName( self.datatype, "?" ) ) )
+
+        if ( reverse_data ):
+            values = self.struct_le.unpack( bytes.fromhex( data ) )
+        else:
+            values = self.struct_be.unpack( bytes.fromhex( data ) )
+        if ( self.is_array ):
+            return list( values )
+        return values[0]
+
+    def DecodeSingle( self, data, reverse_data ):
+        """Return the value of a single element decoded from hex string data.
+        For CHAR the string up to the first \\0 character is returned.
+        """
+        if ( type( data ) is not str ):
+            return data
+        if ( self.is_char ):
+            return bytes.fromhex( data ).split( b"\x00", 1 )[0].decode( "latin-1" )
+        if ( self.struct_le is None ):
+            raise ApplicationError( "Unknown datatype %d (%s)" % (self.datatype,hms.HMS_Datatypes.GetName( self.datatype, "?" ) ) )
+        if ( self.is_bool ):
+            return bool( int( data, 16 ) )
+        if ( reverse_data ):
+            return self.struct_le_single.unpack( bytes.fromhex( data ) )[0]
+        return self.struct_be_single.unpack( bytes.fromhex( data ) )[0]
+
+    def Encode( self, value, reverse_data ):
+        """Return the hex string for the single element value (or the whole string for CHAR).
+        """
+        if ( self.is_char ):
+            # strings are transmitted as is, i.e. never reversed
+            return value.encode( "latin-1" ).hex()
+        if ( self.struct_le is None ):
+            raise ApplicationError( "Unknown datatype %d" % self.datatype )
+        if ( self.is_bool ):
+            return "%02x" % (int(value))
+        if ( not self.mask is None ):
+            value &= self.mask
+        if ( reverse_data ):
+            return self.encode_le.pack( value ).hex()
+        return self.encode_be.pack( value ).hex()
+
+    def EncodeArray( self, values, reverse_data ):
+        """Return the hex string for all elements in values
+        """
+        return "".join( [ self.Encode( v, reverse_data ) for v in values ] )
+
+
+class cStructCodec(object):
+    """Precompiled decoder for the hex string values of a structured parameter.
+    self.elements is a list of (elementname, codec, nb_chars) tuples, one per element of the structure.
+    """
+    def __init__( self, datatypes, numsubelements, elementnames ):
+        self.elements = []
+        for (datatype,nb,elementname) in zip( datatypes, numsubelements, elementnames ):
+            nb_chars = nb * hms.HMS_Datatypes_size_in_bytes[ datatype ] * 2
+            self.elements.append( (elementname, cCodec( datatype, 1 ), nb_chars) )
+
+    def DecodeElements( self, data, reverse_data ):
+        """Return a list of (elementname,value) tuples decoded from hex string data
+        """
+        result = []
+        pos = 0
+        for (elementname,codec,nb_chars) in self.elements:
+            result.append( (elementname, codec.DecodeSingle( data[pos:pos+nb_chars], reverse_data )) )
+            pos += nb_chars
+        return result
+
+
+def MakeCodec( d ):
+    """Return the codec for the parameter described by metadata dict d
+    """
+    if ( len( d["datatype"] ) > 1 ):
+        return cStructCodec( d["datatype"], d["numsubelements"], d["elementname"] )
+    return cCodec( d["datatype"][0], d["numelements"] )
+
+
+g_datatype_codecs = dict()
+
+def GetDatatypeCodec( datatype ):
+    """Return a (shared) codec for single values of HMS datatype datatype
+    """
+    try:
+        return g_datatype_codecs[ datatype ]
+    except KeyError:
+        codec = cCodec( datatype, 1 )
+        g_datatype_codecs[ datatype ] = codec
+        return codec
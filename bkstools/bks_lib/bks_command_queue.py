@@ -0,0 +1,138 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cCommandQueue class to send a sequence of commands to a BKSModule without waiting for each one
+
+Example usage:
+\\code
+    gripper = BKSModule( "192.168.1.253" )
+    queue = cCommandQueue( gripper )
+    f1 = queue.move_to_absolute_position( 10000, 50000 )
+    f2 = queue.grip_workpiece( BKSModule.grip_from_outside, 20000, 50 )
+    f3 = queue.move_to_absolute_position( 60000, 50000 )
+    ...                       # do something else meanwhile, e.g. command another gripper
+    f3.result()               # wait for the last command, raises the GripperError/GripperWarning/GripperTimeout of a failed command
+    queue.Close()
+\\endcode
+'''
+
+import time
+import queue
+import threading
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
+
+
+class cCommandQueue(object):
+    """Execute commands of the BKSModule bks one after the other in a background thread.
+
+    Each command function returns a concurrent.futures.Future for the result of the corresponding BKSModule function.
+    The caller can submit a whole sequence of commands at once and only wait for the futures it is interested in.
+
+    Commands are sent as soon as the previous command is completed: the status read that detected the completion
+    is reused as pre-command status of the next command (see BKSModule.StorePreCommandStatus()),
+    which saves one plc_sync_input read per command compared to calling the BKSModule functions in a row.
+
+    If a command fails (raises an exception or returns False) and cancel_on_error is True then all commands
+    submitted after it are cancelled, since these usually rely on the failed one.
+    Commands submitted after the failure was handled are executed as usual.
+    """
+    def __init__( self, bks, cancel_on_error=True, status_reuse_max_age=0.1 ):
+        self.bks = bks
+        self.bks.status_reuse_max_age = status_reuse_max_age
+        self.cancel_on_error = cancel_on_error
+        self.queue = queue.Queue()
+        self.nb_executed = 0
+        self.nb_failed = 0
+        self.nb_cancelled = 0
+        self.thread = threading.Thread( target=self.Run, name=f"cCommandQueue {bks.host}", daemon=True )
+        self.thread.start()
+
+    def Submit( self, function, *args, **kwargs ):
+        """Append the call of function( *args, **kwargs ) to the queue and return a Future for its result
+        """
+        future = Future()
+        self.queue.put( (future, function, args, kwargs) )
+        return future
+
+    def Run( self ):
+        while True:
+            item = self.queue.get()
+            if ( item is None ):
+                return
+            (future, function, args, kwargs) = item
+            if ( not future.set_running_or_notify_cancel() ):
+                continue
+            try:
+                result = function( *args, **kwargs )
+            except BaseException as e:
+                future.set_exception( e )
+                self.HandleFailure()
+                continue
+            future.set_result( result )
+            if ( result is False ):
+                self.HandleFailure()
+            else:
+                self.nb_executed += 1
+
+    def HandleFailure( self ):
+        self.nb_failed += 1
+        if ( self.cancel_on_error ):
+            self.CancelPending()
+
+    def CancelPending( self ):
+        """Cancel all submitted commands that are not started yet
+        """
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if ( item is None ):
+                self.queue.put( None )   # keep the request to stop for Run()
+                return
+            if ( item[0].cancel() ):
+                self.nb_cancelled += 1
+
+    def Join( self, timeout=None ):
+        """Wait until all commands submitted so far are done (or timeout s passed).
+        Return True if all are done.
+        """
+        future = self.Submit( lambda: None )
+        try:
+            future.result( timeout )
+        except CancelledError:
+            pass
+        except FutureTimeoutError:
+            return False
+        return True
+
+    def Close( self ):
+        """Stop the background thread after executing the commands submitted so far
+        """
+        self.queue.put( None )
+        self.thread.join()
+
+    #--- Convenience functions, see the corresponding functions of BKSModule for the parameters:
+    def MakeReady( self ):
+        return self.Submit( self.bks.MakeReady )
+
+    def move_to_absolute_position( self, pos, vel, wait_command_successfully_processed_timeout=None ):
+        return self.Submit( self.bks.move_to_absolute_position, pos, vel, True, wait_command_successfully_processed_timeout )
+
+    def move_to_relative_position( self, rpos, vel, wait_command_successfully_processed_timeout=None ):
+        return self.Submit( self.bks.move_to_relative_position, rpos, vel, True, wait_command_successfully_processed_timeout )
+
+    def grip_workpiece( self, direction, grip_velocity_ums, force_percent, wait_command_successfully_processed_timeout=None ):
+        return self.Submit( self.bks.grip_workpiece, direction, grip_velocity_ums, force_percent, True, wait_command_successfully_processed_timeout )
+
+    def grip_workpiece_with_expected_position( self, direction, position_um, velocity_ums, force_percent, wait_command_successfully_processed_timeout=None ):
+        return self.Submit( self.bks.grip_workpiece_with_expected_position, direction, position_um, velocity_ums, force_percent, True, wait_command_successfully_processed_timeout )
+
+    def release_workpiece( self, wait_command_successfully_processed_timeout=None ):
+        return self.Submit( self.bks.release_workpiece, True, wait_command_successfully_processed_timeout )
+
+    def Pause( self, duration ):
+        """Submit a pause of duration s between two commands
+        """
+        return self.Submit( time.sleep, duration )
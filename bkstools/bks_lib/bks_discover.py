@@ -0,0 +1,154 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides Discover() to find SCHUNK BKS grippers with HTTP/JSON webinterface in IP networks
+
+Example usage:
+\\code
+    for device in Discover( [ "192.168.1.0/24" ], report=print ):
+        print( device["host"], device["serial_no_txt"], device["sw_version_txt"], device["fieldbus_type"] )
+\\endcode
+'''
+
+import time
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bkstools.bks_lib.bks_http import BKS_HTTP
+
+
+## Names of the parameters read from every gripper found, see IdentifyHost()
+identification_parameters = [ "serial_no_num", "serial_no_txt", "sw_version_txt", "fieldbus_type" ]
+
+
+def IterHosts( networks, port=80 ):
+    """Generate the hosts ("ip" or "ip:port" for port != 80) in the networks,
+    each given in CIDR notation like "192.168.1.0/24" or as a single IP like "192.168.1.253".
+    Network and broadcast addresses are left out.
+    """
+    for network in networks:
+        net = ipaddress.ip_network( network, strict=False )
+        addresses = net.hosts() if net.num_addresses > 2 else iter( net )
+        for address in addresses:
+            yield str( address ) if port == 80 else f"{address}:{port}"
+
+
+def GetHosts( networks, port=80 ):
+    """Return the list of hosts in the networks, see IterHosts()
+    """
+    return list( IterHosts( networks, port ) )
+
+
+def ProbeHost( session, host, timeout ):
+    """Probe host for a BKS webinterface: return a dict with the responses of /adi/info.json ("info")
+    and /module/info.json ("module_info", None if not available) or None if host does not look like a BKS gripper.
+    timeout is the (connect, read) timeout tuple for requests.
+    """
+    try:
+        r = session.get( url="http://" + host + "/adi/info.json", timeout=timeout )
+        if ( r.status_code != 200 ):
+            return None
+        info = r.json()
+        if ( type( info ) is not dict  or  "numadis" not in info ):
+            return None
+    except (requests.RequestException, ValueError):
+        return None
+
+    try:
+        r = session.get( url="http://" + host + "/module/info.json", timeout=timeout )
+        module_info = r.json() if r.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        module_info = None
+    return dict( info=info, module_info=module_info )
+
+
+def IdentifyHost( host, max_age_in_s=5*60, debug=False ):
+    """Connect to the BKS gripper host and return a dict with its identification_parameters.
+    The fieldbus_type is given by name. Parameters not available on the gripper are None.
+
+    Connecting fills the metadata store (see BKS_HTTP.UpdateMetadata()), so later connections to the gripper
+    (or grippers with the same firmware) are fast.
+    """
+    bks = BKS_HTTP( host, max_age_in_s, debug )
+    try:
+        names = [ name for name in identification_parameters if name in bks.name_to_index ]
+        values = dict.fromkeys( identification_parameters )
+        values.update( zip( names, bks.get_values( names ) ) )
+        if ( values["fieldbus_type"] is None ):
+            values["fieldbus_type"] = bks.fieldbus_type   # determined from /module/info.json, see BKS_HTTP.SetFieldbus()
+        values["fieldbus_type"] = bks.enums[ "fieldbus_type" ].GetName( values["fieldbus_type"], str( values["fieldbus_type"] ) )
+        for name in ( "serial_no_txt", "sw_version_txt" ):
+            if ( values[ name ] is not None ):
+                values[ name ] = values[ name ].strip( ' \t\0' )
+        return values
+    finally:
+        bks.Close()
+
+
+def Discover( networks, port=80, connect_timeout=0.3, read_timeout=1.0, nb_workers=64, identify=True, max_age_in_s=5*60, debug=False, report=None ):
+    """Sweep all hosts of networks (see IterHosts()) concurrently with nb_workers threads for BKS grippers.
+    The hosts are handed to the workers through a window of 2*nb_workers pending hosts, so large networks
+    need no more memory than small ones.
+
+    Each host is probed with a connect timeout of connect_timeout s, so unused addresses cost little time.
+    If identify is True then each gripper found is connected to right away to read its identification parameters
+    (see IdentifyHost()), which prewarms the metadata store as well.
+
+    report( device ) is called for each gripper found as soon as it is done (from a worker thread).
+    Return the list of device dicts, sorted by IP, with keys "host", "t" (s since start), "info", "module_info",
+    the identification_parameters and "error" (repr of the exception if identification failed, else None).
+    """
+    nb_workers = max( 1, nb_workers )
+    timeout = (connect_timeout, read_timeout)
+    local = threading.local()
+    sessions = []
+    devices = []
+    lock = threading.Lock()
+    t0 = time.time()
+
+    def Scan( host ):
+        session = getattr( local, "session", None )
+        if ( session is None ):
+            session = local.session = requests.Session()   # one keep-alive session per worker thread
+            with lock:
+                sessions.append( session )
+        probe = ProbeHost( session, host, timeout )
+        if ( probe is None ):
+            return
+        device = dict( host=host, **probe )
+        device.update( dict.fromkeys( identification_parameters ) )
+        device["error"] = None
+        if ( identify ):
+            try:
+                device.update( IdentifyHost( host, max_age_in_s, debug ) )
+            except Exception as e:
+                device["error"] = repr( e )
+        device["t"] = round( time.time() - t0, 3 )
+        with lock:
+            devices.append( device )
+            if ( report is not None ):
+                report( device )
+
+    window = threading.BoundedSemaphore( 2 * nb_workers )
+    errors = []
+    def Done( future ):
+        window.release()
+        if ( future.exception() is not None ):
+            with lock:
+                errors.append( future.exception() )
+
+    with ThreadPoolExecutor( max_workers=nb_workers ) as executor:
+        for host in IterHosts( networks, port ):
+            window.acquire()
+            executor.submit( Scan, host ).add_done_callback( Done )
+    for session in sessions:
+        session.close()
+    if ( errors ):
+        raise errors[0]
+
+    devices.sort( key=lambda device: ipaddress.ip_address( device["host"].split( ":" )[0] ) )
+    return devices
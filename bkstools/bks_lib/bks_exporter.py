@@ -0,0 +1,284 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cMetricsExporter class to export the state of many SCHUNK BKS grippers and the health
+       of their transports as Prometheus metrics, see bks_exporter.py
+
+The grippers are polled by a BKSFleet with batched reads (one get_values() per poll and gripper). A scrape only
+renders the latest snapshots and statistics, so any number of scrapes never causes additional transactions with
+the grippers. The rendered text is cached for one polling period, so even scrape storms cost almost nothing.
+
+The metrics are served in the Prometheus text exposition format 0.0.4 (which OpenMetrics scrapers accept as well):
+- per gripper: bks_up, the polled parameters as gauges bks_<name> (the statistic counters as counter bks_statistics_total),
+  enum parameters (like err_code and wrn_code) with the name of the value as label, the application state from system_state
+  and the poll statistics of the BKSFleet
+- per transport host: latency summaries and error counters of all transactions (see bks_instrumentation)
+  and for Modbus the retries, failures per function code and circuit breaker state of the cRepeater (see bks_retry)
+
+Example usage:
+\\code
+    fleet = BKSFleet( [ "192.168.1.253", "/dev/ttyUSB0,12" ], period=1.0, parameter_names=g_default_parameter_names )
+    exporter = cMetricsExporter( fleet, port=g_default_port )
+    fleet.Start()
+    exporter.Start()
+    ...   # curl http://127.0.0.1:9868/metrics
+    exporter.Stop()
+    fleet.Stop()
+\\endcode
+'''
+
+import re
+import math
+import time
+import threading
+import collections
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bkstools.bks_lib import hms
+from bkstools.bks_lib import hsm_enums
+from bkstools.bks_lib import bks_retry
+from bkstools.bks_lib import bks_instrumentation
+from bkstools.bks_lib.debug import Debug
+
+
+## Default TCP port of the metrics endpoint
+g_default_port = 9868
+
+## Default parameters polled for the metrics
+g_default_parameter_names = [ "actual_pos", "actual_vel", "actual_cur", "err_code", "wrn_code", "system_state", "statistics" ]
+
+## Quantiles reported for the transaction latencies
+g_quantiles = ( 0.5, 0.9, 0.99 )
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+## Characters not allowed in Prometheus metric names
+g_rex_invalid_metric_chars = re.compile( r"[^a-zA-Z0-9_:]+" )
+
+
+def GetMetricName( name ):
+    """Return the metric name for the parameter name, e.g. "bks_plc_sync_input_0" for "plc_sync_input[0]"
+    or "bks_internal_params_comm_state" for "internal_params.comm_state"
+    """
+    return "bks_" + g_rex_invalid_metric_chars.sub( "_", name ).strip( "_" )
+
+
+class cTransportCollector(bks_instrumentation.cInstrument):
+    """Instrument that collects a cLatencyHistogram per (host, transport, kind) and counts errors per (host, transport, error)
+    """
+    def __init__( self, precision_bits=5 ):
+        self.precision_bits = precision_bits
+        self.lock = threading.Lock()
+        self.histograms = dict()
+        self.nb_bytes = collections.defaultdict( int )
+        self.errors = collections.Counter()
+
+    def After( self, transaction ):
+        key = ( transaction.host, transaction.transport, transaction.kind )
+        with self.lock:
+            histogram = self.histograms.get( key )
+            if ( histogram is None ):
+                histogram = self.histograms[ key ] = bks_instrumentation.cLatencyHistogram( self.precision_bits )
+            histogram.Add( transaction.duration )
+            self.nb_bytes[ key ] += transaction.nb_bytes_sent + transaction.nb_bytes_received
+            if ( transaction.error is not None ):
+                self.errors[ ( transaction.host, transaction.transport, transaction.error ) ] += 1
+
+
+class cMetricsText(object):
+    """Builder of a text in the Prometheus exposition format. Samples are grouped by metric family,
+    so they may be added in any order.
+    """
+    def __init__( self ):
+        self.families = dict()       # name -> list of lines, in order of first use
+
+    @staticmethod
+    def EscapeLabel( value ):
+        return str( value ).replace( "\\", "\\\\" ).replace( "\n", "\\n" ).replace( '"', '\\"' )
+
+    @staticmethod
+    def FormatValue( value ):
+        value = float( value )
+        if ( math.isnan( value ) ):
+            return "NaN"
+        if ( math.isinf( value ) ):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr( value ) if not value.is_integer() else str( int( value ) )
+
+    def Add( self, metric, metric_type, help_text, value, suffix="", **labels ):
+        """Add a sample of the metric family metric (with HELP and TYPE lines on first use). Samples with value None are skipped.
+        """
+        if ( value is None ):
+            return
+        lines = self.families.get( metric )
+        if ( lines is None ):
+            lines = self.families[ metric ] = [ f"# HELP {metric} {help_text}", f"# TYPE {metric} {metric_type}" ]
+        label_text = ",".join( f'{k}="{self.EscapeLabel( v )}"' for (k,v) in labels.items() )
+        lines.append( f"{metric}{suffix}{{{label_text}}} {self.FormatValue( value )}" )
+
+    def GetText( self ):
+        return "".join( line + "\n" for lines in self.families.values() for line in lines )
+
+
+class cMetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET( self ):
+        if ( self.path.split( "?" )[0] not in ( "/metrics", "/" ) ):
+            self.send_error( 404 )
+            return
+        body = self.server.exporter.GetText().encode( "utf-8" )
+        self.send_response( 200 )
+        self.send_header( "Content-Type", CONTENT_TYPE )
+        self.send_header( "Content-Length", str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message( self, format, *args ):  # @ReservedAssignment
+        Debug( "cMetricsExporter: " + format % args )
+
+
+class cMetricsExporter(object):
+    """Serve the metrics of the grippers of fleet (a BKSFleet) via HTTP on address:port at /metrics.
+
+    The transaction latencies and errors are collected by a cTransportCollector that is added as global instrument
+    (see bks_instrumentation.AddGlobalInstrument()), so create the exporter before starting the fleet.
+    The rendered text is reused for max_age s (default: the polling period of the fleet).
+    """
+    def __init__( self, fleet, port=g_default_port, address="127.0.0.1", max_age=None ):
+        self.fleet = fleet
+        self.max_age = fleet.period if max_age is None else max_age
+        self.collector = cTransportCollector()
+        bks_instrumentation.AddGlobalInstrument( self.collector )
+        self.lock = threading.Lock()
+        self.text = None
+        self.t_text = 0.0
+        self.nb_renders = 0
+        self.enums = dict()          # (host, parameter name) -> enum or None, see GetEnum()
+
+        self.server = ThreadingHTTPServer( (address, port), cMetricsRequestHandler )
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        self.port = self.server.server_address[1]
+        self.thread = None
+
+    def Start( self ):
+        self.thread = threading.Thread( target=self.server.serve_forever, name="cMetricsExporter", daemon=True )
+        self.thread.start()
+
+    def Stop( self ):
+        self.server.shutdown()
+        self.server.server_close()
+        if ( self.thread is not None ):
+            self.thread.join()
+        bks_instrumentation.RemoveGlobalInstrument( self.collector )
+
+    def GetText( self ):
+        """Return the metrics text, rendered at most once per max_age s no matter how many scrapes arrive
+        """
+        with self.lock:
+            now = time.monotonic()
+            if ( self.text is None or now - self.t_text >= self.max_age ):
+                self.text = self.Render()
+                self.t_text = now
+                self.nb_renders += 1
+            return self.text
+
+    def GetEnum( self, host, bks, name ):
+        """Return the enum of the enum parameter name of the gripper at host or None.
+        Each enum is determined once only (from the metadata or the default_settings), failures included.
+        """
+        key = ( host, name )
+        if ( key not in self.enums ):
+            e = None
+            try:
+                if ( bks.data[ bks.name_to_index[ name ] ]["datatype"] == [ hms.HMS_Datatypes.ABP_ENUM ] ):
+                    e = bks.enums[ name ]
+            except Exception as exc:
+                Debug( f"cMetricsExporter: no enum for {host} {name}: {exc!r}" )
+            self.enums[ key ] = e
+        return self.enums[ key ]
+
+    def Render( self ):
+        m = cMetricsText()
+        self.RenderDevices( m )
+        self.RenderTransactions( m )
+        self.RenderRepeaters( m )
+        return m.GetText()
+
+    def RenderDevices( self, m ):
+        statistics = self.fleet.GetStatistics()
+        now = time.time()
+        for (host, device) in self.fleet.devices.items():
+            s = statistics[ host ]
+            m.Add( "bks_up", "gauge", "1 if the gripper is polled successfully, else 0", int( s["state"] == "online" ), host=host )
+            m.Add( "bks_polls_total", "counter", "Number of successful polls", s["nb_polls"], host=host )
+            m.Add( "bks_poll_errors_total", "counter", "Number of failed polls and connects", s["nb_errors"], host=host )
+            m.Add( "bks_reconnects_total", "counter", "Number of successful reconnects after being offline", s["nb_reconnects"], host=host )
+            m.Add( "bks_poll_overruns_total", "counter", "Number of polls started more than one period late", s["nb_overruns"], host=host )
+            m.Add( "bks_poll_latency_avg_seconds", "gauge", "Average duration of a poll", s["latency_avg"], host=host )
+            m.Add( "bks_poll_latency_max_seconds", "gauge", "Maximum duration of a poll", s["latency_max"], host=host )
+
+            snapshot = self.fleet.snapshots.get( host )
+            bks = device.bks
+            if ( snapshot is None ):
+                continue
+            m.Add( "bks_snapshot_age_seconds", "gauge", "Time since the start of the latest successful poll", now - snapshot.timestamp, host=host )
+            for (name, value) in zip( self.fleet.parameter_names, snapshot.values ):
+                self.RenderParameter( m, host, bks, name, value )
+
+    def RenderParameter( self, m, host, bks, name, value ):
+        values = value if isinstance( value, list ) else [ value ]
+        if ( not all( isinstance( v, ( int, float ) ) for v in values ) ):
+            return  # strings, raw bytes and unreadable values (None) are no metrics
+        if ( name == "statistics" ):
+            if ( isinstance( value, list ) ):
+                for (i, v) in enumerate( value ):
+                    m.Add( "bks_statistics_total", "counter", "Statistic counters of the gripper by index", v, host=host, index=str( i ) )
+            return
+        metric = GetMetricName( name )
+        help_text = f"Value of parameter {name}"
+        e = self.GetEnum( host, bks, name ) if bks is not None else None
+        for (i, v) in enumerate( values ):
+            labels = dict( host=host )
+            if ( isinstance( value, list ) ):
+                labels[ "index" ] = str( i )
+            if ( e is not None ):
+                labels[ "name" ] = e.GetName( v, "?" )
+            m.Add( metric, "gauge", help_text, v, **labels )
+        if ( name == "system_state" ):
+            application_state = ( value & 0x0000ff00 ) >> 8
+            m.Add( "bks_application_state", "gauge", "Application state from system_state", application_state,
+                   host=host, name=hsm_enums.application_state_machine.GetName( application_state, "?" ) )
+
+    def RenderTransactions( self, m ):
+        c = self.collector
+        with c.lock:
+            histograms = [ ( key, h.nb_values, h.sum, [ h.GetPercentile( 100.0 * q ) for q in g_quantiles ], c.nb_bytes[ key ] )
+                           for (key, h) in sorted( c.histograms.items() ) ]
+            errors = sorted( c.errors.items() )
+        for ((host, transport, kind), nb_values, total, percentiles, nb_bytes) in histograms:
+            labels = dict( host=host, transport=transport, kind=kind )
+            for (q, p) in zip( g_quantiles, percentiles ):
+                m.Add( "bks_transaction_duration_seconds", "summary", "Duration of the transactions with the grippers", p, **labels, quantile=str( q ) )
+            m.Add( "bks_transaction_duration_seconds", "summary", "", total, suffix="_sum", **labels )
+            m.Add( "bks_transaction_duration_seconds", "summary", "", nb_values, suffix="_count", **labels )
+            m.Add( "bks_transaction_bytes_total", "counter", "Bytes sent and received in transactions", nb_bytes, **labels )
+        for ((host, transport, error), n) in errors:
+            m.Add( "bks_transaction_errors_total", "counter", "Number of failed transactions by error", n, host=host, transport=transport, error=error )
+
+    def RenderRepeaters( self, m ):
+        for (host, s) in sorted( bks_retry.GetAllTransactionStatistics().items() ):
+            m.Add( "bks_modbus_retries_total", "counter", "Number of Modbus retries", s["nb_retries"], host=host )
+            m.Add( "bks_modbus_requests_with_retries_total", "counter", "Number of Modbus requests that needed retries", s["nb_requests_with_retries"], host=host )
+            m.Add( "bks_modbus_circuit_open", "gauge", "1 if the circuit breaker rejects requests, else 0", int( s["circuit_state"] == "open" ), host=host )
+            m.Add( "bks_modbus_circuit_opened_total", "counter", "Number of times the circuit breaker opened", s["circuit_nb_opened"], host=host )
+            m.Add( "bks_modbus_circuit_rejected_total", "counter", "Number of requests rejected by the open circuit breaker", s["circuit_nb_rejected"], host=host )
+            for (function_code, f) in s["functions"].items():
+                labels = dict( host=host, function_code=str( function_code ) )
+                m.Add( "bks_modbus_transactions_total", "counter", "Number of Modbus transactions by function code", f["nb_transactions"], **labels )
+                m.Add( "bks_modbus_failures_total", "counter", "Number of failed Modbus transactions by function code", f["nb_failures"], **labels )
+                m.Add( "bks_modbus_no_responses_total", "counter", "Number of Modbus transactions without response by function code", f["nb_no_responses"], **labels )
+                m.Add( "bks_modbus_timeout_seconds", "gauge", "Current (adaptive) response timeout by function code", f["timeout"], **labels )
+                for q in g_quantiles:
+                    m.Add( "bks_modbus_response_time_seconds", "gauge", "Recent Modbus response times by function code and quantile",
+                           f[ f"response_time_p{int( q * 100 )}" ], **labels, quantile=str( q ) )
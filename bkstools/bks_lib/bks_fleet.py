@@ -0,0 +1,218 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the BKSFleet class to poll many SCHUNK BKS grippers from a single process
+
+Example usage:
+\\code
+    fleet = BKSFleet( [ "192.168.1.253", "192.168.1.254", "/dev/ttyUSB0,12", "/dev/ttyUSB0,13" ], period=0.05 )
+    fleet.Start()
+    fleet.WaitConnected( timeout=10.0 )
+    ...
+    snapshot = fleet.snapshots[ "192.168.1.253" ]   # latest values, readable without locking
+    print( snapshot.values[0], snapshot.timestamp )
+    ...
+    fleet.Stop()
+\\endcode
+'''
+
+import time
+import threading
+from collections import namedtuple
+
+from bkstools.bks_lib.bks_base import BKSBase, GetModbusSettings
+from bkstools.bks_lib.debug import Debug
+
+
+## Immutable snapshot of the values read from a device in a single poll.
+#  values is the list of values of the polled parameters (see BKSFleet.parameter_names),
+#  timestamp the time.time() when the read was started, latency the duration of the read in s,
+#  sequence the number of the successful poll.
+cSnapshot = namedtuple( "cSnapshot", "host values timestamp latency sequence" )
+
+
+class cDeviceStatistics(object):
+    """Latency and error counters of a single device of a BKSFleet
+    """
+    def __init__( self ):
+        self.state = "connecting"        # "connecting", "online" or "offline"
+        self.nb_polls = 0
+        self.nb_errors = 0
+        self.nb_consecutive_errors = 0
+        self.nb_reconnects = 0           # successful connects after being offline
+        self.nb_overruns = 0             # polls that were started later than one period after their due time
+        self.last_error = None
+        self.latency_min = None
+        self.latency_max = None
+        self.latency_sum = 0.0
+
+    def AddLatency( self, latency ):
+        self.nb_polls += 1
+        self.nb_consecutive_errors = 0
+        self.latency_sum += latency
+        if ( self.latency_min is None or latency < self.latency_min ):
+            self.latency_min = latency
+        if ( self.latency_max is None or latency > self.latency_max ):
+            self.latency_max = latency
+
+    def AddError( self, e ):
+        self.nb_errors += 1
+        self.nb_consecutive_errors += 1
+        self.last_error = e
+
+    def AsDict( self ):
+        d = dict( self.__dict__ )
+        d["latency_avg"] = self.latency_sum / self.nb_polls if self.nb_polls else None
+        d["last_error"] = repr( self.last_error ) if self.last_error is not None else None
+        del d["latency_sum"]
+        return d
+
+
+class cDevice(object):
+    def __init__( self, host ):
+        self.host = host
+        self.bks = None
+        self.statistics = cDeviceStatistics()
+        self.next_poll = 0.0
+        self.backoff = 0.0
+
+
+class BKSFleet(object):
+    """Poll the parameters parameter_names (default: plc_sync_input) of many devices cyclically from a single process.
+
+    hosts is a list of host strings as understood by BKSBase(): IPs/names for HTTP devices and
+    "SERIAL_INTERFACE,SLAVE_ID,..." strings for Modbus-RTU devices.
+
+    Devices are grouped into channels: each HTTP device is a channel of its own, while all Modbus-RTU devices
+    on the same serial interface share one channel (the bus can only do one transaction at a time).
+    Each channel is served by a thread of its own, so connecting and polling is done in parallel for all channels.
+    Each device is polled every period s (deadline based, so without drift).
+
+    The latest successful poll of each device is available as immutable cSnapshot in self.snapshots[ host ].
+    Snapshots are replaced as a whole, so readers always get a consistent snapshot without locking.
+    Per device statistics are available via GetStatistics().
+
+    Devices that fail nb_errors_offline times in a row are marked "offline" and are reconnected
+    with exponentially growing delays (up to max_backoff s), so that failing devices do not delay
+    the polling of other devices on the same channel more than necessary.
+
+    kwargs are forwarded to BKSBase(), e.g. repeater_nb_tries=1 to make failing Modbus devices fail fast.
+    """
+    def __init__( self, hosts, period=0.1, parameter_names=[ "plc_sync_input" ], nb_errors_offline=3, max_backoff=10.0, **kwargs ):
+        self.period = period
+        self.parameter_names = list( parameter_names )
+        self.nb_errors_offline = nb_errors_offline
+        self.max_backoff = max_backoff
+        self.bks_kwargs = kwargs
+
+        self.devices = dict()
+        self.snapshots = dict()
+        self.channels = dict()
+        for host in hosts:
+            device = cDevice( host )
+            self.devices[ host ] = device
+            modbus_settings = GetModbusSettings( host )
+            if ( modbus_settings ):
+                channel = modbus_settings[0]
+            else:
+                channel = host
+            self.channels.setdefault( channel, [] ).append( device )
+
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def Start( self ):
+        """Start one thread per channel that connects to the devices of the channel and then polls them
+        """
+        self.stop_event.clear()
+        for (channel,devices) in self.channels.items():
+            thread = threading.Thread( target=self.ServeChannel, args=(devices,), name=f"BKSFleet {channel}", daemon=True )
+            thread.start()
+            self.threads.append( thread )
+
+    def Stop( self ):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        for device in self.devices.values():
+            if ( device.bks is not None and "mb" in device.bks.__dict__ ):
+                device.bks.mb.serial.close()
+
+    def WaitConnected( self, timeout=None ):
+        """Wait until all devices were tried to connect to at least once (or timeout s passed).
+        Return the list of hosts that are online.
+        """
+        t_end = None if timeout is None else time.time() + timeout
+        while ( any( [ d.statistics.state == "connecting" for d in self.devices.values() ] ) ):
+            if ( t_end is not None and time.time() > t_end ):
+                break
+            time.sleep( 0.01 )
+        return [ host for (host,d) in self.devices.items() if d.statistics.state == "online" ]
+
+    def GetStatistics( self ):
+        """Return a dict that maps each host to a dict with its statistics, see cDeviceStatistics
+        """
+        return { host: device.statistics.AsDict() for (host,device) in self.devices.items() }
+
+    def ServeChannel( self, devices ):
+        for device in devices:
+            self.Connect( device )
+
+        while ( not self.stop_event.is_set() ):
+            # poll the device that is due next:
+            device = min( devices, key=lambda d: d.next_poll )
+            delay = device.next_poll - time.time()
+            if ( delay > 0.0 and self.stop_event.wait( delay ) ):
+                break
+
+            if ( device.bks is None ):
+                self.Connect( device )
+            else:
+                self.Poll( device )
+
+    def Connect( self, device ):
+        now = time.time()
+        try:
+            device.bks = BKSBase( device.host, **self.bks_kwargs )
+        except Exception as e:
+            self.HandleError( device, e, now )
+            return
+        if ( device.statistics.state == "offline" ):
+            device.statistics.nb_reconnects += 1
+        device.statistics.state = "online"
+        device.backoff = 0.0
+        device.next_poll = now
+
+    def Poll( self, device ):
+        due = device.next_poll
+        t0 = time.time()
+        try:
+            values = device.bks.get_values( self.parameter_names, ignore_insufficient_read_rights=True )
+        except Exception as e:
+            self.HandleError( device, e, t0 )
+            return
+        t1 = time.time()
+
+        statistics = device.statistics
+        statistics.AddLatency( t1-t0 )
+        self.snapshots[ device.host ] = cSnapshot( device.host, values, t0, t1-t0, statistics.nb_polls )
+
+        # next deadline is based on the previous one to avoid drift. If that is already passed then skip the missed polls:
+        device.next_poll = due + self.period
+        if ( device.next_poll < t1 ):
+            statistics.nb_overruns += 1
+            device.next_poll = t1 + self.period - ( (t1 - due) % self.period )
+
+    def HandleError( self, device, e, now ):
+        statistics = device.statistics
+        statistics.AddError( e )
+        Debug( f"BKSFleet: {device.host}: {e!r}" )
+        if ( device.bks is None or statistics.nb_consecutive_errors >= self.nb_errors_offline ):
+            statistics.state = "offline"
+            device.bks = None                # reconnect on next try (a serial interface stays open for the other devices of the channel)
+            device.backoff = min( self.max_backoff, max( self.period, device.backoff * 2 ) )
+            device.next_poll = now + device.backoff
+        else:
+            device.next_poll = now + self.period
@@ -9,27 +9,71 @@ Created on 2022-03-07
 
 
 import requests
-import struct
 
 from pyschunk.generated.generated_enums import eCmdCode, eErrorCode  # @UnusedImport
 from pyschunk.tools.util import enum
-from bkstools.bks_lib import hms
+from bkstools.bks_lib import hms, bks_instrumentation
 from bkstools.bks_lib.debug import Print, Error, Debug, Var, ApplicationError, InsufficientAccessRights, InsufficientReadRights, InsufficientWriteRights, ControlledFromOtherChannel, ServiceNotAvailable, UnsupportedCommand  # @UnusedImport
-import time
-from bkstools.bks_lib.bks_base_common import BKSBaseCommon, Struct, int32_to_uint32, Reverse
+from bkstools.bks_lib.bks_base_common import BKSBaseCommon, Struct, GetIndexRanges
+from bkstools.bks_lib.bks_codec import cCodec, GetDatatypeCodec, MakeCodec
+from bkstools.bks_lib.bks_metadata_store import cMetadataStore
 
 import re
 import sys
+import time
 import pprint
+import struct
+import weakref
+
+
+def FlushEnums( store, token, pending_enums ):
+    """Write the enums in pending_enums (a dict mapping parameter names to enum dicts) for token to store in a single transaction
+    and remove them from pending_enums. (pending_enums might be filled from other threads meanwhile, so it is emptied item by item)
+    """
+    enums = dict()
+    while ( pending_enums ):
+        (name, enum_dict) = pending_enums.popitem()
+        enums[ name ] = enum_dict
+    if ( enums ):
+        store.StoreEnums( token, enums )
+
+
+def CloseMetadataStore( store, token, pending_enums ):
+    """Write the pending enums to store and close it. Used as finalizer of BKS_HTTP objects, so it must not refer to the object.
+    """
+    FlushEnums( store, token, pending_enums )
+    store.Close()
+
 
 class BKS_HTTP(BKSBaseCommon):
     """Class where instances allow access to SCHUNK BKS grippers via the HTTP/JSON webinterface.
 
     The actually available parameters are read from the gripper at construction time
     and are made available as properties of the instance object.
-    The parameter list read from the gripper is cached persistently on hard disc. The cached values
-    are used if available and if they are not older than max_age_in_s (default: 5 minutes)
+    The parameter list read from the gripper is cached persistently on hard disc in a cMetadataStore
+    that is shared by all grippers running the same firmware. The cached values are used as long as
+    the validation token of the gripper is unchanged, i.e. as long as /adi/info.json and the firmware
+    version and build reported by the gripper are the same as when the cache was filled.
+    A max_age_in_s of 0 forces re-reading the parameter list.
+
+    The enums of ENUM parameters are read from the gripper on first access to self.enums[ name ] only
+    and are then cached persistently along with the parameter list. Enums read are written to the store
+    in one transaction at the end of the construction, on Close() and when the object is garbage collected
+    or the interpreter exits.
     """
+
+    ## Path of the metadata store file, None for the default ~/.bks3_metadata.sqlite
+    metadata_store_path = None
+
+    ## Names of the parameters whose values form the validation token of the cached metadata, see UpdateMetadata().
+    #  fieldbus_type is not part of the token but is read along since it is needed by SetFieldbus() anyway.
+    validation_parameters = [ "sw_build_date", "sw_build_time", "sw_version_txt" ]
+    validation_info_keys  = [ "dataformat", "numadis", "webversion" ]
+
+    ## Exceptions that indicate that the validation values could not be read or decoded with the metadata of a
+    #  candidate firmware (the gripper runs another firmware with other indices or datatypes), see UpdateMetadata()
+    validation_errors = ( ApplicationError, LookupError, TypeError, ValueError, struct.error )
+
     def __init__(self,host, max_age_in_s=5*60, debug=False ):
         BKSBaseCommon.__init__( self, host, max_age_in_s, debug )
 
@@ -40,57 +84,153 @@ class BKS_HTTP(BKSBaseCommon):
 
         self.timeout = (5,0.75) # (timeout_for_initial_connect, timeout_for_consecutive_reads) according to http://docs.python-requests.org/en/master/user/advanced/#timeouts
 
+        # Maximum number of unrequested parameters between requested ones that get_values() may read
+        # along to save a request. 0 means read contiguous ranges of requested parameters only.
+        self.batch_max_gap = 0
+
         r = self.session_get( url = "http://" + self.host + "/adi/info.json", timeout=self.timeout )
         self.CheckResponse( r, "get" )
-        self.reverse_data = (r.json()["dataformat"] == 0)
+        self.info = r.json()
+        self.reverse_data = (self.info["dataformat"] == 0)
+
+        # enums read but not yet written to the metadata store, see FlushEnums():
+        self.pending_enums = dict()
 
-        self.SetAttributes()
         self.UpdateMetadata()
+        self.store_closer = weakref.finalize( self, CloseMetadataStore, self.store, self.token, self.pending_enums )
+        self.SetAttributes()
+
+        # the values read for the validation token never change at runtime, so keep them:
+        for (name,value) in self.validation_values.items():
+            if ( type( value ) is not dict ):
+                self.cached_index_to_value[ self.GetIndexOfName( name ) ] = value
 
         self.SetFieldbus()
 
         self.SetupControlword()
         self.SetupStatusword()
+        self.FlushEnums()
+
+    def Close(self):
+        """Write the enums read so far to the metadata store, close the metadata store and the connections to the gripper
+        """
+        self._session.close()
+        self.store_closer()
+
+    def FlushEnums(self):
+        """Write the enums read since the last call to the metadata store, in a single transaction
+        """
+        FlushEnums( self.store, self.token, self.pending_enums )
+
+
+    def ReadValidationValues(self):
+        """Return a dict with the values of the validation_parameters (and fieldbus_type) available according to self.data.
+        The values are read with as few requests as possible. (self.codecs might not be set up yet, so codecs are made on the fly)
+        """
+        index_to_name = self.GetValidationIndices()
+        values = dict()
+        for (offset,count) in GetIndexRanges( index_to_name.keys(), max_gap=8 ):
+            self.DecodeValidationData( index_to_name, offset, self.ReadData( offset, count ), values )
+        return values
+
+    def GetValidationIndices(self):
+        """Return a dict that maps the indices of the validation_parameters (and fieldbus_type) in self.data to their names
+        """
+        index_to_name = dict()
+        for (i,d) in enumerate( self.data ):
+            if ( d["name"] in self.validation_parameters or d["name"] == "fieldbus_type" ):
+                index_to_name[ i ] = d["name"]
+        return index_to_name
+
+    def DecodeValidationData(self, index_to_name, offset, data, values ):
+        """Decode the validation values in data as read by ReadData( offset, ... ) into dict values
+        """
+        if ( type( data ) is not list ):
+            data = [ data ]
+        for (index,data_i) in enumerate( data, offset ):
+            if ( index in index_to_name ):
+                values[ index_to_name[ index ] ] = MakeCodec( self.data[ index ] ).Decode( data_i, self.reverse_data )
+
+    def MakeValidationToken(self, values ):
+        """Return the validation token for the cached metadata from self.info and values read by ReadValidationValues()
+        """
+        return repr( ( [ self.info.get( key ) for key in self.validation_info_keys ],
+                       [ values.get( name ) for name in self.validation_parameters ] ) )
 
+    def GetSettings(self, host):
+        # metadata and enums are kept in the shared metadata store instead, see UpdateMetadata()
+        return dict()
 
     def UpdateMetadata(self):
-        now = time.time()
-        data_timestamp = self.settings.setdefault( "data_timestamp", 0 )
-        if ( self.data is None or now - data_timestamp > self.max_age_in_s ):
-            r = self.session_get( url = "http://" + self.host + "/adi/metadata2.json?offset=0&count=256", timeout=self.timeout )
-            self.CheckResponse( r, "get" )
-            self.data = r.json()
-            self.settings[ "data" ] = self.data
-            self.settings[ "data_timestamp" ] = now
-            self.settings.sync()
+        """Read the parameter metadata from the gripper unless the metadata for the firmware of the gripper is in the metadata store already.
+        """
+        self.store = cMetadataStore( self.metadata_store_path )
+        if ( self.max_age_in_s > 0 ):
+            for token in self.store.GetCandidateTokens( self.host ):
+                entry = self.store.Load( token )
+                if ( entry is None ):
+                    continue
+                # read the validation values with the indices given by the candidate metadata:
+                (self.data, self.stored_enums) = entry
+                try:
+                    self.validation_values = self.ReadValidationValues()
+                except self.validation_errors as e:
+                    Debug( f"Validation values cannot be read with the candidate metadata: {e!r}" )
+                    continue  # another firmware with other indices or datatypes is running, so the token cannot match
+                self.token = self.MakeValidationToken( self.validation_values )
+                if ( self.token != token ):
+                    entry = self.store.Load( self.token )
+                if ( entry is not None ):
+                    (self.data, self.stored_enums) = entry
+                    self.store.SetHost( self.host, self.token )
+                    return
+
+        # forget the metadata of a candidate that did not match:
+        self.data = None
+        self.stored_enums = dict()
+        r = self.session_get( url = "http://" + self.host + "/adi/metadata2.json?offset=0&count=256", timeout=self.timeout )
+        self.CheckResponse( r, "get" )
+        self.data = r.json()
+        self.validation_values = self.ReadValidationValues()
+        self.token = self.MakeValidationToken( self.validation_values )
+        self.store.Store( self.token, self.data, self.host )
+
+    def LoadEnum(self, name ):
+        if ( name in self.stored_enums ):
+            stored_enum = enum()
+            for (k,v) in self.stored_enums[ name ].items():
+                stored_enum.Add( k, v )
+            return stored_enum
+        d = self.data[ self.name_to_index[ name ] ]
+        if ( d["datatype"] != [ hms.HMS_Datatypes.ABP_ENUM ] ):
+            raise KeyError( name )
+        return self.UpdateEnum( d )
 
     def UpdateEnum(self, d):
+        """Read the enum of the parameter described by d from the gripper, cache it and return it
+        """
         name = str(d["name"])
-        now = time.time()
-        enum_timestamp = self.settings.setdefault( "%s.enum_timestamp" % (name), 0 )
-        self.enums[ name ] = self.settings.setdefault( "%s.enum" % (name), None )
-
-        if ( self.enums[ name ] is None or now - enum_timestamp > self.max_age_in_s ):
-            r = self.session_get( url = "http://" + self.host + "/adi/enum.json?inst=%d" % (d["instance"]), timeout=self.timeout )
-            try:
-                self.CheckResponse( r, "get" )
-                enum_data = r.json()
-            except ApplicationError as e:
-                sys.stderr.write( "Failed to read enums for instance %d=0x%04x: %r (ignored)\n" % (d["instance"],d["instance"],e))
-                enum_data = []
+        r = self.session_get( url = "http://" + self.host + "/adi/enum.json?inst=%d" % (d["instance"]), timeout=self.timeout )
+        try:
+            self.CheckResponse( r, "get" )
+            enum_data = r.json()
+        except ApplicationError as e:
+            sys.stderr.write( "Failed to read enums for instance %d=0x%04x: %r (ignored)\n" % (d["instance"],d["instance"],e))
+            enum_data = []
 
-            # enum_data is a list of elemntes like:
-            #   dict: {u'string': u'ERROR_NONE', u'value': 0}
-            new_enum = enum()
-            for le in enum_data:
-                if ( str(le["string"]) != "" ):  #unused enum values are reported as "", so ignore these to avoid KeyError
-                    new_enum.Add( str(le["string"]), le["value"] )
+        # enum_data is a list of elemntes like:
+        #   dict: {u'string': u'ERROR_NONE', u'value': 0}
+        new_enum = enum()
+        for le in enum_data:
+            if ( str(le["string"]) != "" ):  #unused enum values are reported as "", so ignore these to avoid KeyError
+                new_enum.Add( str(le["string"]), le["value"] )
 
-            self.enums[ name ] = new_enum
+        self.enums[ name ] = new_enum
 
-            self.settings[ "%s.enum" % (name) ] = new_enum
-            self.settings[ "%s.enum_timestamp" % (name) ] = now
-            self.settings.sync()
+        enum_dict = { k: v for (k,v) in new_enum.items() if k != "_last" }
+        self.stored_enums[ name ] = enum_dict
+        self.pending_enums[ name ] = enum_dict
+        return new_enum
 
     def SetFieldbus(self):
         # determine if the parameter fieldbus_type is available / set to EtherNet/IP
@@ -131,32 +271,78 @@ class BKS_HTTP(BKSBaseCommon):
             return ((v32 & 0xff000000)>>24) | ((v32 & 0x00ff0000)>>8) | ((v32 & 0x0000ff00)<<8) | ((v32 & 0x000000ff)<<24)
         return v32
 
-    def session_get(self, **kwargs ):
+    def session_get(self, indices=None, **kwargs ):
+        """Send a get request with requests.Session.get( **kwargs ).
+        indices are the parameters read (see GetNamesOfIndices()), for instrumentation only.
+        """
         if ( self.debug ):
             Debug( "Sending get request:" )
             for key, value in kwargs.items():
                 Debug( "  %s=%s" % (key, value) )
 
-        r = self._session.get(**kwargs)
+        with self.io_lock:
+            if ( self.instruments ):
+                r = self.InstrumentedRequest( self._session.get, "read", indices, kwargs )
+            else:
+                r = self._session.get(**kwargs)
 
         if ( self.debug ):
             self.pprint_response( r )
 
         return r
 
-    def session_post(self, **kwargs ):
+    def session_post(self, indices=None, **kwargs ):
+        """Send a post request with requests.Session.post( **kwargs ).
+        indices are the parameters written (see GetNamesOfIndices()), for instrumentation only.
+        """
         if ( self.debug ):
             Debug( "Sending post request:" )
             for key, value in kwargs.items():
                 Debug( "  %s=%s" % (key, value) )
 
-        r = self._session.post(**kwargs)
+        with self.io_lock:
+            if ( self.instruments ):
+                r = self.InstrumentedRequest( self._session.post, "write", indices, kwargs )
+            else:
+                r = self._session.post(**kwargs)
 
         if ( self.debug ):
             self.pprint_response( r )
 
         return r
 
+    def BeginTransaction( self, kind, indices, url ):
+        """Return a bks_instrumentation.cTransaction for a request of kind ("read" or "write") for the parameters indices
+        (None for other requests like metadata) to url, after reporting it to self.instruments
+        """
+        if ( indices is None ):
+            return bks_instrumentation.Begin( self.instruments, self.host, "http", "other", None, len( url ) )
+        return bks_instrumentation.Begin( self.instruments, self.host, "http", kind, lambda: self.GetNamesOfIndices( indices ), len( url ) )
+
+    def EndTransaction( self, transaction, r ):
+        """Report the end of transaction with response r to self.instruments
+        """
+        error = None
+        if ( not r.ok ):
+            error = f"HTTP {r.status_code}"
+        elif ( transaction.kind == "write" ):
+            mob = self.rex_result.match( r.content )
+            if ( mob and mob.group(1) != b"0" ):
+                error = f"result {int( mob.group(1) )}"
+        bks_instrumentation.End( self.instruments, transaction, len( r.content ), error )
+
+    def InstrumentedRequest( self, request, kind, indices, kwargs ):
+        """Return request( **kwargs ), reporting the transaction to self.instruments, see bks_instrumentation
+        """
+        transaction = self.BeginTransaction( kind, indices, kwargs["url"] )
+        try:
+            r = request(**kwargs)
+        except Exception as e:
+            bks_instrumentation.End( self.instruments, transaction, exception=e )
+            raise
+        self.EndTransaction( transaction, r )
+        return r
+
     def pprint_response(self, response ):
         Debug( "Received response:" )
         for e in [ "ok", "reason" , "status_code", "content", "_content_consumed", "_next", "apparent_encoding", "elapsed", "encoding", "headers", "history", "url" ]:
@@ -165,28 +351,24 @@ class BKS_HTTP(BKSBaseCommon):
 
 
 
-    def GetStructuredValue( self, index ):
+    def GetStructuredValue( self, index, data=None ):
+        """Return the value of the structured parameter with index index as Struct.
+        If data is None then the value is read from the gripper, else data is
+        the already read element of a /adi/data.json response.
+        """
         s = Struct()
 
-        r = self.session_get( url = "http://" + self.host + "/adi/data.json?offset=%d&count=1" % index, timeout=self.timeout )
-        self.CheckResponse(r, "get")
-        data = r.json()[0] # TODO: cope with other indices (for arrays?)
+        if ( data is None ):
+            data = self.ReadData( index )
         #Debug( "get_value data= %r" % data)
         try:
             if ( type( data ) is dict  and  data["error"] in (hms.HMS_ErrorCodes.ABP_ERR_ATTR_NOT_GETABLE,hms.HMS_ErrorCodes.ABP_ERR_PROTECTED_ACCESS) ):
                 # value is inaccessible due to insufficient read rights
                 raise InsufficientReadRights()
 
-            for si in range( len( self.data[index]["datatype"] ) ):
-
-                nb_bytes =  self.data[index]["numsubelements"][ si ] * hms.HMS_Datatypes_size_in_bytes[ self.data[index]["datatype"][ si ] ]
-                nb_chars =  nb_bytes << 1
-
-                data_i = data[:nb_chars]
-                data = data[nb_chars:]
-                #s.__dict__[ self.data[index]["elementname"][ si ] ] = self.GetSingleValue(  self.data[index]["datatype"][ si ] , data_i )
-                s.AddOrdered( self.data[index]["elementname"][ si ],
-                              self.GetSingleValue(  self.data[index]["datatype"][ si ] , data_i ),
+            for (si,(elementname,value)) in enumerate( self.codecs[ index ].DecodeElements( data, self.reverse_data ) ):
+                s.AddOrdered( elementname,
+                              value,
                               self,
                               index,
                               si )
@@ -195,50 +377,84 @@ class BKS_HTTP(BKSBaseCommon):
 
         except Exception as e:
             # for easy debugging:
-            Error( "GetStructuredValue( index=%d ) failed with %r\n  r=%r\n  data=%r" % (index, e, r, data ))
+            Error( "GetStructuredValue( index=%d ) failed with %r\n  data=%r" % (index, e, data ))
             raise
 
         return s
 
 
-    def UpdateValue( self, index_or_name, datatype, index ):
-        r = self.session_get( url = "http://" + self.host + "/adi/data.json?offset=%d&count=1" % index, timeout=self.timeout )
+    def ReadData( self, index, count=1 ):
+        """Read count elements starting at index from /adi/data.json.
+        Returns the list of elements if count is not 1, else the single element
+        """
+        r = self.session_get( indices=range( index, index+count ), url = "http://" + self.host + "/adi/data.json?offset=%d&count=%d" % (index,count), timeout=self.timeout )
         self.CheckResponse(r, "get")
-        data = r.json()[0]
-        #Debug( "get_value data= %r" % data)
-        try:
-            if ( type( data ) is dict  and  data["error"] in (hms.HMS_ErrorCodes.ABP_ERR_ATTR_NOT_GETABLE,hms.HMS_ErrorCodes.ABP_ERR_PROTECTED_ACCESS) ):
-                # value is inaccessible due to insufficient read rights
-                if ( index in self.failed_requests and self.failed_requests[ index ] == r.json() ):
-                    # same error as before, so do not reprint
-                    pass
-                else:
-                    self.failed_requests[ index ] = r.json()
-                    Error( f"get request for parameter {index_or_name} failed. response: {r.json()!r}. (Future errors for the same parameter will not be printed again)" )
-                raise InsufficientReadRights()
+        if ( count == 1 ):
+            return r.json()[0]
+        return r.json()
+
 
-            if ( self.data[index]["numelements"] > 1 ):
-                if ( len( self.data[index]["datatype"] ) > 1 ):
-                    return self.GetStructuredValue(index)
-                l = []
-                nb_bytes =  hms.HMS_Datatypes_size_in_bytes[ datatype ]
-                nb_chars =  nb_bytes << 1
-
-                for si in range( self.data[index]["numelements"] ):  # @UnusedVariable
-                    data_i = data[:nb_chars]
-                    l.append( self.GetSingleValue( datatype, data_i ) )
-                    data = data[nb_chars:]
-
-                if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
-                    return "".join(l)
-                return l
+    def DecodeValue( self, index_or_name, datatype, index, data ):
+        """Return the value of the parameter with index index decoded from data, an element of a /adi/data.json response.
+        index_or_name is used for error messages only.
+        """
+        if ( type( data ) is dict  and  data["error"] in (hms.HMS_ErrorCodes.ABP_ERR_ATTR_NOT_GETABLE,hms.HMS_ErrorCodes.ABP_ERR_PROTECTED_ACCESS) ):
+            # value is inaccessible due to insufficient read rights
+            if ( index in self.failed_requests and self.failed_requests[ index ] == data ):
+                # same error as before, so do not reprint
+                pass
             else:
-                return self.GetSingleValue( datatype, data )
+                self.failed_requests[ index ] = data
+                Error( f"get request for parameter {index_or_name} failed. response: {data!r}. (Future errors for the same parameter will not be printed again)" )
+            raise InsufficientReadRights()
+
+        if ( datatype is None  or  len( self.data[index]["datatype"] ) > 1 ):
+            return self.GetStructuredValue( index, data )
+
+        codec = self.codecs[ index ]
+        if ( codec.datatype != datatype ):
+            # caller requested a different interpretation than given by the metadata:
+            codec = cCodec( datatype, self.data[index]["numelements"] )
+        return codec.Decode( data, self.reverse_data )
+
+
+    def UpdateValue( self, index_or_name, datatype, index ):
+        return self.DecodeValue( index_or_name, datatype, index, self.ReadData( index ) )
+
+
+    def UpdateValues( self, indices ):
+        """Read the values of the parameters with the indices given in list indices from the gripper.
+
+        Indices are grouped into ranges (see GetIndexRanges() and self.batch_max_gap) and each range is
+        read with a single /adi/data.json request. See BKSBaseCommon.UpdateValues() for the return value.
+        """
+        index_to_value = dict()
+        for (offset,count) in GetIndexRanges( indices, self.batch_max_gap ):
+            t_request = time.time()
+            data_list = self.ReadData( offset, count )
+            t_read = ( t_request + time.time() ) / 2.0
+            self.DecodeRange( indices, offset, data_list, index_to_value )
+            for index in indices:
+                if ( offset <= index < offset + count ):
+                    self.index_to_read_time[ index ] = t_read
+        return index_to_value
+
+    def DecodeRange( self, indices, offset, data_list, index_to_value ):
+        """Decode the values of the parameters with indices in indices from data_list as read by ReadData( offset, ... ) into dict index_to_value
+        """
+        if ( type( data_list ) is not list ):
+            data_list = [ data_list ]
+        for (index,data) in enumerate( data_list, offset ):
+            if ( not index in indices ):
+                continue # unrequested element within a range with gaps
+            try:
+                datatype = None
+                if ( len( self.data[index]["datatype"] ) == 1 ):
+                    datatype = self.data[index]["datatype"][0]
+                index_to_value[ index ] = self.DecodeValue( self.data[index]["name"], datatype, index, data )
+            except InsufficientReadRights as e:
+                index_to_value[ index ] = e
 
-        except Exception as e:  # @UnusedVariable
-            # for easy debugging:
-            #Error( "get_value( index_or_name=%r, datatype=%r ) failed with %r\n  r=%r\n  data=%r" % (index_or_name, datatype, e, r, data ))
-            raise
 
     def get_value_by_inst(self, inst, datatype=None):
 
@@ -250,48 +466,17 @@ class BKS_HTTP(BKSBaseCommon):
             else:
                 return self.GetStructuredValue(index)
 
-        r = self.session_get(url="http://" + self.host + "/adi/data.json?offset=%d&count=1" % index,
-                             timeout=self.timeout)
-        self.CheckResponse(r, "get")
-        data = r.json()[0]
-        # Debug( "get_value data= %r" % data)
-        try:
-            if (type(data) is dict and data["error"] in (
-                    hms.HMS_ErrorCodes.ABP_ERR_ATTR_NOT_GETABLE, hms.HMS_ErrorCodes.ABP_ERR_PROTECTED_ACCESS)):
-                # value is inaccessible due to insufficient read rights
-                if (index in self.failed_requests and self.failed_requests[index] == r.json()):
-                    # same error as before, so do not reprint
-                    pass
-                else:
-                    self.failed_requests[index] = r.json()
-                    Error(
-                        f"get request for parameter {inst} failed. response: {r.json()!r}. (Future errors for the same parameter will not be printed again)")
-                raise InsufficientReadRights()
-
-            if (self.data[index]["numelements"] > 1):
-                if (len(self.data[index]["datatype"]) > 1):
-                    return self.GetStructuredValue(index)
-                l = []
-                nb_bytes = hms.HMS_Datatypes_size_in_bytes[datatype]
-                nb_chars = nb_bytes << 1
-
-                for si in range(self.data[index]["numelements"]):  # @UnusedVariable
-                    data_i = data[:nb_chars]
-                    l.append(self.GetSingleValue(datatype, data_i))
-                    data = data[nb_chars:]
-
-                if (datatype == hms.HMS_Datatypes.ABP_CHAR):
-                    return "".join(l)
-                return l
-            else:
-                return self.GetSingleValue(datatype, data)
-
-        except Exception as e:  # @UnusedVariable
-            # for easy debugging:
-            # Error( "get_value( index_or_name=%r, datatype=%r ) failed with %r\n  r=%r\n  data=%r" % (index_or_name, datatype, e, r, data ))
-            raise
+        return self.DecodeValue( inst, datatype, index, self.ReadData( index ) )
 
     def set_value( self, index_or_name, datatype=None, value=None, elementindices=None ):
+        for url in self.MakeUpdateURLs( index_or_name, datatype, value, elementindices ):
+            r = self.session_post( indices=(index_or_name,), url="http://" + self.host + url, timeout=self.timeout )
+            self.CheckResponse( r, "post" )
+
+    def MakeUpdateURLs( self, index_or_name, datatype=None, value=None, elementindices=None ):
+        """Return the list of /adi/update.json URLs (without "http://host") to post for set_value()
+        """
+        urls = []
         # for structured elements:
         #  GET /adi/update.json?inst=32834&value=0003&elem=7 HTTP/1.1
 
@@ -313,9 +498,8 @@ class BKS_HTTP(BKSBaseCommon):
             hexvalue = self.SingleValueToJSONValue( index, datatype, value )
 
             inst = self.data[ index ]["instance"]
-            r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s&elem=%d" % (inst,hexvalue,e), timeout=self.timeout )
-            self.CheckResponse( r, "post" )
-            return
+            urls.append( "/adi/update.json?inst=%d&value=%s&elem=%d" % (inst,hexvalue,e) )
+            return urls
 
         if ( type(value) in (Struct,tuple) ):
             # its a structure and all elements are given
@@ -331,9 +515,8 @@ class BKS_HTTP(BKSBaseCommon):
                 hexvalue += self.SingleValueToJSONValue( index, datatype, elementvalue )
 
             inst = self.data[ index ]["instance"]
-            r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue), timeout=self.timeout )
-            self.CheckResponse( r, "post" )
-            return
+            urls.append( "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue) )
+            return urls
 
         if ( type( index_or_name ) is str  and  "[" in index_or_name ):
             mob = re.match( "(\w+)\[(.+)\]", index_or_name )
@@ -366,9 +549,8 @@ class BKS_HTTP(BKSBaseCommon):
 
             if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
                 hexvalue = self.SingleValueToJSONValue( index, datatype, value )
-                r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue), timeout=self.timeout )
-                self.CheckResponse( r, "post" )
-                return
+                urls.append( "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue) )
+                return urls
 
             if ( len( value ) != len( elementindices ) ):
                 raise ApplicationError( "Number of values to set for array does not match! Expected 1 or %d values, but not %d" % (self.data[index]["numelements" ],len(value)) )
@@ -376,25 +558,20 @@ class BKS_HTTP(BKSBaseCommon):
             if ( len( elementindices ) == self.data[ index]["numelements"] ):
                 # whole array is given, so use a single post for performance and workaround bug EGI-6151:
 
-                hexvalue = ""
-                for (e,v) in zip( elementindices, value ):
-                    hexvalue += self.SingleValueToJSONValue( index, datatype, v )
-                r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue), timeout=self.timeout )
-                self.CheckResponse( r, "post" )
+                hexvalue = GetDatatypeCodec( datatype ).EncodeArray( value, self.reverse_data )
+                urls.append( "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue) )
             else:
                 for (e,v) in zip( elementindices, value ):
                     hexvalue = self.SingleValueToJSONValue( index, datatype, v )
-                    r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s&elem=%d" % (inst,hexvalue,e), timeout=self.timeout )
-                    self.CheckResponse( r, "post" )
-            return
+                    urls.append( "/adi/update.json?inst=%d&value=%s&elem=%d" % (inst,hexvalue,e) )
+            return urls
 
         else:
             # normal
             hexvalue = self.SingleValueToJSONValue( index, datatype, value )
 
-            r = self.session_post( url="http://" + self.host + "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue), timeout=self.timeout )
-            self.CheckResponse( r, "post" )
-            return
+            urls.append( "/adi/update.json?inst=%d&value=%s" % (inst,hexvalue) )
+            return urls
 
     def AdjustStringValue(self, value, numelements):
         if ( len( value ) > numelements ):
@@ -406,64 +583,9 @@ class BKS_HTTP(BKSBaseCommon):
         return value
 
     def SingleValueToJSONValue(self, index, datatype, value ):
-        reverse_data = self.reverse_data
-        if ( datatype == hms.HMS_Datatypes.ABP_FLOAT ):
-            packed = struct.pack( "!f", value )
-            hexvalue = ""
-            for c in packed:
-                hexvalue += "%02x" % (c)
-
-        elif ( datatype in (hms.HMS_Datatypes.ABP_ENUM,
-                          hms.HMS_Datatypes.ABP_UINT8) ):
-            hexvalue = "%02x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_UINT16 ):
-            hexvalue = "%04x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_UINT32 ):
-            hexvalue = "%08x" % (int32_to_uint32(value))
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_UINT64 ):
-            hexvalue = "%016x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_SINT8 ):
-            if (value < 0 ):
-                value = (-value ^ 0xff) +1
-            hexvalue = "%02x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_SINT16 ):
-            if (value < 0 ):
-                value = (-value ^ 0xffff) +1
-            hexvalue = "%04x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_SINT32 ):
-            if (value < 0 ):
-                value = (-value ^ 0xffffffff) +1
-            hexvalue = "%08x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_SINT64 ):
-            if (value < 0 ):
-                value = (-value ^ 0xffffffffffffffff) +1
-            hexvalue = "%016x" % (value)
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_BOOL ):
-            hexvalue = "%02x" % (int(value))
-
-        elif ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
-            reverse_data = False
-            numelements = self.data[index]["numelements"]
-            value = self.AdjustStringValue( value, numelements )
-
-            hexvalue = ""
-            for c in value:
-                hexvalue += "%02x" % (ord(c))
-        else:
-            raise ApplicationError( "Unknown datatype %d" % datatype )
-
-        if ( reverse_data ):
-            return Reverse( hexvalue )
-        else:
-            return hexvalue
+        if ( datatype == hms.HMS_Datatypes.ABP_CHAR ):
+            value = self.AdjustStringValue( value, self.data[index]["numelements"] )
+        return GetDatatypeCodec( datatype ).Encode( value, self.reverse_data )
 
     def CheckResponse(self, r, method ):
         if ( not r.ok ):
@@ -0,0 +1,416 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the class for asynchronous (asyncio) access to SCHUNK BKS grippers via the HTTP/JSON webinterface
+
+Example usage:
+\\code
+    async def Poll( hosts ):
+        grippers = await ConnectGrippers( hosts )
+        values = await GetValuesOfGrippers( grippers, [ "actual_pos", "actual_vel", "plc_sync_input[0]" ] )
+        ...
+        CloseGrippers( grippers )
+
+    asyncio.run( Poll( [ "192.168.1.253", "192.168.1.254" ] ) )
+\\endcode
+'''
+
+import asyncio
+import json
+import re
+import time
+import weakref
+
+from bkstools.bks_lib import hms, bks_instrumentation
+from bkstools.bks_lib.debug import Debug, ApplicationError
+from bkstools.bks_lib.bks_base_common import BKSBaseCommon, GetIndexRanges, make_property_name
+from bkstools.bks_lib.bks_http import BKS_HTTP, CloseMetadataStore
+from bkstools.bks_lib.bks_metadata_store import cMetadataStore
+from pyschunk.tools.util import enum
+
+
+class cAsyncResponse(object):
+    """Response of a cAsyncConnectionPool request. Provides the attributes of a requests.Response used by BKS_HTTP.CheckResponse()
+    """
+    def __init__( self, url, status_code, reason, headers, content ):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.ok = status_code < 400
+
+    def json( self ):
+        return json.loads( self.content )
+
+    def __repr__( self ):
+        return f"<cAsyncResponse [{self.status_code}] {self.url}>"
+
+
+class cAsyncConnectionPool(object):
+    """Minimal asyncio HTTP/1.1 client with a pool of keep-alive connections to a single host "name_or_ip[:port]".
+
+    At most max_connections requests are sent concurrently. Connections are reused for
+    following requests. If a reused connection turns out to be closed by the server then
+    the request is repeated once on a new connection.
+    """
+    def __init__( self, host, max_connections=4 ):
+        self.host = host
+        (self.hostname, _, port) = host.partition( ":" )
+        self.port = int( port ) if port else 80
+        self.semaphore = asyncio.Semaphore( max_connections )
+        self.idle_connections = []
+
+    async def request( self, method, path, timeout ):
+        """Send the request method path (without body) and return the cAsyncResponse.
+        Raises asyncio.TimeoutError if no complete response is received within timeout s or OSError on connection problems.
+        """
+        async with self.semaphore:
+            while True:
+                reused = len( self.idle_connections ) > 0
+                if ( reused ):
+                    (reader, writer) = self.idle_connections.pop()
+                else:
+                    (reader, writer) = await asyncio.wait_for( asyncio.open_connection( self.hostname, self.port ), timeout )
+                try:
+                    (response, keep_alive) = await asyncio.wait_for( self._request( reader, writer, method, path ), timeout )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if ( reused ):
+                        continue # the server closed the idle connection meanwhile, so retry on a new one
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+
+                if ( keep_alive ):
+                    self.idle_connections.append( (reader, writer) )
+                else:
+                    writer.close()
+                return response
+
+    async def _request( self, reader, writer, method, path ):
+        writer.write( f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: keep-alive\r\nContent-Length: 0\r\n\r\n".encode( "latin-1" ) )
+        await writer.drain()
+
+        status_line = await reader.readuntil( b"\r\n" )
+        (_, status_code, reason) = status_line.decode( "latin-1" ).rstrip( "\r\n" ).split( " ", 2 )
+        headers = dict()
+        while True:
+            line = await reader.readuntil( b"\r\n" )
+            if ( line == b"\r\n" ):
+                break
+            (key, _, value) = line.decode( "latin-1" ).partition( ":" )
+            headers[ key.strip().lower() ] = value.strip()
+
+        keep_alive = headers.get( "connection", "" ).lower() != "close"
+        if ( "content-length" in headers ):
+            content = await reader.readexactly( int( headers["content-length"] ) )
+        elif ( headers.get( "transfer-encoding", "" ).lower() == "chunked" ):
+            content = b""
+            while True:
+                size = int( (await reader.readuntil( b"\r\n" )).split( b";" )[0], 16 )
+                chunk = await reader.readexactly( size + 2 )
+                if ( size == 0 ):
+                    break
+                content += chunk[:-2]
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        url = "http://" + self.host + path
+        return (cAsyncResponse( url, int( status_code ), reason, headers, content ), keep_alive)
+
+    def close( self ):
+        for (reader, writer) in self.idle_connections:  # @UnusedVariable
+            writer.close()
+        self.idle_connections = []
+
+
+class AsyncBKS_HTTP(BKS_HTTP):
+    """Class where instances allow asynchronous access to SCHUNK BKS grippers via the HTTP/JSON webinterface.
+
+    The parameter surface is the same as for BKS_HTTP, but every access to the gripper is a coroutine:
+    - await bks.get_value( "actual_pos" ), await bks.get_values( [...] ), await bks.set_value( "set_pos", 10.0 )
+    - reading a parameter property like bks.actual_pos or bks.plc_sync_input returns an awaitable,
+      so use e.g. "await bks.actual_pos".
+      Writing via properties is not possible, use await set_value() instead.
+
+    Construction does no communication, call await Connect() (or use "async with AsyncBKS_HTTP(...) as bks:").
+    The metadata store and the validation token are the same as for BKS_HTTP.
+    Enums are read on first access as well, but since self.enums[ name ] cannot await, enums not yet
+    in the metadata store must be read with await FetchEnums() before.
+    """
+    def __init__(self, host, max_age_in_s=5*60, debug=False, max_connections=4 ):
+        BKSBaseCommon.__init__( self, host, max_age_in_s, debug )
+
+        #                                                     1   1
+        self.rex_result = re.compile( rb'\s*{\s*"result"\s*:\s*(\d+)\s*}\s*' )
+
+        self.pool = cAsyncConnectionPool( host, max_connections )
+
+        self.timeout = 5.0 # timeout in s for a complete request / response
+
+        # see BKS_HTTP:
+        self.batch_max_gap = 0
+        self.pending_enums = dict()
+
+    async def __aenter__(self):
+        await self.Connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback ):
+        self.Close()
+
+    async def Connect(self):
+        r = await self.session_get( url = "http://" + self.host + "/adi/info.json", timeout=self.timeout )
+        self.CheckResponse( r, "get" )
+        self.info = r.json()
+        self.reverse_data = (self.info["dataformat"] == 0)
+
+        await self.UpdateMetadata()
+        self.store_closer = weakref.finalize( self, CloseMetadataStore, self.store, self.token, self.pending_enums )
+        self.SetAttributes()
+
+        for (name,value) in self.validation_values.items():
+            if ( type( value ) is not dict ):
+                self.cached_index_to_value[ self.GetIndexOfName( name ) ] = value
+
+        await self.SetFieldbus()
+
+        self.SetupControlword()
+        self.SetupStatusword()
+        self.FlushEnums()
+
+    def Close(self):
+        self.pool.close()
+        if ( hasattr( self, "store_closer" ) ):
+            self.store_closer()
+        elif ( hasattr( self, "store" ) ):
+            self.store.Close()
+
+    async def session_get(self, indices=None, **kwargs ):
+        return await self.session_request( "GET", indices=indices, **kwargs )
+
+    async def session_post(self, indices=None, **kwargs ):
+        return await self.session_request( "POST", indices=indices, **kwargs )
+
+    async def session_request(self, method, url, timeout, indices=None ):
+        if ( self.debug ):
+            Debug( f"Sending {method} request: url={url}" )
+        if ( self.instruments ):
+            transaction = self.BeginTransaction( "read" if method == "GET" else "write", indices, url )
+            try:
+                r = await self.pool.request( method, url[ len( "http://" + self.host ): ], timeout )
+            except Exception as e:
+                bks_instrumentation.End( self.instruments, transaction, exception=e )
+                raise
+            self.EndTransaction( transaction, r )
+        else:
+            r = await self.pool.request( method, url[ len( "http://" + self.host ): ], timeout )
+        if ( self.debug ):
+            Debug( f"Received response: {r!r} {r.content!r}" )
+        return r
+
+    async def ReadData( self, index, count=1 ):
+        """Read count elements starting at index from /adi/data.json.
+        Returns the list of elements if count is not 1, else the single element
+        """
+        r = await self.session_get( indices=range( index, index+count ), url = "http://" + self.host + "/adi/data.json?offset=%d&count=%d" % (index,count), timeout=self.timeout )
+        self.CheckResponse(r, "get")
+        if ( count == 1 ):
+            return r.json()[0]
+        return r.json()
+
+    async def ReadValidationValues(self):
+        index_to_name = self.GetValidationIndices()
+        ranges = GetIndexRanges( index_to_name.keys(), max_gap=8 )
+        data_lists = await asyncio.gather( *[ self.ReadData( offset, count ) for (offset,count) in ranges ] )
+        values = dict()
+        for ((offset,count),data) in zip( ranges, data_lists ):  # @UnusedVariable
+            self.DecodeValidationData( index_to_name, offset, data, values )
+        return values
+
+    async def UpdateMetadata(self):
+        # see BKS_HTTP.UpdateMetadata()
+        self.store = cMetadataStore( self.metadata_store_path )
+        if ( self.max_age_in_s > 0 ):
+            for token in self.store.GetCandidateTokens( self.host ):
+                entry = self.store.Load( token )
+                if ( entry is None ):
+                    continue
+                (self.data, self.stored_enums) = entry
+                try:
+                    self.validation_values = await self.ReadValidationValues()
+                except self.validation_errors as e:
+                    Debug( f"Validation values cannot be read with the candidate metadata: {e!r}" )
+                    continue
+                self.token = self.MakeValidationToken( self.validation_values )
+                if ( self.token != token ):
+                    entry = self.store.Load( self.token )
+                if ( entry is not None ):
+                    (self.data, self.stored_enums) = entry
+                    self.store.SetHost( self.host, self.token )
+                    return
+
+        self.data = None
+        self.stored_enums = dict()
+        r = await self.session_get( url = "http://" + self.host + "/adi/metadata2.json?offset=0&count=256", timeout=self.timeout )
+        self.CheckResponse( r, "get" )
+        self.data = r.json()
+        self.validation_values = await self.ReadValidationValues()
+        self.token = self.MakeValidationToken( self.validation_values )
+        self.store.Store( self.token, self.data, self.host )
+
+    def LoadEnum(self, name ):
+        if ( name in self.stored_enums ):
+            return BKS_HTTP.LoadEnum( self, name )
+        raise KeyError( f"{name} (enum not read yet, use await FetchEnums())" )
+
+    async def FetchEnums(self, names=None ):
+        """Read the enums of the ENUM parameters with names in names (default: all) that are not in the metadata store yet, concurrently.
+        """
+        if ( names is None ):
+            names = [ d["name"] for d in self.data if d["datatype"] == [ hms.HMS_Datatypes.ABP_ENUM ] ]
+        await asyncio.gather( *[ self.UpdateEnum( self.data[ self.name_to_index[ name ] ] ) for name in names if not name in self.stored_enums ] )
+        self.FlushEnums()
+
+    async def UpdateEnum(self, d):
+        r = await self.session_get( url = "http://" + self.host + "/adi/enum.json?inst=%d" % (d["instance"]), timeout=self.timeout )
+        try:
+            self.CheckResponse( r, "get" )
+            enum_data = r.json()
+        except ApplicationError as e:
+            Debug( "Failed to read enums for instance %d=0x%04x: %r (ignored)" % (d["instance"],d["instance"],e) )
+            enum_data = []
+
+        new_enum = enum()
+        for le in enum_data:
+            if ( str(le["string"]) != "" ):  #unused enum values are reported as "", so ignore these to avoid KeyError
+                new_enum.Add( str(le["string"]), le["value"] )
+
+        name = str(d["name"])
+        self.enums[ name ] = new_enum
+        enum_dict = { k: v for (k,v) in new_enum.items() if k != "_last" }
+        self.stored_enums[ name ] = enum_dict
+        self.pending_enums[ name ] = enum_dict
+        return new_enum
+
+    async def SetFieldbus(self):
+        # see BKS_HTTP.SetFieldbus()
+        if ( "fieldbus_type" in self.name_to_index ):
+            await self.FetchEnums( [ "fieldbus_type" ] )
+            self.fieldbus_type_value = await self.get_value( "fieldbus_type" )
+            if ( self.fieldbus_type_value == self.enums[ "fieldbus_type"]["EtherNet/IP (TM)"] ):
+                self.reverse_data = True
+        else:
+            #  EGL-C has no fieldbus_type (yet), so determine the fieldbus type from the module info:
+            self.enums[ "fieldbus_type" ] = enum( UNKNOWN=0, PROFINET=1, ETHERNET_IP=2, ETHERCAT=3, MODBUS_TCP=4, COMMON_ETHERNET=5, IOLINK=6, MODBUS_RTU=7 )
+            networktype_to_fieldbus_type = { 137: self.enums[ "fieldbus_type"]["PROFINET"],
+                                             147: self.enums[ "fieldbus_type"]["MODBUS_TCP"],
+                                             155: self.enums[ "fieldbus_type"]["ETHERNET_IP"] }
+            r = await self.session_get( url = "http://" + self.host + "/module/info.json", timeout=self.timeout )
+            self.CheckResponse( r, "get" )
+            self.fieldbus_type_value = networktype_to_fieldbus_type[ r.json()["networktype"] ]
+
+    def PLCReorder( self, v32 ):
+        if ( self.fieldbus_type_value == self.enums[ "fieldbus_type"]["PROFINET"] ):
+            return ((v32 & 0xff000000)>>24) | ((v32 & 0x00ff0000)>>8) | ((v32 & 0x0000ff00)<<8) | ((v32 & 0x000000ff)<<24)
+        return v32
+
+    def _add_property(self, name, i, datatype, inst=0 ):
+        def setter( self, value ):
+            raise ApplicationError( f"Parameter {name} cannot be set via property for {self.__class__.__name__}, use await set_value() instead" )
+        setattr( self.__class__,
+                 make_property_name( name ),
+                 property( lambda self: self.get_value( i, datatype ), setter ) )
+        self.name_to_index[ name ] = i
+        self.inst_to_index[ inst ] = i
+
+    async def UpdateValues( self, indices ):
+        """Read the values of the parameters with the indices given in list indices from the gripper.
+        See BKS_HTTP.UpdateValues(), but the ranges are requested concurrently.
+        """
+        ranges = GetIndexRanges( indices, self.batch_max_gap )
+        t_request = time.time()
+        data_lists = await asyncio.gather( *[ self.ReadData( offset, count ) for (offset,count) in ranges ] )
+        t_read = ( t_request + time.time() ) / 2.0
+        index_to_value = dict()
+        for ((offset,count),data_list) in zip( ranges, data_lists ):
+            self.DecodeRange( indices, offset, data_list, index_to_value )
+            for index in indices:
+                if ( offset <= index < offset + count ):
+                    self.index_to_read_time[ index ] = t_read
+        return index_to_value
+
+    async def get_values( self, index_or_names, ignore_insufficient_read_rights=False ):
+        """See BKSBaseCommon.get_values()
+        """
+        (accesses, index_to_value, indices_to_read) = self.PrepareGetValues( index_or_names )
+        if ( indices_to_read ):
+            index_to_value.update( await self.UpdateValues( indices_to_read ) )
+        return self.FinishGetValues( accesses, index_to_value, ignore_insufficient_read_rights )
+
+    async def get_value( self, index_or_name, datatype=None ):
+        if ( datatype is None ):
+            return (await self.get_values( [ index_or_name ] ))[0]
+
+        # caller requested a specific interpretation:
+        (index, subname, elementindex) = self.ParseIndexOrName( index_or_name )
+        if ( index in self.cached_index_to_value ):
+            value = self.cached_index_to_value[ index ]
+        else:
+            value = self.DecodeValue( index_or_name, datatype, index, await self.ReadData( index ) )
+            if ( index in self.index_is_cachable ):
+                self.cached_index_to_value[ index ] = value
+        if ( not subname is None ):
+            return value.__dict__[ subname ]
+        if ( not elementindex is None ):
+            return value[ elementindex ]
+        return value
+
+    async def get_value_by_inst(self, inst, datatype=None):
+        return await self.get_value( self.GetIndexOfInstance( inst ), datatype )
+
+    async def set_value( self, index_or_name, datatype=None, value=None, elementindices=None ):
+        for url in self.MakeUpdateURLs( index_or_name, datatype, value, elementindices ):
+            r = await self.session_post( indices=(index_or_name,), url="http://" + self.host + url, timeout=self.timeout )
+            self.CheckResponse( r, "post" )
+
+
+async def ConnectGrippers( hosts, return_exceptions=False, **kwargs ):
+    """Return a list of connected AsyncBKS_HTTP objects for the hosts in list hosts, connected concurrently.
+    kwargs are forwarded to AsyncBKS_HTTP. If return_exceptions is True then the exception
+    is returned in place of the object for hosts that could not be connected, else the first exception is raised.
+    """
+    grippers = [ AsyncBKS_HTTP( host, **kwargs ) for host in hosts ]
+    results = await asyncio.gather( *[ gripper.Connect() for gripper in grippers ], return_exceptions=True )
+    for (i,result) in enumerate( results ):
+        if ( isinstance( result, BaseException ) ):
+            grippers[ i ].Close()
+            if ( not return_exceptions ):
+                for gripper in grippers:
+                    gripper.Close()
+                raise result
+            grippers[ i ] = result
+    return grippers
+
+
+async def GetValuesOfGrippers( grippers, index_or_names, ignore_insufficient_read_rights=False ):
+    """Return a list with the result of get_values( index_or_names ) for each AsyncBKS_HTTP in list grippers, read concurrently.
+    For a gripper whose read fails (or which is an exception as returned by ConnectGrippers()) the exception is returned instead.
+    """
+    async def GetValues( gripper ):
+        if ( isinstance( gripper, BaseException ) ):
+            return gripper
+        return await gripper.get_values( index_or_names, ignore_insufficient_read_rights )
+    return await asyncio.gather( *[ GetValues( gripper ) for gripper in grippers ], return_exceptions=True )
+
+
+def CloseGrippers( grippers ):
+    """Close all AsyncBKS_HTTP objects in list grippers (ignoring exceptions as returned by ConnectGrippers())
+    """
+    for gripper in grippers:
+        if ( isinstance( gripper, AsyncBKS_HTTP ) ):
+            gripper.Close()
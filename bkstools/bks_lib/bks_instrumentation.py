@@ -0,0 +1,266 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides instrumentation hooks for the transactions of BKS_HTTP, AsyncBKS_HTTP and BKS_Modbus
+       and the collectors cLatencyCollector and cErrorCounter.
+
+Each transaction with a gripper (a HTTP request or a Modbus-RTU request/response) is reported to the
+instruments (objects derived from cInstrument) of the BKS object: Before() is called right before the
+request is sent, After() right after the response was received or the transaction failed, both with the
+cTransaction describing the transaction. Without instruments only a single test of an empty list is done
+per transaction, so the hooks can stay in production code.
+
+Example usage:
+\\code
+    latencies = cLatencyCollector()
+    errors = cErrorCounter()
+    bks.AddInstrument( latencies )        # or AddGlobalInstrument( latencies ) for all BKS objects of the process
+    bks.AddInstrument( errors )
+    ...
+    for line in latencies.GetLines() + errors.GetLines():
+        print( line )
+\\endcode
+'''
+
+import time
+import threading
+import collections
+
+
+class cTransaction(object):
+    """Description of a single transaction with a gripper, see cInstrument.
+
+    - host, transport ("http" or "modbus") and kind ("read", "write" or "other", e.g. metadata or diagnostics)
+    - names: the names of the parameters read or written (empty for "other"), determined on first access only
+    - nb_bytes_sent, nb_bytes_received: size of the request and the response (HTTP: URL and body, Modbus: PDU data)
+    - t_start: time.perf_counter() when the request was sent, duration: duration of the transaction in s
+    - error: None on success, else a short description like "NoResponseError" or "HTTP 500"
+    - exception: the exception that ended the transaction or None
+    """
+    __slots__ = ( "host", "transport", "kind", "nb_bytes_sent", "nb_bytes_received", "t_start", "duration", "error", "exception", "_names", "_get_names" )
+
+    def __init__( self, host, transport, kind, get_names, nb_bytes_sent ):
+        self.host = host
+        self.transport = transport
+        self.kind = kind
+        self.nb_bytes_sent = nb_bytes_sent
+        self.nb_bytes_received = 0
+        self.t_start = None
+        self.duration = None
+        self.error = None
+        self.exception = None
+        self._names = None
+        self._get_names = get_names
+
+    @property
+    def names(self):
+        if ( self._names is None ):
+            self._names = self._get_names() if self._get_names is not None else []
+        return self._names
+
+    def GetKey( self ):
+        """Return a short key for the transaction: the parameter name, "first..last" for several parameters or the kind
+        """
+        names = self.names
+        if ( not names ):
+            return self.kind
+        if ( len( names ) == 1 ):
+            return names[0]
+        return f"{names[0]}..{names[-1]}"
+
+
+class cInstrument(object):
+    """Base class of instruments. Callbacks are called in the thread doing the transaction, so keep them short.
+    """
+    def Before( self, transaction ):
+        pass
+
+    def After( self, transaction ):
+        pass
+
+
+## Instruments of all BKS objects of the process, see AddGlobalInstrument()
+g_global_instruments = []
+
+
+def AddGlobalInstrument( instrument ):
+    """Add instrument to all BKS objects of the process, including the ones created already
+    (unless they got their own instruments with AddInstrument() before).
+    """
+    g_global_instruments.append( instrument )
+
+
+def RemoveGlobalInstrument( instrument ):
+    g_global_instruments.remove( instrument )
+
+
+def Begin( instruments, host, transport, kind, get_names, nb_bytes_sent ):
+    """Return a new cTransaction after calling Before() of all instruments. get_names is a function returning
+    the list of parameter names (called on demand only) or None.
+    """
+    transaction = cTransaction( host, transport, kind, get_names, nb_bytes_sent )
+    for instrument in instruments:
+        instrument.Before( transaction )
+    transaction.t_start = time.perf_counter()
+    return transaction
+
+
+def End( instruments, transaction, nb_bytes_received=0, error=None, exception=None ):
+    """Finish transaction as returned by Begin() and call After() of all instruments.
+    """
+    transaction.duration = time.perf_counter() - transaction.t_start
+    transaction.nb_bytes_received = nb_bytes_received
+    if ( exception is not None and error is None ):
+        error = type( exception ).__name__
+    transaction.error = error
+    transaction.exception = exception
+    for instrument in instruments:
+        instrument.After( transaction )
+
+
+class cLatencyHistogram(object):
+    """HDR style histogram of durations in s with a constant relative precision of 2**-precision_bits
+    over the whole range from 1 µs on, with sparse bins, so recording is cheap and memory stays small.
+    """
+    def __init__( self, precision_bits=5 ):
+        self.precision_bits = precision_bits
+        self.nb_linear = 1 << precision_bits   # values below are counted exactly (in µs)
+        self.counts = collections.defaultdict( int )
+        self.nb_values = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def GetBin( self, us ):
+        if ( us < self.nb_linear ):
+            return us
+        shift = us.bit_length() - self.precision_bits
+        half = self.nb_linear >> 1
+        return self.nb_linear + ( shift - 1 ) * half + ( ( us >> shift ) - half )
+
+    def GetBinValue( self, b ):
+        """Return the middle of the bin b in s
+        """
+        if ( b < self.nb_linear ):
+            return b * 1e-6
+        half = self.nb_linear >> 1
+        shift = ( b - self.nb_linear ) // half + 1
+        mantissa = ( b - self.nb_linear ) % half + half
+        return ( ( mantissa << shift ) + ( ( 1 << shift ) >> 1 ) ) * 1e-6
+
+    def Add( self, duration ):
+        self.counts[ self.GetBin( int( duration * 1e6 ) ) ] += 1
+        self.nb_values += 1
+        self.sum += duration
+        if ( self.min is None or duration < self.min ):
+            self.min = duration
+        if ( duration > self.max ):
+            self.max = duration
+
+    def GetPercentile( self, p ):
+        """Return the p-th percentile (0...100) in s, None if empty
+        """
+        if ( self.nb_values == 0 ):
+            return None
+        rank = max( 1, int( round( p / 100.0 * self.nb_values ) ) )
+        n = 0
+        for b in sorted( self.counts ):
+            n += self.counts[ b ]
+            if ( n >= rank ):
+                return min( max( self.GetBinValue( b ), self.min ), self.max )
+        return self.max
+
+    def AsDict( self ):
+        return dict( nb_values=self.nb_values,
+                     sum=self.sum,
+                     min=self.min,
+                     p50=self.GetPercentile( 50 ),
+                     p90=self.GetPercentile( 90 ),
+                     p99=self.GetPercentile( 99 ),
+                     max=self.max )
+
+
+class cLatencyCollector(cInstrument):
+    """Instrument that collects a cLatencyHistogram per transaction key (see cTransaction.GetKey()) and the
+    bus time per parameter: the duration of a transaction is shared equally by the parameters read or written with it.
+    """
+    def __init__( self, precision_bits=5 ):
+        self.precision_bits = precision_bits
+        self.lock = threading.Lock()
+        self.histograms = dict()
+        self.bus_time = collections.defaultdict( float )
+        self.nb_bytes = collections.defaultdict( int )
+
+    def After( self, transaction ):
+        key = transaction.GetKey()
+        names = transaction.names
+        with self.lock:
+            histogram = self.histograms.get( key )
+            if ( histogram is None ):
+                histogram = self.histograms[ key ] = cLatencyHistogram( self.precision_bits )
+            histogram.Add( transaction.duration )
+            self.nb_bytes[ key ] += transaction.nb_bytes_sent + transaction.nb_bytes_received
+            for name in names or [ key ]:
+                self.bus_time[ name ] += transaction.duration / max( 1, len( names ) )
+
+    def GetTopBusTime( self, n=10 ):
+        """Return a list of the (name, bus time in s) of the n parameters with the most bus time
+        """
+        with self.lock:
+            return sorted( self.bus_time.items(), key=lambda item: -item[1] )[:n]
+
+    def AsDict( self ):
+        with self.lock:
+            return dict( transactions={ key: dict( h.AsDict(), nb_bytes=self.nb_bytes[ key ] ) for (key,h) in self.histograms.items() },
+                         bus_time=dict( self.bus_time ) )
+
+    def GetLines( self, n=10 ):
+        """Return a list of human readable lines with the latencies of the n transaction keys with the most total time
+        and the n parameters with the most bus time
+        """
+        def ms( t ):
+            return "-" if t is None else f"{t*1000.0:.2f}ms"
+
+        with self.lock:
+            histograms = sorted( self.histograms.items(), key=lambda item: -item[1].sum )[:n]
+            lines = [ "transaction latencies:" ]
+            for (key,h) in histograms:
+                lines.append( f"  {key:<40s} {h.nb_values:8d}x p50={ms(h.GetPercentile(50))} p99={ms(h.GetPercentile(99))} max={ms(h.max)} total={h.sum:.3f}s" )
+        total = sum( self.bus_time.values() ) or 1.0
+        lines.append( "bus time per parameter:" )
+        for (name,t) in self.GetTopBusTime( n ):
+            lines.append( f"  {name:<40s} {t:8.3f}s {100.0*t/total:6.2f}%" )
+        return lines
+
+
+class cErrorCounter(cInstrument):
+    """Instrument that counts failed transactions per error class (see cTransaction.error) and per transaction key and error class
+    """
+    def __init__( self ):
+        self.lock = threading.Lock()
+        self.nb_transactions = 0
+        self.errors = collections.Counter()
+        self.errors_per_key = collections.Counter()
+
+    def After( self, transaction ):
+        with self.lock:
+            self.nb_transactions += 1
+            if ( transaction.error is not None ):
+                self.errors[ transaction.error ] += 1
+                self.errors_per_key[ ( transaction.GetKey(), transaction.error ) ] += 1
+
+    def AsDict( self ):
+        with self.lock:
+            return dict( nb_transactions=self.nb_transactions,
+                         errors=dict( self.errors ),
+                         errors_per_key={ f"{key}:{error}": n for ((key,error),n) in self.errors_per_key.items() } )
+
+    def GetLines( self ):
+        with self.lock:
+            lines = [ f"transaction errors: {sum( self.errors.values() )} of {self.nb_transactions}" ]
+            for (error,n) in self.errors.most_common():
+                lines.append( f"  {error:<40s} {n:8d}" )
+            for ((key,error),n) in self.errors_per_key.most_common( 10 ):
+                lines.append( f"    {key:<38s} {error:<20s} {n:8d}" )
+        return lines
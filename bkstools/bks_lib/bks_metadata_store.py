@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides a persistent store for the parameter metadata and enums read from BKS grippers via the HTTP/JSON webinterface
+'''
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+
+class cMetadataStore(object):
+    """Persistent store for parameter metadata and enums, shared by all grippers running the same firmware.
+
+    The store is a single sqlite database file (by default ~/.bks3_metadata.sqlite) with
+    - one row per firmware, keyed by the validation token of the firmware (see BKS_HTTP.MakeValidationToken()).
+      The metadata and the enums read so far are stored as zlib compressed JSON, so loading them needs a single query.
+    - one row per host, mapping the host to the token of the firmware seen last on that host.
+
+    All writes are done in transactions, so the store stays consistent even if several processes
+    access it concurrently or a process is interrupted while writing. Within a process the store can be used
+    from any thread (e.g. enums are loaded on first use, see BKS_HTTP.LoadEnum()), accesses are serialized by self.lock.
+    """
+
+    ## Version of the database layout. Stores with a different version are discarded and rebuilt.
+    SCHEMA_VERSION = 1
+
+    def __init__( self, path=None ):
+        if ( path is None ):
+            path = os.path.join( os.path.expanduser("~"), ".bks3_metadata.sqlite" )
+        self.path = path
+        self.db = sqlite3.connect( path, timeout=10.0, isolation_level=None, check_same_thread=False )   # autocommit, explicit transactions below
+        self.lock = threading.RLock()
+
+        if ( self.db.execute( "PRAGMA user_version" ).fetchone()[0] != self.SCHEMA_VERSION ):
+            with self.Transaction():
+                self.db.execute( "DROP TABLE IF EXISTS firmware" )
+                self.db.execute( "DROP TABLE IF EXISTS hosts" )
+                self.db.execute( "CREATE TABLE firmware ( token TEXT PRIMARY KEY, data BLOB, enums BLOB, last_used REAL )" )
+                self.db.execute( "CREATE TABLE hosts ( host TEXT PRIMARY KEY, token TEXT )" )
+                self.db.execute( "PRAGMA user_version = %d" % self.SCHEMA_VERSION )
+
+    def Transaction( self ):
+        """Return a context manager for an (immediate) transaction
+        """
+        return _cTransaction( self.db, self.lock )
+
+    @staticmethod
+    def Pack( obj ):
+        return zlib.compress( json.dumps( obj, separators=(",",":") ).encode( "utf-8" ) )
+
+    @staticmethod
+    def Unpack( blob ):
+        return json.loads( zlib.decompress( blob ).decode( "utf-8" ) )
+
+    def GetCandidateTokens( self, host ):
+        """Return a list of tokens of the firmwares that are most likely running on host:
+        the one seen last on host (if any) and the one used last on any host.
+        """
+        tokens = []
+        with self.lock:
+            row = self.db.execute( "SELECT token FROM hosts WHERE host=?", (host,) ).fetchone()
+            if ( row is not None ):
+                tokens.append( row[0] )
+            row = self.db.execute( "SELECT token FROM firmware ORDER BY last_used DESC LIMIT 1" ).fetchone()
+        if ( row is not None and row[0] not in tokens ):
+            tokens.append( row[0] )
+        return tokens
+
+    def Load( self, token ):
+        """Return (data,enums) stored for token or None if there is nothing stored for token.
+        data is the list of parameter metadata dicts, enums a dict mapping parameter names to dicts of enum names to values.
+        """
+        with self.lock:
+            row = self.db.execute( "SELECT data, enums FROM firmware WHERE token=?", (token,) ).fetchone()
+        if ( row is None ):
+            return None
+        return ( self.Unpack( row[0] ), self.Unpack( row[1] ) )
+
+    def Store( self, token, data, host ):
+        """Store the metadata data for the firmware with token (discarding enums stored so far) and remember token for host.
+        """
+        with self.Transaction():
+            self.db.execute( "INSERT OR REPLACE INTO firmware VALUES (?,?,?,?)", (token, self.Pack( data ), self.Pack( {} ), time.time()) )
+            self.db.execute( "INSERT OR REPLACE INTO hosts VALUES (?,?)", (host, token) )
+
+    def SetHost( self, host, token ):
+        """Remember that the firmware with token is running on host
+        """
+        with self.Transaction():
+            self.db.execute( "INSERT OR REPLACE INTO hosts VALUES (?,?)", (host, token) )
+            self.db.execute( "UPDATE firmware SET last_used=? WHERE token=?", (time.time(), token) )
+
+    def StoreEnums( self, token, new_enums ):
+        """Add the enums in new_enums (a dict mapping parameter names to dicts of enum names to values) to the firmware with token.
+        All enums are added in a single transaction.
+        """
+        with self.Transaction():
+            row = self.db.execute( "SELECT enums FROM firmware WHERE token=?", (token,) ).fetchone()
+            if ( row is None ):
+                return
+            enums = self.Unpack( row[0] )
+            enums.update( new_enums )
+            self.db.execute( "UPDATE firmware SET enums=? WHERE token=?", (self.Pack( enums ), token) )
+
+    def StoreEnum( self, token, name, enum_dict ):
+        """Add the enum enum_dict (a dict of enum names to values) of the parameter named name to the firmware with token
+        """
+        self.StoreEnums( token, { name: enum_dict } )
+
+    def Close( self ):
+        with self.lock:
+            self.db.close()
+
+
+class _cTransaction(object):
+    def __init__( self, db, lock ):
+        self.db = db
+        self.lock = lock
+
+    def __enter__( self ):
+        self.lock.acquire()
+        try:
+            self.db.execute( "BEGIN IMMEDIATE" )
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        try:
+            if ( exc_type is None ):
+                self.db.execute( "COMMIT" )
+            else:
+                self.db.execute( "ROLLBACK" )
+        finally:
+            self.lock.release()
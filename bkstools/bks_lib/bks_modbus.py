@@ -11,47 +11,17 @@ import minimalmodbus
 import math
 from pyschunk.generated.generated_enums import eCmdCode, eErrorCode  # @UnusedImport
 from pyschunk.tools.util import GetPersistantDict
-from bkstools.bks_lib import hms, bks_firmware_enums
+from bkstools.bks_lib import hms, bks_firmware_enums, bks_instrumentation
 from bkstools.bks_lib.debug import Print, Error, Debug, Var, ApplicationError, InsufficientAccessRights, InsufficientReadRights, InsufficientWriteRights, ControlledFromOtherChannel, ServiceNotAvailable, UnsupportedCommand  # @UnusedImport
 from bkstools.bks_lib.bks_base_common import BKSBaseCommon, Struct
+from bkstools.bks_lib.bks_rtu_reader import cRTUFrameReader
+from bkstools.bks_lib.bks_retry import cBackoff, CircuitOpenError, GetTransactionStatistics
+from bkstools.bks_lib.bks_modbus_bus import GetBus, PRIORITY_CYCLIC_OUTPUT, PRIORITY_CYCLIC_INPUT, PRIORITY_NORMAL, PRIORITY_DIAGNOSTIC
 import struct
 import re
 import os
 import time
 
-import serial
-import wrapt
-# Problem:
-#   When reading responses from a simulated BKS gripper then the normal serial.Serial.read()
-#   returns immediately after the first byte is received. This results in an error
-#   "Too short Modbus RTU response (minimum length 4 bytes). Response: '\\x0e'"
-#   from the minimalmodbus.
-#
-# Solution:
-#   Override the serial.Serial.read() function to retry until timeout if not enough bytes were
-#   reveived yet. This is done here by "monkey-patching" read_my() over original read.
-#   See https://stackoverflow.com/a/49326472/6098953
-
-@wrapt.patch_function_wrapper( serial.Serial, 'read' )
-def read_my( read_original, self, args, kwargs):
-    # args and kwargs are tuple and dict respectively.
-    t0 = time.monotonic()
-    t_end = t0 + self.timeout
-    answer = b""
-    nb_reads = 0
-    nb_bytes_to_read = args[0]
-    while (True):
-        answer += read_original( nb_bytes_to_read )
-        nb_reads += 1
-        if ( len( answer ) == nb_bytes_to_read ):
-            break
-        if ( time.monotonic() > t_end ):
-            break
-
-    #t1 = time.monotonic()
-    #print( f"read {len(answer)} bytes in {nb_reads} reads in {t1-t0}s")
-    return answer
-
 #====================================================================
 class RepeaterException( minimalmodbus.ModbusException ):
     '''Class to wrap errors after a timeout or repeated tries.
@@ -65,12 +35,16 @@ class RepeaterException( minimalmodbus.ModbusException ):
 
 class cRepeater(object):
     """Class to simplify retrying of some function call.
+
+    If a cBackoff object backoff is given then DoRepeat() sleeps for the (jittered) backoff delay before each retry.
+    If a cTransactionStatistics object statistics is given then the retries are counted there as well.
+    A CircuitOpenError is never retried.
     """
     s_nb_repeaters = 0  # static counter for how many cRepeater objects were created, which is the number of reads and writes
     s_nb_total_failures  = 0  # static counter for total failures
     s_nb_repeaters_with_failures  = 0  # static counter for repeater objects with at least one failures
 
-    def __init__( self, timeout_s=None, nb_tries=3 ):
+    def __init__( self, timeout_s=None, nb_tries=3, backoff=None, statistics=None ):
         """Constructor: Initialize the cRepeater object with a timeout of timeout_s seconds and nb_tries number of retries
         """
         if ( timeout_s is None ):
@@ -83,6 +57,8 @@ class cRepeater(object):
         self.nb_failures = 0
         self.original_exception = None
         self.timeout_checked = 0
+        self.backoff = backoff
+        self.statistics = statistics
         cRepeater.s_nb_repeaters += 1
 
     def TimedOut(self):
@@ -99,26 +75,73 @@ class cRepeater(object):
              and (self.TimedOut()  or  self.tries_left <= 0) ):
             raise RepeaterException( self )
 
+        if ( self.tries_left < self.nb_tries ):
+            # this is a retry:
+            if ( self.statistics is not None ):
+                self.statistics.nb_retries += 1
+            if ( self.backoff is not None ):
+                time.sleep( max( 0.0, min( self.backoff.GetDelay( self.nb_failures ), self.end_time - time.time() ) ) )
         self.tries_left -= 1
         return True
 
     def Failed( self, e ):
         """Call this when a try failed with exception e
         """
+        if ( isinstance( e, CircuitOpenError ) ):
+            raise e
         self.nb_failures += 1
         cRepeater.s_nb_total_failures += 1
         if ( self.nb_failures == 1 ):
             cRepeater.s_nb_repeaters_with_failures += 1
+            if ( self.statistics is not None ):
+                self.statistics.nb_requests_with_retries += 1
 
         self.original_exception = e
         Debug( f"Ignoring {self.nb_failures}: {e!r}")
 
 
+#====================================================================
+## The maximum number of registers that can be read with a single Modbus function code 3 request
+MODBUS_MAX_READ_REGISTERS = 125
+
+def PlanRegisterReads( register_blocks, max_gap=0, max_registers=MODBUS_MAX_READ_REGISTERS ):
+    """Merge the register blocks to read into as few read transactions as possible.
+
+    register_blocks is a list of (key, register_address, nb_registers) tuples.
+    Blocks are merged if at most max_gap unrequested registers lie between them and if the merged
+    transaction does not exceed max_registers. If max_gap is None then no blocks are merged at all.
+
+    Returns a list of (register_address, nb_registers, members) tuples, one per transaction,
+    where members is the list of the merged (key, register_address, nb_registers) tuples.
+    """
+    transactions = []
+    for block in sorted( register_blocks, key=lambda b: b[1] ):
+        (key, register_address, nb_registers) = block  # @UnusedVariable
+        if ( transactions and not max_gap is None ):
+            (t_address, t_nb_registers, t_members) = transactions[-1]
+            t_end = t_address + t_nb_registers
+            new_end = max( t_end, register_address + nb_registers )
+            if ( register_address - t_end <= max_gap  and  new_end - t_address <= max_registers ):
+                transactions[-1] = (t_address, new_end - t_address, t_members + [block])
+                continue
+        transactions.append( (register_address, nb_registers, [block]) )
+    return transactions
+
+
 #====================================================================
 class BKS_Modbus( BKSBaseCommon ):
+    ## If False then requests are sent even to devices that failed too often in a row, see cCircuitBreaker
+    use_circuit_breaker = True
+
     def __init__(self, port, slave_id, baudrate, nb_data_bits, parity, nb_stop_bits, max_age_in_s, debug=False, repeater_timeout=3.0, repeater_nb_tries=5 ):
         self.repeater_timeout = repeater_timeout
         self.repeater_nb_tries = repeater_nb_tries
+        # Maximum number of unrequested registers between the registers of requested parameters
+        # that get_values() may read along to save a transaction. The unrequested registers in between
+        # are read and discarded, so a merged request fails if one of them cannot be read (hence the
+        # fallback to single requests on IllegalRequestError). Parameter IDs are 8 registers apart, so 7
+        # merges parameters whose IDs are neighbours. None disables merging.
+        self.read_max_gap = 7
         self.format_char_read = { hms.HMS_Datatypes.ABP_BOOL  : "?",
                                   hms.HMS_Datatypes.ABP_SINT8 : "h",
                                   hms.HMS_Datatypes.ABP_SINT16: "h",
@@ -200,6 +223,45 @@ class BKS_Modbus( BKSBaseCommon ):
                     print( time.strftime( "%H:%M:%S.", time.localtime( now) ) + ms + " " "MinimalModbus " + text )
         self.mb._print_debug = _my_print_debug
 
+        # All transactions of minimalmodbus end up in _perform_command, so
+        # - schedule that on the bus shared by all slaves and threads using the same port, see cModbusBus
+        # - reject requests to a device that failed too often in a row (circuit breaker)
+        # - use a per function code adaptive timeout
+        # - record per function code statistics, see GetTransactionStatistics()
+        # - report the transaction to the instruments, see bks_instrumentation
+        self.bus = GetBus( port )
+        self.cyclic_register_addresses = dict()  # register address -> ( priority of reads, priority of writes ), see GetTransactionPriority()
+        self.register_to_index = None            # register address -> index of the parameter starting there, see GetNamesOfRegisters()
+        self.backoff = cBackoff()
+        perform_command_original = self.mb._perform_command
+        def _locked_perform_command( functioncode, payload_to_slave ):
+            statistics = self.GetTransactionStatistics()
+            if ( self.use_circuit_breaker ):
+                statistics.CheckCircuit()
+            with self.bus.Transaction( self.mb.address, self.GetTransactionPriority( functioncode, payload_to_slave ) ):
+                timeout = statistics.GetTimeout( functioncode )
+                if ( self.mb.serial.timeout != timeout ):
+                    self.mb.serial.timeout = timeout  # reconfigures the port, so only if changed
+                transaction = None
+                if ( self.instruments ):
+                    transaction = self.BeginTransaction( statistics.host, functioncode, payload_to_slave )
+                t0 = time.monotonic()
+                try:
+                    result = perform_command_original( functioncode, payload_to_slave )
+                except Exception as e:
+                    statistics.AddFailure( functioncode, e, time.monotonic() - t0 )
+                    if ( transaction is not None ):
+                        bks_instrumentation.End( self.instruments, transaction, exception=e )
+                    raise
+                statistics.AddSuccess( functioncode, time.monotonic() - t0 )
+                if ( transaction is not None ):
+                    bks_instrumentation.End( self.instruments, transaction, len( result ) )
+                return result
+        self.mb._perform_command = _locked_perform_command
+
+        # Read responses frame by frame, see cRTUFrameReader (the serial.Serial object is shared by all instruments on port):
+        cRTUFrameReader.Install( self.mb.serial )
+
 
         #self.mb.serial.port                     # this is the serial port name
         self.mb.serial.baudrate = baudrate
@@ -213,7 +275,7 @@ class BKS_Modbus( BKSBaseCommon ):
         else:
             raise ValueError( f"Parity {parity!r} not understood, must be one of N E O.")
         self.mb.serial.stopbits = nb_stop_bits
-        self.mb.serial.timeout  = 0.050          # seconds
+        self.mb.serial.timeout  = 0.050          # seconds, the timeout actually used is adapted per transaction, see cTransactionStatistics
         #self.mb.serial.timeout  = 0.500           # seconds
 
         #self.mb.address                         # this is the slave address number
@@ -275,6 +337,11 @@ class BKS_Modbus( BKSBaseCommon ):
 
         self.SetAttributes( extra_parameter_dicts=[ baudrate, slave_id, slave_id_write2, slave_id_write6 ] )
 
+        # the cyclic process data takes precedence over other transactions on the bus:
+        for name in ( "plc_sync_input", "plc_sync_output" ):
+            if ( name in self.name_to_index ):
+                self.cyclic_register_addresses[ self.data[ self.name_to_index[ name ] ]["instance"] - 1 ] = ( PRIORITY_CYCLIC_INPUT, PRIORITY_CYCLIC_OUTPUT )
+
         self.UpdateMetadata()
 
         self.SetFieldbus()
@@ -284,12 +351,20 @@ class BKS_Modbus( BKSBaseCommon ):
 
 
 
+    def GetSettings(self, host):
+        # (defined explicitly here since BKSModule derives from BKS_HTTP as well, which overwrites this)
+        return BKSBaseCommon.GetSettings( self, host )
+
     def UpdateMetadata( self ):
         pass # TODO: for now Modbus does not update. But it should once meta-info can be read via Modbus
 
     def UpdateEnum( self, d):
         pass # TODO: for now Modbus does not update. But it should once meta-info can be read via Modbus
 
+    def LoadEnum( self, name ):
+        # enums cannot be read via Modbus, but the default_settings contain them along with the metadata:
+        return self.settings[ "%s.enum" % (name) ]
+
     def SetFieldbus(self):
         self.reverse_data = False
         #self.fieldbus_type = 7
@@ -421,31 +496,47 @@ class BKS_Modbus( BKSBaseCommon ):
         parameter_id = self.data[ index ]["instance"]
         register_address = parameter_id - 1
 
-        repeater = cRepeater( self.repeater_timeout, self.repeater_nb_tries )
+        repeater = cRepeater( self.repeater_timeout, self.repeater_nb_tries, self.backoff, self.GetTransactionStatistics() )
         while repeater.DoRepeat():
             try:
                 return self.mb.write_registers( register_address, register_value_list )
             except minimalmodbus.ModbusException as e:
                 repeater.Failed( e )
 
-    def GetStructuredValue( self, index ):
-        s = Struct()
-
-        struct_size = 0
-        for (datatype,numsubelements) in zip( self.data[index]["datatype"], self.data[index]["numsubelements"]):
-            struct_size += hms.HMS_Datatypes_size_in_bytes[ datatype ] * numsubelements
-
-        register_address = self.data[index]["instance"] - 1
-        nb_registers = (struct_size+1) >> 1
-        repeater = cRepeater( self.repeater_timeout, self.repeater_nb_tries )
+    def ReadRegisters( self, register_address, nb_registers ):
+        """Read nb_registers registers starting at register_address with automatic retries.
+        Returns the list of 16 bit ints read.
+        """
+        repeater = cRepeater( self.repeater_timeout, self.repeater_nb_tries, self.backoff, self.GetTransactionStatistics() )
         while repeater.DoRepeat():
             try:
-                data_words = self.mb.read_registers( register_address, nb_registers )
-                # data_words is now a list of 16 bit ints
-                break
+                return self.mb.read_registers( register_address, nb_registers )
             except minimalmodbus.ModbusException as e:
                 repeater.Failed( e )
 
+    def GetNbRegisters( self, index ):
+        """Return the number of registers used by the parameter with index index
+        """
+        nb_bytes = 0
+        if ( len( self.data[index]["datatype"] ) > 1 ):
+            for (datatype,numsubelements) in zip( self.data[index]["datatype"], self.data[index]["numsubelements"]):
+                nb_bytes += hms.HMS_Datatypes_size_in_bytes[ datatype ] * numsubelements
+        else:
+            nb_bytes = hms.HMS_Datatypes_size_in_bytes[ self.data[index]["datatype"][0] ] * self.data[index]["numelements"]
+        return (nb_bytes+1) >> 1
+
+    def GetStructuredValue( self, index, data_words=None ):
+        """Return the value of the structured parameter with index index as Struct.
+        If data_words is None then the registers are read from the gripper, else data_words
+        is the list of the already read 16 bit register values.
+        """
+        s = Struct()
+
+        if ( data_words is None ):
+            register_address = self.data[index]["instance"] - 1
+            data_words = self.ReadRegisters( register_address, self.GetNbRegisters( index ) )
+            # data_words is now a list of 16 bit ints
+
         byte_list = b""
         for w in data_words:
             byte_list += bytes( [w >> 8, w & 0x00ff ] )
@@ -504,28 +595,102 @@ class BKS_Modbus( BKSBaseCommon ):
         register_address = parameter_id - 1
         #print( f"UpdateValue( {Var('index_or_name datatype index')} 0x{parameter_id:x}" )
 
-        numelements = self.data[index]["numelements"]
-
         if ( len( self.data[index]["datatype"] ) > 1 ):
             return self.GetStructuredValue(index)
 
-        nb_registers = (hms.HMS_Datatypes_size_in_bytes[ datatype ]*numelements + 1) >> 1
+        data = self.ReadRegisters( register_address, self.GetNbRegisters( index ) )
+        # data is now a list of 16 bit ints
 
-        repeater = cRepeater( self.repeater_timeout, self.repeater_nb_tries )
-        while repeater.DoRepeat():
+        return self.RegisterListToValue( data, datatype, self.data[index]["numelements"] )
+
+    def DecodeRegisters( self, index, data ):
+        """Return the value of the parameter with index index decoded from the list of 16 bit register values data
+        """
+        if ( len( self.data[index]["datatype"] ) > 1 ):
+            return self.GetStructuredValue( index, data )
+        return self.RegisterListToValue( data, self.data[index]["datatype"][0], self.data[index]["numelements"] )
+
+    def UpdateValues( self, indices ):
+        """Read the values of the parameters with the indices given in list indices from the gripper.
+
+        The register blocks of the parameters are merged into as few read transactions as possible,
+        see PlanRegisterReads() and self.read_max_gap. See BKSBaseCommon.UpdateValues() for the return value.
+
+        If the slave rejects a merged read as illegal request then the parameters are read one by one.
+        If all of these reads succeed then the registers in between were the problem, so merging is disabled.
+        (If a parameter itself cannot be read then its error is raised and merging stays enabled.)
+        """
+        register_blocks = [ (index, self.data[index]["instance"] - 1, self.GetNbRegisters( index )) for index in indices ]
+
+        index_to_value = dict()
+        for (register_address, nb_registers, members) in PlanRegisterReads( register_blocks, self.read_max_gap ):
+            t_request = time.time()
             try:
-                data = self.mb.read_registers( register_address, nb_registers )
-                # data is now a list of 16 bit ints
-                break
-            except minimalmodbus.ModbusException as e:
-                repeater.Failed( e )
+                data = self.ReadRegisters( register_address, nb_registers )
+            except RepeaterException as e:
+                if ( len( members ) == 1  or  not isinstance( e.original_exception, minimalmodbus.IllegalRequestError ) ):
+                    raise
+                Debug( f"Slave rejected merged read of {nb_registers} registers at 0x{register_address:04x}: {e.original_exception!r}. Reading the parameters one by one." )
+                for (index, member_address, member_nb_registers) in members:
+                    t_request = time.time()
+                    index_to_value[ index ] = self.DecodeRegisters( index, self.ReadRegisters( member_address, member_nb_registers ) )
+                    self.index_to_read_time[ index ] = ( t_request + time.time() ) / 2.0
+                Debug( "All parameters of the rejected merged read could be read one by one. Disabling merging of reads." )
+                self.read_max_gap = None
+                continue
+
+            t_read = ( t_request + time.time() ) / 2.0
+            for (index, member_address, member_nb_registers) in members:
+                offset = member_address - register_address
+                index_to_value[ index ] = self.DecodeRegisters( index, data[offset:offset+member_nb_registers] )
+                self.index_to_read_time[ index ] = t_read
+        return index_to_value
+
+    def GetTransactionStatistics( self ):
+        """Return the cTransactionStatistics of the device currently addressed (self.mb.address may be changed, e.g. for scanning).
+        Use its AsDict() for the per function code statistics of the device.
+        """
+        return GetTransactionStatistics( f"{self.mb.serial.port}.{self.mb.address}" )
 
-        return self.RegisterListToValue( data, datatype, numelements )
+    def BeginTransaction( self, host, functioncode, payload_to_slave ):
+        """Return a bks_instrumentation.cTransaction for the request with functioncode and payload_to_slave,
+        after reporting it to self.instruments
+        """
+        get_names = None
+        kind = "other"
+        if ( functioncode in (3, 4, 6, 16) and len( payload_to_slave ) >= 4 ):
+            kind = "read" if functioncode in (3, 4) else "write"
+            register_address = ( payload_to_slave[0] << 8 ) | payload_to_slave[1]
+            nb_registers = 1 if functioncode == 6 else ( payload_to_slave[2] << 8 ) | payload_to_slave[3]
+            get_names = lambda: self.GetNamesOfRegisters( register_address, nb_registers )
+        return bks_instrumentation.Begin( self.instruments, host, "modbus", kind, get_names, len( payload_to_slave ) )
+
+    def GetNamesOfRegisters( self, register_address, nb_registers ):
+        """Return the names of the parameters starting in the nb_registers registers from register_address, for instrumentation
+        """
+        if ( self.register_to_index is None ):
+            self.register_to_index = dict()
+            for (index,d) in enumerate( self.data ):
+                self.register_to_index.setdefault( d["instance"] - 1, index )
+        return [ self.data[ self.register_to_index[ r ] ]["name"] for r in range( register_address, register_address + nb_registers ) if r in self.register_to_index ]
+
+    def GetTransactionPriority( self, functioncode, payload_to_slave ):
+        """Return the priority of a request on the bus, see cModbusBus: writes of plc_sync_output go first,
+        then reads of plc_sync_input, then all other reads and writes, then diagnostics.
+        """
+        if ( functioncode in (3, 16) and len( payload_to_slave ) >= 2 ):
+            priorities = self.cyclic_register_addresses.get( ( payload_to_slave[0] << 8 ) | payload_to_slave[1] )
+            if ( priorities is not None ):
+                return priorities[ functioncode == 16 ]
+            return PRIORITY_NORMAL
+        if ( functioncode in (7, 8) ):
+            return PRIORITY_DIAGNOSTIC
+        return PRIORITY_NORMAL
 
     def ReadExceptionStatus(self):
         """Read the Modbus-RTU exception status using function 7
         """
-        return ord( self.mb._perform_command( 7, "" ) )
+        return ord( self.mb._perform_command( 7, b"" ) )
 
     def SetResponseExpectancy( self, response_expectancy ):
         """Set the SCHUNK addition "response_expectancy" via the function code 08 "diagnostics" sub-function 0x0004 "Force Listen Only Mode"
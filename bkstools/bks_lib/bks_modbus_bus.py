@@ -0,0 +1,183 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cModbusBus class to share a Modbus-RTU serial interface fairly between the BKS_Modbus objects
+       of several slaves (and threads)
+
+Example usage:
+\\code
+    # one BKS_Modbus object per slave, all automatically sharing the bus of /dev/ttyUSB0:
+    grippers = [ BKSBase( f"/dev/ttyUSB0,{slave_id}" ) for slave_id in range( 12, 20 ) ]
+    ...                                                       # use the grippers from as many threads as needed
+    print( GetBus( "/dev/ttyUSB0" ).GetStatistics() )         # per slave transaction counts and bus waiting times
+\\endcode
+'''
+
+import time
+import itertools
+import threading
+
+
+## Priorities of transactions, lower values are scheduled first, see cModbusBus
+PRIORITY_CYCLIC_OUTPUT = 0   # writes of the cyclic process data (plc_sync_output)
+PRIORITY_CYCLIC_INPUT  = 1   # reads of the cyclic process data (plc_sync_input)
+PRIORITY_NORMAL        = 2   # all other parameter reads and writes
+PRIORITY_DIAGNOSTIC    = 3   # diagnostic function codes like 7 and 8
+
+
+class cBusSlaveStatistics(object):
+    """Statistics of the transactions of a single slave on a cModbusBus
+    """
+    def __init__( self ):
+        self.nb_transactions = 0
+        self.wait_time_sum = 0.0
+        self.wait_time_max = 0.0
+        self.t_first = None
+        self.t_last = None
+
+    def AddTransaction( self, wait_time, now ):
+        self.nb_transactions += 1
+        self.wait_time_sum += wait_time
+        self.wait_time_max = max( self.wait_time_max, wait_time )
+        if ( self.t_first is None ):
+            self.t_first = now
+        self.t_last = now
+
+    def AsDict( self ):
+        duration = None if self.t_first is None else self.t_last - self.t_first
+        return dict( nb_transactions=self.nb_transactions,
+                     wait_time_avg=self.wait_time_sum / self.nb_transactions if self.nb_transactions else None,
+                     wait_time_max=self.wait_time_max,
+                     transactions_per_s=(self.nb_transactions - 1) / duration if duration else None )
+
+
+class _cTicket(object):
+    __slots__ = ( "slave_id", "priority", "sequence", "t_start", "thread", "granted" )
+
+    def __init__( self, slave_id, priority, sequence, t_start, thread ):
+        self.slave_id = slave_id
+        self.priority = priority
+        self.sequence = sequence
+        self.t_start = t_start
+        self.thread = thread
+        self.granted = False      # set by cModbusBus.Release() when the bus is handed over to the ticket
+
+
+class cModbusBus(object):
+    """Bus master for a single serial interface: serializes the transactions of all slaves (and threads) using it.
+
+    If the bus is busy, waiting transactions are scheduled
+    - by priority first (see PRIORITY_*), where each aging_period s of waiting raise the priority by one level,
+      so that low priority transactions are delayed but never starved,
+    - then round robin between the slaves, i.e. the slave served least recently goes first,
+      so every slave gets its share of the bus regardless of how many threads use it,
+    - then in order of arrival.
+    The next owner is selected once by Release(), which hands the bus over to it directly. (If every waiting
+    thread selected on its own, the aged priorities might differ between the threads and each might defer to another.)
+
+    The bus is entered with Transaction() (reentrant for the thread owning the bus).
+    Use GetBus() to get the (shared) object for a serial interface.
+    """
+    def __init__( self, port, aging_period=1.0 ):
+        self.port = port
+        self.aging_period = aging_period
+        self.condition = threading.Condition()
+        self.owner = None
+        self.depth = 0
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.nb_transactions = 0
+        self.last_served = dict()      # slave_id -> self.nb_transactions when the slave was served last
+        self.statistics = dict()       # slave_id -> cBusSlaveStatistics
+
+    def Transaction( self, slave_id, priority=PRIORITY_NORMAL ):
+        """Return a context manager for using the bus for a transaction with slave slave_id
+        """
+        return _cBusTransaction( self, slave_id, priority )
+
+    def GetKey( self, ticket, now ):
+        aged_priority = ticket.priority - int( ( now - ticket.t_start ) / self.aging_period )
+        return ( aged_priority, self.last_served.get( ticket.slave_id, -1 ), ticket.sequence )
+
+    def SelectNext( self ):
+        now = time.monotonic()
+        return min( self.waiting, key=lambda ticket: self.GetKey( ticket, now ) )
+
+    def Acquire( self, slave_id, priority ):
+        me = threading.get_ident()
+        with self.condition:
+            if ( self.owner == me ):
+                self.depth += 1
+                return
+            ticket = _cTicket( slave_id, priority, next( self.sequence ), time.monotonic(), me )
+            if ( self.owner is None ):
+                self.owner = me
+                self.depth = 1
+            else:
+                self.waiting.append( ticket )
+                try:
+                    while ( not ticket.granted ):
+                        self.condition.wait()
+                except BaseException:
+                    # e.g. KeyboardInterrupt while waiting: give the bus to the next one if it was handed over already
+                    if ( ticket.granted ):
+                        self.Release()
+                    else:
+                        self.waiting.remove( ticket )
+                    raise
+
+            now = time.monotonic()
+            self.nb_transactions += 1
+            self.last_served[ slave_id ] = self.nb_transactions
+            statistics = self.statistics.get( slave_id )
+            if ( statistics is None ):
+                statistics = self.statistics.setdefault( slave_id, cBusSlaveStatistics() )
+            statistics.AddTransaction( now - ticket.t_start, now )
+
+    def Release( self ):
+        with self.condition:
+            self.depth -= 1
+            if ( self.depth == 0 ):
+                if ( self.waiting ):
+                    ticket = self.SelectNext()
+                    self.waiting.remove( ticket )
+                    ticket.granted = True
+                    self.owner = ticket.thread
+                    self.depth = 1
+                    self.condition.notify_all()
+                else:
+                    self.owner = None
+
+    def GetStatistics( self ):
+        """Return a dict mapping each slave_id to a dict with the statistics of its transactions, see cBusSlaveStatistics
+        """
+        with self.condition:
+            return { slave_id: statistics.AsDict() for (slave_id,statistics) in sorted( self.statistics.items() ) }
+
+
+class _cBusTransaction(object):
+    def __init__( self, bus, slave_id, priority ):
+        self.bus = bus
+        self.slave_id = slave_id
+        self.priority = priority
+
+    def __enter__( self ):
+        self.bus.Acquire( self.slave_id, self.priority )
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.bus.Release()
+
+
+## Registry of the cModbusBus objects, one per serial interface (like minimalmodbus shares the serial.Serial object per port)
+g_buses = dict()
+g_buses_lock = threading.Lock()
+
+def GetBus( port ):
+    """Return the cModbusBus for serial interface port
+    """
+    with g_buses_lock:
+        bus = g_buses.get( port )
+        if ( bus is None ):
+            bus = g_buses.setdefault( port, cModbusBus( port ) )
+        return bus
@@ -13,6 +13,7 @@ from bkstools.bks_lib.bks_base import GetModbusSettings
 from bkstools.bks_lib.bks_modbus import BKS_Modbus
 from bkstools.bks_lib.debug import Print, ApplicationError, InsufficientReadRights
 from bkstools.bks_lib.bks_http import BKS_HTTP
+from bkstools.bks_lib.bks_status_watcher import cStatusWatcher
 from pyschunk.generated.generated_enums import eCmdCode
 
 class cDefault(object):
@@ -104,6 +105,9 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
     grip_from_outside = False
     grip_from_inside  = True
 
+    ## If True then HandleWait() prints the timing of each command
+    print_command_timing = True
+
     def HandleTimeoutDefault( self, module, msg="" ):
         """Default handler for timeout. Raises GripperTimeout
         """
@@ -130,8 +134,12 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
                   handle_error=DEFAULT,
                   debug=False,
                   repeater_timeout=3.0,
-                  repeater_nb_tries=5 ):
+                  repeater_nb_tries=5,
+                  use_status_watcher=False ):
         """CTor, see base class
+
+        If use_status_watcher is True then the WaitFor*() functions do not read the status themselves
+        but wait for the samples read by a background cStatusWatcher, see WaitForBits().
         """
         modbus_settings = GetModbusSettings( host )
 
@@ -203,7 +211,13 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
         else:
             self.handle_warning=handle_warning
 
+        self.status_watcher = None
+        self.last_sample = None
+        self.last_plc_sync_input_t = None    # time.time() when self.last_plc_sync_input was read, None if outdated by a command sent since
+        self.status_reuse_max_age = 0.0      # see StorePreCommandStatus()
         self.StorePreCommandStatus()
+        if ( use_status_watcher ):
+            self.status_watcher = cStatusWatcher( self, min_period=sleep_time )
         (self.controlword, self.pos, self.vel, self.force) = self.plc_sync_output  # cached values of last cyclic output data sent
 
     @property
@@ -259,11 +273,34 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
 
         This must be called before any command is sent to the gripper in order to
         detect bit changes properly.
+
+        If self.last_plc_sync_input was read less than self.status_reuse_max_age s ago and no command was sent since
+        (e.g. by the wait for the completion of the previous command) then that is used instead of reading again.
+        WaitForBits() evaluates such a recent status first as well (e.g. the one read by the wait for command_received_toggle).
         """
-        self.last_plc_sync_input = self.plc_sync_input
+        now = time.time()
+        if ( self.last_plc_sync_input_t is None or now - self.last_plc_sync_input_t >= self.status_reuse_max_age ):
+            self.last_plc_sync_input = self.plc_sync_input
+            self.last_plc_sync_input_t = now
         self.pre_command_statusword = self.last_statusword
         self.pre_command_received_toggle = self.last_statusword & self.sw_command_received_toggle
         self.pre_command_t = time.time()
+        self.expected_command_end_t = None
+
+
+    def StopStatusWatcher(self):
+        """Stop the background cStatusWatcher (if any). The WaitFor*() functions read the status themselves afterwards.
+        """
+        if ( self.status_watcher is not None ):
+            self.status_watcher.Stop()
+            self.status_watcher = None
+
+
+    def SetExpectedDuration( self, expected_duration ):
+        """Set the time in s the current command is expected to take, measured from self.pre_command_t.
+        Used as hint for adaptive polling by the cStatusWatcher (if any).
+        """
+        self.expected_command_end_t = self.pre_command_t + expected_duration
 
 
     def SendCyclic( self, controlword=DEFAULT, pos=DEFAULT, vel=DEFAULT, force=DEFAULT ):
@@ -289,6 +326,7 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
             self.force = force
 
         self.plc_sync_output = [ self.controlword, self.pos, self.vel, self.force ]
+        self.last_plc_sync_input_t = None   # the status read so far does not reflect the reaction to this output
 
 
     def MakeReady( self ):
@@ -357,7 +395,8 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
         else:
             success_msg = ""
 
-        Print( f"{command_description} {check_msg}{acknowledge_msg}{success_msg}" )
+        if ( self.print_command_timing ):
+            Print( f"{command_description} {check_msg}{acknowledge_msg}{success_msg}" )
 
         return ok and command_successfully_processed
 
@@ -398,6 +437,7 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
                              vel=vel )
 
         if ( wait_command_successfully_processed_timeout is None ):
+            self.SetExpectedDuration( abs( self.last_actual_pos - pos ) / vel )
             wait_command_successfully_processed_timeout= 1.2 * abs( self.last_actual_pos - pos ) / vel + 0.3
 
         return self.HandleWait( "move_to_absolute_position", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
@@ -423,6 +463,7 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
                              vel=vel )
 
         if ( wait_command_successfully_processed_timeout is None ):
+            self.SetExpectedDuration( abs( rpos ) / vel )
             wait_command_successfully_processed_timeout= 1.2 * abs( rpos ) / vel + 0.3
 
         return self.HandleWait( "move_to_relative_position", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
@@ -451,9 +492,10 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
             else:
                 delta_pos_um = self.last_actual_pos
             vel_ums = self.Cached_grp_vel() * 1000.0
+            self.SetExpectedDuration( delta_pos_um / vel_ums )
             wait_command_successfully_processed_timeout= 1.2 * delta_pos_um / vel_ums + 0.3
 
-        self.HandleWait( "grip_workpiece", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
+        return self.HandleWait( "grip_workpiece", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
 
 
     def grip_workpiece_with_expected_position( self, direction, position_um, velocity_ums, force_percent, do_wait_for_command_successfully_processed=True, wait_command_successfully_processed_timeout=None ):
@@ -476,9 +518,10 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
 
             delta_pos_um = abs( position_um - self.last_actual_pos )
             min_vel_ums =   min( velocity_ums, self.Cached_grp_vel()*1000.0 )
+            self.SetExpectedDuration( delta_pos_um / min_vel_ums )
             wait_command_successfully_processed_timeout= 1.5 * (delta_pos_um / min_vel_ums) + 0.3
 
-        self.HandleWait( "grip_workpiece_with_expected_position", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
+        return self.HandleWait( "grip_workpiece_with_expected_position", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
 
 
     def release_workpiece( self, do_wait_for_command_successfully_processed=True, wait_command_successfully_processed_timeout=None ):
@@ -488,15 +531,17 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
         self.SendCyclic( controlword=cmd )
 
         if ( wait_command_successfully_processed_timeout is None ):
+            self.SetExpectedDuration( self.Cached_grp_prepos_delta() / self.Cached_grp_vel() )
             wait_command_successfully_processed_timeout= 1.2 * self.Cached_grp_prepos_delta() / self.Cached_grp_vel() + 0.3
 
-        self.HandleWait( "release_workpiece", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
+        return self.HandleWait( "release_workpiece", do_wait_for_command_successfully_processed, wait_command_successfully_processed_timeout )
 
 
     def WaitForBits( self,
                      expected,
                      mask,
-                     wait_timeout, sleep_time ):
+                     wait_timeout, sleep_time,
+                     expected_time=None ):
         """Wait until the masked bits change to the expected value in statusword
 
         wait_timeout is the time in seconds to wait for the bits to become expected, or:
@@ -506,6 +551,11 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
         sleep_time is the time in seconds to sleep before retrying, or:
         - if sleep_time is None or 0.0 then do not sleep before retrying
 
+        If a cStatusWatcher is used (see use_status_watcher in the CTor) then the status is not read here
+        but the samples read by the watcher since the call are evaluated as they arrive, sleep_time is ignored then.
+        expected_time is the time.time() when the bits are expected to change. It is a hint for the watcher
+        to poll less often before, see cStatusWatcher.
+
         Returns
         - True if the bits were equal to expected (not regarding error or warning bits), else
           - If a new error was signaled by the gripper then the return value of self.handle_error() is returned.
@@ -524,8 +574,22 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
 
 
         #--- Wait for the bits to become expected:
+        not_before = time.time()
+        sequence = 0
+        # the status read last may be evaluated first if it is recent enough and no command was sent since, see StorePreCommandStatus():
+        reuse = ( self.last_plc_sync_input_t is not None and not_before - self.last_plc_sync_input_t < self.status_reuse_max_age )
         while True:
-            self.last_plc_sync_input = self.plc_sync_input # update once per loop from gripper
+            if ( reuse ):
+                t_read = self.last_plc_sync_input_t
+            elif ( self.status_watcher is None ):
+                t_read = time.time()
+                self.last_plc_sync_input = self.plc_sync_input # update once per loop from gripper
+            else:
+                self.last_sample = self.status_watcher.WaitForSample( not_before, sequence, endtime, expected_time )
+                if ( self.last_sample is None ):
+                    return self.handle_timeout( self, f"Timeout signaled after {time.time()-(endtime-wait_timeout):.3}s while waiting for {expected:08x} with mask {mask:08x}" )
+                (sequence, t_read, self.last_plc_sync_input) = self.last_sample
+            self.last_plc_sync_input_t = t_read
 
             bits = self.last_statusword & mask
             #Print( f"bits={bits:08x}" )
@@ -555,12 +619,13 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
                 self.handle_warning( self, f"Warning 0x{wc:02x} ({wc_str}) signaled while waiting for {expected:08x} with mask {mask:08x} " )
                 # if handle_warning above did not raise an exception the ignore the warning and keep on waiting
 
-            if ( endtime <= time.time() ):
+            if ( endtime <= time.time() and not reuse ):
                 # timeout detected:
                 return self.handle_timeout( self, f"Timeout signaled after {time.time()-(endtime-wait_timeout):.3}s while waiting for {expected:08x} with mask {mask:08x}" )
 
-            if ( sleep_time > 0.0 ):
+            if ( sleep_time > 0.0 and self.status_watcher is None and not reuse ):
                 time.sleep( sleep_time )
+            reuse = False
 
 
     def WaitFor_command_received_toggle( self ):
@@ -591,7 +656,7 @@ class BKSModule( BKS_Modbus, BKS_HTTP ):
         """
         return self.WaitForBits( self.sw_ready_for_operation | self.sw_success | ((~self.pre_command_received_toggle) & self.sw_command_received_toggle),
                                  self.sw_ready_for_operation | self.sw_success | self.sw_command_received_toggle,
-                                 wait_timeout, self.sleep_time )
+                                 wait_timeout, self.sleep_time, self.expected_command_end_t )
 
 
 
@@ -33,7 +33,7 @@ class cBKSTools_OptionParser( argparse.ArgumentParser ):
     '''Derived command line option parser with options specific for all BKSTools scripts
     '''
     def __init__(self, prog="", description="", fileversion="",
-                 additional_arguments=[] ):
+                 additional_arguments=[], host_required=True ):
         try:
             dummy = __file__    # __file__ is not available in frozen exes generated by py2exe
             frozen = ""
@@ -42,6 +42,7 @@ class cBKSTools_OptionParser( argparse.ArgumentParser ):
 
         argparse.ArgumentParser.__init__( self, prog=prog, description=description, formatter_class=MultilineFormatter )
         self.additional_arguments = additional_arguments
+        self.host_required = host_required  # False for scripts that find hosts themselves, like bks_discover
 
         self.add_argument( "-v", "--version",
                            action="version",
@@ -72,12 +73,14 @@ class cBKSTools_OptionParser( argparse.ArgumentParser ):
                            |n|n
                            Example: --host COM6,15,9600
                            |n|n
+                           For modules shared via a local telemetry server (see bks_telemetry) this is "telemetry:PORT" or "telemetry:HOST:PORT".
+                           |n|n
                            If not given then the value of the BKS_HOST environment variable is considered instead.""" )
 
         self.add_argument( "--force_reread",
                            dest="force_reread",
                            action="store_true",
-                           help="Force re-reading of parameter names instead of using the cached values (at most 5 minutes old)." )
+                           help="Force re-reading of parameter names instead of using the cached values (which are used as long as the firmware of the gripper is unchanged)." )
 
         self.add_argument( "--debug",
                            dest="debug",
@@ -134,7 +137,7 @@ class cBKSTools_OptionParser( argparse.ArgumentParser ):
             import bkstools.bks_lib.debug  # @UnusedImport
             bkstools.bks_lib.debug.g_show_debug = True
 
-        if ( args.host is None ):
+        if ( args.host is None  and  self.host_required ):
             try:
                 args.host = os.environ[ "BKS_HOST" ]
             except KeyError:
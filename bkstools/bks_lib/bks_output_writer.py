@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cOutputWriter class to format and write output lines in a background thread, see bks.py
+'''
+
+import sys
+import time
+import queue
+import threading
+
+
+class cOutputWriter(object):
+    """Writer thread decoupling the formatting and writing of output lines from a (sampling) loop.
+
+    Put() queues an item without blocking. The writer thread converts each item to a line with format_line( item ),
+    collects the lines and writes them to file in batches: as soon as batch_size lines are collected
+    or flush_interval s after the first line of the batch, followed by a single file.flush().
+
+    If the writer falls behind then at most maxsize items are queued, further items are dropped and counted
+    in nb_dropped. Each new drop is reported on stderr with the next batch.
+    """
+    def __init__( self, format_line, file=sys.stdout, maxsize=10000, batch_size=100, flush_interval=0.2 ):
+        self.format_line = format_line
+        self.file = file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue( maxsize )
+        self.nb_written = 0
+        self.nb_dropped = 0
+        self.nb_dropped_reported = 0
+        self.exception = None
+        self.stop = object()
+        self.thread = threading.Thread( target=self.Run, name="cOutputWriter", daemon=True )
+        self.thread.start()
+
+    def Put( self, item ):
+        """Queue item for output. Raises the exception that stopped the writer thread, if any.
+        """
+        if ( self.exception is not None ):
+            raise self.exception
+        try:
+            self.queue.put_nowait( item )
+        except queue.Full:
+            self.nb_dropped += 1
+
+    def Run( self ):
+        try:
+            lines = []
+            t_flush = None
+            while True:
+                timeout = None if t_flush is None else max( 0.0, t_flush - time.monotonic() )
+                try:
+                    item = self.queue.get( timeout=timeout )
+                except queue.Empty:
+                    item = None
+                else:
+                    if ( item is self.stop ):
+                        break
+                    lines.append( self.format_line( item ) )
+                    if ( t_flush is None ):
+                        t_flush = time.monotonic() + self.flush_interval
+                if ( lines and ( len( lines ) >= self.batch_size or time.monotonic() >= t_flush ) ):
+                    self.Write( lines )
+                    lines = []
+                    t_flush = None
+            self.Write( lines )
+        except Exception as e:
+            self.exception = e
+
+    def Write( self, lines ):
+        if ( lines ):
+            self.file.write( "\n".join( lines ) + "\n" )
+            self.file.flush()
+            self.nb_written += len( lines )
+        nb_dropped = self.nb_dropped
+        if ( nb_dropped != self.nb_dropped_reported ):
+            print( f"Output could not keep up, {nb_dropped - self.nb_dropped_reported} lines dropped ({nb_dropped} in total)", file=sys.stderr )
+            self.nb_dropped_reported = nb_dropped
+
+    def Close( self ):
+        """Write all queued items and stop the writer thread. Raises the exception that stopped the writer thread, if any.
+        """
+        if ( self.thread.is_alive() ):
+            self.queue.put( self.stop )
+            self.thread.join()
+        if ( self.exception is not None ):
+            raise self.exception
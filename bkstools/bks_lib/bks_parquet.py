@@ -0,0 +1,155 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cParquetWriter class to write recordings of a cRecordBuffer to compressed columnar Parquet files, see bks.py
+
+Requires pyarrow (pip install pyarrow), which is an optional dependency of bkstools.
+
+Example usage:
+\\code
+    writer = cParquetWriter( "out.parquet", record_buffer, bit_columns=[ ( "plc_sync_input[0]", status_dword_bits ) ] )
+    writer.WriteBuffer( record_buffer )
+    writer.Close()
+
+    # read with pandas for example:
+    df = pandas.read_parquet( "out.parquet" )
+\\endcode
+'''
+
+import json
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from bkstools.bks_lib.bks_record_buffer import cTypedColumn
+
+
+def GetArrowType( column ):
+    """Return the pyarrow type for the values of column of a cRecordBuffer. Python object columns are stored as strings.
+    """
+    if ( type( column ) is not cTypedColumn ):
+        return pyarrow.string()
+    return { "?": pyarrow.bool_(), "q": pyarrow.int64(), "Q": pyarrow.uint64(), "d": pyarrow.float64() }[ column.typecode ]
+
+
+def GetArrowArray( column, start, stop ):
+    """Return a pyarrow array with the values of column of a cRecordBuffer at the storage indices start ... stop-1.
+    The values of typed columns are not copied but wrapped.
+    """
+    n = stop - start
+    if ( type( column ) is not cTypedColumn ):
+        return pyarrow.array( [ v if v is None or type( v ) is str else str( v ) for v in column.values[ start:stop ] ], pyarrow.string() )
+
+    if ( column.typecode == "?" ):
+        values = pyarrow.Array.from_buffers( pyarrow.uint8(), n, [ None, pyarrow.py_buffer( column.values[ start:stop ].cast( "B" ) ) ] )
+        values = pyarrow.compute.not_equal( values, 0 )
+    else:
+        values = pyarrow.Array.from_buffers( GetArrowType( column ), n, [ None, pyarrow.py_buffer( column.values[ start:stop ] ) ] )
+
+    valid = column.valid[ start:stop ]
+    if ( valid.count( 0 ) == 0 ):
+        return values
+    is_invalid = pyarrow.compute.equal( pyarrow.Array.from_buffers( pyarrow.uint8(), n, [ None, pyarrow.py_buffer( valid ) ] ), 0 )
+    return pyarrow.compute.if_else( is_invalid, pyarrow.scalar( None, values.type ), values )
+
+
+def MakeUniqueNames( names ):
+    """Return names with duplicates renamed by appending "_2", "_3", ... (Parquet readers need unique column names)
+    """
+    unique_names = []
+    used = set( names )
+    seen = set()
+    for name in names:
+        if ( name in seen ):
+            n = 2
+            while ( f"{name}_{n}" in used ):
+                n += 1
+            name = f"{name}_{n}"
+            used.add( name )
+        seen.add( name )
+        unique_names.append( name )
+    return unique_names
+
+
+class cParquetWriter(object):
+    """Write the records of a cRecordBuffer to a Parquet file, one row group per call of WriteBuffer() or per row_group_size records.
+
+    The file has a column "time" (s since the epoch, float64), a column "rel_time" (s since t0),
+    the read time columns of the record buffer ("read_time[k]", see cRecordBuffer.AddReadTimeColumns(), the names of the
+    parameters of each are stored as JSON list of lists in the schema metadata "read_time_groups")
+    and one column per parameter, or per element for arrays ("name[i]") and structured values ("name.elementname"),
+    see cRecordBuffer.GetColumns(). Integer and float values are stored as int64/uint64/float64, other values as strings,
+    missing values as null.
+
+    bit_columns is a list of (columnname, bits) for integer columns (like "plc_sync_input[0]" with the status_dword)
+    whose bits should be stored as additional bool columns: bits is a list of (name, mask) tuples.
+
+    Column names must be unique in Parquet files, so duplicates (like the element column "plc_sync_input[0]" of
+    "plc_sync_input" when "plc_sync_input[0]" is recorded as well, or a bit named like a parameter) are renamed,
+    see MakeUniqueNames().
+
+    The schema is determined from record_buffer on construction. A column that is converted to Python objects later
+    (see cRecordBuffer.ConvertToObjectColumn()) is cast to the original type if possible, else written as nulls.
+    """
+    def __init__( self, file_name, record_buffer, t0=0.0, bit_columns=(), row_group_size=65536, compression="zstd" ):
+        if ( pyarrow is None ):
+            raise ImportError( "Writing Parquet files requires pyarrow. Install it with 'pip install pyarrow'" )
+        self.file_name = file_name
+        self.t0 = t0
+        self.row_group_size = row_group_size
+        columns = record_buffer.GetColumns()
+        columnnames = [ columnname for (columnname,column) in columns ]  # @UnusedVariable
+        self.bit_columns = [ ( columnnames.index( columnname ), bits ) for (columnname, bits) in bit_columns if columnname in columnnames ]
+
+        types = [ pyarrow.float64(), pyarrow.float64() ] + [ GetArrowType( column ) for (columnname,column) in columns[1:] ]  # @UnusedVariable
+        names = [ "time", "rel_time" ] + columnnames[1:]
+        for (c,bits) in self.bit_columns:  # @UnusedVariable
+            types += [ pyarrow.bool_() ] * len( bits )
+            names += [ name for (name,mask) in bits ]  # @UnusedVariable
+        fields = [ pyarrow.field( name, arrow_type ) for (name,arrow_type) in zip( MakeUniqueNames( names ), types ) ]
+        metadata = None
+        if ( record_buffer.read_time_groups ):
+            metadata = { "read_time_groups": json.dumps( record_buffer.read_time_groups ) }
+        self.schema = pyarrow.schema( fields, metadata=metadata )
+        self.writer = pyarrow.parquet.ParquetWriter( file_name, self.schema, compression=compression )
+        self.nb_rows = 0
+
+    def WriteBuffer( self, record_buffer, t_from=None ):
+        """Write the records of record_buffer with time stamps at or after t_from (all if None)
+        """
+        columns = record_buffer.GetColumns()
+        for slices in record_buffer.GetSlices( t_from, self.row_group_size ):
+            arrays = []
+            for (columnname,column) in columns:  # @UnusedVariable
+                chunks = [ GetArrowArray( column, start, stop ) for (start,stop) in slices ]
+                arrays.append( chunks[0] if len( chunks ) == 1 else pyarrow.concat_arrays( chunks ) )
+            self.WriteRowGroup( arrays )
+
+    def WriteRowGroup( self, arrays ):
+        arrays.insert( 1, pyarrow.compute.subtract( arrays[0], self.t0 ) )
+        for (c,bits) in self.bit_columns:
+            value = arrays[ c + 1 ]   # +1 for rel_time
+            if ( not pyarrow.types.is_integer( value.type ) ):
+                value = self.CastOrNull( value, pyarrow.int64() )
+            for (name,mask) in bits:  # @UnusedVariable
+                arrays.append( pyarrow.compute.not_equal( pyarrow.compute.bit_wise_and( value, pyarrow.scalar( mask, value.type ) ), 0 ) )
+        for (i,field) in enumerate( self.schema ):
+            if ( arrays[ i ].type != field.type ):
+                arrays[ i ] = self.CastOrNull( arrays[ i ], field.type )
+        self.writer.write_table( pyarrow.Table.from_arrays( arrays, schema=self.schema ) )
+        self.nb_rows += len( arrays[0] )
+
+    @staticmethod
+    def CastOrNull( array, arrow_type ):
+        try:
+            return array.cast( arrow_type )
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+            return pyarrow.nulls( len( array ), arrow_type )
+
+    def Close( self ):
+        self.writer.close()
@@ -0,0 +1,376 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cRecordBuffer class to record parameter values of a BKS gripper in typed columns, see bks.py
+'''
+
+import mmap
+import struct
+import tempfile
+
+from bkstools.bks_lib import hms
+from bkstools.bks_lib.bks_base_common import Struct
+
+
+## Typecodes (see module struct, as used by memoryview.cast()) of the columns for scalar values of the HMS datatypes. Others are stored as Python objects.
+g_datatype_to_typecode = {
+    hms.HMS_Datatypes.ABP_BOOL  : "?",
+    hms.HMS_Datatypes.ABP_SINT8 : "q",
+    hms.HMS_Datatypes.ABP_SINT16: "q",
+    hms.HMS_Datatypes.ABP_SINT32: "q",
+    hms.HMS_Datatypes.ABP_SINT64: "q",
+    hms.HMS_Datatypes.ABP_UINT8 : "q",
+    hms.HMS_Datatypes.ABP_UINT16: "q",
+    hms.HMS_Datatypes.ABP_UINT32: "q",
+    hms.HMS_Datatypes.ABP_UINT64: "Q",
+    hms.HMS_Datatypes.ABP_ENUM  : "q",
+    hms.HMS_Datatypes.ABP_BITS8 : "q",
+    hms.HMS_Datatypes.ABP_BITS16: "q",
+    hms.HMS_Datatypes.ABP_BITS32: "q",
+    hms.HMS_Datatypes.ABP_FLOAT : "d",
+}
+
+
+def GetColumnLayout( bks, index_or_name ):
+    """Return how values of the parameter index_or_name (in any form understood by bks.get_value()) are stored:
+    - ( typecode, ) for scalar values
+    - ( [ (elementname, typecode), ... ], index ) for structured values with scalar elements only
+    - ( [ (elementindex, typecode), ... ], None ) for arrays of scalar values (like plc_sync_input)
+    - ( None, ) for all other values (strings, ...), which are stored as Python objects
+    """
+    (index, subname, elementindex) = bks.ParseIndexOrName( index_or_name )
+    d = bks.data[ index ]
+    datatypes = d["datatype"]
+    if ( len( datatypes ) > 1 ):
+        if ( subname is not None ):
+            return ( g_datatype_to_typecode.get( datatypes[ d["elementname"].index( subname ) ] ), )
+        if ( any( n != 1 for n in d["numsubelements"] ) ):
+            return ( None, )
+        typecodes = [ g_datatype_to_typecode.get( datatype ) for datatype in datatypes ]
+        if ( None in typecodes ):
+            return ( None, )
+        return ( list( zip( d["elementname"], typecodes ) ), index )
+    typecode = g_datatype_to_typecode.get( datatypes[0] )
+    if ( d["numelements"] == 1 or elementindex is not None or typecode is None ):
+        return ( typecode, )
+    return ( [ (e, typecode) for e in range( d["numelements"] ) ], None )
+
+
+class cTypedColumn(object):
+    """Column of capacity values of a single typecode plus a validity flag per value (for None values).
+    The values are kept in a bytearray or, if spill_directory is given, in a memory mapped temporary file
+    in that directory, so that the operating system can page them out.
+    """
+    def __init__( self, typecode, capacity, spill_directory=None ):
+        self.typecode = typecode
+        self.itemsize = struct.calcsize( typecode )
+        self.spill_directory = spill_directory
+        (self.file, self.storage, self.values) = self.Allocate( capacity )
+        self.valid = bytearray( capacity )
+
+    def Allocate( self, capacity ):
+        size = max( 1, capacity * self.itemsize )
+        if ( self.spill_directory is None ):
+            f = None
+            storage = bytearray( size )
+        else:
+            f = tempfile.TemporaryFile( dir=self.spill_directory )
+            f.truncate( size )
+            storage = mmap.mmap( f.fileno(), size )
+        return ( f, storage, memoryview( storage ).cast( self.typecode ) )
+
+    def Set( self, i, value ):
+        if ( value is None ):
+            self.valid[ i ] = 0
+        else:
+            self.values[ i ] = value
+            self.valid[ i ] = 1
+
+    def Get( self, i ):
+        if ( self.valid[ i ] ):
+            return self.values[ i ]
+        return None
+
+    def GetValues( self, start, stop ):
+        """Return the list of values at the storage indices start ... stop-1
+        """
+        values = self.values[ start:stop ].tolist()
+        valid = self.valid[ start:stop ]
+        if ( valid.count( 0 ) ):
+            return [ value if is_valid else None for (value,is_valid) in zip( values, valid ) ]
+        return values
+
+    def Reorder( self, head, count, capacity ):
+        """Move the count values starting at index head (ring order) into new storage for capacity values starting at index 0
+        """
+        old = (self.file, self.storage, self.values)
+        (self.file, self.storage, self.values) = self.Allocate( capacity )
+        valid = bytearray( capacity )
+        n1 = min( count, len( old[2] ) - head )
+        self.values[ 0:n1 ] = old[2][ head:head+n1 ]
+        valid[ 0:n1 ] = self.valid[ head:head+n1 ]
+        self.values[ n1:count ] = old[2][ 0:count-n1 ]
+        valid[ n1:count ] = self.valid[ 0:count-n1 ]
+        self.valid = valid
+        self.Release( *old )
+
+    @staticmethod
+    def Release( f, storage, values ):
+        values.release()
+        if ( f is not None ):
+            storage.close()
+            f.close()
+
+    def Close( self ):
+        self.Release( self.file, self.storage, self.values )
+
+
+class cObjectColumn(object):
+    """Column of capacity Python objects
+    """
+    def __init__( self, capacity ):
+        self.values = [ None ] * capacity
+
+    def Set( self, i, value ):
+        self.values[ i ] = value
+
+    def Get( self, i ):
+        return self.values[ i ]
+
+    def GetValues( self, start, stop ):
+        return self.values[ start:stop ]
+
+    def Reorder( self, head, count, capacity ):
+        values = self.values[ head:head+count ] + self.values[ 0:max( 0, head + count - len( self.values ) ) ]
+        self.values = values + [ None ] * ( capacity - count )
+
+    def Close( self ):
+        self.values = []
+
+
+class cRecordBuffer(object):
+    """Ring buffer for records of a time stamp plus one value per parameter, stored column wise.
+
+    Scalar values are stored in typed columns (see cTypedColumn), arrays and structured values with scalar elements
+    (like plc_sync_input) in one typed column per element, other values as Python objects.
+    Appending a record and dropping old records (DropBefore()) take constant time, except when the buffer is full:
+    then every column is copied into one of twice the capacity (see Grow()), so appending takes amortized constant time.
+    When old records are dropped (see cRecording.CheckPurge()) the capacity stops growing once it holds the records needed.
+
+    If a value does not fit the typed column of its parameter then the column is converted to a column of Python objects.
+
+    If the parameters are read with several requests then the time of each request can be kept as well,
+    see AddReadTimeColumns().
+    """
+    def __init__( self, bks, parameternames, capacity=4096, spill_directory=None ):
+        self.bks = bks
+        self.parameternames = list( parameternames )
+        self.capacity = capacity
+        self.spill_directory = spill_directory
+        self.head = 0
+        self.count = 0
+        self.times = cTypedColumn( "d", capacity, spill_directory )
+        self.read_time_groups = []     # lists of the names of the parameters read with the same request, see AddReadTimeColumns()
+        self.read_times = []           # one time column per element of read_time_groups
+        self.layouts = [ GetColumnLayout( bks, parametername ) for parametername in parameternames ]
+        self.columns = []
+        for layout in self.layouts:
+            if ( type( layout[0] ) is list ):
+                self.columns.append( [ self.MakeColumn( typecode ) for (elementname,typecode) in layout[0] ] )   # @UnusedVariable
+            else:
+                self.columns.append( self.MakeColumn( layout[0] ) )
+
+    def MakeColumn( self, typecode ):
+        if ( typecode is None ):
+            return cObjectColumn( self.capacity )
+        return cTypedColumn( typecode, self.capacity, self.spill_directory )
+
+    def __len__( self ):
+        return self.count
+
+    def AddReadTimeColumns( self, read_time_groups ):
+        """Add a column for the times when the parameters of each group in read_time_groups were read. read_time_groups is
+        a list of lists of parameter names, each read with a single request. Records appended before have no read times (None).
+        """
+        self.read_time_groups = [ list( group ) for group in read_time_groups ]
+        self.read_times = [ cTypedColumn( "d", self.capacity, self.spill_directory ) for group in read_time_groups ]  # @UnusedVariable
+
+    def Append( self, t, values, read_times=None ):
+        """Append the record of time stamp t and the list of values (one per parameter, None if not read).
+        read_times is the list of the times of the read_time_groups (None for groups not read), see AddReadTimeColumns()
+        """
+        if ( self.count == self.capacity ):
+            self.Grow()
+        i = ( self.head + self.count ) % self.capacity
+        self.times.Set( i, t )
+        for (k,column) in enumerate( self.read_times ):
+            column.Set( i, None if read_times is None else read_times[ k ] )
+        for (c,value) in enumerate( values ):
+            column = self.columns[ c ]
+            try:
+                if ( type( column ) is list ):
+                    if ( value is None ):
+                        for element_column in column:
+                            element_column.Set( i, None )
+                    elif ( self.layouts[ c ][1] is None ):
+                        if ( len( value ) != len( column ) ):
+                            raise ValueError( "unexpected number of elements" )
+                        for (element_column,element_value) in zip( column, value ):
+                            element_column.Set( i, element_value )
+                    else:
+                        for (element_column,(elementname,typecode)) in zip( column, self.layouts[ c ][0] ):  # @UnusedVariable
+                            element_column.Set( i, value.__dict__[ elementname ] )
+                else:
+                    column.Set( i, value )
+            except (TypeError, ValueError, OverflowError, KeyError, AttributeError):
+                self.ConvertToObjectColumn( c )
+                self.columns[ c ].Set( i, value )
+        self.count += 1
+
+    def ConvertToObjectColumn( self, c ):
+        object_column = cObjectColumn( self.capacity )
+        for i in range( self.capacity ):
+            object_column.values[ i ] = self.GetValue( c, i )
+        old = self.columns[ c ]
+        for column in ( old if type( old ) is list else [ old ] ):
+            column.Close()
+        self.columns[ c ] = object_column
+        self.layouts[ c ] = ( None, )
+
+    def Grow( self ):
+        capacity = 2 * self.capacity
+        for column in self.GetAllColumns():
+            column.Reorder( self.head, self.count, capacity )
+        self.head = 0
+        self.capacity = capacity
+
+    def GetAllColumns( self ):
+        columns = [ self.times ] + self.read_times
+        for column in self.columns:
+            columns.extend( column if type( column ) is list else [ column ] )
+        return columns
+
+    def DropBefore( self, t ):
+        """Drop the records with time stamps before t
+        """
+        while ( self.count > 0  and  self.times.values[ self.head ] < t ):
+            for column in self.columns:
+                if ( type( column ) is cObjectColumn ):
+                    column.values[ self.head ] = None   # free the object
+            self.head = ( self.head + 1 ) % self.capacity
+            self.count -= 1
+
+    def Clear( self ):
+        """Drop all records
+        """
+        for column in self.columns:
+            if ( type( column ) is cObjectColumn ):
+                column.values = [ None ] * self.capacity
+        self.head = 0
+        self.count = 0
+
+    def GetOldestTime( self ):
+        if ( self.count == 0 ):
+            return None
+        return self.times.values[ self.head ]
+
+    def GetValue( self, c, i ):
+        """Return the value of parameter c in the record at (storage) index i
+        """
+        column = self.columns[ c ]
+        if ( type( column ) is not list ):
+            return column.Get( i )
+        if ( not column[0].valid[ i ] ):
+            return None
+        (elementnames_typecodes, index) = self.layouts[ c ]
+        if ( index is None ):
+            return [ element_column.Get( i ) for element_column in column ]
+        s = Struct()
+        for (si,(element_column,(elementname,typecode))) in enumerate( zip( column, elementnames_typecodes ) ):  # @UnusedVariable
+            s.AddOrdered( elementname, element_column.Get( i ), self.bks, index, si )
+        return s
+
+    def GetColumns( self ):
+        """Return a list of (columnname, column) for the time stamps ("time"), the read times of the read_time_groups
+        ("read_time[k]", if any) and the values, with a column per element for arrays ("name[i]") and structured values ("name.elementname")
+        """
+        columns = [ ( "time", self.times ) ]
+        columns.extend( ( f"read_time[{k}]", column ) for (k,column) in enumerate( self.read_times ) )
+        for (parametername, layout, column) in zip( self.parameternames, self.layouts, self.columns ):
+            if ( type( column ) is not list ):
+                columns.append( ( parametername, column ) )
+            elif ( layout[1] is None ):
+                columns.extend( ( f"{parametername}[{e}]", element_column ) for (e,element_column) in enumerate( column ) )
+            else:
+                columns.extend( ( f"{parametername}.{elementname}", element_column ) for ((elementname,typecode),element_column) in zip( layout[0], column ) )  # @UnusedVariable
+        return columns
+
+    def GetFirst( self, t_from ):
+        """Return the number of records (from the oldest) with time stamps before t_from (assuming increasing time stamps)
+        """
+        (lo, hi) = (0, self.count)
+        while ( lo < hi ):
+            mid = ( lo + hi ) // 2
+            if ( self.times.values[ ( self.head + mid ) % self.capacity ] < t_from ):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def GetSlices( self, t_from=None, max_count=65536 ):
+        """Yield the records with time stamps at or after t_from (all if None) from oldest to newest in chunks of up to max_count
+        records. Each chunk is a list of one or two (start, stop) slices of the storage indices of the columns (see GetColumns()).
+        """
+        k = 0 if t_from is None else self.GetFirst( t_from )
+        while ( k < self.count ):
+            n = min( max_count, self.count - k )
+            start = ( self.head + k ) % self.capacity
+            if ( start + n <= self.capacity ):
+                yield [ ( start, start + n ) ]
+            else:
+                yield [ ( start, self.capacity ), ( 0, start + n - self.capacity ) ]
+            k += n
+
+    def GetValueLists( self, slices ):
+        """Return (times, value_lists) for the records in slices (see GetSlices()): the list of their time stamps and
+        for each parameter the list of its values. This converts column by column, which is much faster than GetRecords().
+        """
+        times = []
+        for (start,stop) in slices:
+            times.extend( self.times.GetValues( start, stop ) )
+        return ( times, [ self.GetColumnValues( c, slices ) for c in range( len( self.columns ) ) ] )
+
+    def GetColumnValues( self, c, slices ):
+        column = self.columns[ c ]
+        if ( type( column ) is not list ):
+            values = []
+            for (start,stop) in slices:
+                values.extend( column.GetValues( start, stop ) )
+            return values
+        if ( self.layouts[ c ][1] is not None ):
+            # structured values are rare and slow to construct anyway:
+            return [ self.GetValue( c, i ) for (start,stop) in slices for i in range( start, stop ) ]
+        values = []
+        for (start,stop) in slices:
+            valid = column[0].valid[ start:stop ]
+            rows = zip( *[ element_column.GetValues( start, stop ) for element_column in column ] )
+            values.extend( list( row ) if is_valid else None for (row,is_valid) in zip( rows, valid ) )
+        return values
+
+    def GetRecords( self, t_from=None ):
+        """Yield the records with time stamps at or after t_from (all if None) from oldest to newest,
+        each as list [t] + values
+        """
+        for k in range( self.count ):
+            i = ( self.head + k ) % self.capacity
+            t = self.times.values[ i ]
+            if ( t_from is not None and t < t_from ):
+                continue
+            yield [ t ] + [ self.GetValue( c, i ) for c in range( len( self.columns ) ) ]
+
+    def Close( self ):
+        """Release the storage (and spill files) of all columns
+        """
+        for column in self.GetAllColumns():
+            column.Close()
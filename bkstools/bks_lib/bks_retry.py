@@ -0,0 +1,250 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides per device transaction statistics, adaptive timeouts, a circuit breaker and jittered backoff
+       for the Modbus-RTU communication with SCHUNK BKS grippers, see BKS_Modbus and cRepeater
+'''
+
+import time
+import random
+import threading
+from collections import deque
+
+import minimalmodbus
+
+
+class CircuitOpenError( minimalmodbus.ModbusException ):
+    '''Raised instead of sending a request to a device that failed too often in a row, see cCircuitBreaker.
+    '''
+    def __init__(self, host, retry_in_s ):
+        minimalmodbus.ModbusException.__init__( self, f"Circuit breaker for {host} is open after repeated communication failures, next try in {retry_in_s:.3f}s" )
+
+
+def IsCommunicationFailure( e ):
+    """Return True if exception e indicates that the device did not respond properly (as opposed to a
+    device that responded with a Modbus exception, e.g. for an illegal data address).
+    """
+    if ( isinstance( e, (minimalmodbus.NoResponseError, minimalmodbus.InvalidResponseError) ) ):
+        return True
+    # minimalmodbus.ModbusException is derived from OSError, so exclude these here to catch errors of the serial interface only:
+    return isinstance( e, OSError ) and not isinstance( e, minimalmodbus.ModbusException )
+
+
+class cBackoff(object):
+    """Delays between retries: exponentially growing from base s up to max_delay s, reduced by a random amount
+    of up to jitter (0.0 ... 1.0) times the delay, so that several masters or threads do not retry in lockstep.
+    """
+    def __init__( self, base=0.005, max_delay=0.2, jitter=0.5 ):
+        self.base = base
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def GetDelay( self, nb_failures ):
+        """Return the delay in s before the retry after the nb_failures-th failure
+        """
+        delay = min( self.max_delay, self.base * ( 2 ** ( nb_failures - 1 ) ) )
+        return delay * ( 1.0 - self.jitter * random.random() )
+
+
+class cCircuitBreaker(object):
+    """Circuit breaker for a single device.
+
+    After failure_threshold communication failures in a row the circuit is "open": Allow() returns False
+    for reset_timeout s, so requests are rejected without using the bus. Then a single request is let through
+    ("half_open"): on success the circuit is "closed" again, on failure it is opened again
+    for twice the time (up to max_reset_timeout s).
+    """
+    def __init__( self, failure_threshold=5, reset_timeout=1.0, max_reset_timeout=30.0 ):
+        self.failure_threshold = failure_threshold
+        self.initial_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = "closed"
+        self.nb_consecutive_failures = 0
+        self.nb_opened = 0
+        self.nb_rejected = 0
+        self.t_open_until = 0.0
+
+    def Allow( self ):
+        if ( self.state == "open" ):
+            if ( time.monotonic() < self.t_open_until ):
+                self.nb_rejected += 1
+                return False
+            self.state = "half_open"
+        return True
+
+    def GetRetryIn( self ):
+        return max( 0.0, self.t_open_until - time.monotonic() )
+
+    def RecordSuccess( self ):
+        self.state = "closed"
+        self.nb_consecutive_failures = 0
+        self.reset_timeout = self.initial_reset_timeout
+
+    def RecordFailure( self ):
+        self.nb_consecutive_failures += 1
+        if ( self.state == "half_open" ):
+            self.reset_timeout = min( self.max_reset_timeout, self.reset_timeout * 2.0 )
+            self.Open()
+        elif ( self.state == "closed" and self.nb_consecutive_failures >= self.failure_threshold ):
+            self.Open()
+
+    def Open( self ):
+        self.state = "open"
+        self.nb_opened += 1
+        self.t_open_until = time.monotonic() + self.reset_timeout
+
+
+class cFunctionStatistics(object):
+    """Statistics of the transactions with a single Modbus function code of a single device.
+    The response times of the last nb_samples transactions are kept for percentiles.
+    Transactions without response contribute their time waited, so that percentiles (and the adaptive timeout
+    derived from them) grow if the device gets slower.
+    """
+    def __init__( self, nb_samples=200 ):
+        self.nb_transactions = 0
+        self.nb_failures = 0
+        self.nb_no_responses = 0
+        self.last_error = None
+        self.response_times = deque( maxlen=nb_samples )
+        self.nb_samples_at_percentiles = -1
+        self.percentiles = dict()
+
+    def AddSuccess( self, response_time ):
+        self.nb_transactions += 1
+        self.response_times.append( response_time )
+
+    def AddFailure( self, e, response_time ):
+        self.nb_transactions += 1
+        self.nb_failures += 1
+        self.last_error = e
+        if ( isinstance( e, minimalmodbus.NoResponseError ) ):
+            self.nb_no_responses += 1
+            self.response_times.append( response_time )
+
+    def GetPercentile( self, p ):
+        """Return the p-th percentile (0...100) of the recent response times in s, or None if there are none
+        """
+        if ( self.nb_samples_at_percentiles != self.nb_transactions ):
+            self.percentiles = dict()
+            self.nb_samples_at_percentiles = self.nb_transactions
+        if ( p not in self.percentiles ):
+            if ( not self.response_times ):
+                return None
+            samples = sorted( self.response_times )
+            self.percentiles[ p ] = samples[ min( len( samples ) - 1, int( p / 100.0 * len( samples ) ) ) ]
+        return self.percentiles[ p ]
+
+    def AsDict( self ):
+        return dict( nb_transactions=self.nb_transactions,
+                     nb_failures=self.nb_failures,
+                     nb_no_responses=self.nb_no_responses,
+                     last_error=repr( self.last_error ) if self.last_error is not None else None,
+                     response_time_p50=self.GetPercentile( 50 ),
+                     response_time_p90=self.GetPercentile( 90 ),
+                     response_time_p99=self.GetPercentile( 99 ),
+                     response_time_max=max( self.response_times ) if self.response_times else None )
+
+
+class cTransactionStatistics(object):
+    """Per function code statistics, circuit breaker and adaptive response timeout of a single device (host).
+
+    Once min_samples response times are known for a function code, the timeout for that function code is
+    timeout_factor times the 99th percentile of the response times, limited to min_timeout ... max_timeout s.
+    Before that (or with adaptive_timeout=False) base_timeout is used.
+
+    Use GetTransactionStatistics() to get the (shared) object for a host.
+    """
+    def __init__( self, host, base_timeout=0.050, adaptive_timeout=True, min_timeout=0.020, max_timeout=0.500, timeout_factor=3.0, min_samples=20 ):
+        self.host = host
+        self.base_timeout = base_timeout
+        self.adaptive_timeout = adaptive_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self.functions = dict()         # function code -> cFunctionStatistics
+        self.circuit_breaker = cCircuitBreaker()
+        self.nb_retries = 0
+        self.nb_requests_with_retries = 0
+
+    def GetFunctionStatistics( self, function_code ):
+        statistics = self.functions.get( function_code )
+        if ( statistics is None ):
+            statistics = self.functions.setdefault( function_code, cFunctionStatistics() )
+        return statistics
+
+    def GetTimeout( self, function_code ):
+        """Return the response timeout in s to use for a request with function_code
+        """
+        statistics = self.functions.get( function_code )
+        if ( not self.adaptive_timeout or statistics is None or len( statistics.response_times ) < self.min_samples ):
+            return self.base_timeout
+        return min( self.max_timeout, max( self.min_timeout, self.timeout_factor * statistics.GetPercentile( 99 ) ) )
+
+    def CheckCircuit( self ):
+        """Raise CircuitOpenError if no request must be sent to the device now
+        """
+        if ( not self.circuit_breaker.Allow() ):
+            raise CircuitOpenError( self.host, self.circuit_breaker.GetRetryIn() )
+
+    def AddSuccess( self, function_code, response_time ):
+        self.GetFunctionStatistics( function_code ).AddSuccess( response_time )
+        self.circuit_breaker.RecordSuccess()
+
+    def AddFailure( self, function_code, e, response_time ):
+        self.GetFunctionStatistics( function_code ).AddFailure( e, response_time )
+        if ( IsCommunicationFailure( e ) ):
+            self.circuit_breaker.RecordFailure()
+        else:
+            self.circuit_breaker.RecordSuccess()  # the device responded, even if with an exception
+
+    def AsDict( self ):
+        """Return the statistics as dict (e.g. for monitoring), with one dict per function code in "functions"
+        """
+        circuit_breaker = self.circuit_breaker
+        return dict( host=self.host,
+                     nb_retries=self.nb_retries,
+                     nb_requests_with_retries=self.nb_requests_with_retries,
+                     circuit_state=circuit_breaker.state,
+                     circuit_nb_opened=circuit_breaker.nb_opened,
+                     circuit_nb_rejected=circuit_breaker.nb_rejected,
+                     functions={ function_code: dict( statistics.AsDict(), timeout=self.GetTimeout( function_code ) )
+                                 for (function_code,statistics) in sorted( self.functions.items() ) } )
+
+
+def GetSummaryLines( statistics ):
+    """Return a list of human readable lines summarizing the statistics dict of a device, see cTransactionStatistics.AsDict()
+    """
+    def ms( t ):
+        return "-" if t is None else f"{t*1000.0:.1f}ms"
+
+    lines = [ f"{statistics['host']}: {statistics['nb_retries']} retries in {statistics['nb_requests_with_retries']} requests,"
+              f" circuit {statistics['circuit_state']} (opened {statistics['circuit_nb_opened']} times, rejected {statistics['circuit_nb_rejected']} requests)" ]
+    for (function_code,f) in statistics["functions"].items():
+        lines.append( f"  function code {function_code:2d}: {f['nb_transactions']} transactions, {f['nb_failures']} failures ({f['nb_no_responses']} without response),"
+                      f" response time p50={ms(f['response_time_p50'])} p99={ms(f['response_time_p99'])} max={ms(f['response_time_max'])}, timeout={ms(f['timeout'])}" )
+    return lines
+
+
+## Registry of the cTransactionStatistics of all devices used in this process, see GetTransactionStatistics()
+g_transaction_statistics = dict()
+g_transaction_statistics_lock = threading.Lock()
+
+def GetTransactionStatistics( host ):
+    """Return the cTransactionStatistics for host. The object is kept for the lifetime of the process,
+    so statistics and circuit breaker state survive reconnects.
+    """
+    with g_transaction_statistics_lock:
+        statistics = g_transaction_statistics.get( host )
+        if ( statistics is None ):
+            statistics = g_transaction_statistics.setdefault( host, cTransactionStatistics( host ) )
+        return statistics
+
+def GetAllTransactionStatistics():
+    """Return a dict mapping each host used so far to the dict of its statistics, see cTransactionStatistics.AsDict()
+    """
+    with g_transaction_statistics_lock:
+        all_statistics = list( g_transaction_statistics.values() )
+    return { statistics.host: statistics.AsDict() for statistics in all_statistics }
@@ -0,0 +1,142 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cRTUFrameReader class to read Modbus-RTU response frames from a serial interface without busy waiting
+'''
+
+import os
+import time
+import select
+
+
+class cRTUFrameReader(object):
+    """Reader for Modbus-RTU response frames that replaces the read() (and write()) method of a serial.Serial object,
+    see Install().
+
+    minimalmodbus reads a response with a single read( number_of_bytes ) call, where number_of_bytes is
+    predicted from the request (or 1000 if it cannot be predicted, e.g. for function codes 7 and 8).
+    A plain serial.Serial.read() may return after the first bytes of a frame only (e.g. with simulated grippers)
+    and always waits for the full timeout if the response is shorter than predicted (e.g. an exception response).
+
+    The reader instead
+    - computes the length of the frame from its first bytes: the function code
+      (exception responses, fixed length responses) and the byte count (function codes 1 to 4),
+    - blocks in select() until data is available, i.e. does not consume CPU time while waiting,
+    - waits self.timeout s for the first byte of the frame and then at most the inter frame gap for each further byte:
+      3.5 character times according to the Modbus standard, but at least min_frame_gap s, since USB serial converters
+      deliver received bytes in chunks,
+    - reads directly into a preallocated buffer of the maximum frame size.
+
+    On platforms where the serial interface has no file descriptor (Windows) the original read() is used
+    to read the frame in stages (header, byte count, rest), which blocks as well.
+    """
+
+    ## Maximum size of a Modbus-RTU frame in bytes
+    MAX_FRAME_LENGTH = 256
+
+    ## Minimum time in s to wait for further bytes of a frame that was started already
+    min_frame_gap = 0.020
+
+    @classmethod
+    def Install( cls, port ):
+        """Install a cRTUFrameReader for the serial.Serial object port (once, as the port may be shared by several
+        minimalmodbus instruments) and return it.
+        """
+        reader = getattr( port, "rtu_frame_reader", None )
+        if ( reader is None ):
+            reader = cls( port )
+            port.rtu_frame_reader = reader
+        return reader
+
+    def __init__( self, port ):
+        self.port = port
+        self.read_original = port.read
+        self.write_original = port.write
+        self.buffer = bytearray( self.MAX_FRAME_LENGTH )
+        self.view = memoryview( self.buffer )
+        self.last_request_length = None
+        self.nb_frames = 0
+        self.nb_incomplete_frames = 0   # frames ended by timeout or inter frame gap before reaching the expected length
+
+        port.read = self.Read
+        port.write = self.Write
+
+    def Write( self, data ):
+        self.last_request_length = len( data )
+        return self.write_original( data )
+
+    def GetFrameGap( self ):
+        return max( 3.5 * 11.0 / self.port.baudrate, self.min_frame_gap )
+
+    def GetExpectedLength( self, nb_read, expected ):
+        """Return the length of the frame of which nb_read bytes are in self.buffer, or expected if not known yet
+        """
+        if ( nb_read < 2 ):
+            return expected
+        function_code = self.buffer[1]
+        if ( function_code & 0x80 ):
+            return 5                                     # slave id, function code, exception code, CRC
+        if ( function_code in (1, 2, 3, 4) ):
+            if ( nb_read < 3 ):
+                return expected
+            return min( 5 + self.buffer[2], expected )   # slave id, function code, byte count, data, CRC
+        if ( function_code in (5, 6, 15, 16) ):
+            return 8                                     # slave id, function code, address, value or count, CRC
+        if ( function_code == 7 ):
+            return 5                                     # slave id, function code, status, CRC
+        if ( function_code == 8 and self.last_request_length is not None ):
+            return min( self.last_request_length, expected )  # diagnostics: echo of the request
+        return expected
+
+    def Read( self, size=1 ):
+        expected = min( size, self.MAX_FRAME_LENGTH )
+        try:
+            fd = self.port.fileno()
+        except Exception:
+            return self.ReadStaged( size, expected )
+
+        timeout = self.port.timeout
+        deadline = time.monotonic() + ( 3600.0 if timeout is None else timeout )
+        frame_gap = self.GetFrameGap()
+        nb_read = 0
+        while ( nb_read < expected ):
+            remaining = deadline - time.monotonic()
+            if ( remaining <= 0.0 ):
+                break
+            (readable, w, x) = select.select( [fd], [], [], remaining )  # @UnusedVariable
+            if ( not readable ):
+                break
+            try:
+                nb = os.readv( fd, [ self.view[nb_read:expected] ] )
+            except BlockingIOError:
+                continue
+            if ( nb == 0 ):
+                break
+            nb_read += nb
+            expected = self.GetExpectedLength( nb_read, expected )
+            deadline = time.monotonic() + frame_gap
+        return self.FinishFrame( nb_read, expected )
+
+    def ReadStaged( self, size, expected ):
+        nb_read = 0
+        while ( nb_read < expected ):
+            if ( nb_read < 2 ):
+                stage_end = 2
+            elif ( nb_read < 3 and self.buffer[1] in (1, 2, 3, 4) ):
+                stage_end = 3
+            else:
+                stage_end = expected
+            data = self.read_original( min( stage_end, expected ) - nb_read )
+            if ( not data ):
+                break
+            self.buffer[nb_read:nb_read+len(data)] = data
+            nb_read += len( data )
+            expected = self.GetExpectedLength( nb_read, expected )
+        return self.FinishFrame( nb_read, expected )
+
+    def FinishFrame( self, nb_read, expected ):
+        self.nb_frames += 1
+        if ( nb_read < expected ):
+            self.nb_incomplete_frames += 1
+        return bytes( self.view[:nb_read] )
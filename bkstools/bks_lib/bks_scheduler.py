@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cTickScheduler class for drift free cyclic processing with a fixed period, see bks.py
+
+Example usage:
+\\code
+    scheduler = cTickScheduler( 0.010 )
+    while True:
+        t_tick = scheduler.WaitForNextTick()
+        ...                                           # do the cyclic work
+    for line in scheduler.jitter.GetLines():
+        print( line )
+\\endcode
+'''
+
+import time
+
+
+class cJitterHistogram(object):
+    """Histogram of the lateness of ticks (time from the deadline to the actual wake up) in s.
+    bounds are the upper bounds of the bins, later values are counted in an additional overflow bin.
+    """
+    def __init__( self, bounds=(0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.010, 0.020, 0.050, 0.100) ):
+        self.bounds = bounds
+        self.counts = [ 0 ] * ( len( bounds ) + 1 )
+        self.nb_values = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def Add( self, lateness ):
+        b = 0
+        while ( b < len( self.bounds ) and lateness > self.bounds[ b ] ):
+            b += 1
+        self.counts[ b ] += 1
+        self.nb_values += 1
+        self.sum += lateness
+        self.max = max( self.max, lateness )
+
+    def GetLines( self ):
+        """Return a list of human readable lines with the non empty bins of the histogram
+        """
+        if ( self.nb_values == 0 ):
+            return []
+        lines = [ f"jitter avg {self.sum/self.nb_values*1000.0:.3f}ms max {self.max*1000.0:.3f}ms" ]
+        for (b,count) in enumerate( self.counts ):
+            if ( count == 0 ):
+                continue
+            if ( b < len( self.bounds ) ):
+                label = f"<= {self.bounds[b]*1000.0:g}ms"
+            else:
+                label = f" > {self.bounds[-1]*1000.0:g}ms"
+            lines.append( f"  {label:>10s} {count:8d} {100.0*count/self.nb_values:6.2f}% " + "#" * int( round( 40.0 * count / self.nb_values ) ) )
+        return lines
+
+
+class cTickScheduler(object):
+    """Scheduler for cyclic processing with a fixed period in s.
+
+    The ticks are at absolute times t_start + k * period (on the monotonic clock), so time spent for the work
+    of a cycle does not add up to drift as with sleeping for period after the work.
+
+    If a cycle overruns, i.e. the work takes longer than period, then with catch_up=False the missed ticks are skipped
+    (counted in nb_skipped) and the next tick is the latest one already due. With catch_up=True the missed ticks are
+    processed as fast as possible one after the other until the schedule is reached again, so the number of cycles
+    stays as planned.
+
+    The lateness of each tick is recorded in the cJitterHistogram self.jitter.
+    """
+    def __init__( self, period, catch_up=False ):
+        self.period = period
+        self.catch_up = catch_up
+        self.t_start = time.monotonic()
+        self.tick = 0
+        self.nb_overruns = 0
+        self.nb_skipped = 0
+        self.jitter = cJitterHistogram()
+
+    def WaitForNextTick( self ):
+        """Wait until the next tick is due and return its deadline (on the monotonic clock)
+        """
+        self.tick += 1
+        deadline = self.t_start + self.tick * self.period
+        now = time.monotonic()
+        if ( now < deadline ):
+            while ( now < deadline ):
+                time.sleep( deadline - now )
+                now = time.monotonic()
+        else:
+            self.nb_overruns += 1
+            if ( not self.catch_up ):
+                nb_missed = int( ( now - deadline ) / self.period )
+                self.tick += nb_missed
+                self.nb_skipped += nb_missed
+                deadline = self.t_start + self.tick * self.period
+        self.jitter.Add( now - deadline )
+        return deadline
+
+    def GetLines( self ):
+        """Return a list of human readable lines with the statistics of the ticks so far
+        """
+        return [ f"ticks {self.tick} overruns {self.nb_overruns} skipped {self.nb_skipped}" ] + self.jitter.GetLines()
@@ -0,0 +1,244 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides functions to save the parameters of a SCHUNK BKS gripper to a snapshot file, to compare a snapshot with
+       a gripper or another snapshot and to restore a snapshot with minimal writes, see bks_snapshot.py
+
+A snapshot contains the values of all readable parameters of the metadata (bks.data), read with batched requests
+(see BKSBaseCommon.get_values()), tagged with the firmware version, module type and serial number of the gripper.
+Snapshot files are compact JSON, gzip compressed if the file name ends with ".gz".
+
+Restoring reads the current values of the gripper first (again batched) and writes only the writable parameters whose
+values differ. Arrays are always written as a whole with a single set_value() call, i.e. a single request (see the
+EGI-6151 workaround in BKS_HTTP.MakeUpdateURLs()). Command, process data and identity parameters are never restored,
+see g_not_restored.
+
+Example usage:
+\\code
+    bks = BKSBase( "192.168.1.253" )
+    WriteSnapshotFile( "egk40.json.gz", SaveSnapshot( bks ) )
+    ...
+    bks = BKSBase( "192.168.1.254" )      # the replacement gripper
+    (written, failed) = RestoreSnapshot( bks, ReadSnapshotFile( "egk40.json.gz" ) )
+\\endcode
+'''
+
+import gzip
+import json
+import math
+import time
+
+import bkstools.release
+from bkstools.bks_lib.bks_base_common import Struct
+from bkstools.bks_lib.debug import Debug, ApplicationError
+
+
+## Version of the snapshot file format
+g_format_version = 1
+
+## Parameters identifying the gripper and its firmware, stored in the header of a snapshot
+g_identity_parameters = [ "sw_version_txt", "sw_version_num", "module_type", "serial_no_txt" ]
+
+## Writable parameters that are never restored: commands and their arguments, settings that start actions
+#  and the identity of the gripper (a replacement gripper must keep its own serial number and module type)
+g_not_restored = [ "command_code", "sys_msg_req", "set_pos", "set_vel", "set_acc", "set_force", "grp_dir",
+                   "firmware_path", "enable_softreset", "bt_result", "internal_params",
+                   "serial_no_txt", "order_no_txt", "production_date", "serial_no_num", "module_type" ]
+
+## Bits of the descriptor of a parameter in the metadata (Anybus ABP_APPD_DESCR_*)
+DESCRIPTOR_GET_ACCESS = 0x01
+DESCRIPTOR_SET_ACCESS = 0x02
+DESCRIPTOR_MAPPABLE_WRITE_PD = 0x10
+
+
+def HasAccess( d, bit ):
+    """Return True if all elements of the parameter described by d (an element of bks.data) have the descriptor bit set.
+    Parameters without descriptor (like the Modbus communication settings added by BKS_Modbus) have no access.
+    """
+    descriptor = d.get( "descriptor" )
+    return bool( descriptor ) and all( e & bit for e in descriptor )
+
+
+def IsReadable( d ):
+    return HasAccess( d, DESCRIPTOR_GET_ACCESS )
+
+
+def IsRestorable( d ):
+    """Return True if the parameter described by d is written by RestoreSnapshot() if its value differs
+    """
+    return ( IsReadable( d ) and HasAccess( d, DESCRIPTOR_SET_ACCESS )
+             and not HasAccess( d, DESCRIPTOR_MAPPABLE_WRITE_PD )     # process data like plc_sync_output
+             and d["name"] not in g_not_restored )
+
+
+def ValueToJSON( value ):
+    """Return value as read by get_values() in a form that can be stored as JSON: Structs as dicts, bytes as hex strings
+    and strings without the trailing \\0 padding (which is read via Modbus but not via HTTP, set_value() adds it again)
+    """
+    if ( isinstance( value, str ) ):
+        return value.rstrip( "\x00" )
+    if ( isinstance( value, Struct ) ):
+        return { name: ValueToJSON( value.__dict__[ name ] ) for name in value._ordered_names }
+    if ( isinstance( value, ( bytes, bytearray ) ) ):
+        return value.hex()
+    if ( isinstance( value, ( list, tuple ) ) ):
+        return [ ValueToJSON( v ) for v in value ]
+    return value
+
+
+def ValueFromJSON( d, value ):
+    """Return the value stored by ValueToJSON() for the parameter described by d in the form expected by set_value()
+    """
+    if ( isinstance( value, dict ) ):
+        return tuple( value[ name ] for name in d["elementname"] )
+    return value
+
+
+def IsEqual( a, b ):
+    """Return True if the JSON values a and b are equal (NaN equals NaN)
+    """
+    if ( isinstance( a, float ) and isinstance( b, float ) and math.isnan( a ) and math.isnan( b ) ):
+        return True
+    if ( isinstance( a, list ) and isinstance( b, list ) ):
+        return len( a ) == len( b ) and all( IsEqual( x, y ) for (x,y) in zip( a, b ) )
+    if ( isinstance( a, dict ) and isinstance( b, dict ) ):
+        return a.keys() == b.keys() and all( IsEqual( a[k], b[k] ) for k in a )
+    return a == b
+
+
+def ReadParameters( bks, names ):
+    """Return a dict that maps the names of the readable parameters in names to their JSON values, read with batched requests.
+    Parameters that cannot be read due to insufficient read rights are left out.
+    """
+    values = bks.get_values( names, ignore_insufficient_read_rights=True )
+    return { name: ValueToJSON( value ) for (name,value) in zip( names, values ) if value is not None }
+
+
+def SaveSnapshot( bks ):
+    """Return a snapshot of all readable parameters of bks as dict, see WriteSnapshotFile()
+    """
+    names = [ d["name"] for d in bks.data if IsReadable( d ) ]
+    t0 = time.time()
+    values = ReadParameters( bks, names )
+    Debug( f"SaveSnapshot: read {len( values )} parameters in {time.time()-t0:.3f}s" )
+    identity = { name: values.get( name ) for name in g_identity_parameters }
+    if ( "module_type" in bks.name_to_index and identity[ "module_type" ] is not None ):
+        try:
+            identity[ "module_type_name" ] = bks.enums[ "module_type" ].GetName( identity[ "module_type" ], "?" )
+        except KeyError:
+            pass
+    return dict( format=g_format_version,
+                 bkstools=bkstools.release.PROJECT_RELEASE,
+                 host=bks.host,
+                 time=time.strftime( "%Y-%m-%d %H:%M:%S" ),
+                 firmware=identity,
+                 values=values )
+
+
+def WriteSnapshotFile( path, snapshot ):
+    text = json.dumps( snapshot, separators=(",", ":") )
+    if ( path.endswith( ".gz" ) ):
+        with gzip.open( path, "wt", encoding="utf-8" ) as f:
+            f.write( text )
+    else:
+        with open( path, "w", encoding="utf-8" ) as f:
+            f.write( text + "\n" )
+
+
+def ReadSnapshotFile( path ):
+    opener = gzip.open if path.endswith( ".gz" ) else open
+    with opener( path, "rt", encoding="utf-8" ) as f:
+        snapshot = json.load( f )
+    if ( snapshot.get( "format" ) != g_format_version ):
+        raise ApplicationError( f"{path} is no bkstools snapshot (format version {g_format_version})" )
+    return snapshot
+
+
+def ModuleTypeText( firmware ):
+    """Return a text naming the module type of firmware (the "firmware" of a snapshot)
+    """
+    name = firmware.get( "module_type_name" )
+    if ( name is None ):
+        return repr( firmware.get( "module_type" ) )
+    return f"{firmware.get( 'module_type' )!r} ({name})"
+
+
+def CheckFirmware( snapshot, live_firmware ):
+    """Raise ApplicationError if the module type or the firmware version of snapshot differs from live_firmware (the "firmware" of another snapshot)
+    """
+    saved = snapshot["firmware"].get( "module_type" )
+    live = live_firmware.get( "module_type" )
+    if ( saved != live ):
+        raise ApplicationError( f"Snapshot was saved from a gripper of module type {ModuleTypeText( snapshot['firmware'] )},"
+                                f" but the gripper is of module type {ModuleTypeText( live_firmware )}. Parameters may differ in meaning." )
+    saved = snapshot["firmware"].get( "sw_version_num" )
+    live = live_firmware.get( "sw_version_num" )
+    if ( saved != live ):
+        raise ApplicationError( f"Snapshot was saved from firmware {snapshot['firmware'].get( 'sw_version_txt' )!r},"
+                                f" but the gripper runs {live_firmware.get( 'sw_version_txt' )!r}. Parameters may differ in meaning." )
+
+
+def DiffValues( saved_values, live_values, data=None ):
+    """Return a list of (name, saved value, live value) for the parameters whose values differ.
+    Parameters missing on one side have None as value there. If data (bks.data) is given then
+    the list is in the order of data, else in the order of saved_values.
+    """
+    names = list( saved_values ) + [ name for name in live_values if name not in saved_values ]
+    if ( data is not None ):
+        order = { d["name"]: i for (i,d) in enumerate( data ) }
+        names.sort( key=lambda name: order.get( name, len( order ) ) )
+    return [ ( name, saved_values.get( name ), live_values.get( name ) ) for name in names
+             if not IsEqual( saved_values.get( name ), live_values.get( name ) ) ]
+
+
+def DiffSnapshot( bks, snapshot ):
+    """Return the differences between snapshot and the current values of bks, see DiffValues()
+    """
+    names = [ d["name"] for d in bks.data if IsReadable( d ) ]
+    return DiffValues( snapshot["values"], ReadParameters( bks, names ), bks.data )
+
+
+def RestoreSnapshot( bks, snapshot, exclude=[], dry_run=False, check_firmware=True ):
+    """Write the values of snapshot to bks: only the restorable parameters (see IsRestorable()) that differ from the
+    current values of bks and are not in exclude are written, each with a single set_value() call.
+    Writes that fail are retried once after all others, since limits may depend on each other (like min_pos and max_pos).
+
+    Return a tuple (written, failed): the list of (name, old value, new value) written (or to write if dry_run)
+    and the list of (name, exception) of the parameters that could not be written.
+    """
+    restorable = [ d for d in bks.data if IsRestorable( d ) and d["name"] in snapshot["values"] and d["name"] not in exclude ]
+    live_values = ReadParameters( bks, [ d["name"] for d in restorable ] + [ name for name in g_identity_parameters if name in bks.name_to_index ] )
+    if ( check_firmware ):
+        live_firmware = { name: live_values.get( name ) for name in g_identity_parameters }
+        if ( live_firmware[ "module_type" ] is not None ):
+            try:
+                live_firmware[ "module_type_name" ] = bks.enums[ "module_type" ].GetName( live_firmware[ "module_type" ], "?" )
+            except KeyError:
+                pass
+        CheckFirmware( snapshot, live_firmware )
+
+    to_write = [ ( d, live_values[ d["name"] ], snapshot["values"][ d["name"] ] ) for d in restorable
+                 if d["name"] in live_values and not IsEqual( live_values[ d["name"] ], snapshot["values"][ d["name"] ] ) ]
+    if ( dry_run ):
+        return ( [ ( d["name"], old, new ) for (d,old,new) in to_write ], [] )
+
+    written = []
+    failed = []
+    for attempt in range( 2 ):
+        failed = []
+        for (d, old, new) in to_write:
+            try:
+                bks.set_value( d["name"], value=ValueFromJSON( d, new ) )
+            except Exception as e:
+                Debug( f"RestoreSnapshot: writing {d['name']} failed with {e!r}" )
+                failed.append( ( d, old, new, e ) )
+                continue
+            written.append( ( d["name"], old, new ) )
+        if ( not failed ):
+            break
+        to_write = [ ( d, old, new ) for (d, old, new, e) in failed ]  # @UnusedVariable
+    # constant parameters are cached by bks, so forget the old values:
+    for name in [ name for (name, old, new) in written ] + [ d["name"] for (d, old, new, e) in failed ]:  # @UnusedVariable
+        bks.cached_index_to_value.pop( bks.name_to_index[ name ], None )
+    return ( written, [ ( d["name"], e ) for (d, old, new, e) in failed ] )  # @UnusedVariable
@@ -0,0 +1,116 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cStatusWatcher class that reads the plc_sync_input of a BKS gripper in a background thread
+       and wakes up threads waiting for status changes, see BKSModule.WaitForBits()
+'''
+
+import time
+import threading
+
+
+class cStatusWatcher(object):
+    """Background poller for the plc_sync_input of a single gripper bks (a BKS_HTTP or BKS_Modbus object).
+
+    The poller thread reads plc_sync_input only while at least one thread waits in WaitForSample().
+    Each sample read is published to all waiting threads at once, so several concurrent waits
+    (e.g. for command_received_toggle and position_reached) share a single stream of reads.
+
+    Polling is adaptive: a waiter may give the time when it expects the status to change
+    (e.g. the end of a motion estimated from distance and velocity). As long as all waiters expect a change
+    only later, the poller reads every max_period s only (still detecting errors and warnings early)
+    and switches to back-to-back reads (every min_period s) lead_time s before the earliest expected change.
+
+    The bus transactions of the poller are serialized with those of other threads by bks.io_lock (HTTP)
+    or the cModbusBus of the serial interface (Modbus-RTU).
+    """
+    def __init__( self, bks, min_period=0.0, max_period=0.1, lead_time=0.05 ):
+        self.bks = bks
+        self.min_period = min_period
+        self.max_period = max_period
+        self.lead_time = lead_time
+
+        self.condition = threading.Condition()
+        self.sample = None            # latest (sequence, t_read, plc_sync_input), t_read is time.time() when the read was started
+        self.sequence = 0
+        self.error = None             # exception of the latest failed read, if any
+        self.nb_reads = 0
+        self.waiters = []             # expected change time (or None for "any time now") of each waiting thread
+        self.stopped = False
+
+        self.thread = threading.Thread( target=self.Run, name=f"cStatusWatcher {bks.host}", daemon=True )
+        self.thread.start()
+
+    def Stop( self ):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def GetDelay( self, now ):
+        """Return the time in s to wait before the next read according to the expectations of the current waiters
+        """
+        if ( None in self.waiters ):
+            return self.min_period
+        t_next = min( self.waiters ) - self.lead_time
+        return min( self.max_period, max( self.min_period, t_next - now ) )
+
+    def Run( self ):
+        t_last_read = 0.0
+        while True:
+            with self.condition:
+                while ( not self.stopped and not self.waiters ):
+                    self.condition.wait()
+                if ( self.stopped ):
+                    return
+                now = time.time()
+                delay = t_last_read + self.GetDelay( now ) - now
+                if ( delay > 0.0 ):
+                    # new waiters or Stop() may shorten the delay, so reevaluate after waking up:
+                    self.condition.wait( delay )
+                    continue
+
+            t_read = time.time()
+            t_last_read = t_read
+            try:
+                plc_sync_input = self.bks.plc_sync_input
+                error = None
+            except Exception as e:
+                error = e
+
+            with self.condition:
+                self.nb_reads += 1
+                self.error = error
+                if ( error is None ):
+                    self.sequence += 1
+                    self.sample = (self.sequence, t_read, plc_sync_input)
+                self.condition.notify_all()
+
+    def WaitForSample( self, not_before, after_sequence, endtime, expected_time=None ):
+        """Wait for a sample of plc_sync_input that was read at or after time not_before
+        and that is newer than the sample with sequence number after_sequence.
+
+        endtime is the time.time() when to give up waiting.
+        expected_time is the time.time() when the caller expects the status to change, or None for "any time now".
+
+        Returns the sample as tuple (sequence, t_read, plc_sync_input) or None on timeout.
+        Raises the exception of a failed read, if a read fails while waiting.
+        """
+        with self.condition:
+            self.waiters.append( expected_time )
+            self.condition.notify_all()
+            try:
+                nb_reads = self.nb_reads
+                while True:
+                    sample = self.sample
+                    if ( sample is not None and sample[0] > after_sequence and sample[1] >= not_before ):
+                        return sample
+                    if ( self.error is not None and self.nb_reads != nb_reads ):
+                        raise self.error
+                    remaining = endtime - time.time()
+                    if ( remaining <= 0.0 ):
+                        return None
+                    self.condition.wait( remaining )
+            finally:
+                self.waiters.remove( expected_time )
@@ -0,0 +1,481 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cTelemetryServer class to share a single connection to a SCHUNK BKS gripper
+       among several local clients and the BKS_Telemetry class to access a gripper via such a server.
+
+The server polls a set of parameters (like plc_sync_input) from the gripper with a fixed period and publishes
+the snapshots to all connected clients, as a full snapshot on connect and as deltas (changed values only) afterwards.
+Reads of other parameters, writes and enum requests of the clients are forwarded to the gripper by the server.
+
+BKS_Telemetry is a BKSBaseCommon like BKS_HTTP and BKS_Modbus, so scripts like bks_status or bks_jog
+can use the server instead of the gripper by giving a host like "telemetry:PORT" or "telemetry:HOST:PORT",
+see BKSBase().
+
+Protocol: newline separated JSON objects over TCP, each with a "type":
+- server to client:
+  - "hello": metadata of the gripper, sent once on connect
+  - "full": seq, t (time of the poll), values (name -> value) and times (name -> read time) of all polled parameters
+  - "delta": like "full" but with the changed values only. An "error" is given if the poll failed.
+  - "reply": id and values or error, the reply to a request of the client
+- client to server (requests with an id):
+  - "get": read the parameters with the given indices
+  - "set": write value to index_or_name, see BKSBaseCommon.set_value()
+  - "enum": return the enum of the parameter name
+
+Example usage:
+\\code
+    # the daemon, see bks_telemetry.py:
+    server = cTelemetryServer( BKSBase( "192.168.1.253" ), [ "plc_sync_input", "actual_pos" ], period=0.02 )
+    server.Start()
+    ...
+    server.Stop()
+
+    # a client:
+    bks = BKSBase( "telemetry:" + str( g_default_port ) )
+    print( bks.plc_sync_input, bks.actual_pos )    # from the latest snapshot
+    bks.command_code = eCmdCode.CMD_ACK            # forwarded to the gripper
+\\endcode
+'''
+
+import json
+import time
+import queue
+import socket
+import threading
+import socketserver
+
+from pyschunk.tools.util import enum
+from bkstools.bks_lib import debug
+from bkstools.bks_lib.debug import Debug, ApplicationError
+from bkstools.bks_lib.bks_base_common import BKSBaseCommon, Struct
+from bkstools.bks_lib.bks_scheduler import cTickScheduler
+
+
+## Default TCP port of the telemetry server
+g_default_port = 8942
+
+## Prefix of host names that select BKS_Telemetry in BKSBase()
+g_host_prefix = "telemetry:"
+
+
+def EncodeValue( value ):
+    """Return value as read from a BKSBaseCommon encoded for JSON: structured values as {"s": [[elementname, value], ...]},
+    exceptions (like InsufficientReadRights stored by UpdateValues()) as {"e": [classname, message]}.
+    """
+    if ( isinstance( value, Struct ) ):
+        return { "s": [ [ name, EncodeValue( value.__dict__[ name ] ) ] for name in value._ordered_names ] }
+    if ( isinstance( value, Exception ) ):
+        return { "e": [ type( value ).__name__, str( value ) ] }
+    if ( type( value ) is tuple ):
+        return list( value )
+    return value
+
+
+def DecodeException( encoded ):
+    """Return the exception for encoded = [classname, message] as encoded by EncodeValue().
+    Exceptions of unknown classes are returned as ApplicationError.
+    """
+    (classname, message) = encoded
+    cls = getattr( debug, classname, None )
+    if ( not ( isinstance( cls, type ) and issubclass( cls, ApplicationError ) ) ):
+        return ApplicationError( f"{classname}: {message}" )
+    return cls( message )
+
+
+class cTelemetryClientHandler( socketserver.StreamRequestHandler ):
+    """Handler for a single client connection of a cTelemetryServer. The messages for the client are sent by a separate thread
+    from self.queue, so a slow client can neither block the polling nor the other clients.
+    """
+    def setup( self ):
+        socketserver.StreamRequestHandler.setup( self )
+        self.queue = queue.Queue()
+        self.needs_full = True           # send a full snapshot instead of the next delta
+        self.sender = threading.Thread( target=self.Send, name="cTelemetryClientHandler.Send", daemon=True )
+
+    def handle( self ):
+        server = self.server.telemetry
+        self.queue.put( server.MakeHello() )
+        self.sender.start()
+        server.AddClient( self )
+        try:
+            for line in self.rfile:
+                request = json.loads( line )
+                self.queue.put( server.HandleRequest( request ) )
+        except (OSError, ValueError) as e:
+            Debug( f"telemetry client {self.client_address} failed: {e!r}" )
+        finally:
+            server.RemoveClient( self )
+            self.queue.put( None )
+            self.sender.join()
+
+    def Send( self ):
+        try:
+            while True:
+                message = self.queue.get()
+                if ( message is None ):
+                    break
+                self.wfile.write( message )
+        except OSError:
+            pass # client is gone, the reader in handle() will notice as well
+
+    def Publish( self, full, delta, max_queued ):
+        """Queue the encoded snapshot for the client: full if the client needs a full snapshot, else delta.
+        If more than max_queued messages are pending (the client is too slow) then the snapshot is dropped
+        and the next one is sent as full snapshot to resynchronize the client.
+        """
+        if ( self.queue.qsize() > max_queued ):
+            self.needs_full = True
+            self.server.telemetry.nb_dropped += 1
+            return
+        if ( self.needs_full ):
+            self.queue.put( full )
+            self.needs_full = False
+        else:
+            self.queue.put( delta )
+
+
+class cTelemetryTCPServer( socketserver.ThreadingTCPServer ):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class cTelemetryServer(object):
+    """Telemetry server that polls the (whole) parameters parameternames from the BKSBaseCommon bks every period s
+    and publishes the snapshots to the clients connected to TCP port port of address address.
+
+    The delta of a poll contains only the values changed since the previous poll, so for a mostly idle gripper
+    only a few bytes are sent per period and client. Clients that fall behind by more than max_queued messages
+    get a full snapshot instead of the missed deltas.
+    """
+    def __init__( self, bks, parameternames, period=0.05, address="127.0.0.1", port=g_default_port, max_queued=50 ):
+        self.bks = bks
+        self.parameternames = list( parameternames )
+        self.indices = [ bks.MakeIndex( name ) for name in self.parameternames ]  # may raise ApplicationError for unknown names
+        self.period = period
+        self.max_queued = max_queued
+        self.seq = 0
+        self.t_poll = None
+        self.error = None
+        self.values = dict()                # name -> encoded value of the latest poll
+        self.times = dict()                 # name -> read time of the latest poll
+        self.clients = []
+        self.clients_lock = threading.Lock()
+        self.nb_polls = 0
+        self.nb_errors = 0
+        self.nb_dropped = 0
+        self.running = False
+        self.poll_thread = None
+
+        self.tcp_server = cTelemetryTCPServer( (address, port), cTelemetryClientHandler )
+        self.tcp_server.telemetry = self
+        self.address = self.tcp_server.server_address
+        self.serve_thread = None
+
+    def Start( self ):
+        """Start polling and serving clients in background threads
+        """
+        self.running = True
+        self.Poll()  # make sure the first client gets a valid snapshot
+        self.poll_thread = threading.Thread( target=self.Run, name="cTelemetryServer.Run", daemon=True )
+        self.poll_thread.start()
+        self.serve_thread = threading.Thread( target=self.tcp_server.serve_forever, name="cTelemetryServer.serve_forever", daemon=True )
+        self.serve_thread.start()
+
+    def Stop( self ):
+        self.running = False
+        self.tcp_server.shutdown()
+        self.tcp_server.server_close()
+        if ( self.poll_thread ):
+            self.poll_thread.join()
+        with self.clients_lock:
+            clients = list( self.clients )
+        for client in clients:
+            try:
+                client.request.shutdown( socket.SHUT_RDWR )
+            except OSError:
+                pass
+
+    def Run( self ):
+        scheduler = cTickScheduler( self.period )
+        while ( self.running ):
+            scheduler.WaitForNextTick()
+            self.Poll()
+
+    def Poll( self ):
+        """Read the polled parameters from the gripper and publish the delta to the clients
+        """
+        t_poll = time.time()
+        changed = dict()
+        error = None
+        try:
+            values = self.bks.get_values( self.parameternames, ignore_insufficient_read_rights=True )
+            times = self.bks.GetReadTimes( self.parameternames )
+            for (name,value,t) in zip( self.parameternames, values, times ):
+                value = EncodeValue( value )
+                if ( self.values.get( name, changed ) != value ):   # (changed as marker for missing values)
+                    changed[ name ] = value
+                self.values[ name ] = value
+                self.times[ name ] = t
+            self.nb_polls += 1
+        except Exception as e:
+            # e.g. connection lost, the clients get the error and the last valid values
+            error = f"{type( e ).__name__}: {e}"
+            self.nb_errors += 1
+
+        with self.clients_lock:
+            self.seq += 1
+            self.t_poll = t_poll
+            self.error = error
+            delta = { "type": "delta", "seq": self.seq, "t": t_poll, "values": changed, "times": { name: self.times[ name ] for name in changed } }
+            if ( error is not None ):
+                delta[ "error" ] = error
+            delta = self.Encode( delta )
+            full = None
+            for client in self.clients:
+                if ( client.needs_full and full is None ):
+                    full = self.MakeFull()   # only encoded if needed, e.g. for new clients
+                client.Publish( full, delta, self.max_queued )
+
+    def MakeFull( self ):
+        full = { "type": "full", "seq": self.seq, "t": self.t_poll, "values": self.values, "times": self.times }
+        if ( self.error is not None ):
+            full[ "error" ] = self.error
+        return self.Encode( full )
+
+    def MakeHello( self ):
+        bks = self.bks
+        return self.Encode( { "type": "hello",
+                              "host": bks.host,
+                              "data": bks.data,
+                              "reverse_data": getattr( bks, "reverse_data", False ),
+                              "plc_reorder": bks.PLCReorder( 1 ) != 1,
+                              "fieldbus_type": getattr( bks, "fieldbus_type", None ),
+                              "period": self.period,
+                              "parameternames": self.parameternames,
+                              "indices": self.indices,
+                              "cached_values": [ [ index, EncodeValue( value ) ] for (index,value) in bks.cached_index_to_value.items() ] } )
+
+    @staticmethod
+    def Encode( message ):
+        return ( json.dumps( message, separators=(",",":") ) + "\n" ).encode( "utf-8" )
+
+    def AddClient( self, client ):
+        Debug( f"telemetry client {client.client_address} connected" )
+        with self.clients_lock:
+            self.clients.append( client )
+
+    def RemoveClient( self, client ):
+        Debug( f"telemetry client {client.client_address} disconnected" )
+        with self.clients_lock:
+            if ( client in self.clients ):
+                self.clients.remove( client )
+
+    def HandleRequest( self, request ):
+        """Execute the request of a client on the gripper and return the encoded reply
+        """
+        reply = { "type": "reply", "id": request.get( "id" ) }
+        try:
+            if ( request[ "type" ] == "get" ):
+                indices = request[ "indices" ]
+                index_to_value = self.bks.UpdateValues( indices )
+                reply[ "values" ] = [ EncodeValue( index_to_value[ index ] ) for index in indices ]
+                reply[ "times" ] = [ self.bks.index_to_read_time.get( index ) for index in indices ]
+            elif ( request[ "type" ] == "set" ):
+                value = request[ "value" ]
+                if ( type( value ) is dict ):
+                    # a whole structure, which set_value() accepts as tuple of the element values
+                    value = tuple( v for (name,v) in value[ "s" ] )  # @UnusedVariable
+                self.bks.set_value( request[ "index_or_name" ], request.get( "datatype" ), value, request.get( "elementindices" ) )
+            elif ( request[ "type" ] == "enum" ):
+                reply[ "enum" ] = { k: v for (k,v) in self.bks.enums[ request[ "name" ] ].items() if k != "_last" }
+            else:
+                raise ApplicationError( f"unknown request type {request['type']!r}" )
+        except KeyError as e:
+            reply[ "error" ] = [ "KeyError", str( e ) ]
+        except Exception as e:
+            reply[ "error" ] = EncodeValue( e )[ "e" ]
+        return self.Encode( reply )
+
+    def GetStatistics( self ):
+        """Return a human readable string with the statistics of the server
+        """
+        with self.clients_lock:
+            nb_clients = len( self.clients )
+        return f"clients {nb_clients} polls {self.nb_polls} errors {self.nb_errors} dropped snapshots {self.nb_dropped}"
+
+
+class BKS_Telemetry(BKSBaseCommon):
+    """Class where instances allow access to SCHUNK BKS grippers via a cTelemetryServer.
+
+    Values of the parameters polled by the server are taken from the latest snapshot published by the server
+    without any communication. Other parameters are read from the gripper via the server on each access,
+    writes are forwarded to the gripper via the server.
+
+    host is "telemetry:PORT" or "telemetry:HOST:PORT" with the address of the server, HOST defaults to 127.0.0.1.
+    """
+    def __init__( self, host, max_age_in_s=5*60, debug=False, timeout=5.0 ):
+        BKSBaseCommon.__init__( self, host, max_age_in_s, debug )
+        self.timeout = timeout
+
+        address = host[ len( g_host_prefix ): ].rsplit( ":", 1 )
+        if ( len( address ) == 1 ):
+            address = [ "127.0.0.1" ] + address
+        self.socket = socket.create_connection( (address[0], int( address[1] )), timeout=timeout )
+        self.socket.settimeout( None )
+        self.rfile = self.socket.makefile( "rb" )
+        self.wfile_lock = threading.Lock()
+
+        self.snapshot = dict()               # index -> latest value published by the server
+        self.snapshot_times = dict()         # index -> read time of the latest value
+        self.snapshot_error = None           # error message of the latest poll of the server, None if ok
+        self.seq = None
+        self.replies = dict()                # request id -> reply
+        self.replies_condition = threading.Condition()
+        self.next_id = 0
+        self.closed = False
+
+        hello = json.loads( self.rfile.readline() )
+        if ( hello.get( "type" ) != "hello" ):
+            raise ApplicationError( f"{host!r} is not a telemetry server" )
+        self.server_host = hello[ "host" ]
+        self.data = hello[ "data" ]
+        self.reverse_data = hello[ "reverse_data" ]
+        self.plc_reorder = hello[ "plc_reorder" ]
+        self.period = hello[ "period" ]
+        self.polled_indices = set( hello[ "indices" ] )
+
+        self.SetAttributes()
+        for (index,value) in hello[ "cached_values" ]:
+            self.cached_index_to_value[ index ] = self.DecodeValue( index, value )
+        if ( "fieldbus_type" not in self.name_to_index ):
+            self.fieldbus_type = hello[ "fieldbus_type" ]
+
+        # wait for the first snapshot, so that the polled parameters are available right away:
+        self.HandleMessage( json.loads( self.rfile.readline() ) )
+        self.reader = threading.Thread( target=self.Read, name="BKS_Telemetry.Read", daemon=True )
+        self.reader.start()
+
+        self.SetupControlword()
+        self.SetupStatusword()
+
+    def GetSettings( self, host ):
+        # the metadata is provided by the server
+        return dict()
+
+    def PLCReorder( self, v32 ):
+        """return v32 with bytes in v32 reordered for the fieldbus_type of the gripper of the server
+        """
+        if ( self.plc_reorder ):
+            return ((v32 & 0xff000000)>>24) | ((v32 & 0x00ff0000)>>8) | ((v32 & 0x0000ff00)<<8) | ((v32 & 0x000000ff)<<24)
+        return v32
+
+    def Read( self ):
+        try:
+            for line in self.rfile:
+                self.HandleMessage( json.loads( line ) )
+        except (OSError, ValueError):
+            pass
+        with self.replies_condition:
+            self.closed = True
+            self.replies_condition.notify_all()
+
+    def HandleMessage( self, message ):
+        if ( message[ "type" ] == "reply" ):
+            with self.replies_condition:
+                self.replies[ message[ "id" ] ] = message
+                self.replies_condition.notify_all()
+            return
+        if ( message[ "type" ] == "delta" and self.seq is not None and message[ "seq" ] != self.seq + 1 ):
+            Debug( f"telemetry deltas {self.seq+1}..{message['seq']-1} missing" )  # should not happen since the server resyncs with full snapshots
+        for (name,value) in message[ "values" ].items():
+            index = self.name_to_index[ name ]
+            self.snapshot[ index ] = self.DecodeValue( index, value )
+            self.snapshot_times[ index ] = message[ "times" ][ name ]
+        self.snapshot_error = message.get( "error" )
+        self.seq = message[ "seq" ]
+
+    def DecodeValue( self, index, value ):
+        """Return value as encoded by EncodeValue() decoded for parameter index, InsufficientReadRights as exception object
+        """
+        if ( type( value ) is not dict ):
+            return value
+        if ( "e" in value ):
+            return DecodeException( value[ "e" ] )
+        s = Struct()
+        for (si,(elementname,elementvalue)) in enumerate( value[ "s" ] ):
+            s.AddOrdered( elementname, elementvalue, self, index, si )
+        return s
+
+    def Request( self, request ):
+        """Send request to the server and return the reply. Errors reported by the server are raised.
+        """
+        with self.replies_condition:
+            request[ "id" ] = self.next_id
+            self.next_id += 1
+        with self.wfile_lock:
+            self.socket.sendall( cTelemetryServer.Encode( request ) )
+        t_end = time.monotonic() + self.timeout
+        with self.replies_condition:
+            while ( request[ "id" ] not in self.replies ):
+                remaining = t_end - time.monotonic()
+                if ( self.closed or remaining <= 0.0 ):
+                    raise ApplicationError( f"no reply from telemetry server {self.host!r} for {request['type']!r} request" )
+                self.replies_condition.wait( remaining )
+            reply = self.replies.pop( request[ "id" ] )
+        if ( "error" in reply ):
+            if ( reply[ "error" ][0] == "KeyError" ):
+                raise KeyError( reply[ "error" ][1] )
+            raise DecodeException( reply[ "error" ] )
+        return reply
+
+    def LoadEnum( self, name ):
+        new_enum = enum()
+        for (k,v) in self.Request( { "type": "enum", "name": name } )[ "enum" ].items():
+            new_enum.Add( k, v )
+        return new_enum
+
+    def UpdateEnum( self, d ):
+        return self.LoadEnum( d[ "name" ] )
+
+    def UpdateValues( self, indices ):
+        """Return the values of the parameters with the indices given in list indices:
+        from the latest snapshot for parameters polled by the server, else read via the server.
+        See BKSBaseCommon.UpdateValues() for the return value.
+        """
+        index_to_value = dict()
+        indices_to_read = []
+        for index in indices:
+            if ( index in self.polled_indices ):
+                if ( self.snapshot_error is not None ):
+                    raise ApplicationError( f"telemetry server {self.host!r} failed to poll the gripper: {self.snapshot_error}" )
+                index_to_value[ index ] = self.snapshot[ index ]
+                self.index_to_read_time[ index ] = self.snapshot_times[ index ]
+            else:
+                indices_to_read.append( index )
+        if ( indices_to_read ):
+            reply = self.Request( { "type": "get", "indices": indices_to_read } )
+            for (index,value,t) in zip( indices_to_read, reply[ "values" ], reply[ "times" ] ):
+                index_to_value[ index ] = self.DecodeValue( index, value )
+                self.index_to_read_time[ index ] = t
+        return index_to_value
+
+    def UpdateValue( self, index_or_name, datatype, index ):
+        value = self.UpdateValues( [ index ] )[ index ]
+        if ( isinstance( value, Exception ) ):
+            raise value
+        return value
+
+    def GetStructuredValue( self, index ):
+        return self.UpdateValue( index, None, index )
+
+    def set_value( self, index_or_name, datatype=None, value=None, elementindices=None ):
+        self.Request( { "type": "set", "index_or_name": index_or_name, "datatype": datatype, "value": EncodeValue( value ), "elementindices": elementindices } )
+
+    def Close( self ):
+        try:
+            self.socket.shutdown( socket.SHUT_RDWR )
+        except OSError:
+            pass
+        self.socket.close()
@@ -74,6 +74,130 @@ PROJECT_NAME = "bkstools"
 #
 #    From newest to oldest the releases have the following names and features:
 #
+#    - \b 0.0.2.32-dev 2026-10-18
+#      - added get_values() to read several parameters with as few requests as possible.
+#        For HTTP adjacent parameters are read with a single /adi/data.json request.
+#        bks uses this for recording, so the sample rate no longer drops linearly
+#        with the number of recorded parameters.
+#      - for Modbus-RTU get_values() merges neighbouring parameters into as few
+#        read transactions (function code 3, max. 125 registers) as possible.
+#      - parameter values are now converted with codecs precompiled per parameter
+#        (bks_codec) instead of a datatype dispatch per single value. bench_codec
+#        in the new bkstools.bench package measures the speedup per HMS datatype.
+#      - BKS_HTTP reads enums lazily on first access instead of one request per
+#        ENUM parameter at construction. The cached metadata is now validated with
+#        a token built from /adi/info.json and the firmware version/build instead of
+#        expiring after 5 minutes. This also fixes missing parameter properties
+#        on the very first connection to a gripper (empty cache).
+#      - BKS_HTTP keeps metadata and enums in one sqlite file (~/.bks3_metadata.sqlite)
+#        keyed by the firmware validation token instead of a shelve per host. Grippers
+#        running the same firmware share the entry, so connecting to another gripper
+#        does not download the metadata again. The store can be used from any thread.
+#        Cached metadata that does not fit the firmware of the gripper (e.g. after a
+#        firmware update) is skipped instead of failing the construction.
+#        Enums read are written to the store in one transaction at the end of the
+#        construction and on BKS_HTTP.Close() (or garbage collection / exit).
+#      - added AsyncBKS_HTTP (bks_http_async) for asyncio based access with a pool of
+#        keep-alive connections, plus ConnectGrippers() / GetValuesOfGrippers() to
+#        poll many grippers concurrently. bkstools.bench.fake_webserver fakes the
+#        /adi/*.json webinterface offline, bench_async compares serial and
+#        concurrent polling.
+#      - added BKSFleet (bks_fleet) and the bks_fleet script to poll many grippers
+#        (HTTP and Modbus-RTU) cyclically from a single process with lock free
+#        snapshots, per device latency/error statistics and reconnects with backoff.
+#      - added BKSModule( ..., use_status_watcher=True ): a background cStatusWatcher
+#        polls plc_sync_input and wakes up all WaitFor*() calls waiting for it, instead
+#        of every wait reading and sleeping on its own. Polling slows down until shortly
+#        before the end of a motion estimated from distance and velocity. Bus accesses
+#        of concurrent threads are serialized by a per object (HTTP) or per serial port
+#        (Modbus-RTU) io_lock.
+#      - added cCommandQueue (bks_command_queue): submit BKSModule commands at once and get
+#        futures, each command is sent as soon as the previous one completed. The status
+#        read of the completion poll is reused as pre-command status of the next command
+#        (BKSModule.status_reuse_max_age). bks_move --stream sends the position list this
+#        way, after acknowledging the gripper like bks_move does without --stream.
+#        bench_pipeline measures the pick-and-place cycle time against a fake gripper
+#        with simulated motion (fake_webserver.cFakeMotion).
+#      - Modbus-RTU responses are now read by cRTUFrameReader (bks_rtu_reader) instead of
+#        the read_my() monkey patch of serial.Serial.read: the frame length is computed
+#        from function code and byte count, the reader blocks in select() with the 3.5
+#        character inter frame gap and reads into a preallocated buffer. Exception
+#        responses and function codes 7/8 no longer wait for the full timeout.
+#        fixed ReadExceptionStatus() for minimalmodbus 2 (payload must be bytes).
+#      - Modbus-RTU retries use a jittered exponential backoff (cBackoff) instead of
+#        retrying immediately. Per device and function code statistics, a circuit breaker
+#        that stops sending requests to a device failing repeatedly and timeouts adapted
+#        to the measured response time percentiles are provided by bks_retry, see
+#        BKS_Modbus.GetTransactionStatistics(). bks_move prints them in its summary.
+#      - added cModbusBus (bks_modbus_bus): all BKS_Modbus objects on a serial interface (one per
+#        slave ID, used from any number of threads) share one bus master that schedules their
+#        transactions by priority (plc_sync_output writes, plc_sync_input reads, other parameters,
+#        diagnostics) and round robin between slaves, with aging against starvation and per slave
+#        transaction rate and bus waiting time statistics (GetBus( port ).GetStatistics()).
+#        Replaces the per port lock.
+#      - bks_scan: scans several serial interfaces concurrently (-P/--port), probes each ID once
+#        with a short, baudrate derived timeout (--first_timeout) and rescans only IDs that
+#        answered, with reduced response expectancy for collision detection in the same pass
+#        until no new serial numbers show up. Results are printed as they come in, with --json
+#        as JSON lines. Fixed constant parameters (serial_no_txt) being reported from the cache
+#        for other IDs.
+#      - added bks_discover (bks_lib.bks_discover): sweeps IP networks (CIDR) concurrently for
+#        grippers answering /adi/info.json and /module/info.json with short connect timeouts,
+#        reports serial number, firmware version and fieldbus type of each gripper as soon as it
+#        is found (optionally as JSON lines) and fills the metadata cache for them.
+#        fake_webserver --consecutive_addresses serves fake grippers on 127.0.0.1, 127.0.0.2, ...
+#      - bks.py records with negative duration -D into a cRecordBuffer (bks_record_buffer):
+#        a preallocated ring buffer with one typed column per parameter (or per element of
+#        arrays and structs) instead of a list of lists, so purging old records no longer
+#        copies the whole recording. New option --spill DIRECTORY keeps the columns in memory
+#        mapped temporary files.
+#      - bks.py with positive or zero duration -D (or without -D) formats and prints the
+#        records in a background cOutputWriter thread (bks_output_writer) that writes them
+#        in batches with a single flush, so the sampling loop and its dt statistics only
+#        contain the bus time. If output cannot keep up, lines are dropped and counted.
+#      - bks.py -p PERIOD now starts the cycles at fixed times (cTickScheduler in
+#        bks_scheduler) instead of sleeping PERIOD after each cycle, so the period no longer
+#        drifts. New option --overrun skip|catch_up selects what happens if a cycle takes
+#        too long. The statistics show overruns and a histogram of the tick jitter.
+#        Records are timestamped with the time the values were read: BKSBase.GetReadTimes()
+#        returns the time of the request that read each parameter.
+#        If a recording needs several requests then the record time is their average and
+#        the record buffer (and Parquet files) keep the time of each request as well (read_time[k]).
+#      - bks.py --parquet writes recordings as compressed (zstd) Parquet files with typed
+#        columns, a column per element of arrays and structured parameters, and bool columns
+#        for the bits of the status/control dwords (cParquetWriter in bks_parquet). With
+#        positive or zero duration -D the file is written in row groups while recording.
+#        Requires the optional dependency pyarrow (pip install bkstools[parquet]).
+#        Duplicate column names are renamed ("name_2", ...) to keep the files readable.
+#      - bks.py renders GPD/CSV column by column (cRecording.GetRecordStrings()): each
+#        parameter column is formatted at once, status dword bits are expanded once per
+#        value and GPD labels are only computed at changes of the codes. Saving is about
+#        3-5 times faster, see bench/bench_render.py. Fixed the crash when recording
+#        plc_sync_input[0] or plc_sync_input.status_dword (bit output).
+#      - added bks_telemetry: local telemetry server that shares a single connection to a gripper with several clients.
+#        Polled parameters are published as deltas, other reads, writes and enums are forwarded.
+#        Scripts attach with -H telemetry:PORT (BKS_Telemetry in bks_lib/bks_telemetry.py)
+#      - added the gripper simulator bkstools/simulator/bks_simulator.py: a kinematic model of a BKS gripper
+#        (moves, jogging, gripping, statusword, errors) driven by the default_settings metadata, served via
+#        the /adi HTTP/JSON interface and via Modbus-RTU on a pseudo terminal, with latency and error injection
+#      - added bkstools/bench/bench_transport.py: benchmark suite for BKS_HTTP and BKS_Modbus against the simulator
+#        (get/set latency, plc_sync_input poll rate, parameter dump, cold/warm startup, command_received latency)
+#        reporting JSON percentiles, with --baseline to compare with the report of an earlier release
+#      - added instrumentation hooks for every transaction of BKS_HTTP, AsyncBKS_HTTP and BKS_Modbus (bks_lib/bks_instrumentation.py):
+#        instruments get Before()/After() callbacks with parameter names, sizes, duration and outcome; built-in collectors
+#        cLatencyCollector (HDR style histograms, bus time per parameter) and cErrorCounter. bks.py: new option --bus_statistics
+#      - added bks_exporter (bks_exporter.cMetricsExporter): serves actual_pos/vel/cur, err_code and
+#        wrn_code (with enum names as labels), system_state, the statistics counters and the transport
+#        health (transaction latency summaries and errors, Modbus retries, failures per function code
+#        and circuit breaker state) as Prometheus metrics on http://127.0.0.1:9868/metrics. The
+#        grippers are polled with batched reads by a BKSFleet, scrapes only render the cached values.
+#      - added bks_snapshot save/diff/restore (bks_lib/bks_snapshot.py): save dumps all readable parameters
+#        with batched reads to a compact (optionally gzipped) JSON file tagged with firmware version, module
+#        type and serial number; diff compares a snapshot with a gripper or another snapshot; restore writes
+#        only the writable parameters that differ, arrays as a whole with a single request (EGI-6151).
+#        Commands, process data and identity parameters (including the module type) are never restored.
+#        restore refuses a snapshot of another module type or firmware version unless --ignore_firmware is given.
+#
 #    - \b 0.0.2.31 2024-06-24
 #      - fixed bug in position reporting for negativ positions in bks_move
 #
@@ -111,11 +235,11 @@ PROJECT_NAME = "bkstools"
 #      - Initial internal "release" of the code
 #      - Scripts egi, egi_move and egi_ref are working
 #
-PROJECT_RELEASE = "0.0.2.31"
+PROJECT_RELEASE = "0.0.2.32-dev"
 
 ## \brief Date of the release of the software project.
 #
 #    \anchor project_date_bkstools
 #    The date of the release of the project.
 #
-PROJECT_DATE = "2024-06-24"
+PROJECT_DATE = "2026-10-18"
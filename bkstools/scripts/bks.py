@@ -28,6 +28,11 @@ from bkstools.bks_lib import hsm_enums, hms, bks_options
 
 from bkstools.bks_lib.bks_base import BKSBase
 from bkstools.bks_lib.bks_base_common import Str2Value
+from bkstools.bks_lib.bks_record_buffer import cRecordBuffer
+from bkstools.bks_lib.bks_output_writer import cOutputWriter
+from bkstools.bks_lib.bks_scheduler import cTickScheduler
+from bkstools.bks_lib.bks_parquet import cParquetWriter
+from bkstools.bks_lib.bks_instrumentation import cLatencyCollector, cErrorCounter, AddGlobalInstrument
 from bkstools.bks_lib.debug import Error, Debug, Print, Var, ApplicationError, InsufficientAccessRights, InsufficientReadRights, InsufficientWriteRights, g_logmethod  # @UnusedImport
 from bkstools.bks_lib.bks_modbus import RepeaterException
 
@@ -39,6 +44,7 @@ g_logmethod = logger.info
 g_file_format_name = dict()
 g_file_format_name[ True ] = ".gpd"
 g_file_format_name[ False ] = ".csv"
+g_parquet_format_name = ".parquet"
 
 g_time_format_name = dict()
 g_time_format_name[ True ] = "absolute"
@@ -46,6 +52,9 @@ g_time_format_name[ False ] = "relative"
 
 g_char_offset = 1.7
 
+## Number of records per row group of Parquet files, see cParquetWriter
+g_parquet_row_group_size = 65536
+
 def ErrorOrWarningCodeToStr( bks, code_int ):
     return (code_int, "0x%02x=%s" % (code_int, bks.enums["err_code"].GetName( code_int, "?" )))
 
@@ -75,6 +84,19 @@ def GetHHMMSSms( t, use_comma ):
     return r
 
 
+def GetHHMMSSmsStrings( times, use_comma ):
+    """Return the list of GetHHMMSSms( t, use_comma ) for all t in times, but with strftime() called only once per second
+    """
+    strings = []
+    second = None
+    for t in times:
+        if ( int( t ) != second ):
+            second = int( t )
+            hhmmss = GetHHMMSSms( second, use_comma )[:-3]
+        strings.append( hhmmss + ("%.3f" % (t - second)) [2:] )
+    return strings
+
+
 def ListParameters( bks ):
     slist = list( enumerate(bks.data) )
     def sort_by_instance(t):
@@ -107,7 +129,7 @@ def UmlautEncode( msg ):
     return r
 
 class cRecording( object ):
-    def __init__(self, bks, parameternames, parameterformats, do_gpd, do_absolute_time, title, output_file_name_without_suffix, output_directly, cyclically, duration, separator, use_comma ):
+    def __init__(self, bks, parameternames, parameterformats, do_gpd, do_absolute_time, title, output_file_name_without_suffix, output_directly, cyclically, duration, separator, use_comma, spill_directory=None, do_parquet=False ):
         self.bks = bks
         self.parameternames_to_record = parameternames
         self.parameterformats = parameterformats
@@ -123,9 +145,20 @@ class cRecording( object ):
         self.output_directly = output_directly
         self.cyclically = cyclically
         self.duration = duration
+        self.do_parquet = do_parquet
         self.t0 = time.time()
-        self.t_oldest = self.t0
-        self.records = []
+        self.parquet_writer = None
+        self.read_time_groups = None   # lists of the indices of the parameters read with the same request, see SetupReadTimeGroups()
+        if ( output_directly and cyclically and do_parquet ):
+            # the record buffer is used for the records of the current row group only:
+            self.record_buffer = cRecordBuffer( bks, parameternames, spill_directory=spill_directory )
+            self.output_writer = None
+        elif ( output_directly ):
+            self.record_buffer = None
+            self.output_writer = cOutputWriter( self.GetOutputLine )  # keeps formatting and printing out of the sampling loop
+        else:
+            self.record_buffer = cRecordBuffer( bks, parameternames, spill_directory=spill_directory )
+            self.output_writer = None
         self.sep = separator
         self.use_comma = use_comma
         self.print_header = True
@@ -311,129 +344,154 @@ class cRecording( object ):
             header = self.GetCSVHeader( t_start, output_file_name )
         return header
 
-    def GetValue(self, value, nbdigits=6, valueformat="" ):
-        if ( value is None ):
-            return "NaN"
-
+    def GetValueStrings(self, values, nbdigits=6, valueformat="" ):
+        """Return the list of strings for values: "NaN" for None, formatted with valueformat if given,
+        floats with nbdigits digits (and a comma if self.use_comma), else str( value )
+        """
         if ( valueformat != "" ):
             s = "{0" + valueformat + "}"
-            return s.format( value )
-        if ( type( value ) is float ):
-            s = "%.*f" % (nbdigits,value)
-            if ( self.use_comma ):
-                s = s.replace(".",",")
-            return s
-        return value
-
-    def GetValueString(self, name, value, valueformat ):
-        if ( self.cyclically ):
-            return "%s%s" % (self.GetValue(value, valueformat=valueformat), self.sep)
-        else:
-            return "%s=%s%s" % (name, self.GetValue(value, valueformat=valueformat), self.sep)
-
+            return [ "NaN" if value is None else s.format( value ) for value in values ]
+        if ( self.use_comma ):
+            return [ "NaN" if value is None else ( ("%.*f" % (nbdigits,value)).replace(".",",") if type( value ) is float else str( value ) ) for value in values ]
+        return [ "NaN" if value is None else ( "%.*f" % (nbdigits,value) if type( value ) is float else str( value ) ) for value in values ]
 
     def GetRecordString( self, record, tstart ):
-        s = ""
-        sl = ""
-        t = record[0] - tstart
+        return self.GetRecordStrings( [ record[0] ], [ [ value ] for value in record[1:] ], tstart )[0]
+
+    def GetRecordStrings( self, times, value_lists, tstart ):
+        """Return the list of output lines (without newline) for records given column wise: times is the list of
+        the time stamps of the records, value_lists the list of values of each parameter in parameternames_to_record.
+
+        The lines are rendered column by column: each column is formatted with a single list comprehension,
+        the bits of special values are expanded from the integer values once and the GPD labels of codes
+        are determined from the change points of the codes only.
+        """
+        sep = self.sep
+        columns = []   # lists of the fields of the records, each including its separator
         if ( self.cyclically ):
-            #s += "%.3f%s" % (t, self.sep)
-            s += "%s%s%s%s%s%s" % (self.GetValue(t,3), self.sep, self.GetValue(record[0],3), self.sep, GetHHMMSSms( record[0], self.use_comma ), self.sep )
-        for (parametername,value,parameterformat) in zip( self.parameternames_to_record, record[1:], self.parameterformats ):
-            s += self.GetValueString( parametername, value, parameterformat )
+            columns.append( [ s + sep for s in self.GetValueStrings( [ t - tstart for t in times ], 3 ) ] )
+            columns.append( [ s + sep for s in self.GetValueStrings( times, 3 ) ] )
+            columns.append( [ s + sep for s in GetHHMMSSmsStrings( times, self.use_comma ) ] )
+            prefixes = [ "" ] * len( self.parameternames_to_record )
+        else:
+            prefixes = [ parametername + "=" for parametername in self.parameternames_to_record ]
+        for (prefix,values,parameterformat) in zip( prefixes, value_lists, self.parameterformats ):
+            columns.append( [ prefix + s + sep for s in self.GetValueStrings( values, valueformat=parameterformat ) ] )
 
+        labels = dict()   # record index -> GPD labels to append
         for parametername in self.parameternames_to_print:
-            #for (special_name,prefix,bits) in self.special_names_prefix_bits:  # @UnusedVariable
             for o in self.special_names_prefix_bits:
                 if ( parametername == o.parametername ):
                     # separate special value into its bits
-                    if ( len( record ) <= o.value_index ):
-                        continue
-                    rv = record[ o.value_index ]
-                    try:
-                        v = int( rv )
-                        for (name,mask) in o.bits:
-                            if ( v & mask ):
-                                bit_value = 1
-                            else:
-                                bit_value = 0
-                            s += self.GetValueString( name, bit_value )
-
-                    except TypeError:
-                        # happens when a parameter could not be read (temporarily), e.g. due to missing read rights)
-                        for (name,mask) in o.bits:
-                            bit_value = None
-                            s += self.GetValueString( name, bit_value )
+                    values = [ None if value is None else int( value ) for value in value_lists[ o.value_index-1 ] ]
+                    for (name,mask) in o.bits:
+                        prefix = "" if self.cyclically else name + "="
+                        (is_set, is_clear, is_none) = (prefix + "1" + sep, prefix + "0" + sep, prefix + "NaN" + sep)
+                        columns.append( [ is_none if v is None else ( is_set if v & mask else is_clear ) for v in values ] )
 
             for o in self.special_names_codes:
                 if ( self.do_gpd and parametername in o.parameternames ):
-                    if ( len( record ) <= o.value_index ):
-                        for o in self.special_names_codes:
-                            o.last_value = None   # reset last values, so that state/code labels are reprinted on reconnect
-                        continue
-                    rv = record[ o.value_index ]
-                    try:
-                        code_int = int( rv )
-                        (new_value,label_str) = o.GetStr( self.bks, code_int)
-                    except TypeError:
-                        # happens when a parameter could not be read (temporarily), e.g. due to missing read rights)
-                        new_value = "NaN"  # when using None then initally unreadable values are not shown but should be
-                        label_str = "???"
-                    if ( new_value != o.last_value ):
-                        sl += '\n## set label "\\n%s" at %.3f,character %.1f point pointtype 9 pointsize 1.5 left %s' % (label_str, t, o.char_offset, o.color)
-                        o.last_value = new_value
-        return s + sl
+                    (last_code, new_value, label_str) = (0, None, None)
+                    for (r,rv) in enumerate( value_lists[ o.value_index-1 ] ):
+                        code = None if rv is None else int( rv )
+                        if ( code != last_code or r == 0 ):
+                            last_code = code
+                            if ( code is None ):
+                                # happens when a parameter could not be read (temporarily), e.g. due to missing read rights)
+                                (new_value,label_str) = ("NaN", "???") # when using None then initally unreadable values are not shown but should be
+                            else:
+                                (new_value,label_str) = o.GetStr( self.bks, code )
+                        if ( new_value != o.last_value ):
+                            labels[ r ] = labels.get( r, "" ) + '\n## set label "\\n%s" at %.3f,character %.1f point pointtype 9 pointsize 1.5 left %s' % (label_str, times[ r ] - tstart, o.char_offset, o.color)
+                            o.last_value = new_value
 
+        if ( columns ):
+            lines = [ "".join( fields ) for fields in zip( *columns ) ]
+        else:
+            lines = [ "" ] * len( times )
+        for (r,label) in labels.items():
+            lines[ r ] += label
+        return lines
+
+
+    def GetOutputLine( self, record ):
+        """Return the line to print for record when output_directly, prefixed with the time of the record like Print() does
+        """
+        return GetHHMMSSms( record[0], False ) + " " + self.GetRecordString( record, math.floor( self.t0 ) )
 
     def CheckPurge(self, now ):
-        """Check if recorded data can be purged and do so if. This keeps the used memory limited for long running records
+        """Purge records that are older than needed. This keeps the used memory limited for long running records.
+        Since the records are kept in a ring buffer this takes only the time to drop the few records that just expired.
         """
-        if ( self.duration and ((now - self.t_oldest) > (abs( self.duration ) + 60.0)) ):
-            # time to delete some records: args duration plus an extra 60s have been recorded
-            #Debug( "Before delete: %d records recorded" % (len(self.records)) )
-            for (i,r) in enumerate( self.records ):
-                t_record = r[0]
-                if ( now - t_record < abs( self.duration ) + 3.0 ):
-                    break
-            newest_records = self.records[ i: ]
-            del self.records
-            self.records = newest_records
-            self.t_oldest = self.records[0][0]
-            #Debug( "After delete: %d records recorded" % (len(self.records)) )
+        if ( self.duration ):
+            self.record_buffer.DropBefore( now - abs( self.duration ) - 3.0 )
 
 
     def AddRecord(self, now ):
         reconnect = False
-        values = []
-        for parametername in self.parameternames_to_record:
-            try:
-                value = self.bks.get_value( parametername )
-
-            except requests.RequestException:
-                if ( not reconnect ):
-                    reconnect = True
-                values = [None] * len(self.parameternames_to_record)
-                break
-            except InsufficientReadRights:
-                value = None
-            values.append( value )
-        record = [time.time()] + values
-
-        if ( self.output_directly ):
+        t_request = time.time()
+        try:
+            # read all parameters with as few requests as possible:
+            values = self.bks.get_values( self.parameternames_to_record, ignore_insufficient_read_rights=True )
+        except requests.RequestException:
+            reconnect = True
+            values = [None] * len(self.parameternames_to_record)
+        # timestamp the record with the time the values were read, averaged over the requests if several were needed:
+        read_times = [ t if t is not None and t >= t_request else None for t in self.bks.GetReadTimes( self.parameternames_to_record ) ]
+        times = [ t for t in read_times if t is not None ]
+        if ( times ):
+            record = [ sum( times ) / len( times ) ] + values
+        else:
+            record = [ ( t_request + time.time() ) / 2.0 ] + values
+        if ( self.record_buffer is not None ):
+            # the buffer keeps the time of each request as well:
+            if ( self.read_time_groups is None and times and self.parquet_writer is None ):
+                self.SetupReadTimeGroups( read_times )
+            group_times = self.GetReadTimesOfGroups( read_times )
+
+        if ( self.output_directly and self.output_writer is None ):
+            # write the records to the Parquet file in row groups:
+            self.record_buffer.Append( record[0], values, group_times )
+            if ( len( self.record_buffer ) >= g_parquet_row_group_size ):
+                self.WriteParquetRowGroup()
+        elif ( self.output_directly ):
             if ( self.print_header ):
                 Print( self.GetHeader() )
                 self.print_header = False
 
-            Print( self.GetRecordString( record, math.floor( self.t0 ) ) )
+            self.output_writer.Put( record )
         else:
-            self.records.append( record )
+            self.record_buffer.Append( record[0], values, group_times )
 
             self.CheckPurge( now )
 
         return reconnect
 
-    def SaveOutput(self):
-        if ( self.do_gpd ):
+    def SetupReadTimeGroups( self, read_times ):
+        """Determine the groups of parameters read with the same request from their read_times (see AddRecord()).
+        If there are several then the record buffer gets a read time column for each group.
+        """
+        time_to_group = dict()
+        for (p,t) in enumerate( read_times ):
+            if ( t is not None ):
+                time_to_group.setdefault( t, [] ).append( p )
+        self.read_time_groups = list( time_to_group.values() ) if len( time_to_group ) > 1 else []
+        if ( self.read_time_groups ):
+            self.record_buffer.AddReadTimeColumns( [ [ self.parameternames_to_record[ p ] for p in group ] for group in self.read_time_groups ] )
+
+    def GetReadTimesOfGroups( self, read_times ):
+        """Return the list of the read times of the read_time_groups (averaged, in case a group was split into several requests)
+        """
+        group_times = []
+        for group in self.read_time_groups or []:
+            times = [ read_times[ p ] for p in group if read_times[ p ] is not None ]
+            group_times.append( sum( times ) / len( times ) if times else None )
+        return group_times
+
+    def GetOutputFileName(self):
+        if ( self.do_parquet ):
+            suffix = ".parquet"
+        elif ( self.do_gpd ):
             suffix = ".gpd"
         else:
             suffix = ".csv"
@@ -446,6 +504,22 @@ class cRecording( object ):
                     break
         else:
             output_file_name = self.output_file_name_without_suffix + suffix
+        return output_file_name
+
+    def MakeParquetWriter(self, output_file_name, t_start ):
+        bit_columns = [ (o.parametername, o.bits) for o in self.special_names_prefix_bits ]
+        return cParquetWriter( output_file_name, self.record_buffer, t_start, bit_columns, g_parquet_row_group_size )
+
+    def WriteParquetRowGroup(self):
+        if ( self.parquet_writer is None ):
+            output_file_name = self.GetOutputFileName()
+            self.parquet_writer = self.MakeParquetWriter( output_file_name, math.floor( self.t0 ) )
+            PrintD( "Writing recording to file %r" % (output_file_name) )
+        self.parquet_writer.WriteBuffer( self.record_buffer )
+        self.record_buffer.Clear()
+
+    def SaveOutput(self):
+        output_file_name = self.GetOutputFileName()
 
         now = time.time()
         if ( self.duration ):
@@ -455,17 +529,33 @@ class cRecording( object ):
 
         tstart = math.floor( tstart )
 
+        if ( self.do_parquet ):
+            writer = self.MakeParquetWriter( output_file_name, tstart )
+            writer.WriteBuffer( self.record_buffer, tstart )
+            writer.Close()
+            Print( "\nSaved recording of %s - %s to file %r" % (time.strftime( "%H:%M:%S", time.localtime( tstart ) ), time.strftime( "%H:%M:%S", time.localtime( now ) ), output_file_name) )
+            return
 
         f = open( output_file_name, "w")
         f.write( self.GetHeader( tstart, output_file_name ) )
-        for record in self.records:
-            t = record[0]
-            if ( t >= tstart ):
-                f.write( self.GetRecordString( record, tstart ) + "\n" )
+        for slices in self.record_buffer.GetSlices( tstart ):
+            (times, value_lists) = self.record_buffer.GetValueLists( slices )
+            f.writelines( line + "\n" for line in self.GetRecordStrings( times, value_lists, tstart ) )
         f.close()
         del f
         Print( "\nSaved recording of %s - %s to file %r" % (time.strftime( "%H:%M:%S", time.localtime( tstart ) ), time.strftime( "%H:%M:%S", time.localtime( now ) ), output_file_name) )
 
+    def Close(self):
+        if ( self.output_directly and self.record_buffer is not None ):
+            if ( len( self.record_buffer ) or self.parquet_writer is None ):
+                self.WriteParquetRowGroup()
+            self.parquet_writer.Close()
+            PrintD( "Wrote %d records to file %r" % (self.parquet_writer.nb_rows, self.parquet_writer.file_name) )
+        if ( self.record_buffer is not None ):
+            self.record_buffer.Close()
+        if ( self.output_writer is not None ):
+            self.output_writer.Close()
+
 def GetTitleFromPeekInput( peek_input ):
     """Clean up peek_input from unwanted cursor movement stuff and the like
     """
@@ -500,7 +590,7 @@ def process( bks, args, parameternames_get, parameterformats, parameternames_set
         Print( "  - Press Q (+optional_plot_title) + Return to save recording and quit" )
         Print( "  - Press S (+optional_plot_title) + Return to save recording and continue recording" )
         Print( "  - Press CTRL-C to quit without saving" )
-        Print( "  - Current output format is %r.\n    Press G + Return to switch to GPD or C + Return to CSV" % (current_file_format) )
+        Print( "  - Current output format is %r.\n    Press G + Return to switch to GPD, C + Return to CSV or P + Return to Parquet" % (current_file_format) )
         if ( current_file_format == ".gpd" ):
             Print( "  - Current time format is %r.\n    Press A + Return to switch to absolute or R + Return to relatie time" % (current_time_format) )
 
@@ -516,7 +606,7 @@ def process( bks, args, parameternames_get, parameterformats, parameternames_set
         tend = t0 + 24.0*3600.0 # 24h is like forever, right?
         output_directly = False
         cyclically = True
-        PrintHelp( g_file_format_name[ args.do_gpd ], g_time_format_name[ args.do_absolute_time ] )
+        PrintHelp( g_parquet_format_name if args.do_parquet else g_file_format_name[ args.do_gpd ], g_time_format_name[ args.do_absolute_time ] )
         PrintD( "Recording started, connected to %s." % (args.host) )
         peek.Start()
 
@@ -534,8 +624,12 @@ def process( bks, args, parameternames_get, parameterformats, parameternames_set
         PrintD( "Starting to record for %.1fs" % (args.duration) )
 
 
-    recording = cRecording( bks, parameternames_get, parameterformats, args.do_gpd, args.do_absolute_time, args.gpd_title, args.output_file_name_without_suffix, output_directly, cyclically, args.duration, args.separator, args.use_comma )
+    recording = cRecording( bks, parameternames_get, parameterformats, args.do_gpd, args.do_absolute_time, args.gpd_title, args.output_file_name_without_suffix, output_directly, cyclically, args.duration, args.separator, args.use_comma, args.spill_directory, args.do_parquet )
 
+    if ( cyclically and args.period > 0.0 ):
+        scheduler = cTickScheduler( args.period, args.overrun == "catch_up" )
+    else:
+        scheduler = None
     reconnecting = False
     t_last = None
     dt_min = 9999.9
@@ -597,12 +691,17 @@ def process( bks, args, parameternames_get, parameterformats, parameternames_set
                         break
                 if ( c in ["g", "G"] ):
                     recording.do_gpd = True
+                    recording.do_parquet = False
                     recording.use_comma = False # makes no sense for GPD
                     PrintD( "Switched output format to GPD")
                 if ( c in ["c", "C"] ):
                     recording.do_gpd = False
+                    recording.do_parquet = False
                     recording.use_comma = args.use_comma
                     PrintD( "Switched output format to CSV")
+                if ( c in ["p", "P"] ):
+                    recording.do_parquet = True
+                    PrintD( "Switched output format to Parquet")
                 if ( c in ["a", "A"] ):
                     recording.do_absolute_time = True
                     PrintD( "Switched GPD time format to absolute")
@@ -610,17 +709,23 @@ def process( bks, args, parameternames_get, parameterformats, parameternames_set
                     recording.do_absolute_time = False
                     PrintD( "Switched GPD time format to relative")
                 if ( c in ["h", "H"] ):
-                    PrintHelp( g_file_format_name[ recording.do_gpd ], g_time_format_name[ recording.do_absolute_time ])
+                    PrintHelp( g_parquet_format_name if recording.do_parquet else g_file_format_name[ recording.do_gpd ], g_time_format_name[ recording.do_absolute_time ])
                 peek.Clear()
 
-            if ( args.period > 0.0 ):
-                time.sleep( args.period )
-
             if ( now >= tend ):
                 break
+
+            if ( scheduler is not None ):
+                scheduler.WaitForNextTick()
     finally:
+        recording.Close()
         if ( dt_sum ):
-            PrintD( f"\nStatistics:\n  cycles recorded {dt_num}\n  dt_min {dt_min:.3f}\n  dt_max {dt_max:.3f}\n  dt_avg {dt_sum/dt_num:.3f}" )
+            statistics = f"\nStatistics:\n  cycles recorded {dt_num}\n  dt_min {dt_min:.3f}\n  dt_max {dt_max:.3f}\n  dt_avg {dt_sum/dt_num:.3f}"
+            if ( recording.output_writer is not None and recording.output_writer.nb_dropped ):
+                statistics += f"\n  output lines dropped {recording.output_writer.nb_dropped}"
+            if ( scheduler is not None ):
+                statistics += "".join( "\n  " + line for line in [ f"period {args.period:.3f}" ] + scheduler.GetLines() )
+            PrintD( statistics )
 
 def main():
     if ( "__file__" in globals() ):
@@ -652,7 +757,15 @@ def main():
     parser.add_argument( '-p', '--period',
                          dest="period",
                          default=0.0, type=float,
-                         help="""Period in s for cyclic processing of parameters. Default is 0.0 to cycle as fast as possible.""" )
+                         help="""Period in s for cyclic processing of parameters. Default is 0.0 to cycle as fast as possible.
+                         The cycles are started at fixed times (start time plus multiples of the period), so the period does not drift
+                         with the time needed for communication. See also --overrun.""" )
+    parser.add_argument( '--overrun',
+                         dest="overrun",
+                         choices=("skip", "catch_up"),
+                         default="skip",
+                         help="""What to do if a cycle takes longer than the period -p: "skip" the cycles missed
+                         or "catch_up" by processing the cycles missed as fast as possible. Default is %(default)s.""" )
     parser.add_argument( "-D", "--duration",
                            dest="duration",
                            type=float,
@@ -671,6 +784,15 @@ def main():
                          help="""Flag, if set then the output format is set to gpd (GNUplot data). Only usefull with -D set to non-None.
                          The default output format is csv (Character Separated Values).
                          With negative duration -D this can be changed interactively after start.""" )
+    parser.add_argument( '--parquet',
+                         dest="do_parquet",
+                         action="store_true",
+                         help="""Flag, if set then the output format is set to Parquet, a compressed columnar file format for
+                         data analysis tools like pandas. Only usefull with -D set to non-None. Requires pyarrow (pip install pyarrow).
+                         Arrays and structured parameters are stored with a column per element, the bits of the status and
+                         control dwords of plc_sync_input/plc_sync_output in additional bool columns.
+                         With positive or zero duration -D the records are written to the output file (see -o) in row groups while recording.
+                         With negative duration -D this can be changed interactively after start.""" )
     parser.add_argument( '--absolute_time',
                          dest="do_absolute_time",
                          action="store_true",
@@ -687,7 +809,8 @@ def main():
                            default="out{n}",
                            help="""The name of the output file to write to without suffix. Default is %(default)s.
                            If "{n}" is part of the file name then it will be replaced with an increasing number starting with 1.
-                           Usefull when the save-and-keep-recording is used. When --gpd is used a ".gpd" suffix will be appended, else a ".csv" suffix.""" )
+                           Usefull when the save-and-keep-recording is used. When --gpd is used a ".gpd" suffix will be appended,
+                           when --parquet is used a ".parquet" suffix, else a ".csv" suffix.""" )
     parser.add_argument( "--separator",
                            dest="separator",
                            type=str,
@@ -704,6 +827,17 @@ def main():
                          action="store_true",
                          help="""Flag, if set then when communicating repeatedly (i.e. when -D != None) then the writes are done only once.
                          Usefull for keeping communication alive after triggering a command that takes longer than the communication timeout.""" )
+    parser.add_argument( '--spill',
+                         dest="spill_directory",
+                         default=None, type=str,
+                         help="""Directory for temporary files to keep the recorded values in. Only used with negative duration -D.
+                         Default is to keep the recorded values in RAM. For very long recording windows this lets the operating system
+                         page the recorded values out to disk instead.""" )
+    parser.add_argument( '--bus_statistics',
+                         dest="bus_statistics",
+                         action="store_true",
+                         help="""Flag, if set then the latencies of the transactions with the gripper, the bus time per parameter
+                         and the transaction errors are printed at the end.""" )
 
     args = parser.parse_args()
 
@@ -731,6 +865,12 @@ def main():
     if ( args.force_reread ):
         maxage_s = 0.0
 
+    instruments = []
+    if ( args.bus_statistics ):
+        instruments = [ cLatencyCollector(), cErrorCounter() ]
+        for instrument in instruments:
+            AddGlobalInstrument( instrument )
+
     #--- Create the BKS object:
     bks = BKSBase( args.host, maxage_s, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=args.repeat_nb_tries )
 
@@ -742,6 +882,8 @@ def main():
                 bks.mb.serial.close()
             except Exception as e:
                 Error( f"Ignoring exception '{type(e)}' = {e} from close")
+        for instrument in instruments:
+            PrintD( "\n".join( instrument.GetLines() ) )
     Debug( "main finished" )
 
 if __name__ == '__main__':
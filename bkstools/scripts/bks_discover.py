@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Find BKS grippers with HTTP/JSON webinterface in IP networks.|n
+All addresses of the networks given (in CIDR notation or as single IPs) are probed
+concurrently for /adi/info.json and /module/info.json. For each gripper found the serial number,
+firmware version and fieldbus type are printed as soon as it is identified. The parameter metadata
+of the grippers found is stored in the metadata cache, so later connections to them are fast.|n
+|n
+Example usage:|n
+-  %(prog)s 192.168.1.0/24|n
+-  %(prog)s 10.49.57.0/24 10.49.58.13 --json|n
+-  %(prog)s 127.0.0.0/28 --port 8080    # fake grippers started with "fake_webserver -p 8080 -n 8 -c"|n
+'''
+
+import os.path
+import sys
+import json
+import time
+
+from bkstools.bks_lib.bks_discover import Discover
+from bkstools.bks_lib.debug import Print
+from bkstools.bks_lib import bks_options
+
+
+def PrintDevice( device ):
+    if ( device["error"] is not None ):
+        Print( f"{device['host']:<21} found but could not be identified: {device['error']}" )
+        return
+    serial_no = "-" if device["serial_no_txt"] is None else device["serial_no_txt"]
+    Print( f"{device['host']:<21} {serial_no:<12} {device['sw_version_txt'] or '-':<20} {device['fieldbus_type'] or '-'}" )
+    sys.stdout.flush()
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        # when runnging as an exe generated by py2exe then __file__ is not defined!
+        prog = "bks_discover.exe"
+
+    parser = bks_options.cBKSTools_OptionParser( prog=prog,
+                                                 description = __doc__,    # @UndefinedVariable
+                                                 host_required=False )
+
+    parser.add_argument( dest="networks",
+                         nargs="+",
+                         help="""The networks to scan in CIDR notation like 192.168.1.0/24, or single IPs.""" )
+
+    parser.add_argument( "-p", "--port",
+                         dest="port",
+                         default=80,
+                         type=int,
+                         help="""The TCP port of the webinterface. Default is %(default)d.""" )
+
+    parser.add_argument( "--connect_timeout",
+                         dest="connect_timeout",
+                         default=0.3,
+                         type=float,
+                         help="""Timeout in s for establishing a connection to an address. Default is %(default)s.""" )
+
+    parser.add_argument( "--read_timeout",
+                         dest="read_timeout",
+                         default=1.0,
+                         type=float,
+                         help="""Timeout in s for the response of a probe request. Default is %(default)s.""" )
+
+    parser.add_argument( "-j", "--nb_workers",
+                         dest="nb_workers",
+                         default=64,
+                         type=int,
+                         help="""Number of addresses to probe concurrently. Default is %(default)d.""" )
+
+    parser.add_argument( "--no_identify",
+                         dest="identify",
+                         action="store_false",
+                         help="""Only probe the addresses, do not connect to the grippers found to read their identification (and fill the metadata cache).""" )
+
+    parser.add_argument( "--json",
+                         dest="json",
+                         action="store_true",
+                         help="""Print each gripper found as one JSON object per line.""" )
+
+    args = parser.parse_args()
+
+    if ( args.json ):
+        report = lambda device: print( json.dumps( device ), flush=True )
+    else:
+        Print( f"{'host':<21} {'serial_no':<12} {'sw_version':<20} fieldbus_type" )
+        report = PrintDevice
+
+    t0 = time.time()
+    devices = Discover( args.networks, args.port, args.connect_timeout, args.read_timeout, args.nb_workers, args.identify,
+                        max_age_in_s=0.0 if args.force_reread else 5*60, debug=args.debug, report=report )
+    if ( not args.json ):
+        Print( f"Found {len( devices )} gripper(s) in {time.time() - t0:.1f}s" )
+    return 0
+
+
+if __name__ == '__main__':
+    from pyschunk.tools import attach_to_debugger
+    rc = attach_to_debugger.AttachToDebugger( main )
+    sys.exit( rc )
+    #main()
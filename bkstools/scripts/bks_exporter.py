@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Export the state of BKS grippers and the health of their transports as Prometheus metrics.|n
+The grippers are polled cyclically with batched reads, scrapes of the metrics endpoint http://BIND:PORT/metrics
+only render the cached values and never cause additional requests to the grippers.|n
+The first gripper is given with -H, further grippers as additional arguments.|n
+|n
+Example usage:|n
+-  %(prog)s -H 192.168.1.253 192.168.1.254|n
+-  %(prog)s -H /dev/ttyUSB0,12 /dev/ttyUSB0,13 --period 0.5 --port 9869|n
+-  curl http://127.0.0.1:9868/metrics|n
+'''
+
+import os.path
+import sys
+import threading
+
+from bkstools.bks_lib.bks_fleet import BKSFleet
+from bkstools.bks_lib.bks_exporter import cMetricsExporter, g_default_port, g_default_parameter_names
+from bkstools.bks_lib.debug import Print
+from bkstools.bks_lib import bks_options
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        # when runnging as an exe generated by py2exe then __file__ is not defined!
+        prog = "bks_exporter.exe"
+
+    parser = bks_options.cBKSTools_OptionParser( prog=prog,
+                                                 description = __doc__ )    # @UndefinedVariable
+
+    parser.add_argument( dest="hosts",
+                         nargs="*",
+                         default=[],
+                         help="""Further grippers to export, given like for -H.""" )
+
+    parser.add_argument( "--period",
+                         dest="period",
+                         default=1.0,
+                         type=float,
+                         help="""The polling period per gripper in s. Default is %(default)s.""" )
+
+    parser.add_argument( "-p", "--parameters",
+                         dest="parameter_names",
+                         nargs="+",
+                         default=g_default_parameter_names,
+                         help="""The names of the parameters to poll and export. Default is %(default)s.""" )
+
+    parser.add_argument( "--port",
+                         dest="port",
+                         default=g_default_port,
+                         type=int,
+                         help="""The TCP port to serve the metrics on. Default is %(default)d.""" )
+
+    parser.add_argument( "--bind",
+                         dest="bind",
+                         default="127.0.0.1",
+                         help="""The address to serve the metrics on, use 0.0.0.0 to allow remote scrapes. Default is %(default)s.""" )
+
+    args = parser.parse_args()
+
+    fleet = BKSFleet( [ args.host ] + args.hosts,
+                      period=args.period,
+                      parameter_names=args.parameter_names,
+                      max_age_in_s=0.0 if args.force_reread else 5*60.0,
+                      debug=args.debug,
+                      repeater_timeout=args.repeat_timeout,
+                      repeater_nb_tries=args.repeat_nb_tries )
+    exporter = cMetricsExporter( fleet, args.port, args.bind )
+    fleet.Start()
+    exporter.Start()
+    Print( f"Serving metrics on http://{args.bind}:{exporter.port}/metrics" )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.Stop()
+        fleet.Stop()
+
+
+if __name__ == '__main__':
+    from pyschunk.tools import attach_to_debugger
+    attach_to_debugger.AttachToDebugger( main )
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Poll many BKS grippers cyclically from a single process and show their latest values and statistics.|n
+The first gripper is given with -H, further grippers as additional arguments.|n
+|n
+Example usage:|n
+-  %(prog)s -H 192.168.1.253 192.168.1.254 192.168.1.255|n
+-  %(prog)s -H /dev/ttyUSB0,12 /dev/ttyUSB0,13 10.49.57.13 --period 0.02 -p plc_sync_input actual_pos|n
+'''
+
+import os.path
+import sys
+import time
+
+from bkstools.bks_lib.bks_fleet import BKSFleet
+from bkstools.bks_lib.debug import Print
+from bkstools.bks_lib import bks_options
+
+
+def PrintTable( fleet ):
+    Print( f"{'host':<24} {'state':<10} {'polls':>7} {'errors':>6} {'overruns':>8} {'lat_avg':>8} {'lat_max':>8}  values" )
+    statistics = fleet.GetStatistics()
+    for host in fleet.devices:
+        s = statistics[ host ]
+        snapshot = fleet.snapshots.get( host )
+        values = "-" if snapshot is None else repr( snapshot.values )
+        lat_avg = "-" if s["latency_avg"] is None else f"{s['latency_avg']*1000.0:.1f}ms"
+        lat_max = "-" if s["latency_max"] is None else f"{s['latency_max']*1000.0:.1f}ms"
+        Print( f"{host:<24} {s['state']:<10} {s['nb_polls']:>7} {s['nb_errors']:>6} {s['nb_overruns']:>8} {lat_avg:>8} {lat_max:>8}  {values}" )
+    Print( "" )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        # when runnging as an exe generated by py2exe then __file__ is not defined!
+        prog = "bks_fleet.exe"
+
+    parser = bks_options.cBKSTools_OptionParser( prog=prog,
+                                                 description = __doc__ )    # @UndefinedVariable
+
+    parser.add_argument( dest="hosts",
+                         nargs="*",
+                         default=[],
+                         help="""Further grippers to poll, given like for -H.""" )
+
+    parser.add_argument( "--period",
+                         dest="period",
+                         default=0.1,
+                         type=float,
+                         help="""The polling period per gripper in s. Default is %(default)s.""" )
+
+    parser.add_argument( "-p", "--parameters",
+                         dest="parameter_names",
+                         nargs="+",
+                         default=[ "plc_sync_input" ],
+                         help="""The names of the parameters to poll. Default is %(default)s.""" )
+
+    parser.add_argument( "-i", "--interval",
+                         dest="interval",
+                         default=1.0,
+                         type=float,
+                         help="""Interval in s for printing the table of values and statistics. Default is %(default)s.""" )
+
+    parser.add_argument( "-d", "--duration",
+                         dest="duration",
+                         default=0.0,
+                         type=float,
+                         help="""Time in s to poll, 0.0 means until interrupted by CTRL-C. Default is %(default)s.""" )
+
+    args = parser.parse_args()
+
+    fleet = BKSFleet( [ args.host ] + args.hosts,
+                      period=args.period,
+                      parameter_names=args.parameter_names,
+                      max_age_in_s=0.0 if args.force_reread else 5*60.0,
+                      debug=args.debug,
+                      repeater_timeout=args.repeat_timeout,
+                      repeater_nb_tries=args.repeat_nb_tries )
+    fleet.Start()
+    t_end = time.time() + args.duration
+    try:
+        while ( args.duration <= 0.0 or time.time() < t_end ):
+            time.sleep( args.interval )
+            PrintTable( fleet )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.Stop()
+
+
+if __name__ == '__main__':
+    from pyschunk.tools import attach_to_debugger
+    attach_to_debugger.AttachToDebugger( main )
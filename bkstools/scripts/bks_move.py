@@ -14,6 +14,7 @@ Example usage:|n
 -  %(prog)s -H 10.49.57.13 --pos=50|n
 -  %(prog)s -H 10.49.57.13 --pos=10.5,50,100 --vel=50|n
 -  %(prog)s -H 10.49.57.13 --pos=10,50,stay5s,10r,-20r|n
+-  %(prog)s -H 10.49.57.13 --pos=10,50,100 --wait_time=0 --stream --loop|n
 '''
 #-  %(prog)s -H 10.49.57.13 --pos=10.5,50,100 --vel=50,10,25.5 --acc=10,20,30 --loop --interactive
 
@@ -22,7 +23,10 @@ import re
 import pyschunk.tools.mylogger
 import time
 from bkstools.bks_lib.bks_base import BKSBase
+from bkstools.bks_lib.bks_module import BKSModule, GripperError, GripperWarning, GripperTimeout
+from bkstools.bks_lib.bks_command_queue import cCommandQueue
 from bkstools.bks_lib.bks_modbus import cRepeater
+from bkstools.bks_lib.bks_retry import GetSummaryLines
 from pyschunk.generated.generated_enums import eCmdCode
 from bkstools.bks_lib.debug import Print, ApplicationError
 from bkstools.bks_lib.debug import InsufficientWriteRights  # @UnusedImport
@@ -65,6 +69,103 @@ def GetActualPos( plc_sync_input ):
         return pos_um / 1000.0
 
 
+def PrintTransactionStatistics( bks ):
+    """Print the per device communication statistics (available for Modbus-RTU only)
+    """
+    if ( "mb" in bks.__dict__ ):
+        for line in GetSummaryLines( bks.GetTransactionStatistics().AsDict() ):
+            Print( line )
+
+
+def GetGripperDiagnosis( bks ):
+    """Return a description of the error and warning code of bks plus the latest message from its syslog
+    """
+    (err_code, wrn_code) = bks.get_values( [ "err_code", "wrn_code" ] )
+    try:
+        ec_str = bks.enums["err_code"].GetName( err_code, "?" )
+    except KeyError:
+        ec_str = "?"
+    try:
+        wc_str = bks.enums["wrn_code"].GetName( wrn_code, "?" )
+    except KeyError:
+        wc_str = "?"
+    bks.sys_msg_req = 0
+    msg = bks.sys_msg_buffer
+    return f"Gripper reports error 0x{err_code:02x} ({ec_str}), warning 0x{wrn_code:02x} ({wc_str}).\nDetails from syslog: {msg}"
+
+
+def StreamMovements( args, poss, vels ):
+    '''Submit the movement list to a cCommandQueue at once, so that each movement is started as soon as
+    the previous one is completed, with as few read/write accesses as possible.
+    '''
+    gripper = BKSModule( args.host, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=args.repeat_nb_tries )
+    gripper.print_command_timing = False
+    command_queue = cCommandQueue( gripper )
+    Print( f"Starting at {GetActualPos( gripper.last_plc_sync_input ):.1f} mm" )
+
+    def GetResult( what, future ):
+        # return the result of future, if the command failed raise an ApplicationError with the state of the gripper
+        try:
+            result = future.result()
+        except ( GripperError, GripperWarning, GripperTimeout ) as e:
+            command_queue.CancelPending()
+            command_queue.Join()
+            raise ApplicationError( f"{what} failed: {e!r}\n{GetGripperDiagnosis( gripper )}" ) from None   # the message contains e already
+        if ( result is False ):
+            raise ApplicationError( f"{what} failed.\n{GetGripperDiagnosis( gripper )}" )
+        return result
+
+    def Move( move_function, pos_um, vel_ums ):
+        # executed by the command_queue, returns the actual position in mm after the movement
+        if ( not move_function( pos_um, vel_ums ) ):
+            return False
+        return GetActualPos( gripper.last_plc_sync_input )
+
+    looping = True # doit at least once
+    nb_loops = 0
+    try:
+        # acknowledge pending errors like main() does (a gripper is in ERR_FAST_STOP after power on):
+        GetResult( "Acknowledging the gripper", command_queue.MakeReady() )
+
+        while looping:
+            futures = []
+            for (p,v) in zip( poss, vels ):
+                if ( type(p) is str and p.startswith( "stay") ):
+                    T = float( re.sub( r"stay\s*(\d+(\.\d*)?|\.\d+)s?", r"\1", p ) )
+                    futures.append( (f"paused for {T:.3f}s", command_queue.Pause( T )) )
+                    continue
+                if ( type(p) is str and p.endswith( "r" ) ):
+                    p = float( re.sub( r"([+-]?\d+(\.\d*)?|[+-]?\.\d+)r", r"\1", p ) )
+                    futures.append( (f"moved relative by {p:.1f} mm with {v:.1f} mm/s", command_queue.Submit( Move, gripper.move_to_relative_position, int( p*1000.0 ), int( v*1000.0 ) )) )
+                elif ( type(p) is str ):
+                    raise ApplicationError( f"Invalid position {p}. giving up." )
+                else:
+                    futures.append( (f"moved absolute to {p:.1f} mm with {v:.1f} mm/s", command_queue.Submit( Move, gripper.move_to_absolute_position, int( p*1000.0 ), int( v*1000.0 ) )) )
+                if ( args.wait_after_pos_reached > 0.0 ):
+                    command_queue.Pause( args.wait_after_pos_reached )
+
+            for (description, future) in futures:
+                result = GetResult( "Movement", future )
+                if ( result is None ):
+                    Print( description )
+                else:
+                    Print( f"{description}, reached {result:.1f} mm" )
+            looping = args.loop
+            nb_loops += 1
+    except KeyboardInterrupt:
+        Print( "\nUser interrupt, fast-stopping" )
+        command_queue.CancelPending()
+        command_queue.Join()
+        gripper.command_code = eCmdCode.CMD_FAST_STOP
+    finally:
+        command_queue.CancelPending()
+        command_queue.Close()
+        Print( "\n===" )
+        Print( f"finally reached {GetActualPos( gripper.last_plc_sync_input ):.1f} mm after {nb_loops} movement cycles." )
+        Print( f"Executed {command_queue.nb_executed} commands, {command_queue.nb_failed} failed." )
+        PrintTransactionStatistics( gripper )
+
+
 def main():
     if ( "__file__" in globals() ):
         prog = os.path.basename( globals()["__file__"] )
@@ -117,6 +218,11 @@ def main():
                          action='store_true',
                          help="Flag, if set then the movement list will be processed interactively, i.e. each new movement must be explicitly confirmed by pressing RETURN." )
 
+    parser.add_argument( '--stream',
+                         action='store_true',
+                         help="""Flag, if set then the whole movement list is submitted at once via the cyclic process data (plc_sync_output)
+                         and each movement is started as soon as the previous one is completed. Cannot be combined with --interactive or --auto_acknowledge.""" )
+
     parser.add_argument( '--wait_time',
                          dest="wait_after_pos_reached",
                          default=0.5, type=float,
@@ -134,6 +240,11 @@ def main():
     #curs=mklist( args.curs, poss )
     eps = 0.1
 
+    if ( args.stream ):
+        if ( args.interactive or args.auto_acknowledge ):
+            raise ApplicationError( "--stream cannot be combined with --interactive or --auto_acknowledge" )
+        return StreamMovements( args, poss, vels )
+
     bks = BKSBase( args.host, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=args.repeat_nb_tries )
 
     plc_sync_input = bks.plc_sync_input
@@ -281,6 +392,7 @@ def main():
         except ZeroDivisionError:
             # cRepeater not available for BKS_HTTP modules, so the print yields a ZeroDivisionError. Just ignore
             pass
+        PrintTransactionStatistics( bks )
 
 if __name__ == '__main__':
     from pyschunk.tools import attach_to_debugger
@@ -6,12 +6,22 @@
 '''
 Scan for Modbus-RTU devices.|n
 |n
+Each slave ID is probed once with a short timeout first. Only IDs that answered
+(with a value, an exception or garbage) are rescanned right away with a reduced
+response expectancy to detect multiple slaves using the same ID (colliding IDs).
+Several serial interfaces given with -H and -P are scanned concurrently.
+Results are printed as soon as an ID is done, with --json as one JSON object per line.|n
+|n
 Example usage:|n
 -  %(prog)s -H COM3|n
+-  %(prog)s -H /dev/ttyUSB0 -P /dev/ttyUSB1,,9600 --json|n
 '''
 
 import os.path
 import sys
+import json
+import time
+import threading
 import pyschunk.tools.mylogger
 
 from bkstools.bks_lib.bks_base import BKSBase, GetModbusSettings
@@ -29,91 +39,184 @@ g_logmethod = logger.info
 from bkstools.bks_lib import bks_options
 
 
-def ScanID( bks, mb_id, parametername, nb_rescans, response_expectancy ):
-    """Try to read the parameter named parametername from the slave with ID mb_id up to nb_rescans times.
-    Return the first value found or None if no one answered
+def GetFirstTimeout( baudrate ):
+    """Return the default timeout in s for the first probe of a slave ID: the time to transmit a request and
+    its response (8 + 9 bytes of 11 bits) twice plus 20ms for the slave to answer
     """
-    Print( f"Trying {mb_id} ... ", end="" )
-
-    bks.mb.address = mb_id
-    SetShowDebug( False )
-    for i in range(0,nb_rescans):  # @UnusedVariable
-        try:
-            value = bks.get_value( parametername )
-            return value
-        except minimalmodbus.ModbusException as e:  # @UnusedVariable
-            # nothing or garbage received, so try with higher response_expectancy
-            bks.SetResponseExpectancy( response_expectancy )
-    Print( f"no" )
-    return None
+    return 0.020 + 2.0 * 17 * 11 / baudrate
 
 
-def ScanIDs( bks, scan_id_range, nb_rescans, response_expectancy ):
-    scan_ids = pyschunk.tools.util.RangeDefToList( scan_id_range )
+def SetTimeout( bks, timeout ):
+    """Use a fixed response timeout of timeout s for the slave currently addressed by bks
+    """
+    statistics = bks.GetTransactionStatistics()
+    statistics.adaptive_timeout = False
+    statistics.base_timeout = timeout
 
-    Print( f"Step 1/2: Start initial scanning for Modbus-RTU devices on IDs {scan_id_range}" )
 
-    serial_no_txts = dict()
-    serial_no_nums = dict()
+def ReadID( bks, parametername ):
+    """Try to read the parameter named parametername once from the slave currently addressed by bks.
+    Return a tuple (outcome, value) with outcome one of
+    "value" (value is the value read), "silent" (no response), "exception" (the slave reported an exception)
+    or "garbage" (an invalid response, e.g. from colliding slaves).
+    """
+    # constant parameters like serial_no_txt are cached per object, but here each read may address another slave:
+    bks.cached_index_to_value.pop( bks.MakeIndex( parametername ), None )
+    try:
+        return ("value", bks.get_value( parametername ))
+    except minimalmodbus.ModbusException as e:
+        e = getattr( e, "original_exception", e )  # unwrap a RepeaterException
+        if ( isinstance( e, minimalmodbus.NoResponseError ) ):
+            return ("silent", None)
+        if ( isinstance( e, minimalmodbus.SlaveReportedException ) ):
+            return ("exception", None)
+        return ("garbage", None)
+
+
+def RescanID( bks, nb_rescans, response_expectancy, max_tries ):
+    """Rescan the slave currently addressed by bks, which answered the first probe, for colliding slaves.
+    With a response_expectancy of n each slave answers with a probability of 1/n only, so repeated reads
+    yield the serial numbers of all slaves using the ID. Rescanning stops after nb_rescans tries in a row without
+    a new serial number (or after max_tries tries).
+    Return a tuple (set of serial_no_num values, set of serial_no_txt values, number of tries).
+    """
+    serial_no_nums = set()
+    serial_no_txts = set()
+    bks.SetResponseExpectancy( response_expectancy )
+    nb_tries = 0
+    nb_tries_without_news = 0
+    while ( nb_tries_without_news < nb_rescans  and  nb_tries < max_tries ):
+        nb_tries += 1
+        nb_tries_without_news += 1
+        (outcome, serial_no_num) = ReadID( bks, "serial_no_num" )
+        if ( outcome == "value" and serial_no_num not in serial_no_nums ):
+            serial_no_nums.add( serial_no_num )
+            nb_tries_without_news = 0
+        (outcome, serial_no_txt) = ReadID( bks, "serial_no_txt" )
+        if ( outcome == "value" ):
+            serial_no_txt = serial_no_txt.strip( ' \t\0' )
+            if ( serial_no_txt not in serial_no_txts ):
+                serial_no_txts.add( serial_no_txt )
+                nb_tries_without_news = 0
+    # let the slave(s) answer every request again:
+    bks.SetResponseExpectancy( 1 )
+    return (serial_no_nums, serial_no_txts, nb_tries)
+
+
+def ScanPort( host, scan_ids, nb_rescans, response_expectancy, first_timeout, rescan_timeout, repeater_timeout, debug, report ):
+    """Scan the slave IDs scan_ids on the serial interface given by host (see --host) and call report( result )
+    with a result dict for each ID that answered, as soon as it is done.
+    Return the list of these result dicts.
+    """
+    (port, slave_id, baudrate, nb_data_bits, parity, nb_stop_bits) = GetModbusSettings( host )  # @UnusedVariable
+    if ( first_timeout is None ):
+        first_timeout = GetFirstTimeout( baudrate )
+    if ( rescan_timeout is None ):
+        rescan_timeout = 3.0 * first_timeout
+
+    bks = BKSBase( host, debug=debug, repeater_timeout=repeater_timeout, repeater_nb_tries=1 )
+    # silent and colliding slave IDs are expected here, so do not stop sending requests to them:
+    bks.use_circuit_breaker = False
+
+    results = []
+    t0 = time.time()
     for mb_id in scan_ids:
-        serial_no_num = ScanID( bks, mb_id, "serial_no_num", nb_rescans, response_expectancy )
-
-        if ( not serial_no_num is None ):
-            Print( "found!")
-            serial_no_nums[ mb_id ] = {serial_no_num}
-
-    found_ids = list( serial_no_nums.keys() )
-    found_ids.sort()
-    Print( f"\nStep 2/2: Rescanning for Modbus-RTU devices with colliding IDs on found IDs {found_ids}" )
+        bks.mb.address = mb_id
+        SetTimeout( bks, first_timeout )
+        (first_outcome, serial_no_num) = ReadID( bks, "serial_no_num" )  # @UnusedVariable
+        if ( first_outcome == "silent" ):
+            continue
+
+        SetTimeout( bks, rescan_timeout )
+        (serial_no_nums, serial_no_txts, nb_tries) = RescanID( bks, nb_rescans, response_expectancy, 4 * nb_rescans * response_expectancy )
+        nb_slaves = max( len( serial_no_nums ), len( serial_no_txts ) )
+        result = dict( port=port,
+                       id=mb_id,
+                       status="collision" if nb_slaves > 1 else "found" if nb_slaves == 1 else "unidentified",
+                       nb_slaves=nb_slaves,
+                       serial_no_nums=[ f"0x{sn_num:08x}" for sn_num in sorted( serial_no_nums ) ],
+                       serial_no_txts=sorted( serial_no_txts ),
+                       first_probe=first_outcome,
+                       nb_rescans=nb_tries,
+                       t=round( time.time() - t0, 3 ) )
+        results.append( result )
+        report( result )
+    return results
+
+
+class cReporter(object):
+    """Print results of the concurrent ScanPort() calls, either human readable or as one JSON object per line
+    """
+    def __init__( self, as_json ):
+        self.as_json = as_json
+        self.lock = threading.Lock()
+
+    def Report( self, result ):
+        with self.lock:
+            if ( self.as_json ):
+                print( json.dumps( result ), flush=True )
+                return
+            if ( result["nb_slaves"] == 0 ):
+                Print( f"  {result['port']}: ID {result['id']} answered ({result['first_probe']}) but could not be identified" )
+                return
+            sn_nums = ", ".join( result["serial_no_nums"] )
+            sn_txts = ", ".join( repr( sn_txt ) for sn_txt in result["serial_no_txts"] )
+            Print( f"  {result['port']}: Found {result['nb_slaves']} slave(s) with ID {result['id']}. Serial numbers {sn_nums} ({sn_txts})" )
+            sys.stdout.flush()
+
+    def Event( self, **kwargs ):
+        with self.lock:
+            if ( self.as_json ):
+                print( json.dumps( kwargs ), flush=True )
+            else:
+                Print( kwargs["message"] )
+
+
+def ScanIDs( hosts, scan_id_range, nb_rescans, response_expectancy, first_timeout=None, rescan_timeout=None, debug=False, reporter=None, repeater_timeout=0.0 ):
+    """Scan the slave IDs scan_id_range on all serial interfaces hosts concurrently (one thread per interface).
+    Return a tuple (list of result dicts, dict mapping each port to the list of its colliding IDs)
+    """
+    scan_ids = pyschunk.tools.util.RangeDefToList( scan_id_range )
+    if ( reporter is None ):
+        reporter = cReporter( as_json=False )
 
-    # For rescanning try with higher response_expectancy right away:
-    bks.SetResponseExpectancy( response_expectancy )
+    SetShowDebug( False )
+    reporter.Event( event="start", ports=hosts, ids=scan_id_range,
+                    message=f"Scanning for Modbus-RTU devices on IDs {scan_id_range} on {', '.join( hosts )}" )
 
-    for mb_id in found_ids:
-        for i in range(0,nb_rescans):  # @UnusedVariable
-            serial_no_num = ScanID( bks, mb_id, "serial_no_num", nb_rescans, response_expectancy )
-            if ( not serial_no_num is None  ):
-                serial_no_nums[ mb_id ].add( serial_no_num )
-
-            serial_no_txt = ScanID( bks, mb_id, "serial_no_txt", nb_rescans, response_expectancy )
-            if ( not serial_no_txt is None  ):
-                if ( mb_id in serial_no_txts ):
-                    serial_no_txts[ mb_id ].add( serial_no_txt )
-                else:
-                    serial_no_txts[ mb_id ] = {serial_no_txt}
-
-    Print( "" )
-
-    Print( "\nFinal results:" )
-    colliding_ids = []
-    for mb_id in found_ids:
-        sn_nums = ""
-        sep = ""
-        for sn_num in serial_no_nums[ mb_id ]:
-            sn_nums += sep + f"0x{sn_num:08x}"
-            sep = ", "
-
-        sn_txts = ""
-        sep = ""
-        for sn_txt in serial_no_txts[ mb_id ]:
-            sn_txt = sn_txt.strip(' \t\0')
-            sn_txts += sep + f"{sn_txt!r}"
-            sep = ", "
-
-        nb_slaves = max( len( serial_no_nums[ mb_id ] ), len( serial_no_txts[ mb_id ] ) )
-        Print( f"  Found {nb_slaves} slave(s) with ID {mb_id}. Serial numbers {sn_nums} ({sn_txts})")
-        if ( nb_slaves > 1 ):
-            colliding_ids.append( mb_id )
+    results = []
+    errors = []
+    def ScanPortThread( host ):
+        try:
+            results.extend( ScanPort( host, scan_ids, nb_rescans, response_expectancy, first_timeout, rescan_timeout, repeater_timeout, debug, reporter.Report ) )
+        except Exception as e:
+            errors.append( e )
+            reporter.Event( event="error", port=host, error=repr( e ), message=f"  {host}: scan failed: {e!r}" )
+
+    t0 = time.time()
+    threads = [ threading.Thread( target=ScanPortThread, args=(host,), name=f"bks_scan {host}" ) for host in hosts ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results.sort( key=lambda result: (result["port"], result["id"]) )
+    colliding_ids = dict()
+    for result in results:
+        if ( result["status"] == "collision" ):
+            colliding_ids.setdefault( result["port"], [] ).append( result["id"] )
 
     if ( len( colliding_ids ) > 0 ):
-        Print( f"  Found {len(colliding_ids)} slave IDs used by multiple devices: {colliding_ids!r} => colliding IDs!!! ")
+        message = f"Found slave IDs used by multiple devices: {colliding_ids!r} => colliding IDs!!!"
     else:
-        Print( f"  Found no slave IDs used by multiple devices. Slave_id mapping seems to be ok.")
+        message = f"Found {len(results)} slave(s), no slave IDs used by multiple devices. Slave_id mapping seems to be ok."
+    reporter.Event( event="done", nb_found=len( results ), colliding_ids=colliding_ids, nb_errors=len( errors ), duration=round( time.time() - t0, 3 ),
+                    message="\nFinal results:\n  " + message + f" (scan took {time.time() - t0:.1f}s)" )
 
-    return (found_ids, colliding_ids)
+    return (results, colliding_ids)
 
 
-def ResolveCollisions( found_ids, colliding_ids ):
+def ResolveCollisions( results, colliding_ids ):
     if ( len(colliding_ids) == 0 ):
         return
 
@@ -130,6 +233,13 @@ def main():
     parser = bks_options.cBKSTools_OptionParser( prog=prog,
                                                  description = __doc__ )    # @UndefinedVariable
 
+    parser.add_argument( '-P', "--port",
+                         dest="ports",
+                         default=[],
+                         action="append",
+                         type=str,
+                         help="""Further serial interface to scan concurrently to the one given with --host, in the same format. Can be given multiple times.""" )
+
     parser.add_argument( '-i', "--ids",
                          dest="scan_ids",
                          default="1-247",
@@ -140,27 +250,45 @@ def main():
                          dest="nb_rescans",
                          default=5,
                          type=int,
-                         help="""The number of rescan tries. Default is %(default)d.""" )
+                         help="""The number of rescan tries in a row without finding a new serial number after which rescanning an ID that answered stops. Default is %(default)d.""" )
 
     parser.add_argument( '-e', "--nb_expected", "--response_expectancy",
                          dest="response_expectancy",
                          default=2,
                          type=int,
-                         help="""The response expectancy (likelihood for sending a response) to set. This can be used to make slaves respond with a probability of 1/response_expectancy only.
+                         help="""The response expectancy (likelihood for sending a response) to set for rescanning. This makes slaves respond with a probability of 1/response_expectancy only.
                          If you expect to find 2 slaves with colliding slave-ID then set this to 2, for 3 to 3 and so on. Default is %(default)d.""" )
 
+    parser.add_argument( "--first_timeout",
+                         dest="first_timeout",
+                         default=None,
+                         type=float,
+                         help="""The response timeout in s for the first probe of each ID. Default is derived from the baudrate (about 23ms at 115200 bit/s).""" )
+
+    parser.add_argument( "--rescan_timeout",
+                         dest="rescan_timeout",
+                         default=None,
+                         type=float,
+                         help="""The response timeout in s for rescanning IDs that answered. Default is 3 times the first timeout.""" )
 
+    parser.add_argument( "--json",
+                         dest="json",
+                         action="store_true",
+                         help="""Print the results as one JSON object per line, as soon as they are available.""" )
 
     args = parser.parse_args()
 
-    if ( GetModbusSettings( args.host ) is None ):
-        print( f"Scanning works for Modbus-RTU devices only!\n{args.host!r} does not denote a serial interface to use for communication." )
-        return 1
-    bks = BKSBase( args.host, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=1 )
+    hosts = [ args.host ] + args.ports
+    for host in hosts:
+        if ( host is None  or  GetModbusSettings( host ) is None ):
+            print( f"Scanning works for Modbus-RTU devices only!\n{host!r} does not denote a serial interface to use for communication." )
+            return 1
 
-    (found_ids, colliding_ids) = ScanIDs( bks, args.scan_ids, args.nb_rescans, args.response_expectancy )
+    (results, colliding_ids) = ScanIDs( hosts, args.scan_ids, args.nb_rescans, args.response_expectancy,
+                                        args.first_timeout, args.rescan_timeout, args.debug, cReporter( args.json ),
+                                        repeater_timeout=args.repeat_timeout )
 
-    ResolveCollisions( found_ids, colliding_ids )
+    ResolveCollisions( results, colliding_ids )
 
 if __name__ == '__main__':
     from pyschunk.tools import attach_to_debugger
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Save, compare and restore the parameters of a BKS gripper (like EGI/EGU/EGK), e.g. to back up its configuration
+or to commission a replacement gripper.|n
+- save FILE: read all readable parameters with batched requests and store them, tagged with the firmware version, in FILE.|n
+- diff FILE: show the parameters whose values differ between FILE and the gripper.|n
+- diff FILE1 FILE2: show the parameters whose values differ between two snapshot files (no gripper needed).|n
+- restore FILE: write only the writable parameters whose values differ between FILE and the gripper.
+  Commands, process data and the identity of the gripper (serial number etc.) are never restored.|n
+FILE is compact JSON, gzip compressed if the name ends with .gz.|n
+|n
+Example usage:|n
+-  %(prog)s -H 10.49.57.13 save egk40.json.gz|n
+-  %(prog)s -H 10.49.57.14 diff egk40.json.gz|n
+-  %(prog)s -H 10.49.57.14 restore egk40.json.gz --dry_run|n
+-  %(prog)s -H /dev/ttyUSB0,12 restore egk40.json.gz --exclude zero_pos_ofs|n
+-  %(prog)s diff egk40.json.gz egk40_new.json.gz|n
+'''
+
+import os.path
+import sys
+import time
+
+from bkstools.bks_lib.bks_base import BKSBase
+from bkstools.bks_lib.bks_snapshot import SaveSnapshot, WriteSnapshotFile, ReadSnapshotFile, DiffSnapshot, DiffValues, RestoreSnapshot, ModuleTypeText
+from bkstools.bks_lib.debug import Print, ApplicationError
+from bkstools.bks_lib import bks_options
+
+
+def PrintDiff( diff, left="saved", right="live" ):
+    for (name, a, b) in diff:
+        Print( f"{name:<24} {left}={a!r:<30} {right}={b!r}" )
+    Print( f"{len( diff )} parameters differ" )
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        # when runnging as an exe generated by py2exe then __file__ is not defined!
+        prog = "bks_snapshot.exe"
+
+    parser = bks_options.cBKSTools_OptionParser( prog=prog,
+                                                 description = __doc__,    # @UndefinedVariable
+                                                 host_required=False )
+
+    parser.add_argument( dest="command",
+                         choices=[ "save", "diff", "restore" ],
+                         help="""What to do, see above.""" )
+
+    parser.add_argument( dest="files",
+                         nargs="+",
+                         help="""The snapshot file, for diff optionally a second snapshot file to compare with instead of the gripper.""" )
+
+    parser.add_argument( "--exclude",
+                         dest="exclude",
+                         nargs="+",
+                         default=[],
+                         help="""Names of further parameters not to restore.""" )
+
+    parser.add_argument( "--dry_run",
+                         dest="dry_run",
+                         action="store_true",
+                         help="""For restore: only show the parameters that would be written.""" )
+
+    parser.add_argument( "--ignore_firmware",
+                         dest="ignore_firmware",
+                         action="store_true",
+                         help="""For restore: restore even if the module type or firmware version of the gripper differs from the one of the snapshot.""" )
+
+    args = parser.parse_args()
+
+    if ( args.command == "diff" and len( args.files ) == 2 ):
+        (a, b) = [ ReadSnapshotFile( path ) for path in args.files ]
+        if ( a["firmware"].get( "module_type" ) != b["firmware"].get( "module_type" ) ):
+            Print( f"Module type differs: {ModuleTypeText( a['firmware'] )} != {ModuleTypeText( b['firmware'] )}" )
+        if ( a["firmware"].get( "sw_version_num" ) != b["firmware"].get( "sw_version_num" ) ):
+            Print( f"Firmware differs: {a['firmware'].get( 'sw_version_txt' )!r} != {b['firmware'].get( 'sw_version_txt' )!r}" )
+        PrintDiff( DiffValues( a["values"], b["values"] ), "1", "2" )
+        return 0
+
+    if ( len( args.files ) != 1 ):
+        parser.error( f"{args.command} needs exactly one file" )
+    if ( args.host is None ):
+        parser.error( f"{args.command} needs a gripper, given with -H" )
+    path = args.files[0]
+
+    bks = BKSBase( args.host, max_age_in_s=0.0 if args.force_reread else 5*60.0, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=args.repeat_nb_tries )
+
+    if ( args.command == "save" ):
+        t0 = time.time()
+        snapshot = SaveSnapshot( bks )
+        WriteSnapshotFile( path, snapshot )
+        Print( f"Saved {len( snapshot['values'] )} parameters of {args.host} (firmware {snapshot['firmware'].get( 'sw_version_txt' )!r}) to {path} in {time.time()-t0:.2f}s" )
+        return 0
+
+    snapshot = ReadSnapshotFile( path )
+    if ( args.command == "diff" ):
+        PrintDiff( DiffSnapshot( bks, snapshot ) )
+        return 0
+
+    t0 = time.time()
+    try:
+        (written, failed) = RestoreSnapshot( bks, snapshot, exclude=args.exclude, dry_run=args.dry_run, check_firmware=not args.ignore_firmware )
+    except ApplicationError as e:
+        Print( f"{e}\nUse --ignore_firmware to restore anyway." )
+        return 1
+    for (name, old, new) in written:
+        Print( f"{'would write' if args.dry_run else 'wrote'} {name:<24} {old!r} -> {new!r}" )
+    for (name, e) in failed:
+        Print( f"failed to write {name}: {e!r}" )
+    Print( f"{'Would write' if args.dry_run else 'Wrote'} {len( written )} parameters, {len( failed )} failed, in {time.time()-t0:.2f}s" )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    from pyschunk.tools import attach_to_debugger
+    rc = attach_to_debugger.AttachToDebugger( main )
+    sys.exit( rc )
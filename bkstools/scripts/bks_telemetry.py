@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Telemetry server: share a single connection to a BKS gripper with several local clients.|n
+The gripper given with -H is polled cyclically, the snapshots of the polled parameters are published to all clients
+connected to the local TCP port, as deltas after an initial full snapshot. Other reads, writes and enums are forwarded
+to the gripper. Scripts like bks_status or bks_jog attach to the server with -H telemetry:PORT
+instead of connecting to the gripper themselves.|n
+|n
+Example usage:|n
+-  %(prog)s -H 192.168.1.253|n
+-  %(prog)s -H /dev/ttyUSB0,12 --period 0.02 --port 8942 -p plc_sync_input actual_pos actual_vel system_state|n
+-  bks_status -H telemetry:8942|n
+'''
+
+import os.path
+import sys
+import time
+
+from bkstools.bks_lib.bks_base import BKSBase
+from bkstools.bks_lib.bks_telemetry import cTelemetryServer, g_default_port
+from bkstools.bks_lib.debug import Print
+from bkstools.bks_lib import bks_options
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        # when runnging as an exe generated by py2exe then __file__ is not defined!
+        prog = "bks_telemetry.exe"
+
+    parser = bks_options.cBKSTools_OptionParser( prog=prog,
+                                                 description = __doc__ )    # @UndefinedVariable
+
+    parser.add_argument( "--period",
+                         dest="period",
+                         default=0.05,
+                         type=float,
+                         help="""The polling period in s. Default is %(default)s.""" )
+
+    parser.add_argument( "-p", "--parameters",
+                         dest="parameter_names",
+                         nargs="+",
+                         default=[ "plc_sync_input", "plc_sync_output", "actual_pos", "actual_vel", "actual_cur", "system_state", "err_code", "wrn_code" ],
+                         help="""The names of the parameters to poll and publish. Parameters unknown to the gripper are ignored. Default is %(default)s.""" )
+
+    parser.add_argument( "--port",
+                         dest="port",
+                         default=g_default_port,
+                         type=int,
+                         help="""The TCP port to serve the clients on. Default is %(default)s.""" )
+
+    parser.add_argument( "--bind",
+                         dest="bind",
+                         default="127.0.0.1",
+                         help="""The address to serve the clients on. Default is %(default)s, i.e. local clients only.""" )
+
+    parser.add_argument( "-i", "--interval",
+                         dest="interval",
+                         default=10.0,
+                         type=float,
+                         help="""Interval in s for printing statistics. Default is %(default)s.""" )
+
+    args = parser.parse_args()
+
+    bks = BKSBase( args.host, max_age_in_s=0.0 if args.force_reread else 5*60.0, debug=args.debug, repeater_timeout=args.repeat_timeout, repeater_nb_tries=args.repeat_nb_tries )
+    parameter_names = [ name for name in args.parameter_names if name in bks.name_to_index ]
+    for name in args.parameter_names:
+        if ( name not in parameter_names ):
+            Print( f"Ignoring parameter {name!r} unknown to {args.host}" )
+
+    server = cTelemetryServer( bks, parameter_names, period=args.period, address=args.bind, port=args.port )
+    server.Start()
+    Print( f"Serving {args.host} on {server.address[0]}:{server.address[1]}, attach with -H telemetry:{server.address[0]}:{server.address[1]}" )
+    try:
+        while True:
+            time.sleep( args.interval )
+            Print( server.GetStatistics() )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.Stop()
+
+
+if __name__ == '__main__':
+    from pyschunk.tools import attach_to_debugger
+    attach_to_debugger.AttachToDebugger( main )
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# Created on 2026-10-18
+'''
+Simulator of a BKS gripper for offline development and tests of the bkstools and of applications using them.|n
+The parameter metadata and enums are taken from the default_settings in bkstools_data, the parameters start with their
+default values. A kinematic model reacts to the commands via plc_sync_output (controlword) and command_code like a
+real gripper: moves, jogging, gripping and releasing of a workpiece, statusword bits, errors and acknowledgement.|n
+The simulated gripper is served via the /adi HTTP/JSON interface (-H localhost:PORT) and optionally via Modbus-RTU on
+a pseudo terminal (-H /dev/pts/N,SLAVE_ID,115200,8N1, Linux/macOS only) at the same time.
+Latency and transmission errors can be injected for robustness tests.|n
+|n
+Example usage:|n
+-  %(prog)s --port 8080|n
+-  %(prog)s --port 8080 --modbus --slave_id 12 --workpiece 40|n
+-  %(prog)s --port 8080 --latency 0.005 --jitter 0.002 --error_rate 0.01 --error_kinds timeout crc|n
+-  bks_status -H localhost:8080|n
+'''
+
+import os.path
+import sys
+import argparse
+import threading
+
+from pyschunk.tools.util import MultilineFormatter
+
+from bkstools.simulator.sim_gripper import cSimGripper
+from bkstools.simulator.sim_model import cKinematicModel
+from bkstools.simulator.sim_faults import cFaultInjector
+from bkstools.simulator.sim_http import cSimWebserver
+
+
+def main():
+    if ( "__file__" in globals() ):
+        prog = os.path.basename( globals()["__file__"] )
+    else:
+        prog = "bks_simulator.exe"
+
+    parser = argparse.ArgumentParser( prog=prog, description=__doc__, formatter_class=MultilineFormatter )
+
+    parser.add_argument( "-p", "--port",
+                         dest="port",
+                         default=8080,
+                         type=int,
+                         help="""The TCP port to serve the HTTP/JSON interface on. Default is %(default)d.""" )
+
+    parser.add_argument( "-a", "--address",
+                         dest="address",
+                         default="127.0.0.1",
+                         help="""The address to serve the HTTP/JSON interface on. Default is %(default)s.""" )
+
+    parser.add_argument( "-m", "--modbus",
+                         dest="modbus",
+                         action="store_true",
+                         help="""Serve the gripper via Modbus-RTU on a pseudo terminal as well. The name of the terminal is printed.""" )
+
+    parser.add_argument( "--slave_id",
+                         dest="slave_id",
+                         default=12,
+                         type=int,
+                         help="""The Modbus slave id of the gripper. Default is %(default)d.""" )
+
+    parser.add_argument( "-w", "--workpiece",
+                         dest="workpiece",
+                         default=None,
+                         type=float,
+                         help="""Position in mm of a workpiece gripped from outside (closing). Default is no workpiece.""" )
+
+    parser.add_argument( "--workpiece_inside",
+                         dest="workpiece_inside",
+                         default=None,
+                         type=float,
+                         help="""Position in mm of a workpiece gripped from inside (opening). Default is no workpiece.""" )
+
+    parser.add_argument( "--cycle_time",
+                         dest="cycle_time",
+                         default=0.001,
+                         type=float,
+                         help="""Cycle time of the kinematic model in s. Default is %(default)s.""" )
+
+    parser.add_argument( "-l", "--latency",
+                         dest="latency",
+                         default=0.0,
+                         type=float,
+                         help="""Artificial delay in s per request. Default is %(default)s.""" )
+
+    parser.add_argument( "-j", "--jitter",
+                         dest="jitter",
+                         default=0.0,
+                         type=float,
+                         help="""Maximum random additional delay in s per request. Default is %(default)s.""" )
+
+    parser.add_argument( "-e", "--error_rate",
+                         dest="error_rate",
+                         default=0.0,
+                         type=float,
+                         help="""Probability of an injected error per request. Default is %(default)s.""" )
+
+    parser.add_argument( "--error_kinds",
+                         dest="error_kinds",
+                         nargs="+",
+                         default=list( cFaultInjector.KINDS ),
+                         choices=cFaultInjector.KINDS,
+                         help="""The kinds of errors to inject, each transport uses the kinds it supports:
+                                 timeout (no response), drop (HTTP: connection closed), status (HTTP: error 500),
+                                 crc (Modbus: wrong CRC), exception (Modbus: exception response). Default is %(default)s.""" )
+
+    parser.add_argument( "--seed",
+                         dest="seed",
+                         default=None,
+                         type=int,
+                         help="""Seed of the random numbers for reproducible jitter and errors.""" )
+
+    args = parser.parse_args()
+
+    gripper = cSimGripper()
+    model = cKinematicModel( gripper, cycle_time=args.cycle_time, workpiece_outside=args.workpiece, workpiece_inside=args.workpiece_inside )
+    faults = cFaultInjector( args.latency, args.jitter, args.error_rate, args.error_kinds, seed=args.seed )
+    server = cSimWebserver( gripper, args.port, args.address, faults )
+    print( f"Serving simulated gripper on http://{server.host}" )
+    slave = None
+    if ( args.modbus ):
+        from bkstools.simulator.sim_modbus import cModbusRTUSlave
+        slave = cModbusRTUSlave( { args.slave_id: gripper }, faults )
+        print( f"Serving simulated gripper via Modbus-RTU on {slave.port}, use -H {slave.port},{args.slave_id},115200,8N1" )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    print( faults.GetStatistics() )
+    if ( slave ):
+        slave.Stop()
+    server.Stop()
+    model.Stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,70 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cFaultInjector class, configurable latency and errors of the simulator transports, see bks_simulator.py
+'''
+
+import time
+import random
+import threading
+import collections
+
+
+class cFaultInjector(object):
+    """Latency and error injection shared by the transports of the simulator.
+
+    Each request is delayed by latency s plus a uniformly distributed random jitter of 0 ... jitter s.
+    With probability error_rate a request fails with one of the fault kinds in error_kinds that is supported by
+    the transport (chosen randomly):
+
+    - "timeout": no reply at all (HTTP: the reply is delayed by timeout s, Modbus: no response frame)
+    - "drop": the connection is closed without reply (HTTP only)
+    - "status": an HTTP 500 error reply (HTTP only)
+    - "crc": a response frame with a wrong CRC (Modbus only)
+    - "exception": a Modbus exception response with code 6 "slave device busy" (Modbus only)
+
+    seed makes the injected errors reproducible.
+    """
+    KINDS = ("timeout", "drop", "status", "crc", "exception")
+
+    def __init__( self, latency=0.0, jitter=0.0, error_rate=0.0, error_kinds=KINDS, timeout=10.0, seed=None ):
+        unknown = set( error_kinds ) - set( self.KINDS )
+        if ( unknown ):
+            raise ValueError( f"Unknown fault kinds {sorted( unknown )}, known are {self.KINDS}" )
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kinds = tuple( error_kinds )
+        self.timeout = timeout
+        self.random = random.Random( seed )
+        self.lock = threading.Lock()
+        self.nb_requests = 0
+        self.nb_faults = collections.Counter()
+
+    def Delay( self ):
+        """Sleep for the configured latency and jitter
+        """
+        delay = self.latency
+        if ( self.jitter > 0.0 ):
+            with self.lock:
+                delay += self.random.uniform( 0.0, self.jitter )
+        if ( delay > 0.0 ):
+            time.sleep( delay )
+
+    def GetFault( self, supported_kinds ):
+        """Return the kind of fault to inject into the current request (one of supported_kinds) or None for no fault
+        """
+        with self.lock:
+            self.nb_requests += 1
+            kinds = [ k for k in self.error_kinds if k in supported_kinds ]
+            if ( not kinds or self.error_rate <= 0.0 or self.random.random() >= self.error_rate ):
+                return None
+            kind = self.random.choice( kinds )
+            self.nb_faults[ kind ] += 1
+            return kind
+
+    def GetStatistics( self ):
+        with self.lock:
+            faults = ", ".join( f"{k}={n}" for (k,n) in sorted( self.nb_faults.items() ) ) or "none"
+            return f"{self.nb_requests} requests, injected faults: {faults}"
@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cSimGripper class, the parameter memory of a simulated BKS gripper shared by the
+       HTTP and the Modbus-RTU transports of the simulator, see bks_simulator.py
+'''
+
+import struct
+
+from bkstools.bench.fake_webserver import cFakeGripper, LoadDefaultSettings
+
+
+class cSimGripper( cFakeGripper ):
+    """Parameter memory of a simulated gripper.
+
+    Unlike the cFakeGripper of the benchmarks the values are initialized with the defaults given in the metadata
+    (like max_pos or grp_vel), and writes can be observed: each function in self.write_listeners is called
+    with the index of the written parameter after each WriteValue(), e.g. by a cKinematicModel.
+    """
+    def __init__( self, data=None, enums=None, sw_version_txt="0.0.0.0-sim", networktype=137, serial_no_num=0 ):
+        if ( data is None ):
+            (data, enums) = LoadDefaultSettings()
+        self.name_to_index = { d["name"]: i for (i,d) in enumerate( data ) }
+        cFakeGripper.__init__( self, data, enums, sw_version_txt, networktype, serial_no_num )
+        self.write_listeners = []
+        for (i,d) in enumerate( data ):
+            default = d.get( "default" )
+            if ( type( default ) is not str ):
+                continue
+            value = bytes.fromhex( default )
+            if ( len( d["datatype"] ) == 1 and len( value ) * d["numelements"] == len( self.values[ i ] ) ):
+                value = value * d["numelements"]   # the default is given for a single element of an array
+            if ( len( value ) == len( self.values[ i ] ) and not any( self.values[ i ] ) ):   # (keep e.g. the serial number)
+                self.values[ i ][:] = value
+
+    def GetIndexOfName( self, name ):
+        return self.name_to_index.get( name )
+
+    def WriteValue( self, i, value, offset=0 ):
+        cFakeGripper.WriteValue( self, i, value, offset )
+        for listener in self.write_listeners:
+            listener( i )
+
+    def Get( self, name, fmt ):
+        """Return the value of parameter name unpacked with struct format fmt (little endian), a tuple for formats with several values.
+        None if the parameter is not available.
+        """
+        i = self.GetIndexOfName( name )
+        if ( i is None ):
+            return None
+        with self.lock:
+            values = struct.unpack_from( "<" + fmt, self.values[ i ] )
+        if ( len( values ) == 1 ):
+            return values[0]
+        return values
+
+    def Set( self, name, fmt, *values ):
+        """Set the value of parameter name (if available) packed with struct format fmt (little endian)
+        """
+        self.SetValueBytes( name, struct.pack( "<" + fmt, *values ) )
@@ -0,0 +1,41 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cSimWebserver class, the /adi HTTP/JSON interface of a simulated BKS gripper, see bks_simulator.py
+'''
+
+import time
+
+from bkstools.bench.fake_webserver import cFakeRequestHandler, cFakeWebserver
+from bkstools.simulator.sim_faults import cFaultInjector
+
+
+class cSimRequestHandler(cFakeRequestHandler):
+    """Request handler of the fake webserver with latency and error injection by the cFaultInjector of the server
+    """
+    FAULT_KINDS = ("timeout", "drop", "status")
+
+    def do_GET( self ):
+        faults = self.server.faults
+        faults.Delay()
+        fault = faults.GetFault( self.FAULT_KINDS )
+        if ( fault == "status" ):
+            return self.Reply( [], 500 )
+        if ( fault == "drop" ):
+            self.close_connection = True
+            return
+        if ( fault == "timeout" ):
+            time.sleep( faults.timeout )
+        cFakeRequestHandler.do_GET( self )
+
+
+class cSimWebserver(cFakeWebserver):
+    """HTTP server of a simulated gripper (a cSimGripper, usually driven by a cKinematicModel), serving in a background thread.
+    faults is the cFaultInjector for latency and errors, None for neither.
+    """
+    request_handler_class = cSimRequestHandler
+
+    def __init__( self, gripper, port=0, address="127.0.0.1", faults=None ):
+        self.faults = faults if faults is not None else cFaultInjector()
+        cFakeWebserver.__init__( self, port, address, 0.0, gripper )
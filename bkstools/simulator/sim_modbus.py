@@ -0,0 +1,219 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cModbusRTUSlave class, the Modbus-RTU interface of simulated BKS grippers on a pseudo terminal, see bks_simulator.py
+'''
+
+import os
+import tty
+import time
+import struct
+import select
+import threading
+
+from bkstools.simulator.sim_faults import cFaultInjector
+
+
+def CRC16( frame ):
+    """Return the Modbus CRC16 of the bytes frame, as the two bytes to append to the frame
+    """
+    crc = 0xffff
+    for b in frame:
+        crc ^= b
+        for _ in range( 8 ):
+            if ( crc & 1 ):
+                crc = ( crc >> 1 ) ^ 0xa001
+            else:
+                crc >>= 1
+    return struct.pack( "<H", crc )
+
+
+class cModbusRTUSlave(object):
+    """Modbus-RTU slave serving the parameters of simulated grippers on a pseudo terminal (Linux/macOS only).
+
+    grippers is a dict mapping slave ids to cSimGripper objects, faults the cFaultInjector for latency and errors.
+    Clients open self.port (like "/dev/pts/5") as serial interface, e.g. with -H /dev/pts/5,12,115200,8N1
+    (the baudrate is ignored by the pseudo terminal, parity is not supported).
+
+    The register map is the one used by BKS_Modbus: the value of the parameter with instance inst starts
+    at register inst-1, two bytes of the little endian value per register (first byte in the high byte),
+    values of odd length are padded with a 0 byte. Reads of registers between parameters return 0.
+    Supported function codes are 3 and 4 (read registers), 6 and 16 (write registers), 7 (read exception status)
+    and 8 (diagnostics: sub-function 0 "return query data" and the SCHUNK sub-function 4 "response expectancy",
+    which is not answered). Requests to slave id 0 (broadcast) are executed without response.
+    """
+    ## Time in s without received bytes that ends a request frame of unknown length
+    frame_gap = 0.002
+
+    ## Maximum number of registers per read request according to the Modbus standard
+    MAX_READ_REGISTERS = 125
+
+    FAULT_KINDS = ("timeout", "crc", "exception")
+
+    def __init__( self, grippers, faults=None ):
+        self.grippers = grippers
+        self.faults = faults if faults is not None else cFaultInjector()
+        self.register_maps = { slave_id: self.MakeRegisterMap( gripper ) for (slave_id, gripper) in grippers.items() }
+        self.nb_requests = 0
+
+        (self.master, self.slave) = os.openpty()
+        tty.setraw( self.slave )
+        self.port = os.ttyname( self.slave )
+
+        self.running = True
+        self.thread = threading.Thread( target=self.Run, name="cModbusRTUSlave", daemon=True )
+        self.thread.start()
+
+    @staticmethod
+    def MakeRegisterMap( gripper ):
+        """Return a dict mapping register addresses to (index, byte offset) of the parameters of gripper
+        """
+        register_map = dict()
+        for (i,d) in enumerate( gripper.data ):
+            for r in range( ( len( gripper.values[ i ] ) + 1 ) >> 1 ):
+                register_map.setdefault( d["instance"] - 1 + r, (i, 2*r) )
+        return register_map
+
+    def Stop( self ):
+        self.running = False
+        self.thread.join()
+        os.close( self.master )
+        os.close( self.slave )
+
+    #-- framing
+
+    @staticmethod
+    def GetRequestLength( frame ):
+        """Return the length of the request frame from its first bytes, None if not known (yet)
+        """
+        if ( len( frame ) < 2 ):
+            return None
+        function_code = frame[1]
+        if ( function_code in (3, 4, 6, 8) ):
+            return 8
+        if ( function_code == 7 ):
+            return 4
+        if ( function_code == 16 and len( frame ) >= 7 ):
+            return 9 + frame[6]
+        return None
+
+    def Run( self ):
+        frame = bytearray()
+        while ( self.running ):
+            (readable, _, _) = select.select( [self.master], [], [], 0.1 if not frame else self.frame_gap )
+            if ( readable ):
+                try:
+                    frame += os.read( self.master, 256 )
+                except OSError:
+                    time.sleep( 0.01 )   # no client connected (EIO on Linux)
+                    continue
+                length = self.GetRequestLength( frame )
+                if ( length is None or len( frame ) < length ):
+                    continue
+                (request, frame) = (bytes( frame[:length] ), frame[length:])
+            elif ( frame ):
+                (request, frame) = (bytes( frame ), bytearray())   # frame gap
+            else:
+                continue
+            self.HandleFrame( request )
+
+    def HandleFrame( self, request ):
+        if ( len( request ) < 4 or CRC16( request[:-2] ) != request[-2:] ):
+            return # corrupted frames are ignored like on a real bus
+        slave_id = request[0]
+        if ( slave_id != 0 and slave_id not in self.grippers ):
+            return # request for another slave
+        self.nb_requests += 1
+        self.faults.Delay()
+        fault = self.faults.GetFault( self.FAULT_KINDS ) if slave_id else None
+        function_code = request[1]
+        if ( fault == "exception" ):
+            response = bytes( [function_code | 0x80, 6] )
+        else:
+            response = self.HandleRequest( slave_id, function_code, request[2:-2] )
+        if ( response is None or slave_id == 0 or fault == "timeout" ):
+            return
+        response = bytes( [slave_id] ) + response
+        crc = CRC16( response )
+        if ( fault == "crc" ):
+            crc = bytes( [crc[0] ^ 0xff, crc[1]] )
+        os.write( self.master, response + crc )
+
+    #-- function codes
+
+    def HandleRequest( self, slave_id, function_code, payload ):
+        """Execute the request and return the response PDU (function code and data), None for no response.
+        slave_id 0 executes writes on all grippers.
+        """
+        try:
+            if ( function_code in (3, 4) ):
+                (register_address, nb_registers) = struct.unpack( ">HH", payload )
+                if ( not 1 <= nb_registers <= self.MAX_READ_REGISTERS ):
+                    return bytes( [function_code | 0x80, 3] )
+                data = self.ReadRegisters( slave_id, register_address, nb_registers )
+                if ( data is None ):
+                    return bytes( [function_code | 0x80, 2] )
+                return bytes( [function_code, len( data )] ) + data
+            if ( function_code in (6, 16) ):
+                if ( function_code == 6 ):
+                    (register_address, nb_registers, data) = ( struct.unpack( ">H", payload[:2] )[0], 1, payload[2:4] )
+                else:
+                    (register_address, nb_registers, nb_bytes) = struct.unpack( ">HHB", payload[:5] )
+                    data = payload[5:5+nb_bytes]
+                    if ( nb_bytes != 2 * nb_registers ):
+                        return bytes( [function_code | 0x80, 3] )
+                for sid in ( self.grippers if slave_id == 0 else [ slave_id ] ):
+                    if ( not self.WriteRegisters( sid, register_address, data ) ):
+                        return bytes( [function_code | 0x80, 2] )
+                return bytes( [function_code] ) + payload[:4]
+            if ( function_code == 7 ):
+                return bytes( [function_code, 0] )
+            if ( function_code == 8 ):
+                sub_function = struct.unpack( ">H", payload[:2] )[0]
+                if ( sub_function == 0x0000 ):
+                    return bytes( [function_code] ) + payload
+                if ( sub_function == 0x0004 ):
+                    return None
+        except struct.error:
+            return bytes( [function_code | 0x80, 3] )
+        return bytes( [function_code | 0x80, 1] )
+
+    def ReadRegisters( self, slave_id, register_address, nb_registers ):
+        """Return the bytes of the registers or None if none of them belongs to a parameter
+        """
+        gripper = self.grippers[ slave_id ]
+        register_map = self.register_maps[ slave_id ]
+        data = bytearray( 2 * nb_registers )
+        found = False
+        with gripper.lock:
+            for r in range( nb_registers ):
+                location = register_map.get( register_address + r )
+                if ( location is not None ):
+                    (i, offset) = location
+                    chunk = gripper.values[ i ][offset:offset+2]
+                    data[2*r:2*r+len( chunk )] = chunk
+                    found = True
+        return bytes( data ) if found else None
+
+    def WriteRegisters( self, slave_id, register_address, data ):
+        """Write the bytes data to the registers starting at register_address, return False if a register does not belong to a parameter.
+        Each written parameter is written with a single cSimGripper.WriteValue() call, so a write of the whole
+        plc_sync_output is seen as one command.
+        """
+        gripper = self.grippers[ slave_id ]
+        register_map = self.register_maps[ slave_id ]
+        writes = dict()   # index -> [first offset, bytes]
+        for r in range( len( data ) >> 1 ):
+            location = register_map.get( register_address + r )
+            if ( location is None ):
+                return False
+            (i, offset) = location
+            chunk = data[2*r:2*r+2][:len( gripper.values[ i ] ) - offset]   # strip the padding of values of odd length
+            if ( i in writes ):
+                writes[ i ][1] += chunk
+            else:
+                writes[ i ] = [offset, chunk]
+        for (i, (offset, value)) in writes.items():
+            gripper.WriteValue( i, value, offset )
+        return True
@@ -0,0 +1,320 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Provides the cKinematicModel class, the behaviour of a simulated BKS gripper, see bks_simulator.py
+
+The model reacts to the cyclic process data (controlword, set_pos, set_vel, gripping_force in plc_sync_output)
+and to the acyclic commands written to command_code like a real gripper, as far as visible via the interfaces:
+statusword bits including the command_received_toggle, actual position and velocity, grip results and error codes.
+'''
+
+import math
+import time
+import struct
+import threading
+import collections
+
+from pyschunk.generated.generated_enums import eCmdCode
+from bkstools.bks_lib.bks_scheduler import cTickScheduler
+
+
+class cKinematicModel(object):
+    """Kinematic model of a gripper with the parameter memory cSimGripper gripper, updated every cycle_time s.
+
+    - The position moves with a trapezoidal velocity profile limited by set_vel (or max_vel / grp_vel) and max_acc
+      within min_pos ... max_pos (all taken from the parameters of the gripper, so they can be changed via the interfaces).
+    - Commands are received received_delay s after the write of plc_sync_output or command_code.
+      A command is started by setting a command bit of the controlword or by toggling repeat_command_toggle
+      (or grip_direction) while a command bit is set. Each started command toggles command_received_toggle.
+    - Gripping stops at the workpiece at workpiece_outside (closing, i.e. decreasing position) or workpiece_inside
+      (opening) in mm, None means there is no workpiece. grip_workpiece_with_position reports a wrong workpiece
+      if the workpiece is not within grp_pos_margin of the expected position.
+    - A cleared fast_stop bit of the controlword or CMD_FAST_STOP stops immediately with ERR_FAST_STOP, as does a
+      real gripper after power on while the controlword is still 0. Errors are cleared by a rising edge of the
+      acknowledge bit (with fast_stop set) or by CMD_ACK.
+    - Infeasible commands (e.g. positions outside the soft limits) set not_feasible and the warning WRN_NOT_FEASIBLE.
+    """
+    #-- The bits of the control word, see BKSBaseCommon.SetupControlword()
+    CW_FAST_STOP                 = 1 << 0
+    CW_STOP                      = 1 << 1
+    CW_ACKNOWLEDGE               = 1 << 2
+    CW_REPEAT_COMMAND_TOGGLE     = 1 << 6
+    CW_GRIP_DIRECTION            = 1 << 7
+    CW_JOG_MODE_MINUS            = 1 << 8
+    CW_JOG_MODE_PLUS             = 1 << 9
+    CW_RELEASE_WORK_PIECE        = 1 << 11
+    CW_GRIP_WORK_PIECE           = 1 << 12
+    CW_MOVE_TO_ABSOLUTE_POSITION = 1 << 13
+    CW_MOVE_TO_RELATIVE_POSITION = 1 << 14
+    CW_MOVE_VELOCITY_CONTROLLED  = 1 << 15
+    CW_GRIP_WORKPIECE_WITH_POSITION = 1 << 16
+    CW_COMMANDS = ( CW_JOG_MODE_MINUS | CW_JOG_MODE_PLUS | CW_RELEASE_WORK_PIECE | CW_GRIP_WORK_PIECE | CW_MOVE_TO_ABSOLUTE_POSITION
+                    | CW_MOVE_TO_RELATIVE_POSITION | CW_MOVE_VELOCITY_CONTROLLED | CW_GRIP_WORKPIECE_WITH_POSITION )
+
+    #-- The bits of the status word, see BKSBaseCommon.SetupStatusword()
+    SW_READY_FOR_OPERATION        = 1 << 0
+    SW_CONTROL_AUTHORITY          = 1 << 1
+    SW_NOT_FEASIBLE               = 1 << 3
+    SW_SUCCESS                    = 1 << 4
+    SW_COMMAND_RECEIVED_TOGGLE    = 1 << 5
+    SW_WARNING                    = 1 << 6
+    SW_ERROR                      = 1 << 7
+    SW_SOFTWARELIMIT              = 1 << 9
+    SW_NO_WORKPIECE_DETECTED      = 1 << 11
+    SW_GRIPPED                    = 1 << 12
+    SW_POSITION_REACHED           = 1 << 13
+    SW_MOVING_VELOCITY_CONTROLLED = 1 << 15
+    SW_WRONG_WORKPIECE_DETECTED   = 1 << 17
+    SW_RESULTS = ( SW_NOT_FEASIBLE | SW_SUCCESS | SW_SOFTWARELIMIT | SW_NO_WORKPIECE_DETECTED | SW_GRIPPED | SW_POSITION_REACHED
+                   | SW_MOVING_VELOCITY_CONTROLLED | SW_WRONG_WORKPIECE_DETECTED )
+
+    #-- error and warning codes, see the err_code enum
+    ERR_NONE = 0x00
+    WRN_NOT_FEASIBLE = 0x94
+    ERR_FAST_STOP = 0xd9
+    INF_UNKNOWN_CMD = 0x04
+
+    #-- application states for system_state, see hsm_enums.application_state_machine
+    STATE_ERROR = 2
+    STATE_OPERATIONAL = 4
+
+    def __init__( self, gripper, cycle_time=0.001, received_delay=0.002, workpiece_outside=None, workpiece_inside=None, initial_pos=0.0 ):
+        self.gripper = gripper
+        self.cycle_time = cycle_time
+        self.received_delay = received_delay
+        self.workpiece_outside = workpiece_outside
+        self.workpiece_inside = workpiece_inside
+
+        self.pos = initial_pos               # mm
+        self.vel = 0.0                       # mm/s
+        self.cur = 0.0                       # A
+        self.motion = None                   # None or a dict describing the current motion, see StartMotion()
+        self.controlword = 0
+        self.statusword = self.SW_ERROR | self.SW_CONTROL_AUTHORITY
+        self.err_code = self.ERR_FAST_STOP   # like a real gripper while the controlword is still 0 after power on
+        self.wrn_code = self.ERR_NONE
+        self.grip_direction = 0
+        self.grip_force = 0
+        self.nb_commands = 0
+
+        self.index_output = gripper.GetIndexOfName( "plc_sync_output" )
+        self.index_command_code = gripper.GetIndexOfName( "command_code" )
+        self.events = collections.deque()    # (t_receive, index, raw value) of written parameters, see OnWrite()
+        gripper.write_listeners.append( self.OnWrite )
+        self.Publish()
+
+        self.running = True
+        self.thread = threading.Thread( target=self.Run, name="cKinematicModel", daemon=True )
+        self.thread.start()
+
+    def GetParameter( self, name, default ):
+        value = self.gripper.Get( name, "f" )
+        return default if value is None else value
+
+    def OnWrite( self, i ):
+        if ( i == self.index_output or i == self.index_command_code ):
+            with self.gripper.lock:
+                value = bytes( self.gripper.values[ i ] )
+            self.events.append( ( time.monotonic() + self.received_delay, i, value ) )
+
+    def Run( self ):
+        scheduler = cTickScheduler( self.cycle_time )
+        t_last = time.monotonic()
+        while ( self.running ):
+            scheduler.WaitForNextTick()
+            now = time.monotonic()
+            while ( self.events and self.events[0][0] <= now ):
+                (t, i, value) = self.events.popleft()  # @UnusedVariable
+                if ( i == self.index_output ):
+                    self.HandleOutput( *struct.unpack_from( "<Iiii", value ) )
+                else:
+                    self.HandleCommandCode( struct.unpack_from( "<H", value )[0] )
+            self.Step( now - t_last )
+            t_last = now
+            self.Publish()
+
+    def Stop( self ):
+        self.running = False
+        self.thread.join()
+        self.gripper.write_listeners.remove( self.OnWrite )
+
+    #-- command handling
+
+    def HandleOutput( self, controlword, pos_um, vel_ums, force ):
+        """React to a write of plc_sync_output
+        """
+        changed = controlword ^ self.controlword
+        self.controlword = controlword
+        if ( not controlword & self.CW_FAST_STOP ):
+            if ( changed & self.CW_FAST_STOP ):
+                self.Fault( self.ERR_FAST_STOP )
+            return
+        if ( changed & self.CW_ACKNOWLEDGE and controlword & self.CW_ACKNOWLEDGE ):
+            self.ToggleReceived()
+            self.Acknowledge()
+            return
+        if ( self.statusword & self.SW_ERROR ):
+            return
+        if ( changed & self.CW_STOP and controlword & self.CW_STOP ):
+            self.ToggleReceived()
+            self.StopMotion( self.SW_SUCCESS )
+            return
+        commands = controlword & self.CW_COMMANDS
+        if ( changed & ( self.CW_COMMANDS | self.CW_REPEAT_COMMAND_TOGGLE | self.CW_GRIP_DIRECTION ) and commands ):
+            self.ToggleReceived()
+            self.StartCommand( commands, bool( controlword & self.CW_GRIP_DIRECTION ), pos_um / 1000.0, vel_ums / 1000.0, force )
+        elif ( changed & ( self.CW_JOG_MODE_MINUS | self.CW_JOG_MODE_PLUS ) and self.motion and self.motion["kind"] == "jog" ):
+            self.StopMotion( self.SW_SUCCESS )   # jog bit released
+
+    def StartCommand( self, commands, direction, pos, vel, force ):
+        if ( bin( commands ).count( "1" ) > 1 ):
+            return self.NotFeasible()
+        if ( commands == self.CW_MOVE_TO_ABSOLUTE_POSITION ):
+            self.StartMove( "move", pos, vel )
+        elif ( commands == self.CW_MOVE_TO_RELATIVE_POSITION ):
+            self.StartMove( "move", self.pos + pos, vel )
+        elif ( commands == self.CW_MOVE_VELOCITY_CONTROLLED ):
+            self.StartMove( "velocity", self.GetParameter( "max_pos", 100.0 ) if vel >= 0.0 else self.GetParameter( "min_pos", 0.0 ), abs( vel ) )
+        elif ( commands in (self.CW_JOG_MODE_PLUS, self.CW_JOG_MODE_MINUS) ):
+            target = self.GetParameter( "max_pos", 100.0 ) if commands == self.CW_JOG_MODE_PLUS else self.GetParameter( "min_pos", 0.0 )
+            self.StartMove( "jog", target, vel if vel > 0.0 else self.GetParameter( "min_vel", 10.0 ) )
+        elif ( commands == self.CW_GRIP_WORK_PIECE ):
+            self.StartGrip( direction, vel, force, None )
+        elif ( commands == self.CW_GRIP_WORKPIECE_WITH_POSITION ):
+            self.StartGrip( direction, vel, force, pos )
+        elif ( commands == self.CW_RELEASE_WORK_PIECE ):
+            self.StartRelease()
+
+    def HandleCommandCode( self, command_code ):
+        """React to a write of command_code
+        """
+        if ( command_code == eCmdCode.CMD_ACK ):
+            return self.Acknowledge()
+        if ( command_code == eCmdCode.CMD_FAST_STOP ):
+            return self.Fault( self.ERR_FAST_STOP )
+        if ( self.statusword & self.SW_ERROR ):
+            return
+        self.statusword &= ~self.SW_RESULTS
+        if ( command_code == eCmdCode.CMD_STOP ):
+            self.StopMotion( self.SW_SUCCESS )
+        elif ( command_code == eCmdCode.MOVE_POS ):
+            self.StartMove( "move", self.GetParameter( "set_pos", 0.0 ), self.GetParameter( "set_vel", 0.0 ) )
+        elif ( command_code == eCmdCode.MOVE_POS_REL ):
+            self.StartMove( "move", self.pos + self.GetParameter( "set_pos", 0.0 ), self.GetParameter( "set_vel", 0.0 ) )
+        elif ( command_code == eCmdCode.MOVE_VEL ):
+            vel = self.GetParameter( "set_vel", 0.0 )
+            self.StartMove( "velocity", self.GetParameter( "max_pos", 100.0 ) if vel >= 0.0 else self.GetParameter( "min_pos", 0.0 ), abs( vel ) )
+        elif ( command_code in (eCmdCode.MOVE_JOG_POS, eCmdCode.MOVE_JOG_NEG) ):
+            target = self.GetParameter( "max_pos", 100.0 ) if command_code == eCmdCode.MOVE_JOG_POS else self.GetParameter( "min_pos", 0.0 )
+            self.StartMove( "jog", target, self.GetParameter( "set_vel", 0.0 ) or self.GetParameter( "min_vel", 10.0 ) )
+        elif ( command_code == eCmdCode.MOVE_GRIP ):
+            self.StartGrip( bool( self.gripper.Get( "grp_dir", "?" ) ), self.GetParameter( "grp_vel", 0.0 ), self.GetParameter( "set_force", 100.0 ), None )
+        elif ( command_code == eCmdCode.CMD_RELEASE_WORK_PIECE ):
+            self.StartRelease()
+        elif ( command_code in (eCmdCode.CMD_REFERENCE, eCmdCode.CMD_DETERMINE_BASE_ZERO_POS, eCmdCode.CMD_ZERO_VECTOR_SEARCH,
+                                eCmdCode.CMD_REBOOT, eCmdCode.CMD_DISCONNECT, eCmdCode.CMD_RESET_STATISTIC) ):
+            self.statusword |= self.SW_SUCCESS   # nothing to simulate
+        else:
+            self.wrn_code = self.INF_UNKNOWN_CMD
+
+    def ToggleReceived( self ):
+        self.nb_commands += 1
+        self.statusword = ( self.statusword ^ self.SW_COMMAND_RECEIVED_TOGGLE ) & ~self.SW_RESULTS
+
+    def Acknowledge( self ):
+        self.err_code = self.ERR_NONE
+        self.wrn_code = self.ERR_NONE
+        self.statusword = ( self.statusword & ~( self.SW_ERROR | self.SW_WARNING | self.SW_NOT_FEASIBLE ) ) | self.SW_READY_FOR_OPERATION
+
+    def Fault( self, err_code ):
+        self.err_code = err_code
+        self.statusword = ( self.statusword & ~( self.SW_READY_FOR_OPERATION | self.SW_SUCCESS ) ) | self.SW_ERROR
+        self.motion = None
+        self.vel = 0.0
+
+    def NotFeasible( self ):
+        self.wrn_code = self.WRN_NOT_FEASIBLE
+        self.statusword |= self.SW_NOT_FEASIBLE | self.SW_WARNING
+
+    #-- motion
+
+    def StartMove( self, kind, target, vel, vel_limit_name="max_vel" ):
+        min_pos = self.GetParameter( "min_pos", 0.0 )
+        max_pos = self.GetParameter( "max_pos", 100.0 )
+        if ( vel <= 0.0 or not ( min_pos - 1e-6 <= target <= max_pos + 1e-6 ) ):
+            return self.NotFeasible()
+        self.statusword &= ~( self.SW_WARNING | self.SW_GRIPPED )
+        self.wrn_code = self.ERR_NONE
+        self.motion = dict( kind=kind, target=target, vel=min( vel, self.GetParameter( vel_limit_name, vel ) ), workpiece=None, expected=None )
+        if ( kind == "velocity" ):
+            self.statusword |= self.SW_MOVING_VELOCITY_CONTROLLED
+
+    def StartGrip( self, direction, vel, force, expected ):
+        self.grip_direction = direction
+        self.grip_force = force
+        if ( vel <= 0.0 ):
+            vel = self.GetParameter( "grp_vel", 10.0 )
+        target = self.GetParameter( "max_pos", 100.0 ) if direction else self.GetParameter( "min_pos", 0.0 )
+        self.StartMove( "grip", target, vel, "max_grp_vel" )
+        if ( self.motion ):
+            self.motion[ "workpiece" ] = self.workpiece_inside if direction else self.workpiece_outside
+            self.motion[ "expected" ] = expected
+
+    def StartRelease( self ):
+        delta = self.GetParameter( "grp_prepos_delta", 5.0 )
+        target = self.pos - delta if self.grip_direction else self.pos + delta
+        target = min( max( target, self.GetParameter( "min_pos", 0.0 ) ), self.GetParameter( "max_pos", 100.0 ) )
+        self.StartMove( "release", target, self.GetParameter( "grp_vel", 10.0 ), "max_grp_vel" )
+
+    def StopMotion( self, result_bits ):
+        self.motion = None
+        self.vel = 0.0
+        self.statusword = ( self.statusword & ~self.SW_MOVING_VELOCITY_CONTROLLED ) | result_bits
+
+    def Step( self, dt ):
+        """Advance the motion by dt s
+        """
+        m = self.motion
+        if ( m is None ):
+            self.cur = self.GetParameter( "nom_mot_cur", 1.0 ) * self.grip_force / 100.0 if self.statusword & self.SW_GRIPPED else 0.0
+            return
+        acc = self.GetParameter( "max_acc", 1000.0 )
+        d = m["target"] - self.pos
+        direction = 1.0 if d >= 0.0 else -1.0
+        vel_desired = direction * min( m["vel"], math.sqrt( 2.0 * acc * abs( d ) ) )
+        dv = min( max( vel_desired - self.vel, -acc * dt ), acc * dt )
+        self.vel += dv
+        self.cur = 0.1 * self.GetParameter( "nom_mot_cur", 1.0 ) * ( 1.0 + abs( dv / dt ) / acc if dt > 0.0 else 1.0 )
+        new_pos = self.pos + self.vel * dt
+
+        workpiece = m["workpiece"]
+        if ( workpiece is not None and ( workpiece - self.pos ) * direction >= 0.0 and ( new_pos - workpiece ) * direction >= 0.0 ):
+            # contact with the workpiece:
+            self.pos = workpiece
+            result = self.SW_GRIPPED | self.SW_SUCCESS
+            if ( m["expected"] is not None and abs( workpiece - m["expected"] ) > self.GetParameter( "grp_pos_margin", 2.0 ) ):
+                result = self.SW_WRONG_WORKPIECE_DETECTED | self.SW_SUCCESS
+            return self.StopMotion( result )
+
+        if ( abs( m["target"] - new_pos ) <= 1e-6 or ( m["target"] - new_pos ) * direction < 0.0 ):
+            self.pos = m["target"]
+            if ( m["kind"] == "grip" ):
+                return self.StopMotion( self.SW_NO_WORKPIECE_DETECTED | self.SW_SUCCESS )
+            return self.StopMotion( self.SW_SUCCESS | self.SW_POSITION_REACHED )
+        self.pos = new_pos
+        if ( abs( m["target"] - self.pos ) <= self.GetParameter( "target_pos_win", 0.0 ) and m["kind"] != "grip" ):
+            self.statusword |= self.SW_POSITION_REACHED
+
+    def Publish( self ):
+        """Write the simulated state to the parameter memory
+        """
+        g = self.gripper
+        state = ( self.STATE_ERROR if self.statusword & self.SW_ERROR else self.STATE_OPERATIONAL ) << 8
+        g.Set( "plc_sync_input", "IiII", self.statusword, int( round( self.pos * 1000.0 ) ), 0, self.err_code | ( self.wrn_code << 16 ) )
+        g.Set( "actual_pos", "f", self.pos )
+        g.Set( "actual_vel", "f", self.vel )
+        g.Set( "actual_cur", "f", self.cur )
+        g.Set( "err_code", "B", self.err_code )
+        g.Set( "wrn_code", "B", self.wrn_code )
+        g.Set( "system_state", "I", state | ( 1 if self.motion else 0 ) )
@@ -126,6 +126,8 @@ try:
             "bkstools",
             "bkstools.bks_lib",
             "bkstools.scripts",
+            "bkstools.bench",
+            "bkstools.simulator",
             "bkstools.demo",
 
             "pyschunk",
@@ -148,6 +150,11 @@ try:
             'pypiwin32 ; platform_system=="Windows"',
         ],
 
+        # Optional dependencies, install e.g. with pip install bkstools[parquet]
+        extras_require = {
+            'parquet': [ 'pyarrow' ],   # for bks.py --parquet
+        },
+
         python_requires='>=3',
 
         # If there are data files included in your packages that need to be
@@ -224,6 +231,11 @@ try:
                 'bks_jog=bkstools.scripts.bks_jog:main',
                 'bks_status=bkstools.scripts.bks_status:main',
                 'bks_scan=bkstools.scripts.bks_scan:main',
+                'bks_fleet=bkstools.scripts.bks_fleet:main',
+                'bks_telemetry=bkstools.scripts.bks_telemetry:main',
+                'bks_exporter=bkstools.scripts.bks_exporter:main',
+                'bks_snapshot=bkstools.scripts.bks_snapshot:main',
+                'bks_discover=bkstools.scripts.bks_discover:main',
                 'bks_get_system_messages=bkstools.scripts.bks_get_system_messages:main',
                 'demo_simple=bkstools.demo.demo_simple:main',
                 'demo_bks_grip_outside_inside=bkstools.demo.demo_bks_grip_outside_inside:main',
@@ -286,6 +298,11 @@ try:
                 r'.\bkstools\scripts\bks_jog.py',
                 r'.\bkstools\scripts\bks_status.py',
                 r'.\bkstools\scripts\bks_scan.py',
+                r'.\bkstools\scripts\bks_fleet.py',
+                r'.\bkstools\scripts\bks_telemetry.py',
+                r'.\bkstools\scripts\bks_exporter.py',
+                r'.\bkstools\scripts\bks_snapshot.py',
+                r'.\bkstools\scripts\bks_discover.py',
                 r'.\bkstools\scripts\bks_get_system_messages.py',
                 r'.\bkstools\demo\demo_simple.py',
                 r'.\bkstools\demo\demo_bks_grip_outside_inside.py',
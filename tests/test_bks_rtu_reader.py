@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+'''
+Created on 2026-10-18
+
+@brief Tests for cRTUFrameReader (bks_rtu_reader) with frames written in chunks to a pseudo terminal (Linux/macOS only)
+
+Run with "python -m unittest discover tests" or "python -m pytest tests".
+'''
+
+import os
+import time
+import tty
+import unittest
+import threading
+
+import serial
+
+from bkstools.bks_lib.bks_rtu_reader import cRTUFrameReader
+
+
+def Crc( body ):
+    """Return the Modbus CRC16 of body, low byte first
+    """
+    crc = 0xffff
+    for b in body:
+        crc ^= b
+        for i in range( 8 ):  # @UnusedVariable
+            crc = ( crc >> 1 ) ^ 0xa001 if ( crc & 1 ) else crc >> 1
+    return bytes( [ crc & 0xff, crc >> 8 ] )
+
+
+def Frame( body ):
+    return body + Crc( body )
+
+
+@unittest.skipUnless( hasattr( os, "openpty" ), "needs a pseudo terminal" )
+class TestRTUFrameReader( unittest.TestCase ):
+
+    ## Timeout of the serial port in s, i.e. for the first byte of a frame
+    timeout = 0.5
+
+    def setUp( self ):
+        (self.master, self.slave) = os.openpty()
+        tty.setraw( self.slave )
+        self.port = serial.Serial( os.ttyname( self.slave ), baudrate=115200, timeout=self.timeout )
+        self.reader = cRTUFrameReader.Install( self.port )
+        self.threads = []
+
+    def tearDown( self ):
+        for thread in self.threads:
+            thread.join()
+        self.port.close()
+        os.close( self.slave )
+        os.close( self.master )
+
+    def WriteChunks( self, frame, chunk_size, delay=0.002 ):
+        """Write frame to the master side of the pty in chunks of chunk_size bytes with delay s between the chunks, in the background
+        """
+        def Run():
+            for i in range( 0, len( frame ), chunk_size ):
+                time.sleep( delay )
+                os.write( self.master, frame[i:i+chunk_size] )
+        thread = threading.Thread( target=Run )
+        thread.start()
+        self.threads.append( thread )
+
+    def Read( self, size ):
+        """Return (frame, duration in s) of self.port.read( size )
+        """
+        t0 = time.monotonic()
+        frame = self.port.read( size )
+        return ( frame, time.monotonic() - t0 )
+
+    def test_install_once( self ):
+        self.assertIs( cRTUFrameReader.Install( self.port ), self.reader )
+        self.assertEqual( self.port.read, self.reader.Read )
+
+    def test_split_read_registers_response( self ):
+        frame = Frame( bytes( [ 12, 3, 8 ] ) + bytes( range( 8 ) ) )
+        for chunk_size in ( 1, 2, 3, 7 ):
+            self.WriteChunks( frame, chunk_size )
+            (data, duration) = self.Read( len( frame ) )
+            self.assertEqual( data, frame, f"chunk_size={chunk_size}" )
+            self.assertLess( duration, self.timeout )
+        self.assertEqual( self.reader.nb_frames, 4 )
+        self.assertEqual( self.reader.nb_incomplete_frames, 0 )
+
+    def test_length_from_byte_count( self ):
+        # minimalmodbus requests more than needed if it cannot predict the length: the byte count ends the frame
+        frame = Frame( bytes( [ 12, 4, 2, 0x12, 0x34 ] ) )
+        self.WriteChunks( frame, 2 )
+        (data, duration) = self.Read( 1000 )
+        self.assertEqual( data, frame )
+        self.assertLess( duration, self.timeout )
+
+    def test_exception_response( self ):
+        frame = Frame( bytes( [ 12, 0x83, 2 ] ) )
+        self.WriteChunks( frame, 1 )
+        (data, duration) = self.Read( 9 )      # as predicted for a normal response to reading 2 registers
+        self.assertEqual( data, frame )
+        self.assertLess( duration, self.timeout )
+        self.assertEqual( self.reader.nb_incomplete_frames, 0 )
+
+    def test_write_response( self ):
+        frame = Frame( bytes( [ 12, 16, 0x01, 0x2f, 0x00, 0x02 ] ) )
+        self.WriteChunks( frame, 3 )
+        (data, duration) = self.Read( 1000 )
+        self.assertEqual( data, frame )
+        self.assertLess( duration, self.timeout )
+
+    def test_read_exception_status( self ):
+        frame = Frame( bytes( [ 12, 7, 0x5a ] ) )
+        self.WriteChunks( frame, 2 )
+        (data, duration) = self.Read( 1000 )
+        self.assertEqual( data, frame )
+        self.assertLess( duration, self.timeout )
+
+    def test_diagnostics_echo( self ):
+        request = Frame( bytes( [ 12, 8, 0x00, 0x00, 0xab, 0xcd ] ) )
+        self.port.write( request )
+        self.assertEqual( os.read( self.master, 100 ), request )
+        self.WriteChunks( request, 3 )
+        (data, duration) = self.Read( 1000 )
+        self.assertEqual( data, request )
+        self.assertLess( duration, self.timeout )
+
+    def test_timeout( self ):
+        (data, duration) = self.Read( 9 )
+        self.assertEqual( data, b"" )
+        self.assertGreaterEqual( duration, self.timeout * 0.9 )
+        self.assertEqual( self.reader.nb_frames, 1 )
+        self.assertEqual( self.reader.nb_incomplete_frames, 1 )
+
+    def test_truncated_frame( self ):
+        # the rest of the frame is never sent: the frame ends after the inter frame gap, not after the timeout
+        frame = Frame( bytes( [ 12, 3, 4, 0, 1, 0, 2 ] ) )
+        self.WriteChunks( frame[:5], 2 )
+        (data, duration) = self.Read( len( frame ) )
+        self.assertEqual( data, frame[:5] )
+        self.assertLess( duration, self.timeout )
+        self.assertEqual( self.reader.nb_incomplete_frames, 1 )
+
+    def test_consecutive_frames( self ):
+        frames = [ Frame( bytes( [ 12, 3, 2, 0, i ] ) ) for i in range( 5 ) ]
+        for frame in frames:
+            self.WriteChunks( frame, 4 )
+            self.assertEqual( self.Read( len( frame ) )[0], frame )
+        self.assertEqual( self.reader.nb_frames, len( frames ) )
+
+
+if __name__ == "__main__":
+    unittest.main()